@@ -21,13 +21,19 @@
 from .network_monitor import NetworkMonitor
 from .policy_monitor import PolicyMonitor
 from .storage import MetricsStorage
+from .retention import RetentionEngine
+from .pubsub import TopicBus
+from .cache import ResponseCache
 
 __all__ = [
     "Collector",
     "FLMonitor",
     "NetworkMonitor",
     "PolicyMonitor",
-    "MetricsStorage"
+    "MetricsStorage",
+    "RetentionEngine",
+    "TopicBus",
+    "ResponseCache"
 ]
 
 # This file makes src/collector a Python package 
\ No newline at end of file
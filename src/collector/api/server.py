@@ -25,13 +25,14 @@
 import logging
 import threading
 import time
+import itertools
 import requests
 from datetime import datetime, timedelta
 from pathlib import Path
 from functools import wraps
 from typing import Optional, Dict, Any
 
-from flask import Flask, jsonify, request, Response, send_file, Blueprint
+from flask import Flask, jsonify, request, Response, send_file, Blueprint, stream_with_context, make_response
 from flask_cors import CORS
 from flask_restful import Api, Resource
 from werkzeug.middleware.proxy_fix import ProxyFix
@@ -43,6 +44,7 @@
     sys.path.insert(0, project_root)
 
 from src.collector.storage import MetricsStorage
+from src.collector.cache import ResponseCache
 
 # Configure logging
 logging.basicConfig(
@@ -68,10 +70,11 @@
 storage = MetricsStorage(output_dir=METRICS_DIR)
 
 # **PERFORMANCE CACHE**
-# Simple in-memory cache for frequently accessed data
-_fl_metrics_cache = {}
-_cache_ttl = 10  # Cache for 10 seconds
-_last_cache_time = 0
+# Bounded response cache for expensive read endpoints, invalidated by storage writes
+API_CACHE_MAX_ENTRIES = int(os.getenv("API_CACHE_MAX_ENTRIES", "256"))
+API_CACHE_TTL = float(os.getenv("API_CACHE_TTL", "10"))
+response_cache = ResponseCache(max_entries=API_CACHE_MAX_ENTRIES, default_ttl=API_CACHE_TTL)
+storage.add_write_listener(response_cache.invalidate)
 
 # Simple authentication middleware if enabled
 if API_AUTH_ENABLED:
@@ -107,24 +110,37 @@ def decorated(*args, **kwargs):
         return decorated
 
 # **PERFORMANCE HELPER FUNCTIONS**
-def _get_cached_fl_metrics(cache_key: str) -> Optional[Dict[str, Any]]:
-    """Get cached FL metrics if available and not expired."""
-    global _last_cache_time, _fl_metrics_cache
+def cached_response(tags=(), ttl: Optional[float] = None):
+    """Cache successful JSON responses of a view per path and query string.
     
-    current_time = time.time()
+    Args:
+        tags: Metric type prefixes whose writes invalidate the cached responses
+        ttl: Seconds a response stays cached (default: API_CACHE_TTL)
     
-    # Check if cache is expired
-    if current_time - _last_cache_time > _cache_ttl:
-        _fl_metrics_cache.clear()
-        _last_cache_time = current_time
-        return None
-    
-    return _fl_metrics_cache.get(cache_key)
-
-def _cache_fl_metrics(cache_key: str, data: Dict[str, Any]) -> None:
-    """Cache FL metrics data."""
-    global _fl_metrics_cache
-    _fl_metrics_cache[cache_key] = data
+    Requests with use_cache=false bypass the cache. Concurrent misses for the
+    same request are computed once.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if request.args.get('use_cache', 'true').lower() == 'false':
+                return f(*args, **kwargs)
+            
+            cache_key = f"{request.path}?{'&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True)))}"
+            
+            def compute():
+                response = make_response(f(*args, **kwargs))
+                return response.get_data(), response.status_code, response.mimetype
+            
+            (body, status, mimetype), hit = response_cache.get_or_compute(
+                cache_key, compute, ttl=ttl, tags=tags,
+                cacheable=lambda value: value[1] == 200
+            )
+            response = Response(body, status=status, mimetype=mimetype)
+            response.headers['X-Cache'] = 'HIT' if hit else 'MISS'
+            return response
+        return decorated
+    return decorator
 
 def _optimize_fl_metrics_query(limit: int, include_rounds: bool, rounds_only: bool) -> Dict[str, Any]:
     """Optimize FL metrics query parameters based on request size."""
@@ -158,6 +174,13 @@ def _optimize_fl_metrics_query(limit: int, include_rounds: bool, rounds_only: bo
     
     return optimized_params
 
+def _ndjson_response(items) -> Response:
+    """Stream an iterable of dicts as newline-delimited JSON."""
+    def generate():
+        for item in items:
+            yield json.dumps(item, default=str) + "\n"
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 # API Documentation
 @api_bp.route('/', methods=['GET'])
 def api_docs():
@@ -280,11 +303,21 @@ def debug_storage():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@api_bp.route('/debug/cache', methods=['GET'])
+def debug_cache():
+    """Get response cache hit/miss statistics."""
+    return jsonify(response_cache.get_stats())
+
 # Metrics endpoints
 @api_bp.route('/metrics', methods=['GET'])
 @requires_auth
 def get_all_metrics():
-    """Get all metrics with filtering options."""
+    """Get all metrics with filtering options.
+    
+    Pass the returned next_cursor as cursor to fetch the following page by keyset
+    instead of offset. With format=ndjson all matching metrics are streamed as
+    newline-delimited JSON (up to limit, if given).
+    """
     try:
         # Parse query parameters with memory-safe limits
         start_time = request.args.get('start')
@@ -293,35 +326,59 @@ def get_all_metrics():
         source_component_filter = request.args.get('source_component')
         limit = request.args.get('limit', type=int, default=100)
         offset = request.args.get('offset', type=int, default=0)
+        cursor = request.args.get('cursor')
+        output_format = request.args.get('format', 'json').lower()
         sort_by = request.args.get('sort_by', default='timestamp')
         sort_desc = request.args.get('sort_desc', 'true').lower() in ('true', '1', 't', 'yes')
         
+        filters = {
+            'start_time': start_time,
+            'end_time': end_time,
+            'type_filter': type_filter,
+            'source_component': source_component_filter,
+            'sort_desc': sort_desc
+        }
+        
+        if cursor:
+            storage.decode_cursor(cursor)  # Reject malformed cursors before streaming
+        
+        if output_format == 'ndjson':
+            # Streamed in batches, never materializing the full result
+            items = storage.iter_metrics(cursor=cursor, **filters)
+            if 'limit' in request.args:
+                items = itertools.islice(items, max(0, limit))
+            return _ndjson_response(items)
+        
         # MEMORY OPTIMIZATION: Enforce strict limits
         limit = min(limit, 1000)  # Maximum 1000 items per request
         offset = max(0, offset)   # No negative offsets
         
         # Load metrics from storage
-        metrics = storage.load_metrics(
-            start_time=start_time, 
-            end_time=end_time,
-            type_filter=type_filter,
-            source_component=source_component_filter,
+        page = storage.load_metrics_page(
             limit=limit,
             offset=offset,
-            sort_desc=sort_desc
+            cursor=cursor,
+            **filters
         )
+        metrics = page['metrics']
         
         return jsonify({
             "status": "success",
             "count": len(metrics),
             "offset": offset,
             "limit": limit,
+            "next_cursor": page['next_cursor'],
             "total": storage.count_metrics(
                 type_filter=type_filter,
                 source_component=source_component_filter
             ),
             "metrics": metrics
         })
+    except ValueError as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 400
     except Exception as e:
         logger.error(f"Error retrieving metrics: {e}")
         return jsonify({
@@ -409,6 +466,7 @@ def get_latest_metrics():
 
 @api_bp.route('/metrics/fl', methods=['GET'])
 @requires_auth
+@cached_response(tags=('fl_',))
 def get_fl_metrics():
     """
     Get FL metrics with enhanced round-by-round access and performance optimizations.
@@ -427,7 +485,6 @@ def get_fl_metrics():
         optimize: Enable performance optimizations for large datasets (default: true)
     """
     import time
-    import hashlib
     
     start_time_exec = time.time()
     
@@ -443,7 +500,6 @@ def get_fl_metrics():
         include_rounds = request.args.get('include_rounds', 'true').lower() == 'true'
         consolidate_rounds = request.args.get('consolidate_rounds', 'true').lower() == 'true'
         rounds_only = request.args.get('rounds_only', 'false').lower() == 'true'
-        use_cache = request.args.get('use_cache', 'true').lower() == 'true'
         optimize = request.args.get('optimize', 'true').lower() == 'true'
         
         # Round filtering parameters
@@ -455,21 +511,6 @@ def get_fl_metrics():
         start_time = request.args.get('start_time')
         end_time = request.args.get('end_time')
         
-        # **CACHING STRATEGY**
-        cache_key = None
-        if use_cache:
-            # Create cache key from request parameters
-            params_str = f"l{limit}_ir{include_raw}_inc{include_rounds}_cr{consolidate_rounds}_ro{rounds_only}_min{min_round}_max{max_round}_st{start_time}_et{end_time}"
-            cache_key = hashlib.md5(params_str.encode()).hexdigest()
-            
-            # Try to get cached data
-            cached_data = _get_cached_fl_metrics(cache_key)
-            if cached_data:
-                logger.debug(f"Returning cached FL metrics (key: {cache_key[:8]}...)")
-                cached_data['cached'] = True
-                cached_data['cache_key'] = cache_key[:8]
-                return jsonify(cached_data)
-        
         # **OPTIMIZATION STRATEGY**
         optimization_params = {}
         if optimize:
@@ -585,10 +626,6 @@ def get_fl_metrics():
                 'execution_time_ms': round((time.time() - start_time_exec) * 1000, 2)
             }
             
-            # Cache empty response
-            if use_cache and cache_key:
-                _cache_fl_metrics(cache_key, response)
-            
             return jsonify(response)
         
         # **OPTIMIZED PROCESSING**
@@ -843,7 +880,6 @@ def get_fl_metrics():
             'execution_time_ms': round(execution_time * 1000, 2),
             'optimizations_applied': optimization_params if optimize else {},
             'performance_info': {
-                'cached': False,
                 'processing_time_ms': round(execution_time * 1000, 2),
                 'total_metrics_processed': len(all_fl_metrics),
                 'optimization_enabled': optimize
@@ -867,11 +903,6 @@ def get_fl_metrics():
                     }
                 }
         
-        # Cache the response
-        if use_cache and cache_key:
-            _cache_fl_metrics(cache_key, response)
-            logger.debug(f"Cached FL metrics response (key: {cache_key[:8]}...)")
-        
         logger.info(f"FL metrics request completed in {execution_time:.3f}s: {len(formatted_metrics)} metrics, {len(processed_rounds)} rounds")
         
         return jsonify(response)
@@ -888,6 +919,7 @@ def get_fl_metrics():
 # **ENHANCED FL ROUNDS ENDPOINT - Consolidated from multiple endpoints**
 @api_bp.route('/metrics/fl/rounds', methods=['GET'])
 @requires_auth
+@cached_response(tags=('fl_',))
 def get_fl_rounds_history():
     """
     Comprehensive FL rounds endpoint - consolidated from multiple endpoints.
@@ -1053,31 +1085,32 @@ def handle_fl_polling_request(since_round, since_timestamp, limit):
         latest_round = 0
         events = []
 
-        # Get new rounds from storage
-        all_metrics = storage.load_metrics(
-            type_filter=None,
+        # Get new rounds from storage, projecting only the fields we return
+        round_rows = storage.load_metric_fields(
+            ['metric_type', 'timestamp_iso', 'status', 'accuracy', 'loss', 'training_duration',
+             'clients_count', 'data.timestamp', 'data.data_source', 'data.training_complete'],
+            type_prefix='fl_round_',
             limit=limit * 2,
             start_time=since_timestamp
         )
         
-        for metric in all_metrics:
-            metric_name = metric.get('metric_type', '')
-            if metric_name.startswith('fl_round_') and not metric_name.endswith('_event'):
+        for row in round_rows:
+            metric_name = row['metric_type']
+            if not metric_name.endswith('_event'):
                 try:
                     round_num = int(metric_name.replace('fl_round_', '').split('_')[0])
                     
                     if not since_round or round_num > since_round:
-                        data = metric.get('data', {})
                         round_data = {
                             'round': round_num,
-                            'timestamp': data.get('timestamp', metric.get('timestamp')),
-                            'status': data.get('status', 'complete'),
-                            'accuracy': data.get('accuracy', 0),
-                            'loss': data.get('loss', 0),
-                            'training_duration': data.get('training_duration', 0),
-                            'clients': data.get('clients', 0),
-                            'data_source': data.get('data_source', 'collector'),
-                            'training_complete': data.get('training_complete', False)
+                            'timestamp': row['data.timestamp'] or row['timestamp_iso'],
+                            'status': row['status'] or 'complete',
+                            'accuracy': row['accuracy'] or 0,
+                            'loss': row['loss'] or 0,
+                            'training_duration': row['training_duration'] or 0,
+                            'clients': row['clients_count'] or 0,
+                            'data_source': row['data.data_source'] or 'collector',
+                            'training_complete': bool(row['data.training_complete'])
                         }
                         
                         new_rounds.append(round_data)
@@ -1133,35 +1166,56 @@ def extract_collector_rounds(limit, start_round, end_round, min_accuracy, max_ac
     collector_rounds = []
     
     try:
-        # Get FL metrics from storage using enhanced processing
-        # First try to get individual FL round metrics which have more detailed data
-        fl_round_metrics = storage.load_metrics(
-            type_filter='fl_round_',  # Get individual round metrics
-            limit=limit * 3,  # Get extra to handle filtering
-            offset=0
+        # Process FL metrics to extract round data using only server-provided data
+        processed_metrics = []
+        
+        # First use individual FL round metrics, whose fields are promoted columns
+        # and can be read without decoding data_json
+        fl_round_rows = storage.load_metric_fields(
+            ['metric_type', 'timestamp_iso', 'round_number', 'accuracy', 'loss', 'status',
+             'training_duration', 'model_size_mb', 'clients_count'],
+            type_prefix='fl_round_',
+            limit=limit * 3  # Get extra to handle filtering
         )
         
-        logger.debug(f"Retrieved {len(fl_round_metrics)} individual FL round metrics from storage")
+        logger.debug(f"Retrieved {len(fl_round_rows)} individual FL round metrics from storage")
         
-        # Also get general FL server metrics for fallback data
-        fl_server_metrics = storage.load_metrics(
-            type_filter='fl_server',
-            limit=limit * 2,  # Get some server snapshots too
-            offset=0
-        )
+        for row in fl_round_rows:
+            if row['metric_type'].endswith('_event') or not row['round_number']:
+                continue
+            processed_metrics.append({
+                'round': row['round_number'],
+                'timestamp': row['timestamp_iso'],
+                'accuracy': row['accuracy'] or 0,
+                'loss': row['loss'] or 0,
+                'clients_connected': row['clients_count'] or 0,
+                'training_duration': row['training_duration'] or 0,
+                'model_size_mb': row['model_size_mb'] or 0.0,
+                'status': row['status'] or 'complete',
+                'source_type': row['metric_type']
+            })
         
-        logger.debug(f"Retrieved {len(fl_server_metrics)} FL server metrics from storage")
+        # Only decode full FL server snapshots when round metrics don't cover the request
+        all_fl_metrics = []
+        if len({metric['round'] for metric in processed_metrics}) < limit:
+            all_fl_metrics = storage.load_metrics(
+                type_filter='fl_server',
+                limit=limit * 2,  # Get some server snapshots too
+                offset=0
+            )
         
-        # Combine and process all FL metrics
-        all_fl_metrics = fl_round_metrics + fl_server_metrics
+        logger.debug(f"Retrieved {len(all_fl_metrics)} FL server metrics from storage")
         
         # Get the latest FL server status for fallback client data
         fallback_clients = 0
         try:
-            latest_fl_status = storage.load_metrics(type_filter='fl_server', limit=1, sort_desc=True)
+            latest_fl_status = storage.load_metric_fields(
+                ['data.connected_clients', 'data.clients_connected'],
+                type_filter='fl_server', limit=1, sort_desc=True
+            )
             if latest_fl_status:
-                status_data = latest_fl_status[0].get('data', {})
-                fallback_clients = status_data.get('connected_clients', status_data.get('clients_connected', 0))
+                status_data = latest_fl_status[0]
+                fallback_clients = status_data['data.connected_clients'] or status_data['data.clients_connected'] or 0
         except Exception as e:
             logger.debug(f"Could not get fallback client count: {e}")
             fallback_clients = 0
@@ -1191,9 +1245,6 @@ def calculate_realistic_model_size(model_type: str = 'cnn') -> float:
                 # Default medium-sized model
                 return 1.5  # 1.5 MB default
         
-        # Process FL metrics to extract round data using only server-provided data
-        processed_metrics = []
-        
         for metric in all_fl_metrics:
             try:
                 data = metric.get('data', {})
@@ -1648,6 +1699,8 @@ def get_events():
         limit: Maximum number of results to return (default: 100)
         offset: Number of results to skip (default: 0)
         since_id: Get events with ID greater than this value
+        cursor: Continuation token from a previous response's next_cursor (replaces offset)
+        format: 'json' (default) or 'ndjson' to stream all matching events
     """
     try:
         # Parse query parameters
@@ -1661,6 +1714,8 @@ def get_events():
         limit = int(request.args.get('limit', 100))  # No hard maximum limit
         offset = int(request.args.get('offset', 0))
         since_id = request.args.get('since_id')
+        cursor = request.args.get('cursor')
+        output_format = request.args.get('format', 'json').lower()
         
         # Use component as fallback for source_component
         if not source_component and component:
@@ -1670,17 +1725,36 @@ def get_events():
         if not event_level and level:
             event_level = level
         
+        filters = {
+            'start_time': start_time,
+            'end_time': end_time,
+            'source_component': source_component,
+            'event_type': event_type,
+            'level': event_level,
+            'since_id': since_id,
+            'sort_desc': True
+        }
+        
+        if cursor:
+            try:
+                storage.decode_cursor(cursor)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+        
+        if output_format == 'ndjson':
+            items = storage.iter_events(cursor=cursor, **filters)
+            if 'limit' in request.args:
+                items = itertools.islice(items, max(0, limit))
+            return _ndjson_response(items)
+        
         # Get matching events
-        events = storage.load_events(
-            start_time=start_time,
-            end_time=end_time,
-            source_component=source_component,
-            event_type=event_type,
-            level=event_level,
+        page = storage.load_events_page(
             limit=limit,
             offset=offset,
-            sort_desc=True
+            cursor=cursor,
+            **filters
         )
+        events = page['events']
         
         # Get total count for pagination
         total_count = storage.count_events(
@@ -1719,7 +1793,8 @@ def get_events():
             'events': events,
             'total': total_count,
             'limit': limit,
-            'offset': offset
+            'offset': offset,
+            'next_cursor': page['next_cursor']
         })
     except Exception as e:
         logger.error(f"Error in /events endpoint: {str(e)}")
@@ -1731,7 +1806,7 @@ def get_events_summary():
     """
     Get summary information about events.
     
-    Returns count of events by component, by level, and total.
+    Returns exact counts of events by component, by level, by type, and total.
     
     Query parameters:
         source_component: Filter by source component
@@ -1756,68 +1831,26 @@ def get_events_summary():
         if not event_level and level:
             event_level = level
         
-        # Get events matching the filters
-        # Use a reasonable default for summary but allow override
-        summary_limit = int(request.args.get('summary_limit', 5000))  # Higher default for better accuracy
-        events = storage.load_events(
-            source_component=source_component,
-            event_type=event_type,
-            level=event_level,
-            limit=summary_limit,  # Configurable limit for summary calculation
-            sort_desc=True
-        )
-        
-        # Get total count
-        total_count = storage.count_events(
+        # Exact counts per group, maintained by the storage as events are written
+        summary = storage.get_event_summary(
             source_component=source_component,
             event_type=event_type,
             level=event_level
         )
+        by_source_component = summary['by_source_component']
+        by_event_level = summary['by_event_level']
         
-        # Count by component and level
-        by_component = {}
-        by_level = {}
-        by_source_component = {}  # Also store original field name
-        by_event_level = {}      # Also store original field name
-        
-        for event in events:
-            # Count by component
-            component = event.get('component', event.get('source_component', 'unknown'))
-            by_component[component] = by_component.get(component, 0) + 1
-            
-            # Count by original field name too
-            source_component = event.get('source_component', 'unknown')
-            by_source_component[source_component] = by_source_component.get(source_component, 0) + 1
-            
-            # Count by level
-            level = event.get('level', event.get('event_level', 'INFO'))
-            by_level[level] = by_level.get(level, 0) + 1
-            
-            # Count by original field name too
-            event_level = event.get('event_level', 'INFO')
-            by_event_level[event_level] = by_event_level.get(event_level, 0) + 1
-        
-        # If we sampled, adjust the counts proportionally
-        if events and total_count > len(events):
-            ratio = total_count / len(events)
-            
-            for comp in by_component:
-                by_component[comp] = int(by_component[comp] * ratio)
-                
-            for comp in by_source_component:
-                by_source_component[comp] = int(by_source_component[comp] * ratio)
-                
-            for lvl in by_level:
-                by_level[lvl] = int(by_level[lvl] * ratio)
-                
-            for lvl in by_event_level:
-                by_event_level[lvl] = int(by_event_level[lvl] * ratio)
+        # Dashboard compatibility aliases
+        by_component = dict(by_source_component)
+        by_level = dict(by_event_level)
+        total_count = summary['total']
         
         return jsonify({
             'by_component': by_component,
             'by_source_component': by_source_component,
             'by_level': by_level,
             'by_event_level': by_event_level,
+            'by_event_type': summary['by_event_type'],
             'total': total_count
         })
     except Exception as e:
@@ -1939,8 +1972,17 @@ def optimize_database():
             'status': 'error'
         }), 500
 
+# Fields of the latest network metric used by /network/topology
+_TOPOLOGY_METRIC_FIELDS = [
+    'status', 'sdn_status', 'switches_count',
+    'data.topology', 'data.collection_timestamp', 'data.project_name', 'data.project_id',
+    'data.project_status', 'data.total_flows', 'data.total_ports', 'data.avg_latency_ms',
+    'data.packet_loss_percent', 'data.bandwidth_utilization_percent'
+]
+
 @api_bp.route('/network/topology', methods=['GET'])
 @requires_auth
+@cached_response(tags=('network',), ttl=5)
 def get_network_topology():
     """
     Get detailed network topology data from GNS3 and SDN controller.
@@ -1957,8 +1999,10 @@ def get_network_topology():
         include_metrics = request.args.get('include_metrics', 'true').lower() == 'true'
         format_type = request.args.get('format', 'detailed')  # 'detailed', 'summary'
         
-        # Get latest network metrics containing topology data
-        latest_network = storage.load_metrics(
+        # Get latest network metrics containing topology data. Only the fields used
+        # below are read, so port metrics and flow statistics are never decoded.
+        latest_network = storage.load_metric_fields(
+            _TOPOLOGY_METRIC_FIELDS,
             type_filter='network',
             limit=1,
             sort_desc=True
@@ -2036,7 +2080,10 @@ def get_network_topology():
                     'message': 'Network monitor not available - empty topology returned'
                 })
         else:
-            network_data = latest_network[0].get('data', {})
+            network_data = {
+                field.split('.', 1)[-1]: value
+                for field, value in latest_network[0].items() if value is not None
+            }
         
         topology = network_data.get('topology', {})
         
@@ -2266,6 +2313,7 @@ def get_network_flows():
 
 @api_bp.route('/performance/metrics', methods=['GET'])
 @requires_auth
+@cached_response(tags=('network',), ttl=5)
 def get_performance_metrics():
     """
     Get comprehensive network performance metrics with health scoring.
@@ -2726,15 +2774,65 @@ def get_fl_configuration():
 
 # Add WebSocket support for real-time metrics updates
 try:
-    from flask_socketio import SocketIO
+    from flask_socketio import SocketIO, join_room, leave_room
     socketio = SocketIO(app, cors_allowed_origins=API_ALLOWED_ORIGINS.split(","))
     
+    # One broadcaster per metric type pushes newly stored metrics to that type's room.
+    # Subscribers are tracked so broadcasters stop once their last client leaves.
+    ws_subscriptions = {}  # sid -> (metric type, interval ms)
+    ws_broadcasters = {}   # metric type -> {sid: interval ms}
+    ws_lock = threading.Lock()
+    
+    def _metrics_room(metric_type):
+        return f"metrics:{metric_type}"
+    
+    def _run_broadcaster(metric_type):
+        """Forward the newest stored metric of a type to its room, at most once per interval."""
+        subscription = storage.topic_bus.subscribe('*' if metric_type == 'all' else metric_type)
+        room = _metrics_room(metric_type)
+        try:
+            while True:
+                with ws_lock:
+                    clients = ws_broadcasters.get(metric_type)
+                    if not clients:
+                        ws_broadcasters.pop(metric_type, None)
+                        break
+                    interval = min(clients.values())
+                
+                messages = subscription.drain()
+                if messages:
+                    try:
+                        socketio.emit('metrics_update',
+                                      {'timestamp': datetime.now().isoformat(),
+                                       'type': metric_type,
+                                       'data': messages[-1]},
+                                      room=room)
+                    except Exception as e:
+                        logger.error(f"Error emitting metrics: {e}")
+                
+                socketio.sleep(interval / 1000.0)  # Convert to seconds
+        finally:
+            subscription.close()
+            logger.info(f"Stopped WebSocket broadcaster for '{metric_type}'")
+    
+    def _remove_subscription(client_id):
+        """Forget a client's subscription; returns the metric type it was subscribed to."""
+        with ws_lock:
+            previous = ws_subscriptions.pop(client_id, None)
+            if previous is None:
+                return None
+            clients = ws_broadcasters.get(previous[0])
+            if clients is not None:
+                clients.pop(client_id, None)
+        return previous[0]
+    
     @socketio.on('connect')
     def handle_connect():
         logger.info(f"Client connected to WebSocket: {request.sid}")
     
     @socketio.on('disconnect')
     def handle_disconnect():
+        _remove_subscription(request.sid)
         logger.info(f"Client disconnected from WebSocket: {request.sid}")
     
     @socketio.on('subscribe')
@@ -2748,40 +2846,46 @@ def handle_subscribe(data):
         metric_type = data.get('type', 'all')
         interval = min(max(int(data.get('interval', 5000)), 1000), 30000)  # Between 1-30 seconds
         
-        # Store subscription info
-        if not hasattr(socketio, 'subscriptions'):
-            socketio.subscriptions = {}
-        socketio.subscriptions[client_id] = {'type': metric_type, 'interval': interval}
-        
-        # Start emitting metrics at requested interval
-        def emit_metrics():
-            while client_id in socketio.subscriptions:
-                try:
-                    # Get latest metrics of the requested type
-                    latest = storage.load_metrics(
-                        limit=1,
-                        type_filter=metric_type if metric_type != 'all' else None,
-                        sort_desc=True
-                    )
-                    
-                    # Emit to the client
-                    if latest:
-                        socketio.emit('metrics_update', 
-                                    {'timestamp': datetime.now().isoformat(), 
-                                     'type': metric_type, 
-                                     'data': latest[0]}, 
-                                    room=client_id)
-                except Exception as e:
-                    logger.error(f"Error emitting metrics: {e}")
-                    
-                # Sleep for the requested interval
-                socketio.sleep(interval / 1000.0)  # Convert to seconds
-        
-        # Start the background task
-        socketio.start_background_task(emit_metrics)
+        # A client follows one metric type at a time
+        previous = _remove_subscription(client_id)
+        if previous is not None and previous != metric_type:
+            leave_room(_metrics_room(previous))
+        join_room(_metrics_room(metric_type))
+        
+        with ws_lock:
+            ws_subscriptions[client_id] = (metric_type, interval)
+            start_broadcaster = metric_type not in ws_broadcasters
+            ws_broadcasters.setdefault(metric_type, {})[client_id] = interval
+        if start_broadcaster:
+            socketio.start_background_task(_run_broadcaster, metric_type)
+            logger.info(f"Started WebSocket broadcaster for '{metric_type}'")
+        
+        # Send the current value once; later updates are pushed as metrics are stored
+        try:
+            latest = storage.load_metrics(
+                limit=1,
+                type_filter=metric_type if metric_type != 'all' else None,
+                sort_desc=True
+            )
+            if latest:
+                socketio.emit('metrics_update',
+                              {'timestamp': datetime.now().isoformat(),
+                               'type': metric_type,
+                               'data': latest[0]},
+                              room=client_id)
+        except Exception as e:
+            logger.error(f"Error emitting metrics: {e}")
         
         return {'status': 'subscribed', 'type': metric_type, 'interval': interval}
     
+    @socketio.on('unsubscribe')
+    def handle_unsubscribe(data=None):
+        """Handle cancellation of a real-time metrics subscription."""
+        metric_type = _remove_subscription(request.sid)
+        if metric_type is not None:
+            leave_room(_metrics_room(metric_type))
+        return {'status': 'unsubscribed', 'type': metric_type}
+    
     logger.info("WebSocket support enabled for real-time metrics updates")
     has_websocket = True
 except ImportError:
@@ -2801,8 +2905,11 @@ def metrics_stream_info():
             'events': {
                 'connect': 'Connection established',
                 'subscribe': 'Subscribe to metrics updates',
+                'unsubscribe': 'Stop receiving metrics updates',
                 'metrics_update': 'Received when new metrics are available'
-            }
+            },
+            'subscribers': len(ws_subscriptions),
+            'bus': storage.topic_bus.get_stats()
         })
     else:
         return jsonify({
@@ -0,0 +1,182 @@
+"""
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Bounded response cache for the collector API.
+
+Entries expire individually after their TTL and the least recently used entry
+is evicted when the cache is full. Concurrent misses on the same key are
+coalesced so only one caller computes the value, and entries are tagged with
+metric type prefixes so storage writes can invalidate exactly what they affect.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """Thread-safe TTL + LRU cache with single-flight computation."""
+
+    def __init__(self, max_entries: int = 256, default_ttl: float = 10.0, wait_timeout: float = 30.0):
+        """Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of cached entries before LRU eviction
+            default_ttl: Seconds an entry stays valid when no TTL is given
+            wait_timeout: Seconds a caller waits for another caller's computation
+        """
+        self.max_entries = max(1, int(max_entries))
+        self.default_ttl = default_ttl
+        self.wait_timeout = wait_timeout
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, expires_at, tags)
+        self._in_flight = {}           # key -> {'done': Event, 'tags': tuple, 'stale': bool}
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0
+        }
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get a live entry, or None if it is missing or expired."""
+        with self._lock:
+            return self._lookup(key)
+
+    def _lookup(self, key: str) -> Optional[Any]:
+        """Look up a key with the lock held, dropping it if expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at, _ = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self._stats['expirations'] += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, tags: Iterable[str] = ()):
+        """Store a value, evicting the least recently used entries if the cache is full."""
+        with self._lock:
+            self._store(key, value, ttl, tags)
+
+    def _store(self, key: str, value: Any, ttl: Optional[float], tags: Iterable[str]):
+        """Store a value with the lock held."""
+        expires_at = time.monotonic() + (self.default_ttl if ttl is None else ttl)
+        self._entries[key] = (value, expires_at, tuple(tags))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats['evictions'] += 1
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any], ttl: Optional[float] = None,
+                       tags: Iterable[str] = (),
+                       cacheable: Callable[[Any], bool] = lambda value: True) -> Tuple[Any, bool]:
+        """Get a cached value or compute it, letting only one caller per key compute at a time.
+
+        Args:
+            key: Cache key
+            compute: Function producing the value on a miss
+            ttl: Seconds the computed value stays valid (default: default_ttl)
+            tags: Metric type prefixes whose writes invalidate the entry
+            cacheable: Predicate deciding whether a computed value may be stored
+
+        Returns:
+            Tuple of (value, True if served from the cache)
+        """
+        while True:
+            with self._lock:
+                value = self._lookup(key)
+                if value is not None:
+                    self._stats['hits'] += 1
+                    return value, True
+                pending = self._in_flight.get(key)
+                if pending is None:
+                    pending = {'done': threading.Event(), 'tags': tuple(tags), 'stale': False}
+                    self._in_flight[key] = pending
+                    self._stats['misses'] += 1
+                    break
+                self._stats['coalesced'] += 1
+            # Another caller is computing this key; use its result once it is stored
+            if not pending['done'].wait(self.wait_timeout):
+                logger.warning(f"Timed out waiting for cache computation of {key}")
+                return compute(), False
+            with self._lock:
+                value = self._lookup(key)
+                if value is not None:
+                    self._stats['hits'] += 1
+                    return value, True
+            # The leader failed, produced an uncacheable value or was invalidated; compete again
+
+        try:
+            value = compute()
+            with self._lock:
+                # Values computed across an invalidation may already be stale
+                if cacheable(value) and not pending['stale']:
+                    self._store(key, value, ttl, pending['tags'])
+            return value, False
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            pending['done'].set()
+
+    def invalidate(self, metric_types: Iterable[str]) -> int:
+        """Drop entries tagged with a prefix of any of the given metric types.
+
+        Returns:
+            Number of entries dropped
+        """
+        metric_types = tuple(metric_types)
+        if not metric_types:
+            return 0
+
+        def matches(tags):
+            return any(metric_type.startswith(tag) for tag in tags for metric_type in metric_types)
+
+        with self._lock:
+            stale = [key for key, (_, _, tags) in self._entries.items() if matches(tags)]
+            for key in stale:
+                del self._entries[key]
+            for pending in self._in_flight.values():
+                if matches(pending['tags']):
+                    pending['stale'] = True
+            self._stats['invalidations'] += len(stale)
+        return len(stale)
+
+    def clear(self):
+        """Drop all entries."""
+        with self._lock:
+            self._entries.clear()
+            for pending in self._in_flight.values():
+                pending['stale'] = True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit, miss and eviction counters."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['in_flight'] = len(self._in_flight)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        stats['max_entries'] = self.max_entries
+        stats['default_ttl'] = self.default_ttl
+        return stats
@@ -42,6 +42,7 @@
 from src.collector.fl_monitor import FLMonitor
 from src.collector.network_monitor import NetworkMonitor
 from src.collector.event_monitor import EventMonitor
+from src.collector.retention import RetentionEngine
 
 # --- Configuration --- 
 # Load .env file if it exists (for local development)
@@ -83,6 +84,9 @@ def load_config(config_path):
                 storage_config = config["storage"]
                 if "metrics_output_dir" in storage_config:
                     config["storage_dir"] = storage_config["metrics_output_dir"]
+                for key in ("write_behind", "batch_size", "flush_interval_ms", "retention_chunk_size", "partitioning"):
+                    if key in storage_config:
+                        config[f"storage_{key}"] = storage_config[key]
                     
             if "logging" in config and isinstance(config["logging"], dict):
                 logging_config = config["logging"]
@@ -163,10 +167,22 @@ def __init__(self, config_path: str = None):
         self.metrics_output_dir = self.config.get("storage_dir", os.getenv("METRICS_OUTPUT_DIR", "./logs"))
         self.log_level = self.config.get("log_level", os.getenv("LOG_LEVEL", "INFO")).upper() # Update logger level if needed
         
+        # Write-behind batching for storage (off by default)
+        self.storage_write_behind = get_env_bool("STORAGE_WRITE_BEHIND", self.config.get("storage_write_behind", False))
+        self.storage_batch_size = int(self.config.get("storage_batch_size", os.getenv("STORAGE_BATCH_SIZE", "500")))
+        self.storage_flush_interval_ms = int(self.config.get("storage_flush_interval_ms", os.getenv("STORAGE_FLUSH_INTERVAL_MS", "250")))
+        # Time partitioning of metrics/events tables: "day", "hour" or unset for a single table
+        self.storage_partitioning = self.config.get("storage_partitioning", os.getenv("STORAGE_PARTITIONING")) or None
+        
+        # Background retention replaces cleanup on the ingest path
+        self.retention_interval_sec = int(self.config.get("retention_interval_sec", os.getenv("RETENTION_INTERVAL_SEC", "300")))
+        self.retention_chunk_size = int(self.config.get("storage_retention_chunk_size", os.getenv("RETENTION_CHUNK_SIZE", "2000")))
+        
         self.check_policy_enabled = get_env_bool("CHECK_POLICY_ENABLED", self.config.get("check_policy_enabled", True)) # Allow config override
         self.policy_monitor_enabled = get_env_bool("POLICY_MONITOR_ENABLED", self.config.get("policy_monitor_enabled", True))
         self.fl_monitor_enabled = get_env_bool("FL_MONITOR_ENABLED", self.config.get("fl_monitor_enabled", True))
         self.network_monitor_enabled = get_env_bool("NETWORK_MONITOR_ENABLED", self.config.get("network_monitor_enabled", True))
+        self.network_monitor_workers = int(self.config.get("network_monitor_workers", os.getenv("NETWORK_MONITOR_WORKERS", "8")))
         self.event_monitor_enabled = get_env_bool("EVENT_MONITOR_ENABLED", self.config.get("event_monitor_enabled", True))
 
         # FL intervals optimized for different training modes
@@ -219,7 +235,16 @@ def __init__(self, config_path: str = None):
             output_dir=self.metrics_output_dir,
             db_name="metrics.db",         # SQLite database file
             max_age_days=14,              # Keep data for 2 weeks (increased for dashboard charts)
-            cleanup_interval_hours=12     # Cleanup twice daily
+            cleanup_interval_hours=12,    # Cleanup twice daily
+            write_behind=self.storage_write_behind,
+            batch_size=self.storage_batch_size,
+            flush_interval_ms=self.storage_flush_interval_ms,
+            inline_cleanup=False,         # Handled by the scheduled retention engine
+            partitioning=self.storage_partitioning
+        )
+        self.retention_engine = RetentionEngine(
+            self.storage,
+            chunk_size=self.retention_chunk_size
         )
         self.scheduler = BlockingScheduler(timezone="UTC")
         self.policy_monitor = None
@@ -267,7 +292,8 @@ def _setup_monitors(self):
             try:
                 self.network_monitor = NetworkMonitor(
                     storage=self.storage,
-                    sdn_controller_url=sdn_controller_url
+                    sdn_controller_url=sdn_controller_url,
+                    max_workers=self.network_monitor_workers
                 )
                 logger.info(f"Network monitor initialized with SDN Controller at {sdn_controller_url}")
             except ValueError as e:
@@ -353,12 +379,15 @@ def collector_status():
                         'policy_sec': self.policy_interval_sec if self.policy_monitor_enabled else None,
                         'fl_sec': self.fl_interval_sec if self.fl_monitor_enabled else None,
                         'network_sec': self.network_interval_sec if self.network_monitor_enabled else None,
-                        'event_sec': self.event_interval_sec if self.event_monitor_enabled else None
+                        'event_sec': self.event_interval_sec if self.event_monitor_enabled else None,
+                        'retention_sec': self.retention_interval_sec
                     },
                     'urls': {
                         'policy_engine': self.policy_engine_url if self.policy_monitor_enabled else None,
                         'fl_server': self.fl_server_url if self.fl_monitor_enabled else None
-                    }
+                    },
+                    'storage': self.storage.get_write_stats(),
+                    'retention': self.retention_engine.get_stats()
                 })
             
             self.api_app = app
@@ -463,6 +492,17 @@ def _setup_scheduler(self):
             )
             logger.info(f"Event collection scheduled every {self.event_interval_sec} seconds")
         
+        # Schedule incremental retention (chunked deletes + incremental vacuum)
+        self.scheduler.add_job(
+            func=self.retention_engine.run,
+            trigger="interval",
+            seconds=self.retention_interval_sec,
+            id="storage_retention",
+            max_instances=1,
+            coalesce=True
+        )
+        logger.info(f"Storage retention scheduled every {self.retention_interval_sec} seconds")
+        
         logger.info("Scheduler setup completed with event-based FL monitoring")
 
     def _collect_policy_metrics(self):
@@ -605,6 +645,19 @@ def shutdown(self):
             except Exception as e:
                 logger.error(f"Error stopping FL monitoring: {e}")
         
+        if self.network_monitor_enabled and self.network_monitor:
+            try:
+                self.network_monitor.close()
+            except Exception as e:
+                logger.error(f"Error closing network monitor: {e}")
+        
+        # Commit any queued writes before connections are closed
+        try:
+            if self.storage.flush():
+                logger.info("Storage write queue flushed.")
+        except Exception as e:
+            logger.error(f"Error while flushing storage: {e}")
+        
         try:
             self.storage.close()
             logger.info("Storage connections closed.")
@@ -14,24 +14,32 @@
 
 import logging
 import os
+import threading
 import time
 import requests
-from typing import Dict, Any, Optional, List
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, Optional, List, Tuple
 import json
 
 from .storage import MetricsStorage
 
 logger = logging.getLogger(__name__)
 
+# Seconds before the bulk stats endpoint is tried again after the controller lacked it
+BULK_STATS_RETRY_SEC = 300
+
 class NetworkMonitor:
     """Monitors the network topology via an SDN controller."""
 
-    def __init__(self, storage: MetricsStorage, sdn_controller_url: str):
+    def __init__(self, storage: MetricsStorage, sdn_controller_url: str, max_workers: int = 8):
         """Initialize the NetworkMonitor.
 
         Args:
             storage: The MetricsStorage instance for saving metrics.
             sdn_controller_url: The URL of the SDN controller REST API (e.g., "http://localhost:8181").
+            max_workers: Maximum concurrent requests to the SDN controller per collection cycle.
         """
         if not sdn_controller_url:
             raise ValueError("sdn_controller_url is required for NetworkMonitor")
@@ -46,6 +54,46 @@ def __init__(self, storage: MetricsStorage, sdn_controller_url: str):
         # Track known switch DPIDs for change detection
         self._last_known_dpids: List[str] = []
 
+        # Keep-alive connections shared by all requests, one per worker
+        self.max_workers = max(1, int(max_workers))
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._request_count = 0
+        self._bulk_stats_retry_at = 0.0
+        self._cycle_durations = deque(maxlen=100)
+        self._last_cycle: Dict[str, Any] = {}
+
+    def _get(self, url: str, **kwargs) -> requests.Response:
+        """GET over the pooled session, counting requests for the cycle statistics."""
+        with self._lock:
+            self._request_count += 1
+        return self.session.get(url, **kwargs)
+
+    def _map(self, fn, items: List[Any]) -> List[Any]:
+        """Apply fn to each item on the worker pool; results are in the order of the items."""
+        if len(items) <= 1:
+            return [fn(item) for item in items]
+        return list(self._get_executor().map(fn, items))
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix="network-monitor")
+            return self._executor
+
+    def close(self):
+        """Shut down the worker pool and close pooled connections."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+        self.session.close()
+
     def _get_sdn_port_stats(self, dpid: str) -> List[Dict[str, Any]]:
         """Get port stats from the SDN controller for a specific switch."""
         try:
@@ -57,7 +105,7 @@ def _get_sdn_port_stats(self, dpid: str) -> List[Dict[str, Any]]:
             # This endpoint is provided by ryu.app.ofctl_rest
             url = f"{self.sdn_controller_url}/stats/port/{dpid}"
             logger.debug(f"Requesting port stats for switch {dpid} from {url}")
-            response = requests.get(url, timeout=5)
+            response = self._get(url, timeout=5)
             response.raise_for_status()
             stats = response.json()
             port_stats = stats.get(dpid, [])
@@ -76,7 +124,7 @@ def _get_sdn_switches(self) -> List[Dict[str, Any]]:
             # Use Ryu REST topology endpoint which has real data
             url = f"{self.sdn_controller_url}/v1.0/topology/switches"
             logger.debug(f"Requesting switches from {url}")
-            response = requests.get(url, timeout=10)
+            response = self._get(url, timeout=10)
             response.raise_for_status()
             switch_data = response.json()
             
@@ -131,7 +179,7 @@ def _get_sdn_links(self) -> List[Dict[str, Any]]:
             # This endpoint is provided by ryu.app.rest_topology
             url = f"{self.sdn_controller_url}/v1.0/topology/links"
             logger.debug(f"Requesting links from {url}")
-            response = requests.get(url, timeout=10)
+            response = self._get(url, timeout=10)
             response.raise_for_status()
             # The API returns a list of link objects.
             # We need to format them for our topology view.
@@ -150,7 +198,7 @@ def _get_sdn_links(self) -> List[Dict[str, Any]]:
             try:
                 url = f"{self.sdn_controller_url}/stats/links"
                 logger.debug(f"Requesting links from fallback endpoint {url}")
-                response = requests.get(url, timeout=10)
+                response = self._get(url, timeout=10)
                 response.raise_for_status()
                 return response.json()
             except requests.exceptions.RequestException as e_fallback:
@@ -166,7 +214,7 @@ def _get_sdn_hosts(self) -> List[Dict[str, Any]]:
             # Use Ryu REST topology endpoint which has real data
             url = f"{self.sdn_controller_url}/v1.0/topology/hosts"
             logger.debug(f"Requesting hosts from {url}")
-            response = requests.get(url, timeout=10)
+            response = self._get(url, timeout=10)
             response.raise_for_status()
             
             raw_hosts = response.json()
@@ -218,8 +266,12 @@ def _get_sdn_hosts(self) -> List[Dict[str, Any]]:
             return []
 
 
-    def get_live_topology(self) -> Dict[str, Any]:
-        """Get live topology data directly from the SDN controller."""
+    def get_live_topology(self, switches: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Get live topology data directly from the SDN controller.
+
+        Args:
+            switches: Switches already discovered in this cycle (discovered here if None).
+        """
         logger.info("Fetching live network topology from SDN controller.")
         
         live_topology = {
@@ -232,7 +284,7 @@ def get_live_topology(self) -> Dict[str, Any]:
         }
         try:
             # Get switches data from SDN controller using improved method
-            switches_data = self._get_sdn_switches()
+            switches_data = self._get_sdn_switches() if switches is None else switches
             self.logger.info(f"Switches discovered via improved method: {len(switches_data)} switches")
             for switch_data in switches_data:
                 live_topology['switches'].append(switch_data)
@@ -241,7 +293,7 @@ def get_live_topology(self) -> Dict[str, Any]:
             self.logger.error(f"Error getting switches from SDN controller: {e}")
             # Try fallback method if main discovery fails
             try:
-                response = requests.get(f"{self.sdn_controller_url}/api/switches", timeout=10)
+                response = self._get(f"{self.sdn_controller_url}/api/switches", timeout=10)
                 if response.status_code == 200:
                     api_data = response.json()
                     for switch in api_data.get('switches', []):
@@ -259,14 +311,14 @@ def get_live_topology(self) -> Dict[str, Any]:
 
         try:
             # Get topology data from SDN controller
-            response = requests.get(f"{self.sdn_controller_url}/v1.0/topology/links", timeout=10)
+            response = self._get(f"{self.sdn_controller_url}/v1.0/topology/links", timeout=10)
             if response.status_code == 200:
                 links_data = response.json()
-                self.logger.info(f"Raw links data from SDN controller: {links_data}")
+                self.logger.debug(f"Raw links data from SDN controller: {links_data}")
                 if links_data:
                     for link in links_data:
                         try:
-                            self.logger.info(f"Processing link: {link}")
+                            self.logger.debug(f"Processing link: {link}")
                             # Handle different possible data structures
                             if isinstance(link.get('src'), dict):
                                 src_dpid = link['src'].get('dpid', '0')
@@ -293,10 +345,10 @@ def get_live_topology(self) -> Dict[str, Any]:
 
         try:
             # Get hosts data from SDN controller using Ryu REST topology
-            response = requests.get(f"{self.sdn_controller_url}/v1.0/topology/hosts", timeout=10)
+            response = self._get(f"{self.sdn_controller_url}/v1.0/topology/hosts", timeout=10)
             if response.status_code == 200:
                 hosts_data = response.json()
-                self.logger.info(f"Raw hosts data from SDN controller: {hosts_data}")
+                self.logger.debug(f"Raw hosts data from SDN controller: {hosts_data}")
                 if isinstance(hosts_data, list):
                     # Ryu REST topology format: array of host objects
                     for host in hosts_data:
@@ -341,7 +393,7 @@ def get_live_topology(self) -> Dict[str, Any]:
                 # Try fallback to alternative endpoint
                 try:
                     # Some Ryu versions might use different endpoint
-                    response = requests.get(f"{self.sdn_controller_url}/stats/hosts", timeout=10)
+                    response = self._get(f"{self.sdn_controller_url}/stats/hosts", timeout=10)
                     if response.status_code == 200:
                         hosts_data = response.json()
                         # Process as before...
@@ -369,62 +421,110 @@ def get_live_topology(self) -> Dict[str, Any]:
         return live_topology
 
 
+    def _get_sdn_bulk_stats(self) -> Optional[Dict[str, Any]]:
+        """Get port and flow stats of all switches in one request.
+
+        Returns:
+            {"ports": {dpid: [port stats]}, "flows": {dpid: [flow entries]}}, or None if the
+            request failed or the controller has no bulk endpoint (then asked again later).
+        """
+        if time.time() < self._bulk_stats_retry_at:
+            return None
+        url = f"{self.sdn_controller_url}/stats/bulk"
+        try:
+            response = self._get(url, timeout=10)
+            if response.status_code in (404, 405, 501):
+                logger.info(f"Bulk stats endpoint not available ({response.status_code}), "
+                            f"polling switches individually")
+                self._bulk_stats_retry_at = time.time() + BULK_STATS_RETRY_SEC
+                return None
+            response.raise_for_status()
+            stats = response.json()
+            if isinstance(stats, dict) and isinstance(stats.get("ports"), dict):
+                return stats
+            logger.warning(f"Unexpected bulk stats response from {url}")
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Failed to get bulk stats from SDN controller: {e}")
+        except json.JSONDecodeError:
+            logger.warning(f"Failed to decode JSON from {url}")
+        return None
+
+    def _get_sdn_switch_stats(self, dpid: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Get the port stats and raw flow entries of one switch."""
+        return self._get_sdn_port_stats(dpid), self._get_sdn_switch_flows(dpid)
+
     def collect_metrics(self):
-        """Collect network topology metrics from SDN controller."""
+        """Collect network topology metrics from SDN controller.
+
+        Switches are discovered once per cycle. The topology and performance metrics
+        are fetched on the worker pool while switch stats are collected, either from
+        the controller's bulk stats endpoint or with concurrent per-switch requests.
+        """
         logger.debug("Attempting to collect network metrics from SDN controller.")
-        
-        topology_data = self.get_live_topology()
-        current_timestamp = topology_data.get("timestamp", time.time())
+        cycle_start = time.time()
+        with self._lock:
+            requests_before = self._request_count
 
-        # Collect real performance metrics from SDN controller
-        performance_metrics = self._get_sdn_performance_metrics()
-        flow_statistics = self._get_sdn_flow_statistics()
+        switches = self._get_sdn_switches()
+        executor = self._get_executor()
+        topology_future = executor.submit(self.get_live_topology, switches)
+        performance_future = executor.submit(self._get_sdn_performance_metrics)
+
+        dpids = [switch.get('dpid') or switch.get('id') for switch in switches if switch.get('type') == 'switch']
+        dpids = [dpid for dpid in dpids if dpid]
+        current_timestamp = time.time()
+        bulk_stats = self._get_sdn_bulk_stats() if dpids else None
+        if bulk_stats is not None:
+            collection_mode = "bulk"
+            bulk_ports, bulk_flows = bulk_stats.get("ports", {}), bulk_stats.get("flows", {})
+            port_stats_by_dpid = {dpid: bulk_ports.get(dpid, []) for dpid in dpids}
+            raw_flows = {dpid: bulk_flows.get(dpid, []) for dpid in dpids}
+        else:
+            collection_mode = "per_switch"
+            switch_stats = self._map(self._get_sdn_switch_stats, dpids)
+            port_stats_by_dpid = {dpid: ports for dpid, (ports, _) in zip(dpids, switch_stats)}
+            raw_flows = {dpid: flows for dpid, (_, flows) in zip(dpids, switch_stats)}
+        flow_statistics = self._get_sdn_flow_statistics(switches, raw_flows)
+
+        topology_data = topology_future.result()
+        performance_metrics = performance_future.result()
         
         # Calculate bandwidth and other port-level metrics
         all_port_metrics = {}
-        if self.last_stats_timestamp is not None:
-            time_delta = current_timestamp - self.last_stats_timestamp
+        time_delta = current_timestamp - self.last_stats_timestamp if self.last_stats_timestamp is not None else 0
+        for dpid, current_stats_list in port_stats_by_dpid.items():
+            switch_port_metrics = {}
             if time_delta > 0:
-                # Always refresh switch discovery before collecting port stats
-                current_switches = self._get_sdn_switches()
-                
-                for switch in current_switches:
-                    if switch.get('type') == 'switch':
-                        dpid = switch.get('dpid') or switch.get('id')
-                        # The DPID from get_switches is already a hex string
-                        current_stats_list = self._get_sdn_port_stats(dpid)
-                        
-                        switch_port_metrics = {}
-                        for port_stat in current_stats_list:
-                            port_no = port_stat.get("port_no")
-                            stat_key = f"{dpid}-{port_no}"
-                            
-                            prev_stat = self.previous_port_stats.get(stat_key)
-                            if prev_stat:
-                                # Calculate bytes delta
-                                rx_bytes_delta = port_stat.get("rx_bytes", 0) - prev_stat.get("rx_bytes", 0)
-                                tx_bytes_delta = port_stat.get("tx_bytes", 0) - prev_stat.get("tx_bytes", 0)
-                                
-                                # Calculate bandwidth in Mbps (ensure positive values)
-                                rx_mbps = max(0, (rx_bytes_delta * 8) / (time_delta * 1_000_000))
-                                tx_mbps = max(0, (tx_bytes_delta * 8) / (time_delta * 1_000_000))
-                                
-                                switch_port_metrics[port_no] = {
-                                    "rx_mbps": round(rx_mbps, 4),
-                                    "tx_mbps": round(tx_mbps, 4),
-                                    "total_mbps": round(rx_mbps + tx_mbps, 4),
-                                    "rx_packets": port_stat.get("rx_packets", 0),
-                                    "tx_packets": port_stat.get("tx_packets", 0),
-                                    "rx_errors": port_stat.get("rx_errors", 0),
-                                    "tx_errors": port_stat.get("tx_errors", 0)
-                                }
+                for port_stat in current_stats_list:
+                    port_no = port_stat.get("port_no")
+                    stat_key = f"{dpid}-{port_no}"
+                    
+                    prev_stat = self.previous_port_stats.get(stat_key)
+                    if prev_stat:
+                        # Calculate bytes delta
+                        rx_bytes_delta = port_stat.get("rx_bytes", 0) - prev_stat.get("rx_bytes", 0)
+                        tx_bytes_delta = port_stat.get("tx_bytes", 0) - prev_stat.get("tx_bytes", 0)
                         
-                        if switch_port_metrics:
-                            all_port_metrics[dpid] = switch_port_metrics
+                        # Calculate bandwidth in Mbps (ensure positive values)
+                        rx_mbps = max(0, (rx_bytes_delta * 8) / (time_delta * 1_000_000))
+                        tx_mbps = max(0, (tx_bytes_delta * 8) / (time_delta * 1_000_000))
                         
-                        # Update previous stats for the next run
-                        for port_stat in current_stats_list:
-                             self.previous_port_stats[f"{dpid}-{port_stat.get('port_no')}"] = port_stat
+                        switch_port_metrics[port_no] = {
+                            "rx_mbps": round(rx_mbps, 4),
+                            "tx_mbps": round(tx_mbps, 4),
+                            "total_mbps": round(rx_mbps + tx_mbps, 4),
+                            "rx_packets": port_stat.get("rx_packets", 0),
+                            "tx_packets": port_stat.get("tx_packets", 0),
+                            "rx_errors": port_stat.get("rx_errors", 0),
+                            "tx_errors": port_stat.get("tx_errors", 0)
+                        }
+            
+            if switch_port_metrics:
+                all_port_metrics[dpid] = switch_port_metrics
+            
+            # Update previous stats for the next run
+            for port_stat in current_stats_list:
+                self.previous_port_stats[f"{dpid}-{port_stat.get('port_no')}"] = port_stat
 
         self.last_stats_timestamp = current_timestamp
 
@@ -480,11 +580,38 @@ def collect_metrics(self):
             },
             "flow_statistics": flow_statistics
         }
+
+        duration = time.time() - cycle_start
+        with self._lock:
+            request_count = self._request_count - requests_before
+            self._cycle_durations.append(duration)
+            self._last_cycle = {
+                "timestamp": cycle_start,
+                "duration_ms": round(duration * 1000, 1),
+                "requests": request_count,
+                "switches": len(dpids),
+                "mode": collection_mode
+            }
+            metrics["collection"] = dict(self._last_cycle)
         
         self.storage.store_metric("network", metrics)
-        logger.info(f"Network metrics collected: {switches_count} switches, {total_flows} flows, {round(total_bandwidth, 2)} Mbps total bandwidth")
+        logger.info(f"Network metrics collected: {switches_count} switches, {total_flows} flows, {round(total_bandwidth, 2)} Mbps total bandwidth "
+                    f"({request_count} requests, {collection_mode}, {duration * 1000:.0f} ms)")
         return metrics
 
+    def get_collection_stats(self) -> Dict[str, Any]:
+        """Get the latency of the last collection cycle and of recent cycles."""
+        with self._lock:
+            durations = list(self._cycle_durations)
+            stats = dict(self._last_cycle)
+        stats.update({
+            "cycles": len(durations),
+            "average_ms": round(sum(durations) / len(durations) * 1000, 1) if durations else 0.0,
+            "max_ms": round(max(durations) * 1000, 1) if durations else 0.0,
+            "max_workers": self.max_workers
+        })
+        return stats
+
     def get_network_health_score(self) -> Dict[str, Any]:
         """Calculate overall network health score based on various metrics."""
         try:
@@ -543,7 +670,7 @@ def _get_sdn_performance_metrics(self) -> Dict[str, Any]:
             # Try to get performance metrics from custom controller endpoint
             url = f"{self.sdn_controller_url}/api/performance/metrics"
             logger.debug(f"Requesting performance metrics from {url}")
-            response = requests.get(url, timeout=10)
+            response = self._get(url, timeout=10)
             
             if response.status_code == 200:
                 return response.json()
@@ -569,91 +696,102 @@ def _get_sdn_performance_metrics(self) -> Dict[str, Any]:
                 "bandwidth": {"total_mbps": 0.0, "average_mbps": 0.0, "max_mbps": 0.0}
             }
 
-    def _get_sdn_flow_statistics(self) -> Dict[str, List[Dict[str, Any]]]:
-        """Get flow statistics from the SDN controller."""
+    def _get_sdn_flow_statistics(self, switches: Optional[List[Dict[str, Any]]] = None,
+                                 raw_flows: Optional[Dict[str, List[Dict[str, Any]]]] = None
+                                 ) -> Dict[str, List[Dict[str, Any]]]:
+        """Get flow statistics from the SDN controller.
+
+        Args:
+            switches: Switches already discovered in this cycle (discovered here if None).
+            raw_flows: Flow entries per DPID already fetched in this cycle (e.g. from the
+                bulk stats endpoint); fetched per switch, concurrently, if None.
+        """
         try:
+            if raw_flows is None:
+                if switches is None:
+                    switches = self._get_sdn_switches()
+                dpids = [switch.get('dpid') or switch.get('id') for switch in switches]
+                dpids = [dpid for dpid in dpids if dpid]
+                raw_flows = dict(zip(dpids, self._map(self._get_sdn_switch_flows, dpids)))
+
             flow_stats = {}
-            
-            # Get switches first
-            switches = self._get_sdn_switches()
-            
-            for switch in switches:
-                dpid = switch.get('dpid') or switch.get('id')
-                if not dpid:
-                    continue
-                    
-                # Get flow stats for this switch
-                url = f"{self.sdn_controller_url}/stats/flow/{dpid}"
-                logger.debug(f"Requesting flow stats for switch {dpid} from {url}")
-                response = requests.get(url, timeout=10)
-                
-                if response.status_code == 200:
-                    switch_flows = response.json().get(dpid, [])
-                    processed_flows = []
-                    
-                    for flow in switch_flows:
-                        # Process flow to extract meaningful information
-                        processed_flow = {
-                            'priority': flow.get('priority', 0),
-                            'table_id': flow.get('table_id', 0),
-                            'duration_sec': flow.get('duration_sec', 0),
-                            'packet_count': flow.get('packet_count', 0),
-                            'byte_count': flow.get('byte_count', 0),
-                            'idle_timeout': flow.get('idle_timeout', 0),
-                            'hard_timeout': flow.get('hard_timeout', 0),
-                            'cookie': flow.get('cookie', 0)
-                        }
-                        
-                        # Process match criteria
-                        match = flow.get('match', {})
-                        match_desc = []
-                        if 'in_port' in match:
-                            match_desc.append(f"in_port={match['in_port']}")
-                        if 'eth_type' in match:
-                            eth_type = match['eth_type']
-                            if eth_type == 0x0800:
-                                match_desc.append("IPv4")
-                            elif eth_type == 0x0806:
-                                match_desc.append("ARP")
-                            else:
-                                match_desc.append(f"eth_type=0x{eth_type:04x}")
-                        if 'ipv4_src' in match:
-                            match_desc.append(f"src={match['ipv4_src']}")
-                        if 'ipv4_dst' in match:
-                            match_desc.append(f"dst={match['ipv4_dst']}")
-                        
-                        processed_flow['match_description'] = ', '.join(match_desc) if match_desc else "any"
-                        
-                        # Process actions
-                        instructions = flow.get('instructions', [])
-                        action_desc = []
-                        for instruction in instructions:
-                            if instruction.get('type') == 'APPLY_ACTIONS':
-                                actions = instruction.get('actions', [])
-                                for action in actions:
-                                    action_type = action.get('type', 'unknown')
-                                    if action_type == 'OUTPUT':
-                                        port = action.get('port', 'unknown')
-                                        if port == 'CONTROLLER':
-                                            action_desc.append("controller")
-                                        elif port == 'FLOOD':
-                                            action_desc.append("flood")
-                                        else:
-                                            action_desc.append(f"port_{port}")
-                                    else:
-                                        action_desc.append(action_type.lower())
-                        
-                        processed_flow['action_description'] = ', '.join(action_desc) if action_desc else "unknown"
-                        processed_flows.append(processed_flow)
-                    
-                    flow_stats[dpid] = processed_flows
-                    logger.debug(f"Collected {len(processed_flows)} flows for switch {dpid}")
-                else:
-                    logger.warning(f"Failed to get flow stats for switch {dpid}: {response.status_code}")
-                    flow_stats[dpid] = []
-            
+            for dpid, switch_flows in raw_flows.items():
+                processed_flows = [self._process_flow(flow) for flow in switch_flows]
+                flow_stats[dpid] = processed_flows
+                logger.debug(f"Collected {len(processed_flows)} flows for switch {dpid}")
             return flow_stats
             
         except Exception as e:
             logger.error(f"Error collecting flow statistics: {e}")
-            return {}
\ No newline at end of file
+            return {}
+
+    def _get_sdn_switch_flows(self, dpid: str) -> List[Dict[str, Any]]:
+        """Get the raw flow entries of one switch."""
+        try:
+            url = f"{self.sdn_controller_url}/stats/flow/{dpid}"
+            logger.debug(f"Requesting flow stats for switch {dpid} from {url}")
+            response = self._get(url, timeout=10)
+            if response.status_code == 200:
+                return response.json().get(dpid, [])
+            logger.warning(f"Failed to get flow stats for switch {dpid}: {response.status_code}")
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Failed to get flow stats for switch {dpid}: {e}")
+        except json.JSONDecodeError:
+            logger.warning(f"Failed to decode JSON for flow stats of switch {dpid}")
+        return []
+
+    @staticmethod
+    def _process_flow(flow: Dict[str, Any]) -> Dict[str, Any]:
+        """Extract the counters and a readable match/action description of a flow entry."""
+        processed_flow = {
+            'priority': flow.get('priority', 0),
+            'table_id': flow.get('table_id', 0),
+            'duration_sec': flow.get('duration_sec', 0),
+            'packet_count': flow.get('packet_count', 0),
+            'byte_count': flow.get('byte_count', 0),
+            'idle_timeout': flow.get('idle_timeout', 0),
+            'hard_timeout': flow.get('hard_timeout', 0),
+            'cookie': flow.get('cookie', 0)
+        }
+        
+        # Process match criteria
+        match = flow.get('match', {})
+        match_desc = []
+        if 'in_port' in match:
+            match_desc.append(f"in_port={match['in_port']}")
+        if 'eth_type' in match:
+            eth_type = match['eth_type']
+            if eth_type == 0x0800:
+                match_desc.append("IPv4")
+            elif eth_type == 0x0806:
+                match_desc.append("ARP")
+            else:
+                match_desc.append(f"eth_type=0x{eth_type:04x}")
+        if 'ipv4_src' in match:
+            match_desc.append(f"src={match['ipv4_src']}")
+        if 'ipv4_dst' in match:
+            match_desc.append(f"dst={match['ipv4_dst']}")
+        
+        processed_flow['match_description'] = ', '.join(match_desc) if match_desc else "any"
+        
+        # Process actions
+        instructions = flow.get('instructions', [])
+        action_desc = []
+        for instruction in instructions:
+            if instruction.get('type') == 'APPLY_ACTIONS':
+                actions = instruction.get('actions', [])
+                for action in actions:
+                    action_type = action.get('type', 'unknown')
+                    if action_type == 'OUTPUT':
+                        port = action.get('port', 'unknown')
+                        if port == 'CONTROLLER':
+                            action_desc.append("controller")
+                        elif port == 'FLOOD':
+                            action_desc.append("flood")
+                        else:
+                            action_desc.append(f"port_{port}")
+                    else:
+                        action_desc.append(action_type.lower())
+        
+        processed_flow['action_description'] = ', '.join(action_desc) if action_desc else "unknown"
+        return processed_flow
@@ -0,0 +1,104 @@
+"""
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+In-memory topic bus used to push newly stored metrics to live subscribers.
+
+Publishers never block: every subscription buffers a bounded number of
+messages and drops the oldest ones when its consumer falls behind.
+"""
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any, List
+
+logger = logging.getLogger(__name__)
+
+WILDCARD_TOPIC = '*'
+
+
+class Subscription:
+    """A consumer's bounded buffer of messages published to one topic."""
+
+    def __init__(self, bus: 'TopicBus', topic: str, max_pending: int):
+        self.bus = bus
+        self.topic = topic
+        self.dropped = 0
+        self._messages = deque(maxlen=max_pending)
+
+    def drain(self) -> List[Any]:
+        """Take all buffered messages, oldest first."""
+        with self.bus._lock:
+            messages = list(self._messages)
+            self._messages.clear()
+        return messages
+
+    def close(self):
+        """Stop receiving messages."""
+        self.bus.unsubscribe(self)
+
+
+class TopicBus:
+    """Thread-safe publish/subscribe bus keyed by topic name."""
+
+    def __init__(self, max_pending: int = 100):
+        """Initialize the bus.
+
+        Args:
+            max_pending: Messages buffered per subscription before the oldest are dropped
+        """
+        self.max_pending = max(1, int(max_pending))
+        self._lock = threading.Lock()
+        self._subscriptions: Dict[str, List[Subscription]] = {}
+        self._published = 0
+
+    def subscribe(self, topic: str) -> Subscription:
+        """Subscribe to a topic, or to every topic with '*'."""
+        subscription = Subscription(self, topic, self.max_pending)
+        with self._lock:
+            self._subscriptions.setdefault(topic, []).append(subscription)
+        logger.debug(f"Subscribed to topic '{topic}'")
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Remove a subscription; unknown subscriptions are ignored."""
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.topic, [])
+            if subscription in subscriptions:
+                subscriptions.remove(subscription)
+            if not subscriptions:
+                self._subscriptions.pop(subscription.topic, None)
+
+    def has_subscribers(self, topic: str) -> bool:
+        """Check whether a message published to a topic would be delivered anywhere."""
+        return topic in self._subscriptions or WILDCARD_TOPIC in self._subscriptions
+
+    def publish(self, topic: str, message: Any):
+        """Deliver a message to the subscribers of a topic and to wildcard subscribers."""
+        with self._lock:
+            self._published += 1
+            for subscription in (self._subscriptions.get(topic, []) +
+                                 self._subscriptions.get(WILDCARD_TOPIC, [])):
+                if len(subscription._messages) == subscription._messages.maxlen:
+                    subscription.dropped += 1
+                subscription._messages.append(message)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get subscription and delivery counters."""
+        with self._lock:
+            return {
+                'published': self._published,
+                'topics': {topic: len(subs) for topic, subs in self._subscriptions.items()},
+                'dropped': sum(sub.dropped for subs in self._subscriptions.values() for sub in subs)
+            }
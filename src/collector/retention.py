@@ -0,0 +1,202 @@
+"""
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Background retention for the collector's SQLite metrics storage.
+
+Old rows are removed in small chunks with a short pause between them so that
+ingestion never waits on a long-running DELETE, and free pages are returned
+with PRAGMA incremental_vacuum instead of a full VACUUM. When the storage is
+partitioned, expired partitions are dropped as whole tables instead.
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from .storage import MetricsStorage, _ARCHIVE_FL_ROUNDS_SQL
+
+logger = logging.getLogger(__name__)
+
+
+class RetentionEngine:
+    """Deletes expired metrics and events in time-sliced chunks."""
+
+    def __init__(self, storage: MetricsStorage, max_age_days: Optional[int] = None,
+                 chunk_size: int = 2000, time_budget_sec: float = 2.0,
+                 chunk_pause_sec: float = 0.05, vacuum_pages: int = 1000):
+        """Initialize the retention engine.
+
+        Args:
+            storage: The MetricsStorage instance to clean up.
+            max_age_days: Maximum age of rows to keep (default: storage.max_age_days)
+            chunk_size: Maximum rows deleted per transaction
+            time_budget_sec: Maximum time a single run may spend deleting
+            chunk_pause_sec: Pause between chunks to let writers in
+            vacuum_pages: Maximum free pages returned per run by incremental_vacuum
+        """
+        self.storage = storage
+        self.max_age_days = max_age_days if max_age_days is not None else storage.max_age_days
+        self.chunk_size = max(1, int(chunk_size))
+        self.time_budget_sec = time_budget_sec
+        self.chunk_pause_sec = chunk_pause_sec
+        self.vacuum_pages = max(1, int(vacuum_pages))
+
+        # Highest metrics id checked for duplicate rounds; None until the first full check
+        self._dedupe_since_id: Optional[int] = None
+        self._run_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'runs': 0,
+            'running': False,
+            'last_run_at': None,
+            'last_run_duration_sec': 0.0,
+            'last_run_deleted': {'metrics': 0, 'events': 0},
+            'total_deleted': {'metrics': 0, 'events': 0},
+            'last_run_chunks': 0,
+            'partitions_dropped_total': 0,
+            'backlog_pending': False,
+            'last_cutoff': None,
+            'pages_reclaimed_total': 0,
+            'freelist_pages': 0,
+            'auto_vacuum': None,
+            'last_error': None
+        }
+        logger.info(f"Retention engine initialized (max_age_days={self.max_age_days}, "
+                    f"chunk_size={self.chunk_size}, time_budget={self.time_budget_sec}s)")
+
+    def run(self) -> Dict[str, Any]:
+        """Run one retention pass. Intended to be called from the scheduler."""
+        if not self._run_lock.acquire(blocking=False):
+            logger.debug("Retention pass already running, skipping")
+            return self.get_stats()
+
+        start = time.monotonic()
+        deadline = start + self.time_budget_sec
+        cutoff_time = time.time() - (self.max_age_days * 24 * 3600)
+        deleted = {'metrics': 0, 'events': 0}
+        chunks = 0
+        partitions_dropped = 0
+        backlog_pending = False
+        error = None
+
+        with self._stats_lock:
+            self._stats['running'] = True
+
+        try:
+            # Only rounds written since the previous pass are checked after the first one
+            self._dedupe_since_id = self.storage.cleanup_duplicate_rounds(self._dedupe_since_id)
+
+            for table in ('metrics', 'events'):
+                while True:
+                    count = self._delete_chunk(table, cutoff_time)
+                    deleted[table] += count
+                    chunks += 1
+                    if count < self.chunk_size:
+                        break
+                    if time.monotonic() >= deadline:
+                        backlog_pending = True
+                        break
+                    time.sleep(self.chunk_pause_sec)
+                if backlog_pending:
+                    break
+
+            # Partitions are dropped whole; this also refreshes the base table ranges
+            dropped = self.storage.drop_expired_partitions(cutoff_time)
+            partitions_dropped = dropped['metrics'] + dropped['events']
+
+            reclaimed, freelist, auto_vacuum = self._incremental_vacuum()
+        except Exception as e:
+            error = str(e)
+            reclaimed, freelist, auto_vacuum = 0, self._stats['freelist_pages'], self._stats['auto_vacuum']
+            logger.error(f"Error during retention pass: {e}")
+        finally:
+            duration = time.monotonic() - start
+            with self._stats_lock:
+                stats = self._stats
+                stats['runs'] += 1
+                stats['running'] = False
+                stats['last_run_at'] = datetime.now().isoformat()
+                stats['last_run_duration_sec'] = round(duration, 3)
+                stats['last_run_deleted'] = deleted
+                stats['total_deleted']['metrics'] += deleted['metrics']
+                stats['total_deleted']['events'] += deleted['events']
+                stats['last_run_chunks'] = chunks
+                stats['partitions_dropped_total'] += partitions_dropped
+                stats['backlog_pending'] = backlog_pending
+                stats['last_cutoff'] = datetime.fromtimestamp(cutoff_time).isoformat()
+                stats['pages_reclaimed_total'] += reclaimed
+                stats['freelist_pages'] = freelist
+                stats['auto_vacuum'] = auto_vacuum
+                stats['last_error'] = error
+            self._run_lock.release()
+
+        if deleted['metrics'] or deleted['events'] or partitions_dropped or reclaimed:
+            logger.info(f"Retention pass: {deleted['metrics']} metrics, {deleted['events']} events deleted "
+                        f"in {chunks} chunks, {partitions_dropped} partitions dropped, "
+                        f"{reclaimed} pages reclaimed ({duration:.2f}s"
+                        f"{', backlog pending' if backlog_pending else ''})")
+        return self.get_stats()
+
+    def _delete_chunk(self, table: str, cutoff_time: float) -> int:
+        """Delete up to chunk_size expired rows from a table in one short transaction."""
+        with self.storage._get_connection() as conn:
+            if table == 'metrics':
+                conn.execute(
+                    _ARCHIVE_FL_ROUNDS_SQL.format(table='metrics') +
+                    " AND id IN (SELECT id FROM metrics WHERE timestamp < ? ORDER BY timestamp LIMIT ?)",
+                    (cutoff_time, self.chunk_size)
+                )
+            else:
+                self.storage._adjust_event_counts(
+                    conn, 'events',
+                    "id IN (SELECT id FROM events WHERE timestamp < ? ORDER BY timestamp LIMIT ?)",
+                    (cutoff_time, self.chunk_size)
+                )
+            result = conn.execute(f"""
+                DELETE FROM {table}
+                WHERE id IN (SELECT id FROM {table} WHERE timestamp < ? ORDER BY timestamp LIMIT ?)
+            """, (cutoff_time, self.chunk_size))
+            conn.commit()
+            return result.rowcount
+
+    def _incremental_vacuum(self):
+        """Return up to vacuum_pages free pages to the filesystem.
+
+        Returns:
+            Tuple of (pages reclaimed, remaining freelist pages, auto_vacuum mode)
+        """
+        with self.storage._get_connection() as conn:
+            auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+            freelist_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if auto_vacuum != 2:
+                # Databases created before incremental mode need one full VACUUM
+                # (e.g. POST /api/debug/optimize) before pages can be reclaimed here
+                return 0, freelist_before, auto_vacuum
+            if freelist_before == 0:
+                return 0, 0, auto_vacuum
+            # executescript steps the pragma to completion; execute() frees a single page
+            conn.executescript(f"PRAGMA incremental_vacuum({self.vacuum_pages});")
+            freelist_after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            return freelist_before - freelist_after, freelist_after, auto_vacuum
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get retention progress counters."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+            stats['last_run_deleted'] = dict(stats['last_run_deleted'])
+            stats['total_deleted'] = dict(stats['total_deleted'])
+        stats['max_age_days'] = self.max_age_days
+        return stats
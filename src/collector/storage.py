@@ -15,18 +15,181 @@
 """
 SQLite-based storage for collected metrics with optimized performance and memory usage.
 """
+import base64
 import logging
 import sqlite3
 import json
 import os
+import queue
+import re
 import threading
 import time
-from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Optional, Tuple, Iterator
 from contextlib import contextmanager
 
+from .pubsub import TopicBus
+
 logger = logging.getLogger(__name__)
 
+# Fields copied out of the metric data into typed columns at write time, so readers
+# can fetch them without decoding data_json: (column, SQL type, path in the data).
+# Only append to this list; existing tables get new columns added and backfilled
+# from data_json on startup.
+PROMOTED_METRIC_FIELDS = [
+    ('training_duration', 'REAL', ('training_duration',)),
+    ('model_size_mb', 'REAL', ('model_size_mb',)),
+    ('clients_count', 'INTEGER', ('clients',)),
+    ('switches_count', 'INTEGER', ('switches_count',)),
+    ('total_flows', 'INTEGER', ('performance_metrics', 'flows', 'total')),
+    ('total_mbps', 'REAL', ('performance_metrics', 'bandwidth', 'total_mbps')),
+    ('sdn_status', 'TEXT', ('sdn_status',))
+]
+
+_PROMOTED_CASTS = {'REAL': float, 'INTEGER': int, 'TEXT': str}
+
+# Dotted path into the metric data accepted by load_metric_fields, e.g. "data.topology.nodes"
+_DATA_PATH_RE = re.compile(r'^data(\.[A-Za-z_][A-Za-z0-9_]*)+$')
+
+_METRIC_COLUMNS = [
+    'id', 'timestamp', 'timestamp_iso', 'metric_type', 'source_component', 'round_number',
+    'accuracy', 'loss', 'status', 'data_json', 'created_at'
+] + [name for name, _, _ in PROMOTED_METRIC_FIELDS]
+
+_EVENT_COLUMNS = [
+    'id', 'timestamp', 'timestamp_iso', 'event_id', 'source_component', 'event_type',
+    'event_level', 'message', 'details_json', 'created_at'
+]
+
+_METRICS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp REAL NOT NULL,
+        timestamp_iso TEXT NOT NULL,
+        metric_type TEXT NOT NULL,
+        source_component TEXT,
+        round_number INTEGER,
+        accuracy REAL,
+        loss REAL,
+        status TEXT,
+        data_json TEXT NOT NULL,
+        created_at REAL DEFAULT (julianday('now'))""" + "".join(
+    f",\n        {name} {sql_type}" for name, sql_type, _ in PROMOTED_METRIC_FIELDS
+) + """
+    )
+"""
+
+_EVENTS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp REAL NOT NULL,
+        timestamp_iso TEXT NOT NULL,
+        event_id TEXT,
+        source_component TEXT NOT NULL,
+        event_type TEXT NOT NULL,
+        event_level TEXT DEFAULT 'INFO',
+        message TEXT,
+        details_json TEXT,
+        created_at REAL DEFAULT (julianday('now'))
+    )
+"""
+
+_METRICS_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_{table}_timestamp ON {table}(timestamp DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_{table}_type_timestamp ON {table}(metric_type, timestamp DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_{table}_round ON {table}(round_number) WHERE round_number IS NOT NULL",
+    "CREATE INDEX IF NOT EXISTS idx_{table}_fl_rounds ON {table}(metric_type, round_number) WHERE metric_type LIKE 'fl_round_%'",
+    "CREATE INDEX IF NOT EXISTS idx_{table}_source_timestamp ON {table}(source_component, timestamp DESC)",
+    # Covers FL round projections without reading data_json
+    "CREATE INDEX IF NOT EXISTS idx_{table}_fl_round_fields ON {table}(metric_type, round_number, accuracy, loss, "
+    "training_duration, model_size_mb, clients_count) WHERE metric_type LIKE 'fl_round_%'"
+]
+
+_EVENTS_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_{table}_timestamp ON {table}(timestamp DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_{table}_component_timestamp ON {table}(source_component, timestamp DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_{table}_type_timestamp ON {table}(event_type, timestamp DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_{table}_level ON {table}(event_level)"
+]
+
+_TABLE_COLUMNS = {
+    'metrics': _METRIC_COLUMNS,
+    'events': _EVENT_COLUMNS
+}
+
+_TABLE_SCHEMAS = {
+    'metrics': (_METRICS_TABLE_SQL, _METRICS_INDEXES),
+    'events': (_EVENTS_TABLE_SQL, _EVENTS_INDEXES)
+}
+
+# Partition lengths in seconds for the partitioned storage mode
+_PARTITION_PERIODS = {
+    'day': 24 * 3600,
+    'hour': 3600
+}
+
+# Copy FL rounds into the summary table before their rows are deleted
+_ARCHIVE_FL_ROUNDS_SQL = """
+    INSERT OR REPLACE INTO fl_training_summary 
+    (round_number, timestamp, accuracy, loss, training_duration, 
+     model_size_mb, clients_count, status, training_complete, updated_at)
+    SELECT 
+        round_number,
+        timestamp,
+        accuracy,
+        loss,
+        JSON_EXTRACT(data_json, '$.training_duration') as training_duration,
+        JSON_EXTRACT(data_json, '$.model_size_mb') as model_size_mb,
+        JSON_EXTRACT(data_json, '$.clients') as clients_count,
+        status,
+        CASE WHEN JSON_EXTRACT(data_json, '$.data_state') = 'training_complete' THEN 1 ELSE 0 END,
+        julianday('now')
+    FROM {table} 
+    WHERE metric_type LIKE 'fl_round_%' 
+    AND round_number IS NOT NULL
+"""
+
+_INSERT_METRIC_SQL = """
+    INSERT INTO {table} 
+    (timestamp, timestamp_iso, metric_type, source_component, 
+     round_number, accuracy, loss, status, data_json""" + "".join(
+    f", {name}" for name, _, _ in PROMOTED_METRIC_FIELDS
+) + """)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?""" + ", ?" * len(PROMOTED_METRIC_FIELDS) + """)
+"""
+
+_UPSERT_FL_SUMMARY_SQL = """
+    INSERT OR REPLACE INTO fl_training_summary 
+    (round_number, timestamp, accuracy, loss, training_duration,
+     model_size_mb, clients_count, status, training_complete, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, julianday('now'))
+"""
+
+_INSERT_EVENT_SQL = """
+    INSERT INTO {table} 
+    (timestamp, timestamp_iso, event_id, source_component, 
+     event_type, event_level, message, details_json)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Running event totals per (source_component, event_type, event_level). Deltas are
+# added on insert and subtracted on delete, in the same transaction as the rows.
+_UPSERT_EVENT_COUNTS_SQL = """
+    INSERT INTO event_counts (source_component, event_type, event_level, count)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(source_component, event_type, event_level)
+    DO UPDATE SET count = count + excluded.count
+"""
+
+_ADJUST_EVENT_COUNTS_SQL = """
+    INSERT INTO event_counts (source_component, event_type, event_level, count)
+    SELECT COALESCE(source_component, ''), COALESCE(event_type, ''), COALESCE(event_level, ''), {sign}COUNT(*)
+    FROM {table} WHERE {condition}
+    GROUP BY 1, 2, 3
+    ON CONFLICT(source_component, event_type, event_level)
+    DO UPDATE SET count = count + excluded.count
+"""
+
 class MetricsStorage:
     """SQLite-based metrics storage with performance optimizations."""
     _instance = None
@@ -41,7 +204,10 @@ def __new__(cls, *args, **kwargs):
         return cls._instance
 
     def __init__(self, output_dir: str = "/logs", db_name: str = "metrics.db", 
-                 max_age_days: int = 7, cleanup_interval_hours: int = 6):
+                 max_age_days: int = 7, cleanup_interval_hours: int = 6,
+                 write_behind: bool = False, batch_size: int = 500,
+                 flush_interval_ms: int = 250, max_queue_size: int = 10000,
+                 inline_cleanup: bool = True, partitioning: Optional[str] = None):
         """Initialize SQLite-based metrics storage.
 
         Args:
@@ -49,6 +215,15 @@ def __init__(self, output_dir: str = "/logs", db_name: str = "metrics.db",
             db_name: Name of the SQLite database file
             max_age_days: Maximum age of metrics to keep (default: 7 days)
             cleanup_interval_hours: How often to run cleanup (default: 6 hours)
+            write_behind: Queue writes and commit them in batches from a writer thread
+            batch_size: Maximum number of queued writes committed per batch
+            flush_interval_ms: Maximum time a queued write waits before being committed
+            max_queue_size: Bound on queued writes; producers block while the queue is full
+            inline_cleanup: Run retention cleanup from the write path. Disable when a
+                RetentionEngine is scheduled to do it in the background.
+            partitioning: Write metrics and events into one table per 'day' or 'hour'
+                so reads can skip irrelevant partitions and retention can drop whole
+                tables (default: None, single table)
         """
         if self._initialized:
             return
@@ -61,18 +236,57 @@ def __init__(self, output_dir: str = "/logs", db_name: str = "metrics.db",
             self.db_path = os.path.join(output_dir, db_name)
             self.max_age_days = max_age_days
             self.cleanup_interval_hours = cleanup_interval_hours
+            self.inline_cleanup = inline_cleanup
+            if partitioning is not None and partitioning not in _PARTITION_PERIODS:
+                raise ValueError(f"Unsupported partitioning '{partitioning}', "
+                                 f"expected one of {list(_PARTITION_PERIODS)}")
+            self.partitioning = partitioning
             self._last_cleanup = datetime.now()
             self._connection_pool = {}
             self._pool_lock = threading.Lock()
 
+            # Partition catalog: base table -> partitions ordered by period
+            self._partition_lock = threading.Lock()
+            self._partitions = {'metrics': [], 'events': []}
+            self._legacy_ranges = {'metrics': None, 'events': None}
+            self._unseeded_partitions = set()
+
+            # Newly committed metrics are published here by metric type for live subscribers
+            self.topic_bus = TopicBus()
+            self._write_listeners = []
+
+            # Write-behind state (only used when write_behind is enabled)
+            self.write_behind = write_behind
+            self.batch_size = max(1, int(batch_size))
+            self.flush_interval = max(0.001, flush_interval_ms / 1000.0)
+            self._write_queue = queue.Queue(maxsize=max_queue_size) if write_behind else None
+            self._writer_thread = None
+            self._writer_stopping = False  # set once the stop request is queued
+            self._stats_lock = threading.Lock()
+            self._write_stats = {
+                'batches_written': 0,
+                'rows_written': 0,
+                'rows_failed': 0,
+                'last_batch_size': 0,
+                'last_batch_latency_ms': 0.0,
+                'max_batch_latency_ms': 0.0,
+                'total_batch_latency_ms': 0.0
+            }
+
             try:
                 os.makedirs(self.output_dir, exist_ok=True)
                 self._init_database()
                 self._create_indexes()
+                self._load_partitions()
+                self._init_event_counts()
                 logger.info(f"SQLite metrics storage initialized: {self.db_path}")
                 
                 # Run initial cleanup
-                self._cleanup_old_data()
+                if self.inline_cleanup:
+                    self._cleanup_old_data()
+                
+                if self.write_behind:
+                    self._start_writer()
                 
             except Exception as e:
                 logger.error(f"Failed to initialize SQLite storage: {e}")
@@ -93,6 +307,9 @@ def _get_connection(self):
                     check_same_thread=False
                 )
                 conn.row_factory = sqlite3.Row  # Enable dict-like access
+                # Allow PRAGMA incremental_vacuum; must precede WAL so it applies to new
+                # databases, existing ones pick it up on their next full VACUUM
+                conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
                 # Performance optimizations
                 conn.execute("PRAGMA journal_mode=WAL")  # Write-Ahead Logging
                 conn.execute("PRAGMA synchronous=NORMAL")  # Faster writes
@@ -112,34 +329,32 @@ def _init_database(self):
         """Initialize database tables with optimized schema."""
         with self._get_connection() as conn:
             # Main metrics table with optimized columns
+            conn.execute(_METRICS_TABLE_SQL.format(table='metrics'))
+            self._evolve_metrics_schema(conn, 'metrics')
+            
+            # Events table
+            conn.execute(_EVENTS_TABLE_SQL.format(table='events'))
+            
+            # Event totals per group for exact summaries (see get_event_summary)
             conn.execute("""
-                CREATE TABLE IF NOT EXISTS metrics (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp REAL NOT NULL,
-                    timestamp_iso TEXT NOT NULL,
-                    metric_type TEXT NOT NULL,
-                    source_component TEXT,
-                    round_number INTEGER,
-                    accuracy REAL,
-                    loss REAL,
-                    status TEXT,
-                    data_json TEXT NOT NULL,
-                    created_at REAL DEFAULT (julianday('now'))
+                CREATE TABLE IF NOT EXISTS event_counts (
+                    source_component TEXT NOT NULL DEFAULT '',
+                    event_type TEXT NOT NULL DEFAULT '',
+                    event_level TEXT NOT NULL DEFAULT '',
+                    count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (source_component, event_type, event_level)
                 )
             """)
             
-            # Events table
+            # Catalog of time partitions (see partitioning)
             conn.execute("""
-                CREATE TABLE IF NOT EXISTS events (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp REAL NOT NULL,
-                    timestamp_iso TEXT NOT NULL,
-                    event_id TEXT,
-                    source_component TEXT NOT NULL,
-                    event_type TEXT NOT NULL,
-                    event_level TEXT DEFAULT 'INFO',
-                    message TEXT,
-                    details_json TEXT,
+                CREATE TABLE IF NOT EXISTS storage_partitions (
+                    name TEXT PRIMARY KEY,
+                    base_table TEXT NOT NULL,
+                    period_start REAL NOT NULL,
+                    period_end REAL NOT NULL,
+                    min_ts REAL,
+                    max_ts REAL,
                     created_at REAL DEFAULT (julianday('now'))
                 )
             """)
@@ -165,20 +380,10 @@ def _init_database(self):
     def _create_indexes(self):
         """Create optimized indexes for fast queries."""
         with self._get_connection() as conn:
-            # Metrics table indexes
-            indexes = [
-                "CREATE INDEX IF NOT EXISTS idx_metrics_timestamp ON metrics(timestamp DESC)",
-                "CREATE INDEX IF NOT EXISTS idx_metrics_type_timestamp ON metrics(metric_type, timestamp DESC)",
-                "CREATE INDEX IF NOT EXISTS idx_metrics_round ON metrics(round_number) WHERE round_number IS NOT NULL",
-                "CREATE INDEX IF NOT EXISTS idx_metrics_fl_rounds ON metrics(metric_type, round_number) WHERE metric_type LIKE 'fl_round_%'",
-                "CREATE INDEX IF NOT EXISTS idx_metrics_source_timestamp ON metrics(source_component, timestamp DESC)",
-                
-                # Events table indexes
-                "CREATE INDEX IF NOT EXISTS idx_events_timestamp ON events(timestamp DESC)",
-                "CREATE INDEX IF NOT EXISTS idx_events_component_timestamp ON events(source_component, timestamp DESC)",
-                "CREATE INDEX IF NOT EXISTS idx_events_type_timestamp ON events(event_type, timestamp DESC)",
-                "CREATE INDEX IF NOT EXISTS idx_events_level ON events(event_level)",
-                
+            # Metrics and events table indexes
+            indexes = [index_sql.format(table='metrics') for index_sql in _METRICS_INDEXES]
+            indexes += [index_sql.format(table='events') for index_sql in _EVENTS_INDEXES]
+            indexes += [
                 # FL summary indexes
                 "CREATE INDEX IF NOT EXISTS idx_fl_summary_round ON fl_training_summary(round_number DESC)",
                 "CREATE INDEX IF NOT EXISTS idx_fl_summary_timestamp ON fl_training_summary(timestamp DESC)"
@@ -192,8 +397,346 @@ def _create_indexes(self):
             
             conn.commit()
 
+    def _evolve_metrics_schema(self, conn, table: str):
+        """Add missing promoted-field columns to a metrics table and backfill them."""
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        missing = [(name, sql_type, path) for name, sql_type, path in PROMOTED_METRIC_FIELDS
+                   if name not in existing]
+        if not missing:
+            return
+
+        for name, sql_type, _ in missing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {sql_type}")
+
+        # One-time backfill of existing rows from their JSON payload
+        assignments = ", ".join(
+            f"{name} = CAST(JSON_EXTRACT(data_json, ?) AS {sql_type})" for name, sql_type, _ in missing
+        )
+        params = ["$." + ".".join(path) for _, _, path in missing]
+        start = time.time()
+        result = conn.execute(f"UPDATE {table} SET {assignments}", params)
+        conn.commit()
+        logger.info(f"Promoted {[name for name, _, _ in missing]} to columns of {table} "
+                    f"({result.rowcount} rows backfilled in {time.time() - start:.2f}s)")
+
+    # --- Event counters ---
+
+    def _init_event_counts(self):
+        """Build the event counters from existing events the first time they are used."""
+        with self._get_connection() as conn:
+            if conn.execute("SELECT 1 FROM event_counts LIMIT 1").fetchone():
+                return
+            tables = self._tables_for_range('events')
+            if not any(conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone() for table in tables):
+                return
+            start = time.time()
+            for table in tables:
+                self._adjust_event_counts(conn, table, "1=1", sign='')
+            conn.commit()
+            groups = conn.execute("SELECT COUNT(*) FROM event_counts").fetchone()[0]
+            logger.info(f"Built event counters from existing events ({groups} groups "
+                        f"in {time.time() - start:.2f}s)")
+
+    @staticmethod
+    def _count_event_rows(conn, rows: List[tuple]):
+        """Add newly inserted event rows to the event counters."""
+        deltas = {}
+        for row in rows:
+            key = (row[3] or '', row[4] or '', row[5] or '')
+            deltas[key] = deltas.get(key, 0) + 1
+        conn.executemany(_UPSERT_EVENT_COUNTS_SQL, [key + (count,) for key, count in deltas.items()])
+
+    @staticmethod
+    def _adjust_event_counts(conn, table: str, condition: str, params: tuple = (), sign: str = '-'):
+        """Subtract the events of a table matching a condition from the event counters.
+
+        Must run in the same transaction as, and before, the DELETE or DROP it accounts
+        for. With sign='' the events are added instead, which builds the counters.
+        """
+        conn.execute(_ADJUST_EVENT_COUNTS_SQL.format(table=table, condition=condition, sign=sign), params)
+        if sign == '-':
+            conn.execute("DELETE FROM event_counts WHERE count <= 0")
+
+    def get_event_summary(self, source_component: Optional[str] = None, event_type: Optional[str] = None,
+                          level: Optional[str] = None) -> Dict[str, Any]:
+        """Get exact event counts grouped by component, level and type.
+
+        Reads the event counters, so the cost depends on the number of distinct
+        groups rather than the number of stored events.
+
+        Args:
+            source_component: Filter by source component
+            event_type: Filter by event type
+            level: Filter by event level
+
+        Returns:
+            Dict with 'by_source_component', 'by_event_level', 'by_event_type' and 'total'
+        """
+        summary = {'by_source_component': {}, 'by_event_level': {}, 'by_event_type': {}, 'total': 0}
+        try:
+            where_conditions = ["count > 0"]
+            params = []
+            if source_component:
+                where_conditions.append("source_component = ?")
+                params.append(source_component)
+            if event_type:
+                where_conditions.append("event_type = ?")
+                params.append(event_type)
+            if level:
+                where_conditions.append("event_level = ?")
+                params.append(level)
+
+            with self._get_connection() as conn:
+                cursor = conn.execute(f"""
+                    SELECT source_component, event_type, event_level, count FROM event_counts
+                    WHERE {" AND ".join(where_conditions)}
+                """, params)
+                for row in cursor:
+                    count = row['count']
+                    for key, value, default in (('by_source_component', row['source_component'], 'unknown'),
+                                                ('by_event_level', row['event_level'], 'INFO'),
+                                                ('by_event_type', row['event_type'], 'unknown')):
+                        groups = summary[key]
+                        value = value or default
+                        groups[value] = groups.get(value, 0) + count
+                    summary['total'] += count
+        except Exception as e:
+            logger.error(f"Error summarizing events: {e}")
+        return summary
+
+    # --- Time partitioning ---
+
+    def _load_partitions(self):
+        """Load the partition catalog and the time range of unpartitioned rows."""
+        with self._get_connection() as conn:
+            cursor = conn.execute("""
+                SELECT name, base_table, period_start, period_end, min_ts, max_ts
+                FROM storage_partitions ORDER BY period_start ASC
+            """)
+            partitions = {'metrics': [], 'events': []}
+            for row in cursor:
+                partitions.setdefault(row['base_table'], []).append({
+                    'name': row['name'],
+                    'period_start': row['period_start'],
+                    'period_end': row['period_end'],
+                    'min_ts': row['min_ts'],
+                    'max_ts': row['max_ts']
+                })
+        # Partitions created before a field was promoted need the new columns too
+        with self._get_connection() as conn:
+            for partition in partitions.get('metrics', []):
+                self._evolve_metrics_schema(conn, partition['name'])
+                for index_sql in _METRICS_INDEXES:
+                    conn.execute(index_sql.format(table=partition['name']))
+            conn.commit()
+        with self._partition_lock:
+            self._partitions = partitions
+        self._refresh_legacy_ranges()
+        if self.partitioning:
+            logger.info(f"Partitioned storage by {self.partitioning}: "
+                        f"{len(partitions['metrics'])} metrics, {len(partitions['events'])} events partitions")
+
+    def _refresh_legacy_ranges(self):
+        """Record the timestamp range of rows still held in the unpartitioned base tables."""
+        with self._get_connection() as conn:
+            for base in ('metrics', 'events'):
+                row = conn.execute(f"SELECT MIN(timestamp), MAX(timestamp) FROM {base}").fetchone()
+                with self._partition_lock:
+                    self._legacy_ranges[base] = (row[0], row[1]) if row[0] is not None else None
+
+    def _partition_period(self, timestamp: float) -> Tuple[float, float, str]:
+        """Get the (start, end, name suffix) of the UTC period containing a timestamp."""
+        length = _PARTITION_PERIODS[self.partitioning]
+        start = timestamp - (timestamp % length)
+        fmt = '%Y%m%d' if self.partitioning == 'day' else '%Y%m%d%H'
+        suffix = datetime.fromtimestamp(start, tz=timezone.utc).strftime(fmt)
+        return start, start + length, suffix
+
+    def _create_partition(self, conn, base: str, timestamp: float) -> Dict[str, Any]:
+        """Create the partition covering a timestamp and make it the active one.
+
+        Must be called before any DML in the connection's current transaction,
+        since the DDL is committed immediately so other connections can see it.
+        """
+        period_start, period_end, suffix = self._partition_period(timestamp)
+        name = f"{base}_p{suffix}"
+        table_sql, index_sqls = _TABLE_SCHEMAS[base]
+
+        conn.execute(table_sql.format(table=name))
+        for index_sql in index_sqls:
+            conn.execute(index_sql.format(table=name))
+
+        conn.execute("""
+            INSERT OR IGNORE INTO storage_partitions (name, base_table, period_start, period_end)
+            VALUES (?, ?, ?, ?)
+        """, (name, base, period_start, period_end))
+        conn.commit()
+
+        partition = {
+            'name': name,
+            'period_start': period_start,
+            'period_end': period_end,
+            'min_ts': None,
+            'max_ts': None
+        }
+        self._partitions[base].append(partition)
+        self._unseeded_partitions.add(name)
+        logger.info(f"Created storage partition {name}")
+        return partition
+
+    def _route_rows(self, conn, base: str, rows: List[tuple]) -> Dict[str, List[tuple]]:
+        """Group rows (timestamp first) by the table they should be written to."""
+        if not self.partitioning:
+            return {base: rows}
+
+        grouped = {}
+        with self._partition_lock:
+            partitions = self._partitions[base]
+            for row in rows:
+                timestamp = row[0]
+                partition = partitions[-1] if partitions else None
+                # Late rows stay in the active partition; its min/max still bound it for reads
+                if partition is None or timestamp >= partition['period_end']:
+                    partition = self._create_partition(conn, base, timestamp)
+                if partition['min_ts'] is None or timestamp < partition['min_ts']:
+                    partition['min_ts'] = timestamp
+                if partition['max_ts'] is None or timestamp > partition['max_ts']:
+                    partition['max_ts'] = timestamp
+                grouped.setdefault(partition['name'], []).append(row)
+        return grouped
+
+    def _seed_partition_sequence(self, conn, base: str, name: str):
+        """Continue the id sequence of earlier partitions so ids stay unique and increasing.
+
+        Runs right before the first insert into a new partition, inside the write transaction.
+        """
+        if name not in self._unseeded_partitions:
+            return
+        last_id = conn.execute(
+            "SELECT MAX(seq) FROM sqlite_sequence WHERE (name = ? OR name LIKE ? ESCAPE '!') AND name != ?",
+            (base, f"{base}!_p%", name)
+        ).fetchone()[0]
+        if not last_id:
+            return
+        current = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (name,)).fetchone()
+        if current is None:
+            conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (name, last_id))
+        elif current[0] < last_id:
+            conn.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = ?", (last_id, name))
+
+    def _insert_rows(self, conn, base: str, insert_sql: str, grouped: Dict[str, List[tuple]]):
+        """Insert routed rows, oldest partition first, and persist partition bounds."""
+        for table, rows in grouped.items():
+            if self.partitioning:
+                self._seed_partition_sequence(conn, base, table)
+            conn.executemany(insert_sql.format(table=table), rows)
+        self._update_partition_bounds(conn, grouped)
+
+    def _mark_partitions_seeded(self, grouped: Dict[str, List[tuple]]):
+        """Forget partitions whose first rows have been committed."""
+        if self._unseeded_partitions:
+            self._unseeded_partitions.difference_update(grouped)
+
+    def _update_partition_bounds(self, conn, grouped: Dict[str, List[tuple]]):
+        """Persist the timestamp bounds of partitions written in this transaction."""
+        if not self.partitioning:
+            return
+        for name, rows in grouped.items():
+            timestamps = [row[0] for row in rows]
+            low, high = min(timestamps), max(timestamps)
+            conn.execute("""
+                UPDATE storage_partitions
+                SET min_ts = MIN(COALESCE(min_ts, ?), ?), max_ts = MAX(COALESCE(max_ts, ?), ?)
+                WHERE name = ?
+            """, (low, low, high, high, name))
+
+    def _tables_for_range(self, base: str, start_ts: Optional[float] = None,
+                          end_ts: Optional[float] = None) -> List[str]:
+        """Get the tables of a base table whose rows may fall within a time range."""
+        def overlaps(low, high):
+            if low is None:
+                return False
+            return (end_ts is None or low <= end_ts) and (start_ts is None or high >= start_ts)
+
+        with self._partition_lock:
+            partitions = list(self._partitions[base])
+            legacy = self._legacy_ranges[base]
+
+        if not partitions:
+            return [base]
+
+        # Tables are returned oldest first. Rows in the base table predate the partitions,
+        # unless partitioning was switched off again and the base table is receiving writes.
+        tables = [p['name'] for p in partitions if overlaps(p['min_ts'], p['max_ts'])]
+        if not self.partitioning:
+            tables.append(base)
+        elif legacy and overlaps(*legacy):
+            tables.insert(0, base)
+        return tables or [base]
+
+    def _source(self, base: str, start_ts: Optional[float] = None, end_ts: Optional[float] = None) -> str:
+        """Get a FROM clause source covering only the partitions relevant to a time range."""
+        tables = self._tables_for_range(base, start_ts, end_ts)
+        if len(tables) == 1:
+            return tables[0]
+        columns = ", ".join(_TABLE_COLUMNS[base])
+        union = " UNION ALL ".join(f"SELECT {columns} FROM {table}" for table in tables)
+        return f"({union}) AS {base}"
+
+    def drop_expired_partitions(self, cutoff_time: float) -> Dict[str, int]:
+        """Drop partitions whose newest row is older than the cutoff.
+
+        FL rounds in a dropped partition are archived to fl_training_summary first.
+
+        Returns:
+            Number of partitions dropped per base table
+        """
+        dropped = {'metrics': 0, 'events': 0}
+        with self._partition_lock:
+            # The active (latest) partition is never dropped
+            expired = {
+                base: [p for p in partitions[:-1]
+                       if (p['max_ts'] if p['max_ts'] is not None else p['period_end']) < cutoff_time]
+                for base, partitions in self._partitions.items()
+            }
+
+        for base, partitions in expired.items():
+            for partition in partitions:
+                name = partition['name']
+                try:
+                    with self._get_connection() as conn:
+                        if base == 'metrics':
+                            conn.execute(_ARCHIVE_FL_ROUNDS_SQL.format(table=name))
+                        else:
+                            self._adjust_event_counts(conn, name, "1=1")
+                        # One transaction: a failure leaves both the table and its catalog row
+                        conn.execute("DELETE FROM storage_partitions WHERE name = ?", (name,))
+                        conn.execute("DELETE FROM sqlite_sequence WHERE name = ?", (name,))
+                        conn.execute(f"DROP TABLE IF EXISTS {name}")
+                        conn.commit()
+                    with self._partition_lock:
+                        self._partitions[base] = [p for p in self._partitions[base] if p['name'] != name]
+                    dropped[base] += 1
+                    logger.info(f"Dropped expired storage partition {name}")
+                except sqlite3.Error as e:
+                    logger.error(f"Failed to drop partition {name}: {e}")
+
+        self._refresh_legacy_ranges()
+        return dropped
+
+    def get_partition_info(self) -> Dict[str, Any]:
+        """Get the partition catalog for diagnostics."""
+        with self._partition_lock:
+            return {
+                'partitioning': self.partitioning,
+                'partitions': {base: [dict(p) for p in parts] for base, parts in self._partitions.items()},
+                'legacy_ranges': dict(self._legacy_ranges)
+            }
+
     def _should_cleanup(self) -> bool:
         """Check if cleanup should run."""
+        if not self.inline_cleanup:
+            return False
         now = datetime.now()
         time_since_cleanup = now - self._last_cleanup
         return time_since_cleanup.total_seconds() / 3600 >= self.cleanup_interval_hours
@@ -206,46 +749,35 @@ def _cleanup_old_data(self):
             
             cutoff_time = time.time() - (self.max_age_days * 24 * 3600)
             
+            # Partitions older than the cutoff are dropped whole
+            dropped = self.drop_expired_partitions(cutoff_time)
+            
             # First, perform data operations within transaction
             with self._get_connection() as conn:
                 # Archive old FL rounds to summary table before deletion
-                conn.execute("""
-                    INSERT OR REPLACE INTO fl_training_summary 
-                    (round_number, timestamp, accuracy, loss, training_duration, 
-                     model_size_mb, clients_count, status, training_complete, updated_at)
-                    SELECT 
-                        round_number,
-                        timestamp,
-                        accuracy,
-                        loss,
-                        JSON_EXTRACT(data_json, '$.training_duration') as training_duration,
-                        JSON_EXTRACT(data_json, '$.model_size_mb') as model_size_mb,
-                        JSON_EXTRACT(data_json, '$.clients') as clients_count,
-                        status,
-                        CASE WHEN JSON_EXTRACT(data_json, '$.data_state') = 'training_complete' THEN 1 ELSE 0 END,
-                        julianday('now')
-                    FROM metrics 
-                    WHERE metric_type LIKE 'fl_round_%' 
-                    AND round_number IS NOT NULL 
-                    AND timestamp < ?
-                """, (cutoff_time,))
+                conn.execute(_ARCHIVE_FL_ROUNDS_SQL.format(table='metrics') + " AND timestamp < ?",
+                             (cutoff_time,))
                 
                 # Delete old metrics
                 result = conn.execute("DELETE FROM metrics WHERE timestamp < ?", (cutoff_time,))
                 deleted_metrics = result.rowcount
                 
                 # Delete old events
+                self._adjust_event_counts(conn, 'events', "timestamp < ?", (cutoff_time,))
                 result = conn.execute("DELETE FROM events WHERE timestamp < ?", (cutoff_time,))
                 deleted_events = result.rowcount
                 
                 conn.commit()
-                
+            self._refresh_legacy_ranges()
+            
             # Vacuum database OUTSIDE of transaction context to reclaim space
             try:
                 conn = sqlite3.connect(self.db_path)
+                conn.execute("PRAGMA auto_vacuum=INCREMENTAL")  # Converts older databases
                 conn.execute("VACUUM")
                 conn.close()
-                logger.info(f"Cleanup completed: {deleted_metrics} metrics, {deleted_events} events deleted. Database optimized.")
+                logger.info(f"Cleanup completed: {deleted_metrics} metrics, {deleted_events} events deleted, "
+                            f"{dropped['metrics'] + dropped['events']} partitions dropped. Database optimized.")
             except sqlite3.Error as vacuum_error:
                 logger.warning(f"Database VACUUM operation failed: {vacuum_error} (data cleanup successful)")
                 
@@ -254,11 +786,24 @@ def _cleanup_old_data(self):
         except Exception as e:
             logger.error(f"Error during cleanup: {e}")
 
-    def store_metric(self, metric_type: str, data: dict):
-        """Store a metric with optimized processing."""
-        if self._should_cleanup():
-            self._cleanup_old_data()
+    @staticmethod
+    def _extract_promoted_fields(data: Any) -> tuple:
+        """Extract the promoted field values of a metric, None where absent or invalid."""
+        values = []
+        for _, sql_type, path in PROMOTED_METRIC_FIELDS:
+            value = data
+            for key in path:
+                value = value.get(key) if isinstance(value, dict) else None
+            if value is not None:
+                try:
+                    value = _PROMOTED_CASTS[sql_type](value)
+                except (ValueError, TypeError):
+                    value = None
+            values.append(value)
+        return tuple(values)
 
+    def _build_metric_rows(self, metric_type: str, data: dict) -> Tuple[tuple, Optional[tuple]]:
+        """Build the metrics row and optional FL summary row for a metric."""
         timestamp = time.time()
         timestamp_iso = datetime.now().isoformat()
         
@@ -287,97 +832,373 @@ def store_metric(self, metric_type: str, data: dict):
             if round_number is None:
                 round_number = data.get('round', data.get('current_round'))
 
+        metric_row = (
+            timestamp, timestamp_iso, metric_type, source_component,
+            round_number, accuracy, loss, status, json.dumps(data, default=str)
+        ) + self._extract_promoted_fields(data)
+        
+        # Update FL summary for fast dashboard access
+        summary_row = None
+        if round_number is not None and accuracy is not None:
+            model_size_mb = data.get('model_size_mb')
+            
+            # Ensure model_size_mb is properly converted to float
+            try:
+                if model_size_mb is None:
+                    model_size_mb = 0.0
+                elif isinstance(model_size_mb, str):
+                    model_size_mb = float(model_size_mb) if model_size_mb else 0.0
+                else:
+                    model_size_mb = float(model_size_mb)
+            except (ValueError, TypeError):
+                logger.warning(f"Storage: Invalid model_size_mb value '{model_size_mb}' for round {round_number}, using 0.0")
+                model_size_mb = 0.0
+            
+            logger.debug(f"Storage: Storing FL summary for round {round_number} with model_size_mb: {model_size_mb} (type: {type(model_size_mb)})")
+            
+            summary_row = (
+                round_number, timestamp, accuracy, loss,
+                data.get('training_duration'), model_size_mb,
+                data.get('clients', data.get('connected_clients')), status,
+                1 if data.get('data_state') == 'training_complete' else 0
+            )
+        
+        return metric_row, summary_row
+
+    def store_metric(self, metric_type: str, data: dict):
+        """Store a metric with optimized processing."""
+        try:
+            metric_row, summary_row = self._build_metric_rows(metric_type, data)
+        except Exception as e:
+            logger.error(f"Failed to store metric: {e}")
+            return
+
+        if self._write_queue is not None:
+            self._enqueue_write(('metric', metric_row, summary_row))
+            return
+
+        if self._should_cleanup():
+            self._cleanup_old_data()
+
         try:
             with self._get_connection() as conn:
-                conn.execute("""
-                    INSERT INTO metrics 
-                    (timestamp, timestamp_iso, metric_type, source_component, 
-                     round_number, accuracy, loss, status, data_json)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    timestamp, timestamp_iso, metric_type, source_component,
-                    round_number, accuracy, loss, status, json.dumps(data, default=str)
-                ))
-                
-                # Update FL summary for fast dashboard access
-                if round_number is not None and accuracy is not None:
-                    model_size_mb = data.get('model_size_mb')
-                    
-                    # Ensure model_size_mb is properly converted to float
-                    try:
-                        if model_size_mb is None:
-                            model_size_mb = 0.0
-                        elif isinstance(model_size_mb, str):
-                            model_size_mb = float(model_size_mb) if model_size_mb else 0.0
-                        else:
-                            model_size_mb = float(model_size_mb)
-                    except (ValueError, TypeError):
-                        logger.warning(f"Storage: Invalid model_size_mb value '{model_size_mb}' for round {round_number}, using 0.0")
-                        model_size_mb = 0.0
-                    
-                    logger.debug(f"Storage: Storing FL summary for round {round_number} with model_size_mb: {model_size_mb} (type: {type(model_size_mb)})")
-                    
-                    conn.execute("""
-                        INSERT OR REPLACE INTO fl_training_summary 
-                        (round_number, timestamp, accuracy, loss, training_duration,
-                         model_size_mb, clients_count, status, training_complete, updated_at)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, julianday('now'))
-                    """, (
-                        round_number, timestamp, accuracy, loss,
-                        data.get('training_duration'), model_size_mb,
-                        data.get('clients', data.get('connected_clients')), status,
-                        1 if data.get('data_state') == 'training_complete' else 0
-                    ))
-                
+                grouped = self._route_rows(conn, 'metrics', [metric_row])
+                self._insert_rows(conn, 'metrics', _INSERT_METRIC_SQL, grouped)
+                if summary_row is not None:
+                    conn.execute(_UPSERT_FL_SUMMARY_SQL, summary_row)
                 conn.commit()
+                self._mark_partitions_seeded(grouped)
+            self._publish_metrics([metric_row])
                 
         except Exception as e:
             logger.error(f"Failed to store metric: {e}")
 
+    def add_write_listener(self, callback):
+        """Register a callback invoked with the set of metric types of every committed write."""
+        self._write_listeners.append(callback)
+
+    def _publish_metrics(self, metric_rows: List[tuple]):
+        """Notify write listeners and publish committed metric rows to the topic bus.
+
+        Published messages are shaped like load_metrics results.
+        """
+        if self._write_listeners and metric_rows:
+            metric_types = {row[2] for row in metric_rows}
+            for callback in self._write_listeners:
+                try:
+                    callback(metric_types)
+                except Exception as e:
+                    logger.error(f"Storage write listener failed: {e}")
+        for row in metric_rows:
+            if not self.topic_bus.has_subscribers(row[2]):
+                continue
+            self.topic_bus.publish(row[2], {
+                'timestamp': row[1],
+                'metric_type': row[2],
+                'data': json.loads(row[8]) if row[8] else {}
+            })
+
     def store_event(self, event: Dict[str, Any]):
         """Store an event efficiently."""
-        timestamp = time.time()
-        timestamp_iso = datetime.now().isoformat()
-        
+        try:
+            event_row = (
+                time.time(), datetime.now().isoformat(),
+                event.get('event_id', event.get('id')),
+                event.get('source_component'),
+                event.get('event_type'),
+                event.get('event_level', event.get('level', 'INFO')),
+                event.get('message'),
+                json.dumps(event.get('details', {}), default=str)
+            )
+        except Exception as e:
+            logger.error(f"Failed to store event: {e}")
+            return
+
+        if self._write_queue is not None:
+            self._enqueue_write(('event', event_row, None))
+            return
+
         try:
             with self._get_connection() as conn:
-                conn.execute("""
-                    INSERT INTO events 
-                    (timestamp, timestamp_iso, event_id, source_component, 
-                     event_type, event_level, message, details_json)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    timestamp, timestamp_iso,
-                    event.get('event_id', event.get('id')),
-                    event.get('source_component'),
-                    event.get('event_type'),
-                    event.get('event_level', event.get('level', 'INFO')),
-                    event.get('message'),
-                    json.dumps(event.get('details', {}), default=str)
-                ))
+                grouped = self._route_rows(conn, 'events', [event_row])
+                self._insert_rows(conn, 'events', _INSERT_EVENT_SQL, grouped)
+                self._count_event_rows(conn, [event_row])
                 conn.commit()
+                self._mark_partitions_seeded(grouped)
                 
         except Exception as e:
             logger.error(f"Failed to store event: {e}")
 
+    # --- Write-behind support ---
+
+    def _start_writer(self):
+        """Start the background thread that drains the write queue."""
+        if self._writer_thread and self._writer_thread.is_alive():
+            return
+        self._writer_stopping = False
+        self._writer_thread = threading.Thread(
+            target=self._writer_loop, name="metrics-storage-writer", daemon=True
+        )
+        self._writer_thread.start()
+        logger.info(f"Write-behind enabled (batch_size={self.batch_size}, "
+                    f"flush_interval={self.flush_interval * 1000:.0f}ms)")
+
+    def _enqueue_write(self, item: tuple):
+        """Queue a write for the writer thread, falling back to a direct write if it is gone or stopping."""
+        if self._writer_stopping or self._writer_thread is None or not self._writer_thread.is_alive():
+            self._write_batch([item])
+            return
+        self._write_queue.put(item)
+
+    def _writer_loop(self):
+        """Collect queued writes into batches bounded by size and latency and commit them."""
+        running = True
+        while running:
+            try:
+                item = self._write_queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = []
+            waiters = []
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                kind = item[0]
+                if kind == 'flush':
+                    waiters.append(item[1])
+                elif kind == 'stop':
+                    waiters.append(item[1])
+                    running = False
+                else:
+                    batch.append(item)
+
+                # Flush and stop requests are served as soon as they are seen
+                if kind != 'metric' and kind != 'event':
+                    break
+                if len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._write_queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._write_batch(batch)
+            for waiter in waiters:
+                waiter.set()
+
+            if running and self._should_cleanup():
+                self._cleanup_old_data()
+
+        # Drop the writer thread's pooled connection
+        with self._pool_lock:
+            conn = self._connection_pool.pop(threading.get_ident(), None)
+        if conn is not None:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    def _write_batch(self, batch: List[tuple]):
+        """Write a batch of queued rows with executemany in a single transaction.
+
+        If a row violates a constraint the batch is retried one row at a time.
+        """
+        metric_rows = [item[1] for item in batch if item[0] == 'metric']
+        summary_rows = [item[2] for item in batch if item[0] == 'metric' and item[2] is not None]
+        event_rows = [item[1] for item in batch if item[0] == 'event']
+
+        start = time.perf_counter()
+        try:
+            with self._get_connection() as conn:
+                # Route before any DML so new partitions are committed on their own
+                metric_groups = self._route_rows(conn, 'metrics', metric_rows) if metric_rows else {}
+                event_groups = self._route_rows(conn, 'events', event_rows) if event_rows else {}
+                self._insert_rows(conn, 'metrics', _INSERT_METRIC_SQL, metric_groups)
+                if summary_rows:
+                    conn.executemany(_UPSERT_FL_SUMMARY_SQL, summary_rows)
+                self._insert_rows(conn, 'events', _INSERT_EVENT_SQL, event_groups)
+                if event_rows:
+                    self._count_event_rows(conn, event_rows)
+                conn.commit()
+                self._mark_partitions_seeded(metric_groups)
+                self._mark_partitions_seeded(event_groups)
+            self._publish_metrics(metric_rows)
+        except Exception as e:
+            if isinstance(e, sqlite3.IntegrityError) and len(batch) > 1:
+                # The transaction was rolled back; retry row by row so only the bad row is lost
+                logger.warning(f"Batch of {len(batch)} rows rejected ({e}), writing rows one at a time")
+                for item in batch:
+                    self._write_batch([item])
+                return
+            logger.error(f"Failed to write batch of {len(batch)} rows: {e}")
+            with self._stats_lock:
+                self._write_stats['rows_failed'] += len(batch)
+            return
+
+        latency_ms = (time.perf_counter() - start) * 1000
+        with self._stats_lock:
+            stats = self._write_stats
+            stats['batches_written'] += 1
+            stats['rows_written'] += len(batch)
+            stats['last_batch_size'] = len(batch)
+            stats['last_batch_latency_ms'] = latency_ms
+            stats['max_batch_latency_ms'] = max(stats['max_batch_latency_ms'], latency_ms)
+            stats['total_batch_latency_ms'] += latency_ms
+
+    def flush(self, timeout: Optional[float] = 30.0) -> bool:
+        """Block until all writes queued so far are committed.
+
+        Returns:
+            True if the queue was drained within the timeout
+        """
+        if self._writer_thread is None or not self._writer_thread.is_alive():
+            return True
+        done = threading.Event()
+        self._write_queue.put(('flush', done, None))
+        flushed = done.wait(timeout)
+        if not flushed:
+            logger.warning(f"Storage flush timed out with {self._write_queue.qsize()} writes pending")
+        return flushed
+
+    def _stop_writer(self, timeout: Optional[float] = 30.0):
+        """Flush pending writes and stop the writer thread."""
+        if self._writer_thread is None or not self._writer_thread.is_alive():
+            return
+        # Writes from now on go straight to the database
+        self._writer_stopping = True
+        done = threading.Event()
+        self._write_queue.put(('stop', done, None))
+        if done.wait(timeout):
+            self._writer_thread.join(timeout)
+        else:
+            logger.warning(f"Storage writer did not stop in time, {self._write_queue.qsize()} writes pending")
+        if not self._writer_thread.is_alive():
+            self._drain_write_queue()
+        self._writer_thread = None
+
+    def _drain_write_queue(self):
+        """Write rows queued behind the stop request, which the writer thread never saw."""
+        batch = []
+        waiters = []
+        while True:
+            try:
+                item = self._write_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item[0] in ('metric', 'event'):
+                batch.append(item)
+            else:
+                waiters.append(item[1])
+        if batch:
+            logger.info(f"Writing {len(batch)} rows queued after the storage writer stopped")
+            self._write_batch(batch)
+        for waiter in waiters:
+            waiter.set()
+
+    def get_write_stats(self) -> Dict[str, Any]:
+        """Get write-behind queue depth and batch latency counters."""
+        with self._stats_lock:
+            stats = dict(self._write_stats)
+        total_latency = stats.pop('total_batch_latency_ms')
+        stats['avg_batch_latency_ms'] = (
+            total_latency / stats['batches_written'] if stats['batches_written'] else 0.0
+        )
+        stats['write_behind'] = self.write_behind
+        stats['queue_depth'] = self._write_queue.qsize() if self._write_queue is not None else 0
+        stats['writer_running'] = bool(self._writer_thread and self._writer_thread.is_alive())
+        return stats
+
+    @staticmethod
+    def _to_timestamp(value: Optional[str]) -> Optional[float]:
+        """Convert an ISO time filter to a UNIX timestamp, ignoring invalid values."""
+        if not value:
+            return None
+        try:
+            return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+        except (ValueError, AttributeError):
+            return None
+
+    @staticmethod
+    def encode_cursor(timestamp: float, row_id: int) -> str:
+        """Encode a (timestamp, id) position as an opaque continuation token."""
+        raw = json.dumps([timestamp, row_id], separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[float, int]:
+        """Decode a continuation token produced by encode_cursor.
+
+        Raises:
+            ValueError: If the token is malformed
+        """
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            timestamp, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            return float(timestamp), int(row_id)
+        except Exception as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
+
+    @staticmethod
+    def _keyset_clause(position: Tuple[float, int], sort_desc: bool) -> str:
+        """Get the WHERE term that seeks past a (timestamp, id) position."""
+        return "(timestamp, id) < (?, ?)" if sort_desc else "(timestamp, id) > (?, ?)"
+
     def load_metrics(self, start_time: Optional[str] = None, end_time: Optional[str] = None,
                     type_filter: Optional[str] = None, limit: int = 100, offset: int = 0,
-                    sort_desc: bool = True, source_component: Optional[str] = None) -> List[Dict[str, Any]]:
+                    sort_desc: bool = True, source_component: Optional[str] = None,
+                    cursor: Optional[str] = None) -> List[Dict[str, Any]]:
         """Load metrics with optimized SQLite queries."""
+        return self.load_metrics_page(
+            start_time=start_time, end_time=end_time, type_filter=type_filter,
+            limit=limit, offset=offset, sort_desc=sort_desc,
+            source_component=source_component, cursor=cursor
+        )['metrics']
+
+    def load_metrics_page(self, start_time: Optional[str] = None, end_time: Optional[str] = None,
+                          type_filter: Optional[str] = None, limit: int = 100, offset: int = 0,
+                          sort_desc: bool = True, source_component: Optional[str] = None,
+                          cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Load a page of metrics together with a continuation token.
+
+        With a cursor the page starts right after the position it encodes, found by
+        seeking on (timestamp, id), and offset is ignored. Deep pages then cost the
+        same as the first one.
+
+        Returns:
+            Dict with 'metrics' and 'next_cursor' (None when no rows are left)
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        position = self.decode_cursor(cursor) if cursor else None
         try:
             # Convert time filters to timestamps
-            start_ts = None
-            end_ts = None
-            if start_time:
-                try:
-                    start_ts = datetime.fromisoformat(start_time.replace('Z', '+00:00')).timestamp()
-                except:
-                    pass
-            if end_time:
-                try:
-                    end_ts = datetime.fromisoformat(end_time.replace('Z', '+00:00')).timestamp()
-                except:
-                    pass
+            start_ts = self._to_timestamp(start_time)
+            end_ts = self._to_timestamp(end_time)
 
             # Build optimized query
             where_conditions = []
@@ -395,13 +1216,17 @@ def load_metrics(self, start_time: Optional[str] = None, end_time: Optional[str]
             if source_component:
                 where_conditions.append("source_component = ?")
                 params.append(source_component)
+            if position:
+                where_conditions.append(self._keyset_clause(position, sort_desc))
+                params.extend(position)
+                offset = 0
 
             where_clause = " AND ".join(where_conditions) if where_conditions else "1=1"
-            order_clause = "ORDER BY timestamp DESC" if sort_desc else "ORDER BY timestamp ASC"
+            order_clause = "ORDER BY ts DESC, id DESC" if sort_desc else "ORDER BY ts ASC, id ASC"
             
             query = f"""
-                SELECT timestamp_iso as timestamp, metric_type, data_json
-                FROM metrics 
+                SELECT id, timestamp AS ts, timestamp_iso as timestamp, metric_type, data_json
+                FROM {self._source('metrics', start_ts, end_ts)} 
                 WHERE {where_clause}
                 {order_clause}
                 LIMIT ? OFFSET ?
@@ -411,8 +1236,12 @@ def load_metrics(self, start_time: Optional[str] = None, end_time: Optional[str]
             with self._get_connection() as conn:
                 cursor = conn.execute(query, params)
                 results = []
+                last_row = None
+                row_count = 0
                 
                 for row in cursor:
+                    row_count += 1
+                    last_row = row
                     try:
                         data = json.loads(row['data_json'])
                         results.append({
@@ -423,10 +1252,107 @@ def load_metrics(self, start_time: Optional[str] = None, end_time: Optional[str]
                     except json.JSONDecodeError:
                         continue
                 
-                return results
+                next_cursor = None
+                if last_row is not None and row_count == limit:
+                    next_cursor = self.encode_cursor(last_row['ts'], last_row['id'])
+                return {'metrics': results, 'next_cursor': next_cursor}
                 
         except Exception as e:
             logger.error(f"Error loading metrics: {e}")
+            return {'metrics': [], 'next_cursor': None}
+
+    def iter_metrics(self, batch_size: int = 500, cursor: Optional[str] = None,
+                     **filters) -> Iterator[Dict[str, Any]]:
+        """Stream metrics matching the load_metrics filters in keyset-paginated batches.
+
+        Only one batch is held in memory at a time, and no read transaction stays
+        open between batches.
+        """
+        while True:
+            page = self.load_metrics_page(limit=batch_size, cursor=cursor, **filters)
+            yield from page['metrics']
+            cursor = page['next_cursor']
+            if not cursor:
+                return
+
+    def load_metric_fields(self, fields: List[str], type_filter: Optional[str] = None,
+                           type_prefix: Optional[str] = None, start_time: Optional[str] = None,
+                           end_time: Optional[str] = None, source_component: Optional[str] = None,
+                           limit: int = 100, offset: int = 0,
+                           sort_desc: bool = True) -> List[Dict[str, Any]]:
+        """Load selected fields of metrics without decoding each row's data_json.
+
+        Args:
+            fields: Metrics columns (including PROMOTED_METRIC_FIELDS) or "data.<path>"
+                paths into the metric data, which SQLite extracts from the stored JSON
+            type_filter: Exact metric type to match
+            type_prefix: Metric type prefix to match, e.g. "fl_round_"
+
+        Returns:
+            One dict per metric keyed by the requested field names
+        """
+        select_exprs = []
+        select_params = []
+        json_fields = []
+        for index, field in enumerate(fields):
+            if field in _METRIC_COLUMNS and field != 'data_json':
+                select_exprs.append(f"{field} AS f{index}")
+            elif _DATA_PATH_RE.match(field):
+                path = "$" + field[len('data'):]
+                # The type tells objects/arrays (returned as JSON text) apart from strings
+                select_exprs.append(f"JSON_EXTRACT(data_json, ?) AS f{index}, JSON_TYPE(data_json, ?) AS t{index}")
+                select_params.extend([path, path])
+                json_fields.append(index)
+            else:
+                raise ValueError(f"Unknown metric field '{field}'")
+
+        try:
+            start_ts = self._to_timestamp(start_time)
+            end_ts = self._to_timestamp(end_time)
+            where_conditions = []
+            params = list(select_params)
+
+            if start_ts:
+                where_conditions.append("timestamp >= ?")
+                params.append(start_ts)
+            if end_ts:
+                where_conditions.append("timestamp <= ?")
+                params.append(end_ts)
+            if type_filter:
+                where_conditions.append("metric_type = ?")
+                params.append(type_filter)
+            if type_prefix:
+                escaped = type_prefix.replace('!', '!!').replace('%', '!%').replace('_', '!_')
+                where_conditions.append("metric_type LIKE ? ESCAPE '!'")
+                params.append(escaped + '%')
+            if source_component:
+                where_conditions.append("source_component = ?")
+                params.append(source_component)
+
+            where_clause = " AND ".join(where_conditions) if where_conditions else "1=1"
+            order_clause = "ORDER BY timestamp DESC" if sort_desc else "ORDER BY timestamp ASC"
+
+            query = f"""
+                SELECT {', '.join(select_exprs)}
+                FROM {self._source('metrics', start_ts, end_ts)} 
+                WHERE {where_clause}
+                {order_clause}
+                LIMIT ? OFFSET ?
+            """
+            params.extend([limit, offset])
+
+            with self._get_connection() as conn:
+                results = []
+                for row in conn.execute(query, params):
+                    item = {field: row[f"f{index}"] for index, field in enumerate(fields)}
+                    for index in json_fields:
+                        if row[f"t{index}"] in ('object', 'array'):
+                            item[fields[index]] = json.loads(row[f"f{index}"])
+                    results.append(item)
+                return results
+
+        except Exception as e:
+            logger.error(f"Error loading metric fields: {e}")
             return []
 
     def get_fl_summary_fast(self, limit: int = 1000) -> List[Dict[str, Any]]:
@@ -466,15 +1392,19 @@ def get_latest_fl_metrics(self) -> Optional[Dict[str, Any]]:
         try:
             with self._get_connection() as conn:
                 # Get latest FL server metrics
-                cursor = conn.execute("""
-                    SELECT timestamp_iso, data_json, accuracy, round_number, status
-                    FROM metrics 
-                    WHERE metric_type = 'fl_server'
-                    ORDER BY timestamp DESC 
-                    LIMIT 1
-                """)
+                # Newest partitions first; stop at the first one holding a row
+                row = None
+                for table in reversed(self._tables_for_range('metrics')):
+                    row = conn.execute(f"""
+                        SELECT timestamp_iso, data_json, accuracy, round_number, status
+                        FROM {table} 
+                        WHERE metric_type = 'fl_server'
+                        ORDER BY timestamp DESC 
+                        LIMIT 1
+                    """).fetchone()
+                    if row:
+                        break
                 
-                row = cursor.fetchone()
                 if not row:
                     return None
                 
@@ -503,12 +1433,21 @@ def get_latest_fl_metrics(self) -> Optional[Dict[str, Any]]:
             logger.error(f"Error getting latest FL metrics: {e}")
             return None
 
-    def count_metrics(self, type_filter: Optional[str] = None, source_component: Optional[str] = None) -> int:
+    def count_metrics(self, type_filter: Optional[str] = None, source_component: Optional[str] = None,
+                      start_time: Optional[str] = None, end_time: Optional[str] = None) -> int:
         """Count metrics efficiently."""
         try:
+            start_ts = self._to_timestamp(start_time)
+            end_ts = self._to_timestamp(end_time)
             where_conditions = []
             params = []
             
+            if start_ts:
+                where_conditions.append("timestamp >= ?")
+                params.append(start_ts)
+            if end_ts:
+                where_conditions.append("timestamp <= ?")
+                params.append(end_ts)
             if type_filter:
                 where_conditions.append("metric_type = ?")
                 params.append(type_filter)
@@ -519,8 +1458,11 @@ def count_metrics(self, type_filter: Optional[str] = None, source_component: Opt
             where_clause = " AND ".join(where_conditions) if where_conditions else "1=1"
             
             with self._get_connection() as conn:
-                cursor = conn.execute(f"SELECT COUNT(*) FROM metrics WHERE {where_clause}", params)
-                return cursor.fetchone()[0]
+                # Count per table so each partition can use its own indexes
+                return sum(
+                    conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {where_clause}", params).fetchone()[0]
+                    for table in self._tables_for_range('metrics', start_ts, end_ts)
+                )
                 
         except Exception as e:
             logger.error(f"Error counting metrics: {e}")
@@ -530,26 +1472,38 @@ def load_events(self, start_time: Optional[str] = None, end_time: Optional[str]
                    source_component: Optional[str] = None, event_type: Optional[str] = None, 
                    limit: int = 100, offset: int = 0, sort_desc: bool = True,
                    component: Optional[str] = None, level: Optional[str] = None,
-                   since_id: Optional[str] = None) -> List[Dict[str, Any]]:
+                   since_id: Optional[str] = None, cursor: Optional[str] = None) -> List[Dict[str, Any]]:
         """Load events efficiently."""
+        return self.load_events_page(
+            start_time=start_time, end_time=end_time, source_component=source_component,
+            event_type=event_type, limit=limit, offset=offset, sort_desc=sort_desc,
+            component=component, level=level, since_id=since_id, cursor=cursor
+        )['events']
+
+    def load_events_page(self, start_time: Optional[str] = None, end_time: Optional[str] = None,
+                         source_component: Optional[str] = None, event_type: Optional[str] = None,
+                         limit: int = 100, offset: int = 0, sort_desc: bool = True,
+                         component: Optional[str] = None, level: Optional[str] = None,
+                         since_id: Optional[str] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Load a page of events together with a continuation token.
+
+        See load_metrics_page for the cursor semantics.
+
+        Returns:
+            Dict with 'events' and 'next_cursor' (None when no rows are left)
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        position = self.decode_cursor(cursor) if cursor else None
         try:
             # Handle backward compatibility
             if component and not source_component:
                 source_component = component
 
             # Convert time filters
-            start_ts = None
-            end_ts = None
-            if start_time:
-                try:
-                    start_ts = datetime.fromisoformat(start_time.replace('Z', '+00:00')).timestamp()
-                except:
-                    pass
-            if end_time:
-                try:
-                    end_ts = datetime.fromisoformat(end_time.replace('Z', '+00:00')).timestamp()
-                except:
-                    pass
+            start_ts = self._to_timestamp(start_time)
+            end_ts = self._to_timestamp(end_time)
 
             # Build query
             where_conditions = []
@@ -573,14 +1527,18 @@ def load_events(self, start_time: Optional[str] = None, end_time: Optional[str]
             if since_id:
                 where_conditions.append("id > ?")
                 params.append(int(since_id))
+            if position:
+                where_conditions.append(self._keyset_clause(position, sort_desc))
+                params.extend(position)
+                offset = 0
 
             where_clause = " AND ".join(where_conditions) if where_conditions else "1=1"
-            order_clause = "ORDER BY timestamp DESC" if sort_desc else "ORDER BY timestamp ASC"
+            order_clause = "ORDER BY timestamp DESC, id DESC" if sort_desc else "ORDER BY timestamp ASC, id ASC"
             
             query = f"""
-                SELECT id, timestamp_iso, event_id, source_component, event_type, 
+                SELECT id, timestamp AS ts, timestamp_iso, event_id, source_component, event_type, 
                        event_level, message, details_json
-                FROM events 
+                FROM {self._source('events', start_ts, end_ts)} 
                 WHERE {where_clause}
                 {order_clause}
                 LIMIT ? OFFSET ?
@@ -590,8 +1548,12 @@ def load_events(self, start_time: Optional[str] = None, end_time: Optional[str]
             with self._get_connection() as conn:
                 cursor = conn.execute(query, params)
                 results = []
+                last_row = None
+                row_count = 0
                 
                 for row in cursor:
+                    row_count += 1
+                    last_row = row
                     try:
                         details = json.loads(row['details_json'] or '{}')
                         results.append({
@@ -609,19 +1571,41 @@ def load_events(self, start_time: Optional[str] = None, end_time: Optional[str]
                     except json.JSONDecodeError:
                         continue
                 
-                return results
+                next_cursor = None
+                if last_row is not None and row_count == limit:
+                    next_cursor = self.encode_cursor(last_row['ts'], last_row['id'])
+                return {'events': results, 'next_cursor': next_cursor}
                 
         except Exception as e:
             logger.error(f"Error loading events: {e}")
-            return []
+            return {'events': [], 'next_cursor': None}
+
+    def iter_events(self, batch_size: int = 500, cursor: Optional[str] = None,
+                    **filters) -> Iterator[Dict[str, Any]]:
+        """Stream events matching the load_events filters in keyset-paginated batches."""
+        while True:
+            page = self.load_events_page(limit=batch_size, cursor=cursor, **filters)
+            yield from page['events']
+            cursor = page['next_cursor']
+            if not cursor:
+                return
 
     def count_events(self, source_component: Optional[str] = None, event_type: Optional[str] = None,
-                    level: Optional[str] = None) -> int:
+                    level: Optional[str] = None, start_time: Optional[str] = None,
+                    end_time: Optional[str] = None) -> int:
         """Count events efficiently."""
         try:
+            start_ts = self._to_timestamp(start_time)
+            end_ts = self._to_timestamp(end_time)
             where_conditions = []
             params = []
             
+            if start_ts:
+                where_conditions.append("timestamp >= ?")
+                params.append(start_ts)
+            if end_ts:
+                where_conditions.append("timestamp <= ?")
+                params.append(end_ts)
             if source_component:
                 where_conditions.append("source_component = ?")
                 params.append(source_component)
@@ -632,18 +1616,25 @@ def count_events(self, source_component: Optional[str] = None, event_type: Optio
                 where_conditions.append("event_level = ?")
                 params.append(level)
 
+            if not start_ts and not end_ts:
+                # Without a time range the event counters answer exactly
+                return self.get_event_summary(source_component, event_type, level)['total']
+
             where_clause = " AND ".join(where_conditions) if where_conditions else "1=1"
             
             with self._get_connection() as conn:
-                cursor = conn.execute(f"SELECT COUNT(*) FROM events WHERE {where_clause}", params)
-                return cursor.fetchone()[0]
+                return sum(
+                    conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {where_clause}", params).fetchone()[0]
+                    for table in self._tables_for_range('events', start_ts, end_ts)
+                )
                 
         except Exception as e:
             logger.error(f"Error counting events: {e}")
             return 0
 
     def close(self):
-        """Close all database connections."""
+        """Flush pending writes and close all database connections."""
+        self._stop_writer()
         with self._pool_lock:
             for conn in self._connection_pool.values():
                 try:
@@ -653,36 +1644,74 @@ def close(self):
             self._connection_pool.clear()
         logger.info("SQLite storage connections closed")
 
-    def cleanup_duplicate_rounds(self):
-        """Remove duplicate round records keeping only the latest entry per round."""
+    def cleanup_duplicate_rounds(self, since_id: Optional[int] = None) -> int:
+        """Remove duplicate round records keeping only the latest entry per round.
+
+        Args:
+            since_id: Only check rounds with a metrics row newer than this id, so that
+                repeated calls cost as much as the rows written in between (default:
+                check every round)
+
+        Returns:
+            Highest metrics id checked, to pass as since_id to the next call
+        """
         try:
             with self._get_connection() as conn:
-                # Remove duplicates from metrics table, keeping only the latest timestamp for each round
-                conn.execute("""
-                    DELETE FROM metrics 
-                    WHERE id NOT IN (
-                        SELECT MAX(id) 
-                        FROM metrics 
-                        WHERE metric_type LIKE 'fl_round_%' 
-                        AND round_number IS NOT NULL 
-                        GROUP BY round_number
-                    ) 
-                    AND metric_type LIKE 'fl_round_%'
-                    AND round_number IS NOT NULL
-                """)
+                tables = self._tables_for_range('metrics')
+                covered = max([since_id or 0] + [
+                    conn.execute(f"SELECT MAX(id) FROM {table}").fetchone()[0] or 0 for table in tables
+                ])
+
+                if since_id is None:
+                    round_filters = [("", [])]
+                else:
+                    rounds = set()
+                    for table in tables:
+                        rounds.update(row[0] for row in conn.execute(f"""
+                            SELECT DISTINCT round_number FROM {table}
+                            WHERE id > ? AND id <= ?
+                            AND metric_type LIKE 'fl_round_%'
+                            AND round_number IS NOT NULL
+                        """, (since_id, covered)))
+                    rounds = sorted(rounds)
+                    round_filters = [
+                        (f" AND round_number IN ({', '.join('?' * len(chunk))})", chunk)
+                        for chunk in (rounds[i:i + 500] for i in range(0, len(rounds), 500))
+                    ]
+
+                # Remove duplicates from metrics table, keeping only the latest timestamp for each round.
+                # Ids are unique across partitions, so the latest id is picked over all of them.
+                source = self._source('metrics')
+                for round_filter, round_params in round_filters:
+                    for table in tables:
+                        conn.execute(f"""
+                            DELETE FROM {table} 
+                            WHERE id NOT IN (
+                                SELECT MAX(id) 
+                                FROM {source} 
+                                WHERE metric_type LIKE 'fl_round_%' 
+                                AND round_number IS NOT NULL{round_filter}
+                                GROUP BY round_number
+                            ) 
+                            AND metric_type LIKE 'fl_round_%'
+                            AND round_number IS NOT NULL{round_filter}
+                        """, round_params + round_params)
                 
                 # Remove duplicates from FL training summary
-                conn.execute("""
-                    DELETE FROM fl_training_summary 
-                    WHERE rowid NOT IN (
-                        SELECT MAX(rowid) 
-                        FROM fl_training_summary 
-                        GROUP BY round_number
-                    )
-                """)
+                if since_id is None:
+                    conn.execute("""
+                        DELETE FROM fl_training_summary 
+                        WHERE rowid NOT IN (
+                            SELECT MAX(rowid) 
+                            FROM fl_training_summary 
+                            GROUP BY round_number
+                        )
+                    """)
                 
                 conn.commit()
                 logger.debug("Cleaned up duplicate round records")
+                return covered
                 
         except Exception as e:
-            logger.error(f"Error cleaning up duplicate rounds: {e}")
\ No newline at end of file
+            logger.error(f"Error cleaning up duplicate rounds: {e}")
+            return since_id or 0
\ No newline at end of file
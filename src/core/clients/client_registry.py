@@ -0,0 +1,617 @@
+"""
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Client Registry
+
+Indexed store of federated learning clients for large populations. Besides
+the clients by ID, the registry keeps:
+
+- an index of capability values (e.g. dataset, device type) to client IDs,
+- clients sorted by their smoothed training duration (latency),
+- clients grouped by participation count,
+- a Fenwick tree over per-client utility scores.
+
+Utility scores favour fast, reliable clients that have not participated
+often, and are updated incrementally as fit results arrive. Weighted
+sampling of k clients walks the Fenwick tree once per draw, O(k log n),
+and uniform sampling is O(k), so neither rebuilds a list of all clients.
+"""
+
+import bisect
+import heapq
+import math
+import random
+import threading
+import time
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from src.core.clients.client import Client
+
+
+class FenwickTree:
+    """Binary indexed tree of non-negative weights with prefix-sum search."""
+
+    # Rebuild from the stored values after this many updates to bound rounding drift
+    REBUILD_INTERVAL = 1 << 16
+
+    def __init__(self, capacity: int = 0):
+        self._values: List[float] = [0.0] * capacity
+        self._tree: List[float] = [0.0] * (capacity + 1)
+        self._updates = 0
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __getitem__(self, index: int) -> float:
+        return self._values[index]
+
+    def resize(self, capacity: int):
+        """Grow the tree to hold `capacity` weights, keeping the current ones."""
+        if capacity > len(self._values):
+            self._values.extend([0.0] * (capacity - len(self._values)))
+            self.rebuild()
+
+    def rebuild(self):
+        """Recompute the tree from the stored weights in O(n)."""
+        size = len(self._values)
+        tree = [0.0] + self._values
+        for i in range(1, size + 1):
+            parent = i + (i & -i)
+            if parent <= size:
+                tree[parent] += tree[i]
+        self._tree = tree
+        self._updates = 0
+
+    def set(self, index: int, weight: float):
+        """Set the weight at an index."""
+        delta = weight - self._values[index]
+        if delta == 0:
+            return
+        self._values[index] = weight
+        size = len(self._values)
+        i = index + 1
+        while i <= size:
+            self._tree[i] += delta
+            i += i & -i
+        self._updates += 1
+        if self._updates >= self.REBUILD_INTERVAL:
+            self.rebuild()
+
+    def total(self) -> float:
+        """Sum of all weights."""
+        i = len(self._values)
+        total = 0.0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def find(self, target: float) -> int:
+        """Index whose cumulative weight range contains target (0 <= target < total())."""
+        size = len(self._values)
+        position = 0
+        step = 1 << (size.bit_length() - 1) if size else 0
+        while step:
+            following = position + step
+            if following <= size and self._tree[following] <= target:
+                position = following
+                target -= self._tree[following]
+            step >>= 1
+        return min(position, size - 1)
+
+
+class ClientRegistry:
+    """Clients by ID with secondary indexes and utility-weighted sampling."""
+
+    def __init__(self,
+                 latency_scale: float = 10.0,
+                 latency_smoothing: float = 0.3,
+                 participation_penalty: float = 0.0,
+                 min_score: float = 1e-3,
+                 seed: Optional[int] = None):
+        """
+        Initialize the registry.
+
+        Args:
+            latency_scale: Training duration (seconds) at which the speed factor of a score halves
+            latency_smoothing: Weight of the newest training duration in the moving average
+            participation_penalty: Score reduction per round participated, to spread rounds across clients
+            min_score: Lowest score of an available client, so every client can still be sampled
+            seed: Seed of the sampling random generator
+        """
+        self.latency_scale = latency_scale
+        self.latency_smoothing = latency_smoothing
+        self.participation_penalty = participation_penalty
+        self.min_score = min_score
+        self._rng = random.Random(seed)
+        self._lock = threading.RLock()
+
+        self._reset()
+
+    def _reset(self):
+        self.clients: Dict[str, Client] = {}
+        self._slots: Dict[str, int] = {}
+        self._slot_ids: List[Optional[str]] = []
+        self._free_slots: List[int] = []
+        self._scores = FenwickTree()
+
+        # Available clients as a list with positions, for O(1) removal and O(k) uniform sampling
+        self._available: List[str] = []
+        self._available_positions: Dict[str, int] = {}
+
+        self._capability_index: Dict[str, Dict[Hashable, Set[str]]] = {}
+        # Capability values each client is indexed under, as callers may change Client objects in place
+        self._indexed: Dict[str, Dict[str, Hashable]] = {}
+        self._latency: Dict[str, float] = {}
+        self._by_latency: List[Tuple[float, str]] = []
+        self._participation: Dict[str, int] = {}
+        self._by_participation: Dict[int, Set[str]] = {}
+        self._failures: Dict[str, int] = {}
+        self._last_seen: Dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self.clients)
+
+    def __contains__(self, client_id: str) -> bool:
+        return client_id in self.clients
+
+    # --- Membership ---
+
+    def register(self, client_id: str, capabilities: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Register a client, or mark a known client available and update its capabilities.
+
+        Returns:
+            True if the client was new, False otherwise
+        """
+        with self._lock:
+            if client_id in self.clients:
+                if capabilities:
+                    self.update_capabilities(client_id, capabilities)
+                self.set_available(client_id, True)
+                return False
+            self.add(Client(client_id, dict(capabilities or {})))
+            return True
+
+    def add(self, client: Client):
+        """Add a client object, replacing a client with the same ID."""
+        with self._lock:
+            if client.client_id in self.clients:
+                self._unindex_capabilities(client.client_id)
+            else:
+                self._assign_slot(client.client_id)
+                self._participation[client.client_id] = 0
+                self._by_participation.setdefault(0, set()).add(client.client_id)
+            self.clients[client.client_id] = client
+            self._index_capabilities(client.client_id, client.capabilities)
+            self._last_seen[client.client_id] = time.time()
+            self.set_available(client.client_id, True)
+
+    def remove(self, client_id: str) -> bool:
+        """Remove a client and everything recorded about it."""
+        with self._lock:
+            client = self.clients.pop(client_id, None)
+            if client is None:
+                return False
+            self._remove_available(client_id)
+            self._unindex_capabilities(client_id)
+            self._set_latency(client_id, None)
+            count = self._participation.pop(client_id, 0)
+            self._discard_participation(client_id, count)
+            self._failures.pop(client_id, None)
+            self._last_seen.pop(client_id, None)
+            slot = self._slots.pop(client_id)
+            self._scores.set(slot, 0.0)
+            self._slot_ids[slot] = None
+            self._free_slots.append(slot)
+            return True
+
+    def clear(self):
+        """Remove all clients."""
+        with self._lock:
+            self._reset()
+
+    def set_available(self, client_id: str, available: bool):
+        """Mark a client available for sampling, or not (e.g. while disconnected)."""
+        with self._lock:
+            if client_id not in self.clients:
+                return
+            if available:
+                if client_id not in self._available_positions:
+                    self._available_positions[client_id] = len(self._available)
+                    self._available.append(client_id)
+            else:
+                self._remove_available(client_id)
+            self._update_score(client_id)
+
+    def _assign_slot(self, client_id: str):
+        if self._free_slots:
+            slot = self._free_slots.pop()
+        else:
+            slot = len(self._slot_ids)
+            self._slot_ids.append(None)
+            if slot >= len(self._scores):
+                self._scores.resize(max(16, 2 * len(self._scores)))
+        self._slot_ids[slot] = client_id
+        self._slots[client_id] = slot
+
+    def _remove_available(self, client_id: str):
+        position = self._available_positions.pop(client_id, None)
+        if position is None:
+            return
+        last = self._available.pop()
+        if last != client_id:
+            self._available[position] = last
+            self._available_positions[last] = position
+
+    # --- Indexes ---
+
+    def update_capabilities(self, client_id: str, capabilities: Dict[str, Any]):
+        """Update a client's capabilities and the capability index."""
+        with self._lock:
+            client = self.clients.get(client_id)
+            if client is None:
+                return
+            self._unindex_capabilities(client_id)
+            client.update_capabilities(capabilities)
+            self._index_capabilities(client_id, client.capabilities)
+
+    def _index_capabilities(self, client_id: str, capabilities: Dict[str, Any]):
+        indexed = {key: value for key, value in capabilities.items() if isinstance(value, Hashable)}
+        for key, value in indexed.items():
+            self._capability_index.setdefault(key, {}).setdefault(value, set()).add(client_id)
+        self._indexed[client_id] = indexed
+
+    def _unindex_capabilities(self, client_id: str):
+        for key, value in self._indexed.pop(client_id, {}).items():
+            values = self._capability_index.get(key, {})
+            members = values.get(value)
+            if members is not None:
+                members.discard(client_id)
+                if not members:
+                    del values[value]
+
+    def _set_latency(self, client_id: str, latency: Optional[float]):
+        previous = self._latency.pop(client_id, None)
+        if previous is not None:
+            index = bisect.bisect_left(self._by_latency, (previous, client_id))
+            if index < len(self._by_latency) and self._by_latency[index] == (previous, client_id):
+                del self._by_latency[index]
+        if latency is not None:
+            self._latency[client_id] = latency
+            bisect.insort(self._by_latency, (latency, client_id))
+
+    def _discard_participation(self, client_id: str, count: int):
+        members = self._by_participation.get(count)
+        if members is not None:
+            members.discard(client_id)
+            if not members:
+                del self._by_participation[count]
+
+    def find(self,
+             capabilities: Optional[Dict[str, Any]] = None,
+             max_latency: Optional[float] = None,
+             max_participation: Optional[int] = None,
+             available_only: bool = True) -> Set[str]:
+        """
+        Find clients through the indexes.
+
+        Args:
+            capabilities: Required capability values, e.g. {"dataset": "mnist"}
+            max_latency: Highest smoothed training duration in seconds (clients without one are excluded)
+            max_participation: Highest number of rounds participated
+            available_only: Only clients currently available
+
+        Returns:
+            Matching client IDs
+        """
+        with self._lock:
+            candidates: Optional[Set[str]] = set(self._matching(capabilities)) if capabilities else None
+            if candidates is not None and not candidates:
+                return set()
+            if max_latency is not None:
+                end = bisect.bisect_right(self._by_latency, (max_latency, chr(0x10FFFF)))
+                fast = {client_id for _, client_id in self._by_latency[:end]}
+                candidates = fast if candidates is None else candidates & fast
+            if max_participation is not None:
+                rarely = set()
+                for count, members in self._by_participation.items():
+                    if count <= max_participation:
+                        rarely |= members
+                candidates = rarely if candidates is None else candidates & rarely
+            if candidates is None:
+                candidates = set(self._available) if available_only else set(self.clients)
+            elif available_only:
+                candidates = {client_id for client_id in candidates if client_id in self._available_positions}
+            return candidates
+
+    # --- Scores ---
+
+    def record_fit(self, client_id: str, metrics: Dict[str, Any], round_number: Optional[int] = None):
+        """
+        Update a client's statistics and score from the metrics of a fit result.
+
+        Args:
+            client_id: Client identifier (registered if unknown)
+            metrics: Fit metrics; `training_duration` feeds the latency average, and
+                `model_type` and `dataset` are indexed as capabilities
+            round_number: Round the result belongs to
+        """
+        with self._lock:
+            if client_id not in self.clients:
+                self.register(client_id)
+            client = self.clients[client_id]
+
+            duration = metrics.get("training_duration")
+            if isinstance(duration, (int, float)) and duration > 0:
+                previous = self._latency.get(client_id)
+                smoothed = duration if previous is None else (
+                    self.latency_smoothing * duration + (1 - self.latency_smoothing) * previous)
+                self._set_latency(client_id, smoothed)
+
+            capabilities = {key: metrics[key] for key in ("model_type", "dataset")
+                            if key in metrics and client.capabilities.get(key) != metrics[key]}
+            if capabilities:
+                self.update_capabilities(client_id, capabilities)
+
+            count = self._participation.get(client_id, 0)
+            self._discard_participation(client_id, count)
+            self._participation[client_id] = count + 1
+            self._by_participation.setdefault(count + 1, set()).add(client_id)
+            self._last_seen[client_id] = time.time()
+
+            client.update_metrics(metrics)
+            if round_number is not None:
+                client.record_round_participation(round_number, metrics)
+            self._update_score(client_id)
+
+    def record_failure(self, client_id: str):
+        """Count a failed fit against a client's score."""
+        with self._lock:
+            if client_id not in self.clients:
+                return
+            self._failures[client_id] = self._failures.get(client_id, 0) + 1
+            self._update_score(client_id)
+
+    def compute_score(self, client_id: str) -> float:
+        """Utility of a client from its latency, reliability and participation."""
+        latency = self._latency.get(client_id)
+        participation = self._participation.get(client_id, 0)
+        failures = self._failures.get(client_id, 0)
+        speed = 1.0 if latency is None else 1.0 / (1.0 + latency / self.latency_scale)
+        reliability = (participation + 1) / (participation + failures + 1)
+        fairness = 1.0 / (1.0 + self.participation_penalty * participation)
+        return max(self.min_score, speed * reliability * fairness)
+
+    def _update_score(self, client_id: str):
+        score = self.compute_score(client_id) if client_id in self._available_positions else 0.0
+        self._scores.set(self._slots[client_id], score)
+
+    def get_score(self, client_id: str) -> float:
+        """Current sampling weight of a client (0 if it is unavailable)."""
+        with self._lock:
+            slot = self._slots.get(client_id)
+            return self._scores[slot] if slot is not None else 0.0
+
+    # --- Sampling ---
+
+    def sample(self,
+               count: int,
+               weighted: bool = True,
+               capabilities: Optional[Dict[str, Any]] = None,
+               exclude: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        Sample available clients without replacement.
+
+        Args:
+            count: Number of clients to sample
+            weighted: Sample proportionally to utility scores instead of uniformly
+            capabilities: Only clients with these capability values
+            exclude: Client IDs not to sample
+
+        Returns:
+            Sampled client IDs (all matching clients if there are not more than `count`)
+        """
+        with self._lock:
+            excluded = {client_id for client_id in exclude or () if client_id in self._available_positions}
+            accept = None
+            if capabilities:
+                accept = self._matching(capabilities)
+                if 4 * len(accept) < len(self._available):
+                    # Few matches: sample them directly instead of rejecting most draws
+                    candidates = [client_id for client_id in accept
+                                  if client_id in self._available_positions and client_id not in excluded]
+                    return self._sample_subset(candidates, count, weighted)
+            elif count >= len(self._available) - len(excluded):
+                return [client_id for client_id in self._available if client_id not in excluded]
+            if not weighted:
+                return self._sample_uniform(count, excluded, accept)
+            return self._sample_weighted(count, excluded, accept)
+
+    def _matching(self, capabilities: Dict[str, Any]) -> Set[str]:
+        """Clients with all the given capability values (the index set itself for one capability)."""
+        matches: Optional[Set[str]] = None
+        for key, value in capabilities.items():
+            members = self._capability_index.get(key, {}).get(value, set())
+            matches = members if matches is None else matches & members
+        return matches if matches is not None else set()
+
+    def _sample_uniform(self, count: int, excluded: Set[str], accept: Optional[Set[str]] = None) -> List[str]:
+        """Draw positions of the available list, rejecting excluded and (with `accept`) unmatched clients."""
+        selected: List[str] = []
+        seen: Set[int] = set()
+        size = len(self._available)
+        while len(selected) < count and len(seen) < size:
+            position = self._rng.randrange(size)
+            if position in seen:
+                continue
+            seen.add(position)
+            client_id = self._available[position]
+            if client_id not in excluded and (accept is None or client_id in accept):
+                selected.append(client_id)
+        return selected
+
+    def _sample_weighted(self, count: int, excluded: Set[str], accept: Optional[Set[str]] = None) -> List[str]:
+        """
+        Draw from the Fenwick tree, zeroing each drawn weight until the sample is complete.
+
+        Clients not in `accept` are zeroed when drawn without being selected.
+        """
+        removed: List[Tuple[int, float]] = []
+        for client_id in excluded:
+            slot = self._slots.get(client_id)
+            if slot is not None and self._scores[slot] > 0:
+                removed.append((slot, self._scores[slot]))
+                self._scores.set(slot, 0.0)
+        selected = []
+        try:
+            while len(selected) < count:
+                total = self._scores.total()
+                if total <= 0:
+                    break
+                slot = self._scores.find(self._rng.random() * total)
+                weight = self._scores[slot]
+                if weight <= 0:
+                    # Rounding put the draw on an empty slot; rebuild and draw again
+                    self._scores.rebuild()
+                    continue
+                client_id = self._slot_ids[slot]
+                if accept is None or client_id in accept:
+                    selected.append(client_id)
+                removed.append((slot, weight))
+                self._scores.set(slot, 0.0)
+        finally:
+            for slot, weight in removed:
+                self._scores.set(slot, weight)
+        return selected
+
+    def _sample_subset(self, candidates: List[str], count: int, weighted: bool) -> List[str]:
+        """Sample from an explicit candidate list (Efraimidis-Spirakis keys when weighted)."""
+        if len(candidates) <= count:
+            return candidates
+        if not weighted:
+            return self._rng.sample(candidates, count)
+        keys = []
+        for client_id in candidates:
+            weight = self._scores[self._slots[client_id]]
+            keys.append((math.log(self._rng.random() or 1e-300) / weight, client_id))
+        return [client_id for _, client_id in heapq.nlargest(count, keys)]
+
+    # --- Introspection ---
+
+    def available_count(self) -> int:
+        """Number of clients available for sampling."""
+        return len(self._available)
+
+    def get_client_stats(self, client_id: str) -> Optional[Dict[str, Any]]:
+        """Latency, participation, failures and score of a client."""
+        with self._lock:
+            if client_id not in self.clients:
+                return None
+            return {
+                "client_id": client_id,
+                "available": client_id in self._available_positions,
+                "latency": self._latency.get(client_id),
+                "participation": self._participation.get(client_id, 0),
+                "failures": self._failures.get(client_id, 0),
+                "score": self.get_score(client_id),
+                "last_seen": self._last_seen.get(client_id)
+            }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Summary of the registry."""
+        with self._lock:
+            latencies = [latency for latency, _ in self._by_latency]
+            return {
+                "clients": len(self.clients),
+                "available": len(self._available),
+                "with_latency": len(latencies),
+                "median_latency": latencies[len(latencies) // 2] if latencies else None,
+                "total_score": self._scores.total(),
+                "indexed_capabilities": sorted(self._capability_index)
+            }
+
+
+def benchmark(population: int = 10000, count: int = 100, rounds: int = 200) -> Dict[str, Any]:
+    """
+    Time client sampling from the registry against rebuilding the client list
+    each round, as RandomSelectionPolicy does.
+
+    Args:
+        population: Number of registered clients
+        count: Clients sampled per round
+        rounds: Rounds timed
+
+    Returns:
+        Milliseconds per round for each approach
+    """
+    registry = ClientRegistry(seed=0)
+    for i in range(population):
+        registry.register(f"client-{i}", {"dataset": "mnist" if i % 2 else "cifar10"})
+    rng = random.Random(1)
+    for i in range(population):
+        registry.record_fit(f"client-{i}", {"training_duration": rng.uniform(1, 60)})
+    available_clients = [client.to_dict() for client in registry.clients.values()]
+
+    def timed(fn) -> float:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            fn()
+        return round((time.perf_counter() - start) / rounds * 1000, 4)
+
+    def list_uniform():
+        client_ids = [client["client_id"] for client in available_clients]
+        return random.sample(client_ids, count)
+
+    def list_weighted():
+        client_ids = [client["client_id"] for client in available_clients]
+        weights = [registry.compute_score(client_id) for client_id in client_ids]
+        return [client_ids[i] for i in _weighted_indices_without_replacement(weights, count, rng)]
+
+    def update_scores():
+        for client_id in registry.sample(count):
+            registry.record_fit(client_id, {"training_duration": rng.uniform(1, 60)})
+
+    return {
+        "population": population,
+        "count": count,
+        "list_uniform_ms": timed(list_uniform),
+        "registry_uniform_ms": timed(lambda: registry.sample(count, weighted=False)),
+        "list_weighted_ms": timed(list_weighted),
+        "registry_weighted_ms": timed(lambda: registry.sample(count)),
+        "registry_filtered_ms": timed(lambda: registry.sample(count, capabilities={"dataset": "mnist"})),
+        "registry_sample_and_update_ms": timed(update_scores),
+    }
+
+
+def _weighted_indices_without_replacement(weights: List[float], count: int, rng: random.Random) -> List[int]:
+    """Reference weighted sampling that recomputes the total after every draw."""
+    weights = list(weights)
+    selected = []
+    for _ in range(count):
+        target = rng.random() * sum(weights)
+        cumulative = 0.0
+        for index, weight in enumerate(weights):
+            cumulative += weight
+            if cumulative > target and weight > 0:
+                selected.append(index)
+                weights[index] = 0.0
+                break
+    return selected
+
+
+if __name__ == "__main__":
+    import json
+    print(json.dumps(benchmark(), indent=2))
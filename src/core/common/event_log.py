@@ -0,0 +1,176 @@
+"""
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Bounded in-memory event feed shared by the components' /events endpoints.
+
+Events are kept in a fixed-size ring and numbered with a monotonically
+increasing sequence number. An index from event id to sequence number turns
+`since_event_id` lookups into a dict lookup, and reads only copy the events
+they return. Consumers can block until new events arrive instead of polling.
+"""
+
+import json
+import logging
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class EventLog:
+    """Thread-safe ring buffer of events with O(1) cursor lookup."""
+
+    def __init__(self, capacity: int = 1000, id_key: str = "event_id"):
+        """
+        Initialize the event log.
+
+        Args:
+            capacity: Number of most recent events retained
+            id_key: Event field holding the event's unique id
+        """
+        self.capacity = max(1, int(capacity))
+        self.id_key = id_key
+        self._ring: List[Optional[Dict[str, Any]]] = [None] * self.capacity
+        self._index: Dict[str, int] = {}  # event id -> sequence number
+        self._next_seq = 0
+        self._condition = threading.Condition()
+
+    def __len__(self) -> int:
+        with self._condition:
+            return min(self._next_seq, self.capacity)
+
+    @property
+    def first_seq(self) -> int:
+        """Sequence number of the oldest retained event."""
+        return max(0, self._next_seq - self.capacity)
+
+    @property
+    def next_seq(self) -> int:
+        """Sequence number the next appended event will get."""
+        return self._next_seq
+
+    def append(self, event: Dict[str, Any]) -> int:
+        """
+        Add an event, evicting the oldest one if the log is full.
+
+        Returns:
+            The event's sequence number
+        """
+        with self._condition:
+            seq = self._next_seq
+            slot = seq % self.capacity
+            evicted = self._ring[slot]
+            if evicted is not None:
+                self._index.pop(evicted.get(self.id_key), None)
+            self._ring[slot] = event
+            self._index[event.get(self.id_key)] = seq
+            self._next_seq = seq + 1
+            self._condition.notify_all()
+        return seq
+
+    def _slice(self, start_seq: int, stop_seq: int) -> List[Dict[str, Any]]:
+        """Get events [start_seq, stop_seq) with the lock held, copying at most two ring slices."""
+        if start_seq >= stop_seq:
+            return []
+        start, stop = start_seq % self.capacity, stop_seq % self.capacity
+        if start < stop:
+            return self._ring[start:stop]
+        return self._ring[start:] + self._ring[:stop]
+
+    def _start_after(self, since_event_id: Optional[str]) -> int:
+        """Sequence number following an event id; unknown or evicted ids start from the oldest event."""
+        if since_event_id:
+            seq = self._index.get(since_event_id)
+            if seq is not None:
+                return seq + 1
+            logger.debug(f"Event ID {since_event_id} not found, returning all events")
+        return self.first_seq
+
+    def read(self, since_event_id: Optional[str] = None, limit: int = 1000,
+             since_seq: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Get the events after a cursor.
+
+        Args:
+            since_event_id: Return events after this event (all retained events if unknown)
+            limit: Maximum number of events to return
+            since_seq: Return events with a sequence number above this one (overrides since_event_id)
+
+        Returns:
+            Dictionary with the events, and the event id and sequence number to pass
+            as since_event_id / since_seq to continue after them
+        """
+        with self._condition:
+            if since_seq is not None:
+                start = max(int(since_seq) + 1, self.first_seq)
+            else:
+                start = self._start_after(since_event_id)
+            stop = min(self._next_seq, start + max(0, int(limit)))
+            events = self._slice(start, stop)
+            # The cursor to resume from: the last returned event, so a limit never skips events
+            last_seq = stop - 1 if events else self._next_seq - 1
+            last = self._ring[last_seq % self.capacity] if last_seq >= 0 else None
+        return {
+            "events": events,
+            "last_event_id": last.get(self.id_key) if last else None,
+            "last_seq": last_seq
+        }
+
+    def wait(self, since_event_id: Optional[str] = None, timeout: float = 30.0,
+             since_seq: Optional[int] = None) -> bool:
+        """
+        Block until there are events after the cursor or the timeout expires.
+
+        Returns:
+            True if events are available
+        """
+        with self._condition:
+            if since_seq is not None:
+                target = int(since_seq) + 1
+            else:
+                target = self._start_after(since_event_id)
+            return self._condition.wait_for(lambda: self._next_seq > target, timeout)
+
+    def read_or_wait(self, since_event_id: Optional[str] = None, limit: int = 1000,
+                     timeout: float = 0.0, since_seq: Optional[int] = None) -> Dict[str, Any]:
+        """Long-poll read: wait up to timeout seconds for new events, then read."""
+        if timeout > 0:
+            self.wait(since_event_id, timeout, since_seq)
+        return self.read(since_event_id, limit, since_seq)
+
+    def stream(self, since_event_id: Optional[str] = None, heartbeat: float = 15.0,
+               batch_size: int = 100) -> Iterator[str]:
+        """
+        Yield events as Server-Sent Events, blocking between batches.
+
+        A comment line is sent every heartbeat seconds without events so that
+        proxies keep the connection open and disconnects are noticed.
+
+        Args:
+            since_event_id: Start after this event (all retained events if unknown)
+            heartbeat: Seconds between keep-alive comments
+            batch_size: Maximum events read per wake-up
+        """
+        with self._condition:
+            cursor = self._start_after(since_event_id) - 1
+        while True:
+            if not self.wait(timeout=heartbeat, since_seq=cursor):
+                yield ": keep-alive\n\n"
+                continue
+            batch = self.read(limit=batch_size, since_seq=cursor)
+            for event in batch["events"]:
+                yield (f"id: {event.get(self.id_key)}\n"
+                       f"data: {json.dumps(event, default=str)}\n\n")
+            cursor = batch["last_seq"]
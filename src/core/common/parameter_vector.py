@@ -0,0 +1,327 @@
+"""
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Flat model parameter buffer.
+
+A ParameterVector keeps all layers of a model in one contiguous, 64-byte
+aligned NumPy buffer, with a manifest of layer names, shapes and original
+dtypes. Layers are views into the buffer, so whole-model operations (norm,
+clipping, noise, weighted sums) are single vectorized calls. Converters cover
+the forms parameters take in this code base: lists of arrays, dicts of
+arrays, Flower `Parameters` and torch state dicts. Flower and torch are only
+imported by their converters.
+"""
+
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ALIGNMENT = 64  # bytes; a cache line, and enough for AVX-512 loads
+
+
+def aligned_empty(size: int, dtype: Any = np.float32) -> np.ndarray:
+    """Allocate an uninitialized 1-D array whose data starts on an ALIGNMENT boundary."""
+    dtype = np.dtype(dtype)
+    raw = np.empty(size * dtype.itemsize + ALIGNMENT, dtype=np.uint8)
+    offset = -raw.ctypes.data % ALIGNMENT
+    return raw[offset:offset + size * dtype.itemsize].view(dtype)
+
+
+def _standard_normal(rng, size: int, dtype: np.dtype) -> np.ndarray:
+    """Draw standard normal noise, directly in float32 when the generator supports it."""
+    if isinstance(rng, np.random.Generator) and dtype in (np.float32, np.float64):
+        return rng.standard_normal(size, dtype=dtype)
+    return (rng or np.random).standard_normal(size).astype(dtype, copy=False)
+
+
+class ParameterVector:
+    """Model layers stored back to back in one aligned buffer, with per-layer views."""
+
+    def __init__(self, shapes: Sequence[Tuple[int, ...]], dtype: Any = np.float32,
+                 names: Optional[Sequence[str]] = None, layer_dtypes: Optional[Sequence[Any]] = None,
+                 data: Optional[np.ndarray] = None):
+        """
+        Initialize a vector; the buffer is left uninitialized unless data is given.
+
+        Args:
+            shapes: Shape of each layer, in order
+            dtype: Buffer dtype, shared by all layers
+            names: Layer names (default: "0", "1", ...)
+            layer_dtypes: Dtype each layer had before packing, restored by to_ndarrays()
+            data: Existing 1-D buffer to use instead of allocating one
+        """
+        self.shapes = [tuple(int(dim) for dim in shape) for shape in shapes]
+        self.names = list(names) if names is not None else [str(i) for i in range(len(self.shapes))]
+        if len(self.names) != len(self.shapes):
+            raise ValueError(f"Got {len(self.names)} names for {len(self.shapes)} layers")
+        self.sizes = [int(np.prod(shape, dtype=np.int64)) for shape in self.shapes]
+        self.offsets = np.concatenate(([0], np.cumsum(self.sizes, dtype=np.int64))).tolist()
+        self.dtype = np.dtype(dtype)
+        self.layer_dtypes = ([np.dtype(d) for d in layer_dtypes] if layer_dtypes is not None
+                             else [self.dtype] * len(self.shapes))
+        if data is None:
+            data = aligned_empty(self.offsets[-1], self.dtype)
+        elif data.ndim != 1 or data.size != self.offsets[-1] or data.dtype != self.dtype:
+            raise ValueError(f"Buffer must be 1-D {self.dtype} of size {self.offsets[-1]}")
+        self.data = data
+        self._views = [data[start:stop].reshape(shape)
+                       for start, stop, shape in zip(self.offsets, self.offsets[1:], self.shapes)]
+        self._index = {name: i for i, name in enumerate(self.names)}
+
+    # --- Layout ---
+
+    def __len__(self) -> int:
+        return len(self.shapes)
+
+    @property
+    def size(self) -> int:
+        """Total number of parameters."""
+        return self.data.size
+
+    @property
+    def nbytes(self) -> int:
+        """Buffer size in bytes."""
+        return self.data.nbytes
+
+    def __getitem__(self, key) -> np.ndarray:
+        """Get a layer view by index or name."""
+        if isinstance(key, str):
+            key = self._index[key]
+        return self._views[key]
+
+    def layers(self) -> List[np.ndarray]:
+        """Get views of all layers (writes go to the buffer)."""
+        return list(self._views)
+
+    def same_layout(self, other: "ParameterVector") -> bool:
+        """Whether both vectors have the same layer shapes."""
+        return self.shapes == other.shapes
+
+    def _check_layout(self, other: "ParameterVector"):
+        if not self.same_layout(other):
+            raise ValueError("Parameter vectors have different layer shapes")
+
+    def empty_like(self, dtype: Any = None) -> "ParameterVector":
+        """New vector with the same layout and an uninitialized buffer."""
+        return ParameterVector(self.shapes, dtype or self.dtype, self.names, self.layer_dtypes)
+
+    def zeros_like(self, dtype: Any = None) -> "ParameterVector":
+        """New vector with the same layout, filled with zeros."""
+        vector = self.empty_like(dtype)
+        vector.data.fill(0)
+        return vector
+
+    def copy(self, dtype: Any = None) -> "ParameterVector":
+        """New vector with the same layout and a copy of the values."""
+        vector = self.empty_like(dtype)
+        np.copyto(vector.data, self.data, casting="unsafe")
+        return vector
+
+    # --- Converters ---
+
+    @classmethod
+    def from_ndarrays(cls, arrays: Sequence[Any], dtype: Any = None,
+                      names: Optional[Sequence[str]] = None) -> "ParameterVector":
+        """
+        Pack arrays into a new vector (one copy of each array).
+
+        Args:
+            arrays: Layers, in order
+            dtype: Buffer dtype (default: the common type of floating layers, float32 if none)
+            names: Layer names
+        """
+        arrays = [np.asarray(array) for array in arrays]
+        if dtype is None:
+            floating = [array.dtype for array in arrays if np.issubdtype(array.dtype, np.floating)]
+            dtype = np.result_type(*floating) if floating else np.float32
+        vector = cls([array.shape for array in arrays], dtype, names, [array.dtype for array in arrays])
+        for view, array in zip(vector._views, arrays):
+            np.copyto(view, array, casting="unsafe")
+        return vector
+
+    def to_ndarrays(self, copy: bool = False) -> List[np.ndarray]:
+        """
+        Get the layers as arrays in their original dtypes.
+
+        Layers whose original dtype is the buffer dtype are returned as views
+        unless copy is set; other layers are converted.
+        """
+        return [view.astype(layer_dtype) if copy or layer_dtype != self.dtype else view
+                for view, layer_dtype in zip(self._views, self.layer_dtypes)]
+
+    @classmethod
+    def from_dict(cls, arrays: Mapping[str, Any], dtype: Any = None) -> "ParameterVector":
+        """Pack a name -> array dict; layer names are the keys, in dict order."""
+        return cls.from_ndarrays(list(arrays.values()), dtype, list(arrays.keys()))
+
+    def to_dict(self, copy: bool = False) -> Dict[str, np.ndarray]:
+        """Get a name -> layer dict (views unless copy is set or the layer dtype differs)."""
+        return dict(zip(self.names, self.to_ndarrays(copy)))
+
+    @classmethod
+    def from_parameters(cls, parameters, dtype: Any = None) -> "ParameterVector":
+        """
+        Pack Flower Parameters, copying each serialized tensor straight into the buffer.
+
+        Args:
+            parameters: flwr.common.Parameters with .npy serialized tensors
+            dtype: Buffer dtype (default: as for from_ndarrays)
+        """
+        from src.fl.server.robust_aggregation import tensor_view
+        return cls.from_ndarrays([tensor_view(tensor) for tensor in parameters.tensors], dtype)
+
+    def to_parameters(self):
+        """Serialize to Flower Parameters, with each layer in its original dtype."""
+        from flwr.common import ndarrays_to_parameters
+        return ndarrays_to_parameters(self.to_ndarrays())
+
+    @classmethod
+    def from_state_dict(cls, state_dict: Mapping[str, Any], dtype: Any = None) -> "ParameterVector":
+        """
+        Pack a torch state dict (tensors are moved to the CPU once each).
+
+        Args:
+            state_dict: Name -> torch tensor, e.g. module.state_dict()
+            dtype: Buffer dtype (default: as for from_ndarrays)
+        """
+        arrays = OrderedDict((name, tensor.detach().cpu().numpy()) for name, tensor in state_dict.items())
+        return cls.from_dict(arrays, dtype)
+
+    def to_state_dict(self, device: Any = None) -> "OrderedDict[str, Any]":
+        """
+        Get a torch state dict, e.g. for module.load_state_dict().
+
+        On the CPU, layers in the buffer dtype share memory with the buffer.
+        """
+        import torch
+        state_dict = OrderedDict()
+        for name, array in zip(self.names, self.to_ndarrays()):
+            tensor = torch.from_numpy(array)
+            state_dict[name] = tensor.to(device) if device is not None else tensor
+        return state_dict
+
+    # --- Whole-model operations ---
+
+    def norm(self) -> float:
+        """L2 norm over all parameters."""
+        return float(np.sqrt(np.dot(self.data, self.data)))
+
+    def layer_norms(self) -> np.ndarray:
+        """L2 norm of each layer (one BLAS dot per layer, without temporaries)."""
+        squares = [np.dot(self.data[start:stop], self.data[start:stop])
+                   for start, stop in zip(self.offsets, self.offsets[1:])]
+        return np.sqrt(np.asarray(squares, dtype=np.float64))
+
+    def scale_(self, factor: float) -> "ParameterVector":
+        """Multiply all parameters by factor, in place."""
+        self.data *= factor
+        return self
+
+    def clip_(self, max_norm: float, per_layer: bool = False) -> float:
+        """
+        Scale parameters down, in place, so their L2 norm is at most max_norm.
+
+        Args:
+            max_norm: Norm bound
+            per_layer: Bound each layer's norm separately instead of the whole model's
+
+        Returns:
+            Norm before clipping (the largest layer norm if per_layer)
+        """
+        if per_layer:
+            norms = self.layer_norms()
+            for view, norm in zip(self._views, norms):
+                if norm > max_norm:
+                    view *= max_norm / norm
+            return float(norms.max()) if len(norms) else 0.0
+        norm = self.norm()
+        if norm > max_norm:
+            self.data *= max_norm / norm
+        return norm
+
+    def add_noise_(self, std: float, rng: Optional[np.random.Generator] = None) -> "ParameterVector":
+        """Add Gaussian noise with standard deviation std to every parameter, in place."""
+        if std:
+            noise = _standard_normal(rng, self.size, self.dtype)
+            noise *= std
+            self.data += noise
+        return self
+
+    def add_(self, other: "ParameterVector", alpha: float = 1.0) -> "ParameterVector":
+        """Add alpha * other, in place."""
+        self._check_layout(other)
+        if alpha == 1.0:
+            np.add(self.data, other.data, out=self.data, casting="unsafe")
+        else:
+            self.data += alpha * other.data
+        return self
+
+    def accumulate_(self, arrays: Sequence[np.ndarray], weight: float = 1.0,
+                    scratch: Optional[np.ndarray] = None) -> "ParameterVector":
+        """
+        Add weight * arrays, in place, for layers that are not packed in a vector.
+
+        Costs one pass over each layer and no allocation when a scratch buffer of
+        at least the largest layer's size is passed.
+
+        Args:
+            arrays: One array per layer, shaped like the layers
+            weight: Factor applied to the arrays
+            scratch: 1-D buffer in this vector's dtype used for the products
+        """
+        if len(arrays) != len(self):
+            raise ValueError(f"Got {len(arrays)} arrays for {len(self)} layers")
+        if scratch is None:
+            scratch = aligned_empty(max(self.sizes, default=0), self.dtype)
+        for view, size, array in zip(self._views, self.sizes, arrays):
+            if array.shape != view.shape:
+                raise ValueError(f"Array of shape {array.shape} does not match layer shape {view.shape}")
+            product = scratch[:size].reshape(view.shape)
+            np.multiply(array, weight, out=product, casting="unsafe")
+            np.add(view, product, out=view)
+        return self
+
+    @classmethod
+    def weighted_sum(cls, vectors: Sequence["ParameterVector"], weights: Iterable[float],
+                     dtype: Any = None) -> "ParameterVector":
+        """
+        Sum of weight * vector over vectors with the same layout.
+
+        Args:
+            vectors: Vectors to combine
+            weights: One weight per vector (e.g. normalized example counts)
+            dtype: Accumulator dtype (default: the first vector's dtype)
+
+        Returns:
+            New vector with the sum
+        """
+        weights = list(weights)
+        if not vectors or len(weights) != len(vectors):
+            raise ValueError("weighted_sum needs one weight per vector and at least one vector")
+        result = vectors[0].empty_like(dtype)
+        np.multiply(vectors[0].data, weights[0], out=result.data, casting="unsafe")
+        scratch = aligned_empty(result.size, result.dtype) if len(vectors) > 1 else None
+        for vector, weight in zip(vectors[1:], weights[1:]):
+            result._check_layout(vector)
+            np.multiply(vector.data, weight, out=scratch, casting="unsafe")
+            result.data += scratch
+        return result
+
+    def __repr__(self) -> str:
+        return f"ParameterVector(layers={len(self)}, size={self.size}, dtype={self.dtype})"
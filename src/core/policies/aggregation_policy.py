@@ -21,6 +21,9 @@
 from abc import abstractmethod
 from typing import Dict, Any, List
 
+import numpy as np
+
+from src.core.common.parameter_vector import ParameterVector
 from src.core.policies.policy import IPolicy
 
 
@@ -137,8 +140,20 @@ def aggregate_updates(self, updates: List[Dict[str, Any]], weights: List[float]
         for update in updates:
             all_keys.update(update.keys())
         
-        # For each parameter, compute weighted average
+        # Floating-point arrays present in every update are summed into one flat buffer
+        vector_keys = self._vector_keys(updates, all_keys)
+        if vector_keys:
+            averaged = ParameterVector.from_ndarrays([updates[0][key] for key in vector_keys], names=vector_keys)
+            averaged.scale_(weights[0])
+            scratch = np.empty(max(averaged.sizes), dtype=averaged.dtype)
+            for update, weight in zip(updates[1:], weights[1:]):
+                averaged.accumulate_([update[key] for key in vector_keys], weight, scratch)
+            aggregated.update(zip(vector_keys, averaged.layers()))
+        
+        # For each remaining parameter, compute weighted average
         for key in all_keys:
+            if key in aggregated:
+                continue
             # Only consider updates that have this key
             valid_updates = [(u, w) for u, w in zip(updates, weights) if key in u]
             
@@ -179,6 +194,24 @@ def aggregate_updates(self, updates: List[Dict[str, Any]], weights: List[float]
         
         return aggregated
     
+    @staticmethod
+    def _vector_keys(updates: List[Dict[str, Any]], keys) -> List[str]:
+        """Keys whose values are NumPy arrays of one floating dtype and shape in every update."""
+        first = updates[0]
+        dtype = next((value.dtype for value in first.values()
+                      if isinstance(value, np.ndarray) and np.issubdtype(value.dtype, np.floating)), None)
+        if dtype is None:
+            return []
+        vector_keys = []
+        for key in keys:
+            value = first.get(key)
+            if not isinstance(value, np.ndarray) or value.dtype != dtype:
+                continue
+            if all(isinstance(update.get(key), np.ndarray) and update[key].dtype == dtype
+                   and update[key].shape == value.shape for update in updates[1:]):
+                vector_keys.append(key)
+        return vector_keys
+    
     def to_dict(self) -> Dict[str, Any]:
         """
         Convert the policy to a dictionary.
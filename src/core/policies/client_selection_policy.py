@@ -55,6 +55,10 @@ class RandomSelectionPolicy(IClientSelectionPolicy):
     Random client selection policy.
     
     This policy selects clients randomly from the pool of available clients.
+    If the context holds a `client_registry` (ClientRegistry), clients are
+    sampled from the registry instead of the available client list, which
+    avoids scanning all clients. The `weighted` parameter then samples by
+    utility score and `capabilities` restricts the clients sampled.
     """
     
     def __init__(self, policy_id: str, description: str = "Random client selection policy"):
@@ -84,6 +88,7 @@ def evaluate(self, context: Dict[str, Any]) -> Dict[str, Any]:
                 - available_clients: List of available clients
                 - round_number: Current round number
                 - target_count: Target number of clients to select
+                - client_registry: Optional ClientRegistry to sample from
                 
         Returns:
             Dictionary with selected client IDs
@@ -92,7 +97,7 @@ def evaluate(self, context: Dict[str, Any]) -> Dict[str, Any]:
         round_number = context.get('round_number', 0)
         target_count = context.get('target_count', 10)
         
-        selected_clients = self.select_clients(available_clients, round_number, target_count)
+        selected_clients = self.select_clients(available_clients, round_number, target_count, context)
         
         return {
             'selected_clients': selected_clients,
@@ -110,12 +115,19 @@ def select_clients(self, available_clients: List[Dict[str, Any]], round_number:
             round_number: Current round number
             target_count: Target number of clients to select
             context: Additional context for selection
+                - client_registry: ClientRegistry to sample from instead of available_clients
             
         Returns:
             List of selected client IDs
         """
         import random
         
+        registry = (context or {}).get('client_registry')
+        if registry is not None:
+            return registry.sample(target_count,
+                                   weighted=self.parameters.get('weighted', False),
+                                   capabilities=self.parameters.get('capabilities'))
+        
         # Get client IDs from available clients
         client_ids = [client['client_id'] for client in available_clients]
         
@@ -22,6 +22,9 @@
 from typing import Dict, Any, List, Optional
 import logging
 
+import numpy as np
+
+from src.core.common.parameter_vector import ParameterVector
 from src.core.policies.policy import IPolicy, Policy
 
 logger = logging.getLogger(__name__)
@@ -144,13 +147,23 @@ def apply_privacy_mechanism(self, data: Dict[str, Any], context: Dict[str, Any]
         Returns:
             Privacy-protected data
         """
-        import numpy as np
-        
         # Implementation of a basic differential privacy mechanism
         # In a real implementation, use established DP libraries
         protected_data = {}
         
+        # Array values are clipped (per array) and noised in one flat buffer
+        array_keys = [key for key, value in data.items()
+                      if not isinstance(value, (int, float)) and hasattr(value, 'shape') and hasattr(value, '__mul__')]
+        if array_keys:
+            vector = ParameterVector.from_ndarrays([np.asarray(data[key]) for key in array_keys], dtype=np.float64)
+            if self.max_norm is not None:
+                vector.clip_(self.max_norm, per_layer=True)
+            vector.add_noise_(self.noise_multiplier)
+            protected_data.update(zip(array_keys, vector.layers()))
+        
         for key, value in data.items():
+            if key in protected_data:
+                continue
             # Only apply to numeric data
             if isinstance(value, (int, float)):
                 # Clip if max_norm is specified
@@ -160,20 +173,6 @@ def apply_privacy_mechanism(self, data: Dict[str, Any], context: Dict[str, Any]
                 # Add Gaussian noise
                 noise = np.random.normal(0, self.noise_multiplier)
                 protected_data[key] = value + noise
-            
-            elif hasattr(value, 'shape') and hasattr(value, '__mul__'):
-                # Handle NumPy-like arrays
-                array_value = np.array(value)
-                
-                # Clip gradient norm if max_norm is specified
-                if self.max_norm is not None:
-                    l2_norm = np.linalg.norm(array_value)
-                    if l2_norm > self.max_norm:
-                        array_value = array_value * (self.max_norm / l2_norm)
-                
-                # Generate noise with same shape as the array
-                noise = np.random.normal(0, self.noise_multiplier, array_value.shape)
-                protected_data[key] = array_value + noise
             else:
                 # For non-numeric data, just pass through
                 protected_data[key] = value
@@ -182,7 +181,8 @@ def apply_privacy_mechanism(self, data: Dict[str, Any], context: Dict[str, Any]
         # In a real implementation, use advanced accounting methods
         self.privacy_budget_used += self.noise_multiplier
         
-        return protected_data
+        # Keep the keys in the order of the input
+        return {key: protected_data[key] for key in data}
     
     def get_privacy_budget(self) -> Dict[str, Any]:
         """
@@ -21,11 +21,13 @@
 from src.core.repositories.client_repository import IClientRepository
 from src.core.repositories.in_memory_client_repository import InMemoryClientRepository
 from src.core.repositories.file_model_repository import FileModelRepository
+from src.core.repositories.model_version_store import ModelVersionStore
 from src.core.repositories.model_cleanup import ModelCleanupService
 
 __all__ = [
     'IClientRepository',
     'InMemoryClientRepository',
     'FileModelRepository',
+    'ModelVersionStore',
     'ModelCleanupService'
 ] 
\ No newline at end of file
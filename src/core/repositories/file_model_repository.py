@@ -16,24 +16,34 @@
 File Model Repository
 
 This module provides a file-based implementation of the model repository.
+Model versions are kept in a content-addressed store (see ModelVersionStore):
+layers shared between versions are written once, and versions and their
+metadata are listed from the store's index instead of scanning directories.
 """
 import os
 import json
 import logging
+import shutil
 import numpy as np
 from datetime import datetime
 from typing import Dict, Any, Optional, List
 
-from src.core.model.fl_model import FLModel
+from src.core.models.fl_model import FLModel
 from src.core.interfaces.model_repository import IModelRepository
+from src.core.repositories.model_version_store import ModelVersionStore
+
+STORE_DIR = "_store"
+# Index setting marking that versions saved as per-version files were indexed
+LEGACY_IMPORT_SETTING = "legacy_files_indexed"
 
 
 class FileModelRepository(IModelRepository):
     """
     A file-based implementation of the model repository.
     
-    This repository stores FL models on the file system, with metadata
-    in JSON format and model weights in a format suitable for the model type.
+    This repository stores FL models on the file system, with layers stored
+    once per distinct content and metadata in a SQLite index. Loaded weights
+    are read-only memory-mapped arrays.
     """
     
     def __init__(self, base_dir: str = 'data/artifacts', enable_saving: bool = True):
@@ -46,14 +56,48 @@ def __init__(self, base_dir: str = 'data/artifacts', enable_saving: bool = True)
         """
         self.base_dir = base_dir
         self.enable_saving = enable_saving
+        self.logger = logging.getLogger(__name__)
+        self.store: Optional[ModelVersionStore] = None
         if enable_saving:
             os.makedirs(base_dir, exist_ok=True)
-        self.logger = logging.getLogger(__name__)
+            self.store = ModelVersionStore(os.path.join(base_dir, STORE_DIR))
+            if self.store.get_setting(LEGACY_IMPORT_SETTING) is None:
+                self._index_legacy_versions()
+    
+    def _index_legacy_versions(self):
+        """Index versions saved as `<version>_metadata.json` and `<version>_weights_<i>.npy` files."""
+        indexed = 0
+        for model_name in sorted(os.listdir(self.base_dir)):
+            model_dir = os.path.join(self.base_dir, model_name)
+            if model_name == STORE_DIR or not os.path.isdir(model_dir):
+                continue
+            file_names = os.listdir(model_dir)
+            for metadata_file in sorted(f for f in file_names if f.endswith("_metadata.json")):
+                version = metadata_file[:-len("_metadata.json")]
+                metadata_path = os.path.join(model_dir, metadata_file)
+                try:
+                    with open(metadata_path, 'r') as f:
+                        metadata = json.load(f)
+                except (OSError, ValueError) as e:
+                    self.logger.warning(f"Skipping model {model_name} version {version}: {e}")
+                    continue
+                prefix = f"{version}_weights_"
+                weight_files = sorted((f for f in file_names if f.startswith(prefix) and f.endswith(".npy")),
+                                      key=lambda f: int(f[len(prefix):-4]) if f[len(prefix):-4].isdigit() else -1)
+                paths = [os.path.relpath(os.path.join(model_dir, f), self.store.directory) for f in weight_files]
+                self.store.register_files(model_name, version, paths, metadata,
+                                          created=os.path.getmtime(metadata_path))
+                indexed += 1
+        self.store.set_setting(LEGACY_IMPORT_SETTING, datetime.now().isoformat())
+        if indexed:
+            self.logger.info(f"Indexed {indexed} model versions stored as per-version files")
     
     def save_model(self, model: FLModel, version: Optional[str] = None) -> bool:
         """
         Save a model to the repository.
         
+        Layers identical to a layer of any stored version are not written again.
+        
         Args:
             model: The model to save
             version: Optional version string
@@ -67,28 +111,16 @@ def save_model(self, model: FLModel, version: Optional[str] = None) -> bool:
             return True
             
         try:
-            # Create model directory
-            model_dir = os.path.join(self.base_dir, model.name)
-            os.makedirs(model_dir, exist_ok=True)
-            
             # Determine version
             if version is None:
                 version = datetime.now().strftime("%Y%m%d_%H%M%S")
             
-            # Save metadata
-            metadata_path = os.path.join(model_dir, f"{version}_metadata.json")
-            
             # Convert numpy arrays in metadata to Python lists for JSON serialization
             serializable_metadata = self._make_serializable(model.metadata)
             
-            with open(metadata_path, 'w') as f:
-                json.dump(serializable_metadata, f, indent=2)
-            
-            # Save each weight array as a numpy file
-            for i, weight in enumerate(model.weights):
-                weight_path = os.path.join(model_dir, f"{version}_weights_{i}.npy")
-                np.save(weight_path, weight)
-            
+            result = self.store.put(model.name, version, model.weights, serializable_metadata)
+            self.logger.debug(f"Saved model {model.name} version {version}: {result['layers_written']} layers written, "
+                              f"{result['layers_reused']} shared with other versions")
             return True
         except Exception as e:
             self.logger.error(f"Error saving model: {str(e)}")
@@ -100,54 +132,22 @@ def load_model(self, name: str, version: Optional[str] = None) -> Optional[FLMod
         
         Args:
             name: The name of the model to load
-            version: Optional version string
+            version: Optional version string (default: the most recently saved version)
             
         Returns:
-            The loaded model, or None if not found
+            The loaded model with read-only memory-mapped weights, or None if not found
         """
         if not self.enable_saving:
             self.logger.warning(f"Model saving is disabled, cannot load model {name}")
             return None
             
         try:
-            model_dir = os.path.join(self.base_dir, name)
-            
-            if not os.path.exists(model_dir):
-                self.logger.warning(f"Model directory {model_dir} not found")
+            stored = self.store.get(name, version)
+            if stored is None:
+                self.logger.warning(f"Model {name} version {version or 'latest'} not found")
                 return None
             
-            # Find the correct version
-            if version is None:
-                # Find the latest version
-                metadata_files = [f for f in os.listdir(model_dir) if f.endswith("_metadata.json")]
-                if not metadata_files:
-                    self.logger.warning(f"No metadata files found in {model_dir}")
-                    return None
-                
-                # Sort by filename (which includes timestamp)
-                metadata_files.sort(reverse=True)
-                version = metadata_files[0].split("_metadata.json")[0]
-            
-            # Load metadata
-            metadata_path = os.path.join(model_dir, f"{version}_metadata.json")
-            if not os.path.exists(metadata_path):
-                self.logger.warning(f"Metadata file {metadata_path} not found")
-                return None
-            
-            with open(metadata_path, 'r') as f:
-                metadata = json.load(f)
-            
-            # Find and load weight files
-            weight_files = [f for f in os.listdir(model_dir) if f.startswith(version) and f.endswith(".npy")]
-            weight_files.sort()  # Ensure correct order
-            
-            weights = []
-            for weight_file in weight_files:
-                if "weights" in weight_file:
-                    weight_path = os.path.join(model_dir, weight_file)
-                    weights.append(np.load(weight_path))
-            
-            # Create and return model
+            _, metadata, weights = stored
             model = FLModel(name=name, weights=weights)
             model.metadata = metadata
             
@@ -167,27 +167,24 @@ def delete_model(self, name: str, version: Optional[str] = None) -> bool:
         Returns:
             Success status
         """
+        if not self.enable_saving:
+            return False
+        
         try:
-            model_dir = os.path.join(self.base_dir, name)
-            
-            if not os.path.exists(model_dir):
-                self.logger.warning(f"Model directory {model_dir} not found")
+            deleted = self.store.delete(name, version)
+            if not deleted:
+                self.logger.warning(f"Model {name} version {version or 'any'} not found")
                 return False
             
-            if version is None:
-                # Delete all versions
-                import shutil
-                shutil.rmtree(model_dir)
-                return True
-            
-            # Delete specific version
-            files_to_delete = [
-                f for f in os.listdir(model_dir) 
-                if f.startswith(version)
-            ]
-            
-            for file in files_to_delete:
-                os.remove(os.path.join(model_dir, file))
+            # Remove files of versions saved before the store was used
+            model_dir = os.path.join(self.base_dir, name)
+            if os.path.isdir(model_dir):
+                if version is None:
+                    shutil.rmtree(model_dir)
+                else:
+                    for file in os.listdir(model_dir):
+                        if file.startswith(f"{version}_"):
+                            os.remove(os.path.join(model_dir, file))
             
             return True
         except Exception as e:
@@ -201,38 +198,12 @@ def list_models(self) -> List[Dict[str, Any]]:
         Returns:
             List of model information dictionaries
         """
+        if not self.enable_saving:
+            return []
+        
         try:
-            if not os.path.exists(self.base_dir):
-                return []
-            
-            models = []
-            
-            # Iterate through model directories
-            for model_name in os.listdir(self.base_dir):
-                model_dir = os.path.join(self.base_dir, model_name)
-                
-                if not os.path.isdir(model_dir):
-                    continue
-                
-                # Find metadata files
-                metadata_files = [f for f in os.listdir(model_dir) if f.endswith("_metadata.json")]
-                
-                for metadata_file in metadata_files:
-                    version = metadata_file.split("_metadata.json")[0]
-                    
-                    # Load metadata
-                    metadata_path = os.path.join(model_dir, metadata_file)
-                    with open(metadata_path, 'r') as f:
-                        metadata = json.load(f)
-                    
-                    # Add model info
-                    models.append({
-                        "name": model_name,
-                        "version": version,
-                        "metadata": metadata
-                    })
-            
-            return models
+            return [{"name": entry["name"], "version": entry["version"], "metadata": entry["metadata"]}
+                    for entry in self.store.list_versions()]
         except Exception as e:
             self.logger.error(f"Error listing models: {str(e)}")
             return []
@@ -247,35 +218,18 @@ def list_versions(self, model_name: str) -> List[Dict[str, Any]]:
         Returns:
             List of version metadata dictionaries
         """
+        if not self.enable_saving:
+            return []
+        
         try:
-            model_dir = os.path.join(self.base_dir, model_name)
+            versions = [{
+                "version": entry["version"],
+                "timestamp": entry["metadata"].get("timestamp", datetime.fromtimestamp(entry["created"]).isoformat()),
+                "metadata": entry["metadata"]
+            } for entry in self.store.list_versions(model_name)]
             
-            if not os.path.exists(model_dir) or not os.path.isdir(model_dir):
-                self.logger.warning(f"Model directory {model_dir} not found")
-                return []
-            
-            versions = []
-            
-            # Find metadata files
-            metadata_files = [f for f in os.listdir(model_dir) if f.endswith("_metadata.json")]
-            
-            for metadata_file in metadata_files:
-                version = metadata_file.split("_metadata.json")[0]
-                
-                # Load metadata
-                metadata_path = os.path.join(model_dir, metadata_file)
-                with open(metadata_path, 'r') as f:
-                    metadata = json.load(f)
-                
-                # Add version info
-                versions.append({
-                    "version": version,
-                    "timestamp": metadata.get("timestamp", 
-                                            datetime.fromtimestamp(
-                                                os.path.getctime(metadata_path)
-                                            ).isoformat()),
-                    "metadata": metadata
-                })
+            if not versions:
+                self.logger.warning(f"No versions found for model {model_name}")
             
             # Sort by timestamp if available
             versions.sort(key=lambda v: v.get("timestamp", ""), reverse=True)
@@ -285,6 +239,17 @@ def list_versions(self, model_name: str) -> List[Dict[str, Any]]:
             self.logger.error(f"Error listing versions for model {model_name}: {str(e)}")
             return []
     
+    def get_storage_stats(self) -> Dict[str, Any]:
+        """Get the number of stored versions and layers, and the bytes saved by sharing layers."""
+        if self.store is None:
+            return {}
+        return self.store.get_stats()
+    
+    def close(self):
+        """Close the version index."""
+        if self.store is not None:
+            self.store.close()
+    
     def _make_serializable(self, obj):
         """
         Convert an object to a JSON serializable format.
@@ -16,12 +16,15 @@
 In-Memory Client Repository Implementation
 
 This module provides an in-memory implementation of the client repository.
+Clients are kept in a ClientRegistry, which indexes them by capability,
+latency and participation and samples them by utility.
 """
 import logging
 import threading
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Set
 
 from src.core.clients.client import Client
+from src.core.clients.client_registry import ClientRegistry
 from src.core.repositories.client_repository import IClientRepository
 
 
@@ -33,17 +36,42 @@ class InMemoryClientRepository(IClientRepository):
     It is useful for testing and development environments.
     """
     
-    def __init__(self, logger: Optional[logging.Logger] = None):
+    def __init__(self, logger: Optional[logging.Logger] = None, registry: Optional[ClientRegistry] = None):
         """
         Initialize the in-memory client repository.
         
         Args:
             logger: Logger instance
+            registry: Client registry to store clients in (default: a new one)
         """
         self.logger = logger or logging.getLogger(__name__)
-        self.clients = {}  # Dictionary of client_id -> Client
+        self.registry = registry or ClientRegistry()
         self.client_updates = {}  # Dictionary of client_id -> updates
     
+    @property
+    def clients(self) -> Dict[str, Client]:
+        """Dictionary of client_id -> Client."""
+        return self.registry.clients
+    
+    def register_client(self, client_id: str, capabilities: Dict[str, Any]) -> bool:
+        """
+        Register a new client in the repository.
+        
+        Args:
+            client_id: Unique identifier for the client
+            capabilities: Client capabilities and characteristics
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        if client_id in self.clients:
+            self.logger.warning(f"Client {client_id} already exists")
+            return False
+        
+        self.registry.register(client_id, capabilities)
+        self.logger.info(f"Registered client {client_id}")
+        return True
+    
     def add_client(self, client: Client) -> bool:
         """
         Add a client to the repository.
@@ -58,7 +86,7 @@ def add_client(self, client: Client) -> bool:
             self.logger.warning(f"Client {client.client_id} already exists")
             return False
         
-        self.clients[client.client_id] = client
+        self.registry.add(client)
         self.logger.info(f"Added client {client.client_id}")
         return True
     
@@ -76,7 +104,7 @@ def remove_client(self, client_id: str) -> bool:
             self.logger.warning(f"Client {client_id} not found")
             return False
         
-        del self.clients[client_id]
+        self.registry.remove(client_id)
         if client_id in self.client_updates:
             del self.client_updates[client_id]
         
@@ -114,7 +142,7 @@ def update_client(self, client: Client) -> bool:
             self.logger.warning(f"Client {client.client_id} not found")
             return False
         
-        self.clients[client.client_id] = client
+        self.registry.add(client)
         self.logger.info(f"Updated client {client.client_id}")
         return True
     
@@ -136,6 +164,72 @@ def get_client_count(self) -> int:
         """
         return len(self.clients)
     
+    def count(self) -> int:
+        """
+        Get the number of clients in the repository.
+        
+        Returns:
+            Number of clients
+        """
+        return len(self.clients)
+    
+    def clear(self) -> None:
+        """Clear all clients and their updates from the repository."""
+        self.registry.clear()
+        self.client_updates = {}
+        self.logger.info("Cleared all clients")
+    
+    def sample_clients(self, count: int, weighted: bool = True,
+                       capabilities: Optional[Dict[str, Any]] = None) -> List[str]:
+        """
+        Sample available clients without scanning the whole repository.
+        
+        Args:
+            count: Number of clients to sample
+            weighted: Sample by utility score (latency, reliability, participation) instead of uniformly
+            capabilities: Only clients with these capability values
+            
+        Returns:
+            List of sampled client IDs
+        """
+        return self.registry.sample(count, weighted=weighted, capabilities=capabilities)
+    
+    def find_clients(self, capabilities: Optional[Dict[str, Any]] = None,
+                     max_latency: Optional[float] = None,
+                     max_participation: Optional[int] = None) -> Set[str]:
+        """
+        Find available clients through the registry indexes.
+        
+        Args:
+            capabilities: Required capability values
+            max_latency: Highest smoothed training duration in seconds
+            max_participation: Highest number of rounds participated
+            
+        Returns:
+            Set of matching client IDs
+        """
+        return self.registry.find(capabilities, max_latency, max_participation)
+    
+    def record_client_fit(self, client_id: str, metrics: Dict[str, Any],
+                          round_number: Optional[int] = None) -> bool:
+        """
+        Update a client's latency, participation and score from its fit metrics.
+        
+        Args:
+            client_id: Client identifier
+            metrics: Fit metrics, e.g. training_duration
+            round_number: Round the metrics belong to
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        if client_id not in self.clients:
+            self.logger.warning(f"Client {client_id} not found")
+            return False
+        
+        self.registry.record_fit(client_id, metrics, round_number)
+        return True
+    
     def add_client_update(self, client_id: str, update: Dict[str, Any]) -> bool:
         """
         Add a client update to the repository.
@@ -0,0 +1,323 @@
+"""
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Model Version Store
+
+Content-addressed storage for model versions. Each layer is serialized in
+.npy format and written once to `layers/<sha256>.npy`, so layers that are
+identical across versions (e.g. frozen layers) are stored once. A SQLite
+index holds every version's metadata and layer hashes, and a reference count
+per layer lets deletes remove layers no version uses any more.
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.sqlite"
+LAYERS_DIR = "layers"
+# Layer references of versions registered from files outside the store
+FILE_REFERENCE_PREFIX = "file:"
+
+
+class ModelVersionStore:
+    """Deduplicated layer blobs with a SQLite index of model versions."""
+
+    def __init__(self, directory: str):
+        """
+        Initialize the store.
+
+        Args:
+            directory: Directory holding the index and the layer files
+        """
+        self.directory = directory
+        self.layers_dir = os.path.join(directory, LAYERS_DIR)
+        os.makedirs(self.layers_dir, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(os.path.join(directory, INDEX_FILE), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._init_index()
+        self._stats = {"layers_written": 0, "layers_reused": 0, "bytes_written": 0, "layers_deleted": 0}
+
+    def _init_index(self):
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS versions (
+                    name TEXT NOT NULL,
+                    version TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    metadata TEXT NOT NULL,
+                    layers TEXT NOT NULL,
+                    PRIMARY KEY (name, version)
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_versions_created ON versions (name, created)")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS layers (
+                    digest TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    refs INTEGER NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT)")
+
+    def get_setting(self, key: str) -> Optional[str]:
+        """Get a value stored with the index, e.g. a migration marker."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def set_setting(self, key: str, value: str):
+        """Store a value with the index."""
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, value))
+
+    # --- Layers ---
+
+    def _layer_path(self, digest: str) -> str:
+        if digest.startswith(FILE_REFERENCE_PREFIX):
+            return os.path.join(self.directory, digest[len(FILE_REFERENCE_PREFIX):])
+        return os.path.join(self.layers_dir, f"{digest}.npy")
+
+    def _write_layer(self, array: np.ndarray) -> Tuple[str, int, bool]:
+        """Write a layer unless a layer with the same bytes exists; returns (digest, size, written)."""
+        buffer = io.BytesIO()
+        np.lib.format.write_array(buffer, np.asarray(array), allow_pickle=False)
+        data = buffer.getbuffer()
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._layer_path(digest)
+        if os.path.exists(path):
+            return digest, len(data), False
+        fd, temp_path = tempfile.mkstemp(dir=self.layers_dir, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        return digest, len(data), True
+
+    def _load_layer(self, digest: str) -> np.ndarray:
+        """Load a layer as a read-only memory-mapped array."""
+        path = self._layer_path(digest)
+        try:
+            return np.load(path, mmap_mode="r", allow_pickle=False)
+        except ValueError:
+            # Empty arrays cannot be memory-mapped
+            return np.load(path, allow_pickle=False)
+
+    def _release_layers(self, digests: Sequence[str]) -> List[str]:
+        """Drop one reference to each layer; returns the layers no longer referenced."""
+        unused = []
+        for digest in digests:
+            if digest.startswith(FILE_REFERENCE_PREFIX):
+                continue
+            self._conn.execute("UPDATE layers SET refs = refs - 1 WHERE digest = ?", (digest,))
+            row = self._conn.execute("SELECT refs FROM layers WHERE digest = ?", (digest,)).fetchone()
+            if row is not None and row["refs"] <= 0:
+                self._conn.execute("DELETE FROM layers WHERE digest = ?", (digest,))
+                unused.append(digest)
+        return unused
+
+    def _delete_layer_files(self, digests: Sequence[str]):
+        for digest in digests:
+            try:
+                os.unlink(self._layer_path(digest))
+                self._stats["layers_deleted"] += 1
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not remove unused model layer {digest}: {e}")
+
+    # --- Versions ---
+
+    def put(self, name: str, version: str, arrays: Sequence[Any], metadata: Dict[str, Any],
+            created: Optional[float] = None) -> Dict[str, int]:
+        """
+        Store a model version, replacing a version with the same name.
+
+        Args:
+            name: Model name
+            version: Version string
+            arrays: Layer arrays, in order
+            metadata: JSON-serializable metadata
+            created: Creation time used to order versions (default: now)
+
+        Returns:
+            Number of layers written and reused, and the bytes written
+        """
+        written = reused = bytes_written = 0
+        layers = []
+        with self._lock:
+            sizes = {}
+            for array in arrays:
+                digest, size, is_new = self._write_layer(array)
+                layers.append(digest)
+                sizes[digest] = size
+                if is_new:
+                    written += 1
+                    bytes_written += size
+                else:
+                    reused += 1
+            with self._conn:
+                for digest in layers:
+                    self._conn.execute(
+                        "INSERT INTO layers (digest, size, refs) VALUES (?, ?, 1) "
+                        "ON CONFLICT(digest) DO UPDATE SET refs = refs + 1",
+                        (digest, sizes[digest]))
+                unused = self._replace_version(name, version, layers, metadata, created)
+            self._delete_layer_files(unused)
+            self._stats["layers_written"] += written
+            self._stats["layers_reused"] += reused
+            self._stats["bytes_written"] += bytes_written
+        return {"layers_written": written, "layers_reused": reused, "bytes_written": bytes_written}
+
+    def register_files(self, name: str, version: str, paths: Sequence[str], metadata: Dict[str, Any],
+                       created: Optional[float] = None):
+        """
+        Index a version whose layers are existing .npy files instead of store layers.
+
+        Args:
+            name: Model name
+            version: Version string
+            paths: Layer files relative to the store directory, in order
+            metadata: JSON-serializable metadata
+            created: Creation time used to order versions (default: now)
+        """
+        layers = [FILE_REFERENCE_PREFIX + path for path in paths]
+        with self._lock:
+            with self._conn:
+                unused = self._replace_version(name, version, layers, metadata, created)
+            self._delete_layer_files(unused)
+
+    def _replace_version(self, name: str, version: str, layers: List[str], metadata: Dict[str, Any],
+                         created: Optional[float]) -> List[str]:
+        """Write a version row inside the caller's transaction; returns layers left unreferenced."""
+        previous = self._conn.execute(
+            "SELECT layers FROM versions WHERE name = ? AND version = ?", (name, version)).fetchone()
+        unused = self._release_layers(json.loads(previous["layers"])) if previous else []
+        self._conn.execute(
+            "INSERT OR REPLACE INTO versions (name, version, created, metadata, layers) VALUES (?, ?, ?, ?, ?)",
+            (name, version, time.time() if created is None else created, json.dumps(metadata), json.dumps(layers)))
+        return unused
+
+    def latest_version(self, name: str) -> Optional[str]:
+        """Get the most recently created version of a model."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version FROM versions WHERE name = ? ORDER BY created DESC, version DESC LIMIT 1",
+                (name,)).fetchone()
+        return row["version"] if row else None
+
+    def get(self, name: str, version: Optional[str] = None) -> Optional[Tuple[str, Dict[str, Any], List[np.ndarray]]]:
+        """
+        Load a model version with its layers memory-mapped read-only.
+
+        Args:
+            name: Model name
+            version: Version string (default: the latest version)
+
+        Returns:
+            (version, metadata, layers), or None if the version does not exist
+        """
+        with self._lock:
+            if version is None:
+                row = self._conn.execute(
+                    "SELECT version, metadata, layers FROM versions WHERE name = ? "
+                    "ORDER BY created DESC, version DESC LIMIT 1", (name,)).fetchone()
+            else:
+                row = self._conn.execute(
+                    "SELECT version, metadata, layers FROM versions WHERE name = ? AND version = ?",
+                    (name, version)).fetchone()
+        if row is None:
+            return None
+        layers = [self._load_layer(digest) for digest in json.loads(row["layers"])]
+        return row["version"], json.loads(row["metadata"]), layers
+
+    def delete(self, name: str, version: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Delete one or all versions of a model and the layers only they used.
+
+        Returns:
+            The deleted versions as {"version", "layers"} with the layer references they had
+        """
+        with self._lock:
+            with self._conn:
+                if version is None:
+                    rows = self._conn.execute(
+                        "SELECT version, layers FROM versions WHERE name = ?", (name,)).fetchall()
+                else:
+                    rows = self._conn.execute(
+                        "SELECT version, layers FROM versions WHERE name = ? AND version = ?",
+                        (name, version)).fetchall()
+                deleted = [{"version": row["version"], "layers": json.loads(row["layers"])} for row in rows]
+                unused = []
+                for entry in deleted:
+                    unused.extend(self._release_layers(entry["layers"]))
+                    self._conn.execute("DELETE FROM versions WHERE name = ? AND version = ?",
+                                       (name, entry["version"]))
+            self._delete_layer_files(unused)
+        return deleted
+
+    def list_versions(self, name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        List versions from the index, newest first.
+
+        Args:
+            name: Only versions of this model (default: all models)
+
+        Returns:
+            Dictionaries with name, version, created and metadata
+        """
+        with self._lock:
+            if name is None:
+                rows = self._conn.execute(
+                    "SELECT name, version, created, metadata FROM versions ORDER BY name, created DESC").fetchall()
+            else:
+                rows = self._conn.execute(
+                    "SELECT name, version, created, metadata FROM versions WHERE name = ? ORDER BY created DESC",
+                    (name,)).fetchall()
+        return [{"name": row["name"], "version": row["version"], "created": row["created"],
+                 "metadata": json.loads(row["metadata"])} for row in rows]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get write counters and the stored versus logical size of all versions."""
+        with self._lock:
+            stats = dict(self._stats)
+            row = self._conn.execute("SELECT COUNT(*) AS layers, COALESCE(SUM(size), 0) AS stored, "
+                                     "COALESCE(SUM(size * refs), 0) AS logical FROM layers").fetchone()
+            stats["versions"] = self._conn.execute("SELECT COUNT(*) FROM versions").fetchone()[0]
+        stats.update({"layers": row["layers"], "stored_bytes": row["stored"], "logical_bytes": row["logical"]})
+        return stats
+
+    def close(self):
+        """Close the index connection."""
+        with self._lock:
+            self._conn.close()
@@ -43,6 +43,9 @@
 # --- Add this import to fix the ConfigurationError issue ---
 from src.fl.common.model_handler import ModelHandler, ConfigurationError
 
+# --- Opt-in compression of model updates sent to the server ---
+from src.fl.common.compression import UpdateCompressor, COMPRESSION_METRIC
+
 logger = logging.getLogger(__name__)
 
 # --- Suppress verbose gRPC logs by default ---
@@ -928,6 +931,11 @@ def __init__(self, client_id: str, model_name: str, dataset: str, local_epochs:
         
         # For demo purposes, we'll use random data for parameters if none exist
         self.parameters = None
+
+        # Compression of fit results (None unless enabled in the client config)
+        self.update_compressor = UpdateCompressor.from_config(self.fl_client.config)
+        if self.update_compressor:
+            logger.info(f"FlowerClient [{client_id}] compressing model updates: {self.update_compressor.scheme}")
         
         logger.info(f"Initialized FlowerClient: {client_id} with {model_name} model and {dataset} dataset")
     
@@ -1395,7 +1403,6 @@ def fit(self, parameters, config) -> Tuple[NDArrays, int, Dict]:
         try:
             # Use the model handler's train method with the effective config
             updated_params, num_examples, metrics = self.model_handler.train(parameters, effective_config)
-            return updated_params, num_examples, metrics
         except Exception as e:
             logger.error(f"Error during training: {e}")
             # Return parameters with some random noise as fallback
@@ -1405,6 +1412,16 @@ def fit(self, parameters, config) -> Tuple[NDArrays, int, Dict]:
             
             # Return parameters, number of examples, and metrics
             return self.parameters, 1, {"accuracy": 0.0, "loss": 1.0, "error": str(e)}
+
+        if self.update_compressor:
+            try:
+                encoded = self.update_compressor.encode(updated_params, parameters)
+                metrics = dict(metrics or {})
+                metrics[COMPRESSION_METRIC] = self.update_compressor.scheme
+                return encoded, num_examples, metrics
+            except Exception as e:
+                logger.error(f"Error compressing model update, sending it uncompressed: {e}")
+        return updated_params, num_examples, metrics
     
     def evaluate(self, parameters, config) -> Tuple[float, int, Dict]:
         """
@@ -19,6 +19,7 @@
 including differential privacy and other techniques to protect client data.
 """
 
+import hashlib
 import math
 from typing import Dict, Any, List, Optional, Tuple, Union, Callable
 
@@ -27,6 +28,39 @@
 import numpy as np
 
 from src.core.common.logger import LoggerMixin
+from src.fl.common.privacy_accounting import RDPAccountant
+
+
+def _group_by_device_and_dtype(tensors: List[torch.Tensor]) -> Dict[Tuple[torch.device, torch.dtype], List[torch.Tensor]]:
+    groups: Dict[Tuple[torch.device, torch.dtype], List[torch.Tensor]] = {}
+    for tensor in tensors:
+        groups.setdefault((tensor.device, tensor.dtype), []).append(tensor)
+    return groups
+
+
+def global_grad_norm(grads: List[torch.Tensor]) -> float:
+    """
+    L2 norm of a list of tensors taken as one vector.
+
+    Per-tensor norms are computed with one multi-tensor kernel per device and
+    dtype and reduced on the device, so the result needs a single sync.
+
+    Args:
+        grads: Tensors, e.g. parameter gradients
+
+    Returns:
+        float: The global L2 norm (0.0 for an empty list)
+    """
+    if not grads:
+        return 0.0
+    norms = []
+    for (device, _), group in _group_by_device_and_dtype(grads).items():
+        if hasattr(torch, "_foreach_norm"):
+            group_norms = torch._foreach_norm(group)
+        else:
+            group_norms = [torch.linalg.vector_norm(tensor) for tensor in group]
+        norms.append(torch.linalg.vector_norm(torch.stack(group_norms).double()).to(grads[0].device))
+    return torch.linalg.vector_norm(torch.stack(norms)).item()
 
 
 class PrivacyMechanism(LoggerMixin):
@@ -82,6 +116,8 @@ def __init__(self,
         self.max_grad_norm = max_grad_norm
         self.privacy_budget = float('inf')  # epsilon, initially unlimited
         self.privacy_spent = 0.0  # epsilon spent so far
+        self.accountant = RDPAccountant()
+        self._noise_buffers: Dict[Tuple[torch.device, torch.dtype], torch.Tensor] = {}
         
     def apply(self, model: nn.Module, **kwargs) -> Tuple[nn.Module, Dict[str, Any]]:
         """
@@ -116,96 +152,73 @@ def apply(self, model: nn.Module, **kwargs) -> Tuple[nn.Module, Dict[str, Any]]:
                 "privacy_budget": privacy_budget
             }
         
-        # Apply DP-SGD noise addition
-        total_norm = 0.0
-        clipped_grads = []
-        
-        # Get model parameters with gradients
-        for param in model.parameters():
-            if param.grad is not None:
-                # Calculate gradient norm
-                param_norm = param.grad.data.norm(2)
-                total_norm += param_norm.item() ** 2
-                
-                # Store for later clipping
-                clipped_grads.append(param.grad.data)
-        
-        total_norm = total_norm ** 0.5
-        
-        # Clip gradients
+        # Clip to the global norm and add noise in place, with one device sync for the norm
+        grads = [param.grad for param in model.parameters() if param.grad is not None]
+        total_norm = global_grad_norm(grads)
         clip_coef = max_grad_norm / (total_norm + 1e-6)
         if clip_coef < 1:
-            for grad in clipped_grads:
-                grad.mul_(clip_coef)
-        
-        # Add noise to gradients
-        for grad in clipped_grads:
-            noise = torch.randn_like(grad) * noise_multiplier * max_grad_norm
-            grad.add_(noise)
-        
-        # Calculate privacy spent (approximate using moment accountant)
-        # This is a simple approximation - production code should use proper DP accounting
+            torch._foreach_mul_(grads, clip_coef)
+        self._add_noise(grads, noise_multiplier * max_grad_norm)
+
+        privacy_metrics = {
+            "mechanism": self.name,
+            "status": "applied",
+            "noise_multiplier": noise_multiplier,
+            "max_grad_norm": max_grad_norm,
+            "clip_coef": clip_coef,
+            "total_norm_before_clip": total_norm
+        }
+
+        # Account the step with the RDP accountant, which only adds the cached
+        # per-step curve for this sampling rate and noise multiplier
         if batch_size is not None and sample_size is not None:
             # q is the sampling probability
             q = batch_size / sample_size
-            
-            # Simple approximation of privacy spent
-            # In production, use a proper DP accountant like RDP or zCDP
-            # This is just a rough estimate based on the analytical Gaussian mechanism
             delta = 1.0 / sample_size  # Standard choice for delta
-            epsilon_spent = self._calculate_approximate_epsilon(q, noise_multiplier, delta)
-            
-            # Update privacy spent
-            self.privacy_spent += epsilon_spent
-            
-            privacy_metrics = {
-                "mechanism": self.name,
-                "status": "applied",
-                "noise_multiplier": noise_multiplier,
-                "max_grad_norm": max_grad_norm,
-                "clip_coef": clip_coef.item() if isinstance(clip_coef, torch.Tensor) else clip_coef,
-                "total_norm_before_clip": total_norm,
+            self.accountant.step(q, noise_multiplier)
+            total_epsilon, rdp_order = self.accountant.get_privacy_spent(delta)
+            epsilon_spent = total_epsilon - self.privacy_spent
+            self.privacy_spent = total_epsilon
+
+            privacy_metrics.update({
                 "batch_size": batch_size,
                 "sample_size": sample_size,
                 "sampling_rate": q,
                 "epsilon_spent": epsilon_spent,
                 "total_epsilon_spent": self.privacy_spent,
                 "privacy_budget": privacy_budget,
-                "delta": delta
-            }
-        else:
-            privacy_metrics = {
-                "mechanism": self.name,
-                "status": "applied",
-                "noise_multiplier": noise_multiplier,
-                "max_grad_norm": max_grad_norm,
-                "clip_coef": clip_coef.item() if isinstance(clip_coef, torch.Tensor) else clip_coef,
-                "total_norm_before_clip": total_norm
-            }
+                "delta": delta,
+                "rdp_order": rdp_order,
+                "steps": self.accountant.steps
+            })
         
         self.logger.info(f"Applied differential privacy with noise multiplier {noise_multiplier}")
         return model, privacy_metrics
     
-    def _calculate_approximate_epsilon(self, q: float, sigma: float, delta: float) -> float:
+    def _add_noise(self, grads: List[torch.Tensor], std: float) -> None:
         """
-        Calculate an approximation of epsilon for the given parameters.
-        
-        Args:
-            q: Sampling probability (batch_size / sample_size)
-            sigma: Noise multiplier
-            delta: Target delta
-            
-        Returns:
-            float: Approximate epsilon spent
+        Add Gaussian noise to the gradients in place.
+
+        Noise is drawn in one call per device and dtype into a flat buffer that
+        is kept between calls, then added to all gradients at once.
         """
-        # This is a very simple approximation based on the analytical Gaussian mechanism
-        # In production, use a proper DP accounting method
-        c = q * math.sqrt(2 * math.log(1.25 / delta))
-        return c / sigma
-    
+        if std == 0:
+            return
+        for key, group in _group_by_device_and_dtype(grads).items():
+            numel = sum(grad.numel() for grad in group)
+            buffer = self._noise_buffers.get(key)
+            if buffer is None or buffer.numel() != numel:
+                buffer = torch.empty(numel, device=key[0], dtype=key[1])
+                self._noise_buffers[key] = buffer
+            buffer.normal_(0.0, std)
+            noise = [chunk.view_as(grad) for chunk, grad in
+                     zip(buffer.split([grad.numel() for grad in group]), group)]
+            torch._foreach_add_(group, noise)
+
     def reset_privacy_budget(self) -> None:
         """Reset the privacy budget tracking."""
         self.privacy_spent = 0.0
+        self.accountant.reset()
         
     def get_privacy_spent(self) -> float:
         """Get the amount of privacy budget spent so far."""
@@ -219,9 +232,18 @@ class SecureAggregation(PrivacyMechanism):
     This class prepares model updates for secure aggregation by adding
     random masks that cancel out during aggregation.
     
+    Masks are never stored: they are expanded layer by layer from a seed
+    derived from (seed, round, client) or, for pairwise masks, from
+    (seed, round, client pair), and re-derived when they must be removed.
+    With pairwise masks every client adds the stream it shares with each
+    peer with opposite signs on the two sides, so the masks cancel in the
+    sum of all updates and the server needs no per-client state to unmask
+    it. Clients then have to share `seed` (in a full protocol, the pair
+    seeds come from a key agreement between the two clients).
+    
     Note: A full secure aggregation protocol requires coordination with 
-    the server and other clients. This class only handles the client-side
-    preparation.
+    the server and other clients, e.g. to recover the masks of clients
+    that drop out. This class only handles the client-side preparation.
     """
     
     def __init__(self, 
@@ -239,7 +261,8 @@ def __init__(self,
         super().__init__(name=name)
         self.seed = seed if seed is not None else np.random.randint(0, 2**31)
         self.mask_scale = mask_scale
-        self.masks = {}  # Stored masks for later removal
+        # How the mask of each round was derived, so it can be removed again
+        self.masks: Dict[int, Dict[str, Any]] = {}
         
     def apply(self, model: nn.Module, **kwargs) -> Tuple[nn.Module, Dict[str, Any]]:
         """
@@ -255,6 +278,8 @@ def apply(self, model: nn.Module, **kwargs) -> Tuple[nn.Module, Dict[str, Any]]:
                 - mask_scale: Override the mask scale
                 - client_id: ID of the client
                 - num_clients: Total number of clients in the aggregation
+                - peer_ids: IDs of all clients in the aggregation; enables
+                  pairwise masks that cancel in the sum of their updates
                 
         Returns:
             Tuple of (model prepared for secure aggregation, metrics)
@@ -263,41 +288,22 @@ def apply(self, model: nn.Module, **kwargs) -> Tuple[nn.Module, Dict[str, Any]]:
         round_id = kwargs.get('round_id', 0)
         mask_scale = kwargs.get('mask_scale', self.mask_scale)
         client_id = kwargs.get('client_id', 'unknown')
-        num_clients = kwargs.get('num_clients', 1)
+        peer_ids = [peer for peer in kwargs.get('peer_ids') or [] if str(peer) != str(client_id)]
+        num_clients = kwargs.get('num_clients', len(peer_ids) + 1 if peer_ids else 1)
         
-        # Set the random seed based on round ID and client ID for reproducibility
-        if isinstance(client_id, str):
-            client_seed = hash(client_id) % (2**31)
-        else:
-            client_seed = client_id
-        
-        np.random.seed(self.seed + round_id + client_seed)
-        
-        # Generate and apply masks to each parameter
-        masks = []
-        with torch.no_grad():
-            for param in model.parameters():
-                # Generate random mask
-                mask = torch.from_numpy(
-                    np.random.normal(0, mask_scale, param.size())
-                ).to(param.device).type(param.dtype)
-                
-                # Store mask for potential later removal
-                masks.append(mask.clone().cpu().numpy())
-                
-                # Apply mask to parameter
-                param.add_(mask)
-        
-        # Store masks for this round
-        self.masks[round_id] = masks
+        spec = {"client_id": client_id, "peer_ids": peer_ids, "mask_scale": mask_scale}
+        self._add_masks(model, round_id, spec, sign=1.0)
+        self.masks[round_id] = spec
         
-        self.logger.info(f"Applied secure aggregation preparation for round {round_id}, client {client_id}")
+        self.logger.info(f"Applied secure aggregation preparation for round {round_id}, client {client_id}"
+                         f"{f' with {len(peer_ids)} pairwise masks' if peer_ids else ''}")
         return model, {
             "mechanism": self.name,
             "status": "applied",
             "round_id": round_id,
             "mask_scale": mask_scale,
-            "num_clients": num_clients
+            "num_clients": num_clients,
+            "pairwise": bool(peer_ids)
         }
     
     def remove_mask(self, model: nn.Module, round_id: int) -> nn.Module:
@@ -305,7 +311,7 @@ def remove_mask(self, model: nn.Module, round_id: int) -> nn.Module:
         Remove the mask from the model.
         
         This is used when aggregation fails and the client needs to
-        submit an unmasked model.
+        submit an unmasked model. The mask is derived again from its seed.
         
         Args:
             model: Model with mask applied
@@ -318,12 +324,7 @@ def remove_mask(self, model: nn.Module, round_id: int) -> nn.Module:
             self.logger.warning(f"No mask found for round {round_id}")
             return model
         
-        masks = self.masks[round_id]
-        
-        with torch.no_grad():
-            for param, mask in zip(model.parameters(), masks):
-                mask_tensor = torch.from_numpy(mask).to(param.device).type(param.dtype)
-                param.sub_(mask_tensor)
+        self._add_masks(model, round_id, self.masks.pop(round_id), sign=-1.0)
         
         self.logger.info(f"Removed secure aggregation mask for round {round_id}")
         return model
@@ -333,6 +334,47 @@ def clear_masks(self) -> None:
         self.masks = {}
         self.logger.info("Cleared all secure aggregation masks")
 
+    def _mask_streams(self, round_id: int, spec: Dict[str, Any]) -> List[Tuple[int, float]]:
+        """Seed and sign of every mask stream the client adds in a round."""
+        client_id = str(spec["client_id"])
+        if not spec["peer_ids"]:
+            return [(_derive_seed(self.seed, round_id, client_id), 1.0)]
+        streams = []
+        for peer in spec["peer_ids"]:
+            low, high = sorted((client_id, str(peer)))
+            streams.append((_derive_seed(self.seed, round_id, low, high), 1.0 if client_id == low else -1.0))
+        return streams
+
+    def _add_masks(self, model: nn.Module, round_id: int, spec: Dict[str, Any], sign: float) -> None:
+        """Expand the round's mask streams layer by layer and add them to the parameters."""
+        params = list(model.parameters())
+        scale = sign * spec["mask_scale"]
+        with torch.no_grad():
+            for seed, stream_sign in self._mask_streams(round_id, spec):
+                generator = np.random.Generator(np.random.Philox(key=seed))
+                for param in params:
+                    param.add_(_expand_mask(generator, param), alpha=scale * stream_sign)
+
+
+def _derive_seed(*parts: Any) -> int:
+    """128-bit Philox key derived from the given values, stable across processes."""
+    digest = hashlib.sha256("/".join(str(part) for part in parts).encode()).digest()
+    return int.from_bytes(digest[:16], "little")
+
+
+def _expand_mask(generator: np.random.Generator, param: torch.Tensor) -> torch.Tensor:
+    """
+    Draw the next standard normal mask for a parameter from a mask stream.
+
+    Masks are drawn from NumPy's Philox generator rather than a torch device
+    generator because the CPU and CUDA generators produce different streams
+    for the same seed, and pairwise masks only cancel if every client draws
+    the same values. Only one layer's mask exists at a time.
+    """
+    dtype = np.float64 if param.dtype == torch.float64 else np.float32
+    mask = torch.from_numpy(generator.standard_normal(param.numel(), dtype=dtype)).view(param.shape)
+    return mask.to(device=param.device, dtype=param.dtype)
+
 
 class LocalModelTruncation(PrivacyMechanism):
     """
@@ -433,4 +475,110 @@ def apply(self, model: nn.Module, **kwargs) -> Tuple[nn.Module, Dict[str, Any]]:
             "sparsity": sparsity,
             "total_params": total_params,
             "params_kept": mask.sum().item()
-        } 
\ No newline at end of file
+        } 
+
+def _clip_and_noise_loop(model: nn.Module, max_grad_norm: float, noise_multiplier: float) -> float:
+    """Reference per-layer clipping and noising, with one device sync per layer."""
+    total_norm = 0.0
+    grads = []
+    for param in model.parameters():
+        if param.grad is not None:
+            total_norm += param.grad.data.norm(2).item() ** 2
+            grads.append(param.grad.data)
+    total_norm = total_norm ** 0.5
+    clip_coef = max_grad_norm / (total_norm + 1e-6)
+    if clip_coef < 1:
+        for grad in grads:
+            grad.mul_(clip_coef)
+    for grad in grads:
+        grad.add_(torch.randn_like(grad) * noise_multiplier * max_grad_norm)
+    return total_norm
+
+
+def _benchmark_cnn() -> nn.Module:
+    """CIFAR-sized CNN with about 2.5M parameters."""
+    return nn.Sequential(
+        nn.Conv2d(3, 64, 3, padding=1), nn.ReLU(), nn.MaxPool2d(2),
+        nn.Conv2d(64, 128, 3, padding=1), nn.ReLU(), nn.MaxPool2d(2),
+        nn.Conv2d(128, 256, 3, padding=1), nn.ReLU(), nn.MaxPool2d(2),
+        nn.Conv2d(256, 256, 3, padding=1), nn.ReLU(), nn.MaxPool2d(2),
+        nn.Flatten(), nn.Linear(256 * 2 * 2, 2048), nn.ReLU(), nn.Linear(2048, 10))
+
+
+def benchmark(iterations: int = 50, rounds: int = 1000, device: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Time fused DP clipping and noising against the per-layer loop, and RDP
+    accounting with cached per-step curves against recomputing them each round.
+
+    Args:
+        iterations: Clip-and-noise calls timed per implementation
+        rounds: Rounds of privacy accounting
+        device: Torch device (default: cuda if available)
+
+    Returns:
+        Milliseconds per call and per round for each implementation
+    """
+    import time
+
+    from src.fl.common.privacy_accounting import rdp_curve, rdp_to_epsilon
+
+    device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+    model = _benchmark_cnn().to(device)
+    model(torch.randn(32, 3, 32, 32, device=device)).sum().backward()
+    reference = [param.grad.clone() for param in model.parameters()]
+
+    def reset_grads():
+        for param, grad in zip(model.parameters(), reference):
+            param.grad.copy_(grad)
+
+    def timed(fn) -> float:
+        elapsed = 0.0
+        for iteration in range(iterations + 1):
+            reset_grads()
+            if device.startswith("cuda"):
+                torch.cuda.synchronize()
+            start = time.perf_counter()
+            fn()
+            if device.startswith("cuda"):
+                torch.cuda.synchronize()
+            if iteration > 0:  # the first call warms up
+                elapsed += time.perf_counter() - start
+        return elapsed / iterations * 1000
+
+    mechanism = DifferentialPrivacy(noise_multiplier=1.0, max_grad_norm=1.0)
+    report = {
+        "device": device,
+        "parameters": sum(param.numel() for param in model.parameters()),
+        "layers": len(reference),
+        "loop_ms": round(timed(lambda: _clip_and_noise_loop(model, 1.0, 1.0)), 3),
+        "fused_ms": round(timed(lambda: mechanism.apply(model)), 3),
+    }
+
+    # Norms must agree between the two implementations
+    reset_grads()
+    loop_norm = _clip_and_noise_loop(model, 1.0, 1.0)
+    reset_grads()
+    fused_norm = global_grad_norm([param.grad for param in model.parameters()])
+    report["norms_match"] = bool(abs(loop_norm - fused_norm) <= 1e-4 * max(loop_norm, 1.0))
+
+    q, sigma, delta = 256 / 60000, 1.1, 1e-5
+    accountant = RDPAccountant()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        accountant.step(q, sigma)
+        cached_epsilon = accountant.get_epsilon(delta)
+    report["accountant_cached_ms"] = round((time.perf_counter() - start) / rounds * 1000, 4)
+
+    start = time.perf_counter()
+    for round_number in range(1, rounds + 1):
+        curve = rdp_curve.__wrapped__(q, sigma, accountant.orders)
+        uncached_epsilon, _ = rdp_to_epsilon(round_number * curve, accountant.orders, delta)
+    report["accountant_uncached_ms"] = round((time.perf_counter() - start) / rounds * 1000, 4)
+    report["epsilon"] = round(cached_epsilon, 4)
+    report["epsilons_match"] = bool(math.isclose(cached_epsilon, uncached_epsilon, rel_tol=1e-9))
+    return report
+
+
+if __name__ == "__main__":
+    import json
+    print(json.dumps(benchmark(), indent=2))
@@ -0,0 +1,223 @@
+"""
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Model update compression between FL clients and the server.
+
+An encoded update is still a list of NumPy arrays, so it travels through
+Flower unchanged:
+
+    [header (int64), dtypes (unicode), then per layer: indices, values, range]
+
+The header holds the format version, the scheme flags and every layer's shape.
+Per layer, `indices` is empty for dense layers, `values` holds float32 values
+or 8/16-bit codes, and `range` holds the (minimum, step) of quantized values.
+Clients mark compressed updates with the COMPRESSION_METRIC fit metric.
+"""
+
+import logging
+import math
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+COMPRESSION_METRIC = "compression"
+QUANTIZATION_DTYPES = {8: np.uint8, 16: np.uint16}
+
+
+class UpdateCompressor:
+    """Client-side encoder of model updates, keeping the error feedback residual between rounds."""
+
+    def __init__(self, bits: int = 0, topk_ratio: float = 0.0, delta: bool = False,
+                 error_feedback: bool = True):
+        """
+        Initialize the compressor.
+
+        Args:
+            bits: Quantization width, 8 or 16 (0 sends float32 values)
+            topk_ratio: Fraction of values sent per layer, largest magnitude first (0 sends all).
+                Top-k implies delta encoding: sparsified full weights decode mostly to zero.
+            delta: Encode the difference to the global model received from the server
+            error_feedback: Carry what compression dropped into the next round's update
+        """
+        if bits not in (0, 8, 16):
+            raise ValueError(f"Quantization bits must be 0, 8 or 16, got {bits}")
+        if not 0 <= topk_ratio <= 1:
+            raise ValueError(f"topk_ratio must be in [0, 1], got {topk_ratio}")
+        if 0 < topk_ratio < 1 and not delta:
+            logger.info("Top-k compression enabled, switching on delta encoding")
+            delta = True
+        self.bits = bits
+        self.topk_ratio = topk_ratio
+        self.delta = delta
+        self.error_feedback = error_feedback
+        self._residual: Optional[List[np.ndarray]] = None
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional["UpdateCompressor"]:
+        """Create a compressor from client configuration, or None if compression is off."""
+        bits = int(config.get("compression_bits", 0) or 0)
+        topk_ratio = float(config.get("compression_topk_ratio", 0.0) or 0.0)
+        delta = bool(config.get("compression_delta", False))
+        if not bits and not topk_ratio and not delta:
+            return None
+        return cls(bits=bits, topk_ratio=topk_ratio, delta=delta,
+                   error_feedback=bool(config.get("compression_error_feedback", True)))
+
+    @property
+    def scheme(self) -> str:
+        """Human-readable description sent with each update, e.g. 'q8+top0.01+delta'."""
+        parts = [f"q{self.bits}" if self.bits else "f32"]
+        if self.topk_ratio and self.topk_ratio < 1:
+            parts.append(f"top{self.topk_ratio:g}")
+        if self.delta:
+            parts.append("delta")
+        return "+".join(parts)
+
+    def encode(self, ndarrays: List[np.ndarray], global_ndarrays: Optional[List[np.ndarray]] = None) -> List[np.ndarray]:
+        """
+        Encode a client's trained model.
+
+        Args:
+            ndarrays: Trained model layers
+            global_ndarrays: Global model layers received for this round (required for delta encoding)
+
+        Returns:
+            Encoded arrays to return from fit()
+        """
+        delta = self.delta and global_ndarrays is not None and len(global_ndarrays) == len(ndarrays)
+        if self.delta and not delta:
+            logger.warning("Delta encoding skipped: global model not available or shape mismatch")
+        # Without a global model to take the delta against, send every value
+        sparse = 0 < self.topk_ratio < 1 and delta
+        lossy = sparse or self.bits > 0
+
+        if self._residual is not None and [r.shape for r in self._residual] != [a.shape for a in ndarrays]:
+            self._residual = None
+        if self.error_feedback and lossy and self._residual is None:
+            self._residual = [np.zeros(np.shape(layer), dtype=np.float32) for layer in ndarrays]
+
+        header = [FORMAT_VERSION, self.bits, int(sparse), int(delta), len(ndarrays)]
+        dtypes = []
+        encoded_layers = []
+        for index, layer in enumerate(ndarrays):
+            layer = np.asarray(layer)
+            header.append(layer.ndim)
+            header.extend(layer.shape)
+            dtypes.append(layer.dtype.str)
+
+            values = layer.astype(np.float32).ravel()
+            if delta:
+                values -= np.asarray(global_ndarrays[index], dtype=np.float32).ravel()
+            if self.error_feedback and lossy:
+                values += self._residual[index].ravel()
+
+            indices = np.empty(0, dtype=np.uint32)
+            selected = values
+            if sparse and values.size:
+                k = max(1, math.ceil(self.topk_ratio * values.size))
+                if k < values.size:
+                    indices = np.argpartition(np.abs(values), values.size - k)[values.size - k:]
+                    indices.sort()
+                    indices = indices.astype(np.uint32)
+                    selected = values[indices]
+
+            codes, value_range = _quantize(selected, self.bits)
+            encoded_layers.extend([indices, codes, value_range])
+
+            if self.error_feedback and lossy:
+                sent = _dequantize(codes, value_range)
+                residual = values  # values is a private float32 copy
+                if indices.size:
+                    residual[indices] -= sent
+                else:
+                    residual -= sent
+                self._residual[index] = residual.reshape(layer.shape)
+
+        return [np.asarray(header, dtype=np.int64), np.asarray(dtypes)] + encoded_layers
+
+
+def _quantize(values: np.ndarray, bits: int):
+    """Map float32 values to unsigned integer codes over their [min, max] range."""
+    if not bits:
+        # Copy: the caller turns `values` into the error feedback residual in place
+        return values.astype(np.float32, copy=True), np.empty(0, dtype=np.float32)
+    levels = (1 << bits) - 1
+    low = float(values.min()) if values.size else 0.0
+    high = float(values.max()) if values.size else 0.0
+    step = (high - low) / levels if high > low else 1.0
+    codes = np.rint((values - low) / step).astype(QUANTIZATION_DTYPES[bits])
+    return codes, np.asarray([low, step], dtype=np.float32)
+
+
+def _dequantize(codes: np.ndarray, value_range: np.ndarray) -> np.ndarray:
+    """Inverse of _quantize."""
+    if not value_range.size:
+        return codes.astype(np.float32, copy=False)
+    low, step = float(value_range[0]), float(value_range[1])
+    return codes.astype(np.float32) * np.float32(step) + np.float32(low)
+
+
+def is_compressed(metrics: Optional[Dict[str, Any]]) -> bool:
+    """Check whether fit metrics mark the returned parameters as a compressed update."""
+    return bool(metrics) and bool(metrics.get(COMPRESSION_METRIC))
+
+
+def decode_update(encoded: List[np.ndarray], global_ndarrays: Optional[List[np.ndarray]] = None) -> List[np.ndarray]:
+    """
+    Decode an update produced by UpdateCompressor.encode.
+
+    Args:
+        encoded: Arrays returned by the client
+        global_ndarrays: Global model layers sent for the round (required for delta updates)
+
+    Returns:
+        Model layers in the client's original shapes and dtypes
+
+    Raises:
+        ValueError: If the update is malformed or needs a global model that was not given
+    """
+    if len(encoded) < 2:
+        raise ValueError("Compressed update is missing its header")
+    header = [int(value) for value in encoded[0]]
+    dtypes = [str(dtype) for dtype in encoded[1]]
+    if not header or header[0] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported compressed update format: {header[:1]}")
+    _, _, _, delta, num_layers = header[:5]
+    if len(encoded) != 2 + 3 * num_layers or len(dtypes) != num_layers:
+        raise ValueError(f"Compressed update has {len(encoded)} arrays for {num_layers} layers")
+    if delta and (global_ndarrays is None or len(global_ndarrays) != num_layers):
+        raise ValueError("Delta-encoded update received without a matching global model")
+
+    layers = []
+    position = 5
+    for index in range(num_layers):
+        ndim = header[position]
+        shape = tuple(header[position + 1:position + 1 + ndim])
+        position += 1 + ndim
+        indices, codes, value_range = encoded[2 + 3 * index:5 + 3 * index]
+
+        values = _dequantize(codes, value_range)
+        if indices.size:
+            dense = np.zeros(int(np.prod(shape)), dtype=np.float32)
+            dense[indices.astype(np.int64)] = values
+            values = dense
+        values = values.reshape(shape)
+        if delta:
+            values = values + np.asarray(global_ndarrays[index], dtype=np.float32)
+        layers.append(values.astype(np.dtype(dtypes[index]), copy=False))
+    return layers
@@ -19,5 +19,7 @@
 """
 
 from src.fl.server.fl_server import FLServer
+from src.fl.server.policy_client import PolicyClient
+from src.fl.server.aggregation import StreamingFedAvg
 
-__all__ = ["FLServer"] 
\ No newline at end of file
+__all__ = ["FLServer", "PolicyClient", "StreamingFedAvg"] 
\ No newline at end of file
@@ -0,0 +1,212 @@
+"""
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Streaming weighted aggregation of client updates.
+
+Client updates are folded one layer at a time into a preallocated accumulator,
+so aggregation needs memory for one model plus one layer instead of a
+deserialized and a weighted copy of every client's update.
+"""
+
+import json
+import logging
+import multiprocessing
+import resource
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from flwr.common import NDArrays, Parameters, bytes_to_ndarray
+
+logger = logging.getLogger(__name__)
+
+
+class StreamingFedAvg:
+    """FedAvg weighted average computed incrementally as client updates arrive."""
+
+    def __init__(self, dtype: Any = np.float64):
+        """
+        Initialize the aggregator.
+
+        Args:
+            dtype: Accumulator dtype; the average is computed at this precision
+        """
+        self.dtype = np.dtype(dtype)
+        self.reset()
+
+    def reset(self):
+        """Drop the accumulated state so the aggregator can be reused for another round."""
+        self._accumulator: Optional[List[np.ndarray]] = None
+        self._layer_dtypes: List[np.dtype] = []
+        self._scratch: Optional[np.ndarray] = None
+        self.num_clients = 0
+        self.total_examples = 0
+
+    def _fold_layer(self, index: int, layer: np.ndarray, num_examples: int):
+        """Add num_examples * layer to the accumulator without allocating."""
+        if index == len(self._accumulator):
+            # First client: the accumulator grows layer by layer as shapes become known
+            self._accumulator.append(np.zeros(layer.shape, dtype=self.dtype))
+            self._layer_dtypes.append(layer.dtype)
+        target = self._accumulator[index]
+        if layer.shape != target.shape:
+            raise ValueError(f"Layer {index} has shape {layer.shape}, expected {target.shape}")
+        if self._scratch is None or self._scratch.size < layer.size:
+            self._scratch = np.empty(layer.size, dtype=self.dtype)
+        weighted = self._scratch[:layer.size].reshape(layer.shape)
+        np.multiply(layer, num_examples, out=weighted, casting="unsafe")
+        np.add(target, weighted, out=target)
+
+    def _check_layer_count(self, count: int):
+        """Start a new accumulator or check that an update matches the existing one."""
+        if self._accumulator is None:
+            self._accumulator = []
+        elif self.num_clients and count != len(self._accumulator):
+            raise ValueError(f"Update has {count} layers, expected {len(self._accumulator)}")
+
+    def add(self, ndarrays: NDArrays, num_examples: int):
+        """
+        Fold one client's update into the running weighted sum.
+
+        Args:
+            ndarrays: Model layers returned by the client
+            num_examples: Number of training examples the client used
+        """
+        self._check_layer_count(len(ndarrays))
+        for index, layer in enumerate(ndarrays):
+            self._fold_layer(index, layer, num_examples)
+        self.num_clients += 1
+        self.total_examples += num_examples
+
+    def add_parameters(self, parameters: Parameters, num_examples: int, release: bool = False):
+        """
+        Fold one client's serialized update, deserializing a single layer at a time.
+
+        Args:
+            parameters: Serialized model layers returned by the client
+            num_examples: Number of training examples the client used
+            release: Drop the serialized tensors from parameters once folded
+        """
+        self._check_layer_count(len(parameters.tensors))
+        for index, tensor in enumerate(parameters.tensors):
+            self._fold_layer(index, bytes_to_ndarray(tensor), num_examples)
+        self.num_clients += 1
+        self.total_examples += num_examples
+        if release:
+            parameters.tensors = []
+
+    def result(self, dtype: Any = None) -> NDArrays:
+        """
+        Get the weighted average of the folded updates.
+
+        Args:
+            dtype: Output dtype (default: the dtype of each layer as sent by the clients)
+
+        Returns:
+            Averaged model layers
+        """
+        if not self.num_clients or self.total_examples <= 0:
+            raise ValueError("No client updates with training examples were aggregated")
+
+        averaged = []
+        for layer, layer_dtype in zip(self._accumulator, self._layer_dtypes):
+            np.divide(layer, self.total_examples, out=layer)
+            out_dtype = np.dtype(dtype) if dtype is not None else layer_dtype
+            if not np.issubdtype(out_dtype, np.inexact):
+                # Integer layers (e.g. counters) are averaged like FedAvg does, into floats
+                out_dtype = self.dtype
+            averaged.append(layer if out_dtype == self.dtype else layer.astype(out_dtype))
+        # The accumulator now holds the result; start over on the next add()
+        self.reset()
+        return averaged
+
+
+def _simulate_results(num_clients: int, model_size: int, seed: int = 0) -> List[tuple]:
+    """Build serialized float32 client updates for a two-layer model of about model_size values."""
+    from flwr.common import FitRes, Status, Code, ndarrays_to_parameters
+
+    rng = np.random.default_rng(seed)
+    rows = max(1, model_size // 100)
+    results = []
+    for _ in range(num_clients):
+        layers = [rng.standard_normal((rows, 100), dtype=np.float32),
+                  rng.standard_normal(100, dtype=np.float32)]
+        fit_res = FitRes(status=Status(code=Code.OK, message=""),
+                         parameters=ndarrays_to_parameters(layers),
+                         num_examples=int(rng.integers(10, 1000)), metrics={})
+        results.append((None, fit_res))
+    return results
+
+
+def _benchmark_worker(mode: str, num_clients: int, model_size: int, queue):
+    """Aggregate simulated results in a fresh process and report wall time and peak RSS."""
+    from flwr.common import parameters_to_ndarrays
+    from flwr.server.strategy.aggregate import aggregate
+
+    results = _simulate_results(num_clients, model_size)
+    # ru_maxrss is in KiB on Linux
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if mode == "flower":
+        aggregated = aggregate([(parameters_to_ndarrays(fit_res.parameters), fit_res.num_examples)
+                                for _, fit_res in results])
+    else:
+        aggregator = StreamingFedAvg()
+        for _, fit_res in results:
+            aggregator.add_parameters(fit_res.parameters, fit_res.num_examples, release=True)
+        aggregated = aggregator.result()
+    duration = time.perf_counter() - start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put({
+        "wall_time_s": round(duration, 4),
+        "peak_rss_mb": round(rss_after / 1024, 1),
+        "aggregation_rss_mb": round((rss_after - rss_before) / 1024, 1),
+        "checksum": float(sum(np.sum(layer, dtype=np.float64) for layer in aggregated))
+    })
+
+
+def benchmark(client_counts=(10, 100, 1000), model_size: int = 50000) -> Dict[str, Any]:
+    """
+    Compare Flower's FedAvg aggregation with StreamingFedAvg on simulated clients.
+
+    Each run happens in its own process so that peak RSS is measured per run.
+
+    Args:
+        client_counts: Numbers of simulated clients
+        model_size: Approximate number of float32 values per client update
+
+    Returns:
+        Wall time, peak RSS and aggregation RSS growth per mode and client count
+    """
+    ctx = multiprocessing.get_context("spawn")
+    report = {"model_size": model_size, "runs": []}
+    for num_clients in client_counts:
+        run = {"clients": num_clients}
+        for mode in ("flower", "streaming"):
+            queue = ctx.Queue()
+            process = ctx.Process(target=_benchmark_worker, args=(mode, num_clients, model_size, queue))
+            process.start()
+            run[mode] = queue.get()
+            process.join()
+        checksums = (run["flower"].pop("checksum"), run["streaming"].pop("checksum"))
+        run["results_match"] = bool(np.isclose(checksums[0], checksums[1], rtol=1e-4, atol=1e-3))
+        report["runs"].append(run)
+    return report
+
+
+if __name__ == "__main__":
+    counts = tuple(int(arg) for arg in sys.argv[1:]) or (10, 100, 1000)
+    print(json.dumps(benchmark(counts), indent=2))
@@ -0,0 +1,257 @@
+"""
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Incremental model checkpoint store.
+
+Each layer is written once to `layers/<sha256>.npy`, where the hash is taken
+over the layer's serialized bytes, so layers that did not change between
+rounds are not written again. `manifest.json` lists the retained checkpoints
+(newest last) with the layer hashes of each. Flower already serializes
+tensors in .npy format, so saving writes the tensor bytes as they are and
+loading can memory-map the files.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from flwr.common import Parameters
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+LAYERS_DIR = "layers"
+NUMPY_TENSOR_TYPE = "numpy.ndarray"
+
+
+class CheckpointStore:
+    """Per-layer .npy checkpoints with a JSON manifest, written on a background thread."""
+
+    def __init__(self, directory: str, keep: int = 5):
+        """
+        Initialize the store.
+
+        Args:
+            directory: Directory holding the manifest and layer files
+            keep: Number of most recent checkpoints retained
+        """
+        self.directory = directory
+        self.layers_dir = os.path.join(directory, LAYERS_DIR)
+        self.keep = max(1, int(keep))
+        os.makedirs(self.layers_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._pending: Optional[Dict[str, Any]] = None
+        self._wake = threading.Condition(self._lock)
+        self._idle = threading.Event()
+        self._idle.set()
+        self._closed = False
+        self._writer: Optional[threading.Thread] = None
+        # Most recently saved or loaded checkpoint, so in-process resumes need no I/O
+        self.latest: Optional[Dict[str, Any]] = None
+        self._stats = {"saved": 0, "superseded": 0, "layers_written": 0, "layers_reused": 0,
+                       "bytes_written": 0, "last_write_time": 0.0}
+
+    # --- Manifest ---
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.directory, MANIFEST_FILE)
+
+    def read_manifest(self) -> Dict[str, Any]:
+        """Get the manifest, or an empty one if none has been written yet."""
+        try:
+            with open(self._manifest_path(), "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"checkpoints": []}
+
+    def _write_atomic(self, path: str, data: bytes):
+        """Write a file so that readers see either the old or the complete new content."""
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+    def _layer_path(self, digest: str) -> str:
+        return os.path.join(self.layers_dir, f"{digest}.npy")
+
+    # --- Saving ---
+
+    def save(self, parameters: Parameters, round_num: int, metadata: Optional[Dict[str, Any]] = None):
+        """
+        Queue a checkpoint for writing and return immediately.
+
+        If the writer is still busy, a checkpoint queued earlier and not yet
+        started is replaced by this newer one.
+
+        Args:
+            parameters: Model parameters serialized by Flower
+            round_num: Round the parameters belong to
+            metadata: Extra JSON-serializable fields stored with the checkpoint
+        """
+        if parameters.tensor_type != NUMPY_TENSOR_TYPE:
+            raise ValueError(f"Unsupported tensor type for checkpoints: {parameters.tensor_type}")
+        checkpoint = {
+            "round": round_num,
+            "timestamp": time.time(),
+            **(metadata or {}),
+            "tensors": list(parameters.tensors)
+        }
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Checkpoint store is closed")
+            if self._pending is not None:
+                self._stats["superseded"] += 1
+            self._pending = checkpoint
+            self.latest = {"round": round_num, "parameters": parameters, **(metadata or {})}
+            self._idle.clear()
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="checkpoint-writer", daemon=True)
+                self._writer.start()
+            self._wake.notify()
+
+    def _write_loop(self):
+        while True:
+            with self._lock:
+                while self._pending is None and not self._closed:
+                    self._wake.wait()
+                if self._pending is None:
+                    return
+                checkpoint, self._pending = self._pending, None
+            try:
+                self._write_checkpoint(checkpoint)
+            except Exception as e:
+                logger.error(f"Error writing checkpoint for round {checkpoint['round']}: {e}")
+            with self._lock:
+                if self._pending is None:
+                    self._idle.set()
+
+    def _write_checkpoint(self, checkpoint: Dict[str, Any]):
+        """Write changed layers, then the manifest, then drop layers no checkpoint uses."""
+        start = time.time()
+        tensors = checkpoint.pop("tensors")
+        layers = []
+        written = reused = bytes_written = 0
+        for tensor in tensors:
+            digest = hashlib.sha256(tensor).hexdigest()
+            path = self._layer_path(digest)
+            if os.path.exists(path):
+                reused += 1
+            else:
+                self._write_atomic(path, tensor)
+                written += 1
+                bytes_written += len(tensor)
+            layers.append(digest)
+        checkpoint["layers"] = layers
+
+        manifest = self.read_manifest()
+        checkpoints = manifest.get("checkpoints", []) + [checkpoint]
+        manifest["checkpoints"] = checkpoints[-self.keep:]
+        self._write_atomic(self._manifest_path(), json.dumps(manifest, indent=2).encode())
+        self._collect_garbage(manifest)
+
+        duration = time.time() - start
+        with self._lock:
+            self._stats["saved"] += 1
+            self._stats["layers_written"] += written
+            self._stats["layers_reused"] += reused
+            self._stats["bytes_written"] += bytes_written
+            self._stats["last_write_time"] = duration
+        logger.info(f"Saved checkpoint for round {checkpoint['round']}: {written} layers written, "
+                    f"{reused} unchanged ({bytes_written / (1024 * 1024):.2f} MB in {duration:.2f}s)")
+
+    def _collect_garbage(self, manifest: Dict[str, Any]):
+        """Delete layer files that no retained checkpoint references."""
+        referenced = {digest for checkpoint in manifest["checkpoints"] for digest in checkpoint["layers"]}
+        for name in os.listdir(self.layers_dir):
+            if name.endswith(".npy") and name[:-4] not in referenced:
+                try:
+                    os.unlink(os.path.join(self.layers_dir, name))
+                except OSError as e:
+                    logger.warning(f"Could not remove unused checkpoint layer {name}: {e}")
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until queued checkpoints are written; returns False on timeout."""
+        return self._idle.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 30):
+        """Write any queued checkpoint and stop the writer thread."""
+        with self._lock:
+            self._closed = True
+            self._wake.notify()
+            writer = self._writer
+        if writer is not None:
+            writer.join(timeout)
+
+    # --- Loading ---
+
+    def latest_checkpoint(self) -> Optional[Dict[str, Any]]:
+        """Get the newest checkpoint's manifest entry, or None if there is none."""
+        checkpoints = self.read_manifest().get("checkpoints", [])
+        return checkpoints[-1] if checkpoints else None
+
+    def load_ndarrays(self, checkpoint: Optional[Dict[str, Any]] = None) -> Optional[List[np.ndarray]]:
+        """
+        Get a checkpoint's layers as read-only memory-mapped arrays.
+
+        Only the .npy headers are read; layer data is paged in on access.
+
+        Args:
+            checkpoint: Manifest entry (default: the newest checkpoint)
+        """
+        checkpoint = checkpoint or self.latest_checkpoint()
+        if checkpoint is None:
+            return None
+        return [np.load(self._layer_path(digest), mmap_mode="r", allow_pickle=False)
+                for digest in checkpoint["layers"]]
+
+    def load_parameters(self, checkpoint: Optional[Dict[str, Any]] = None) -> Optional[Parameters]:
+        """
+        Get a checkpoint as Flower parameters.
+
+        The layer files are already in Flower's tensor format, so their bytes
+        are used as they are without deserializing.
+
+        Args:
+            checkpoint: Manifest entry (default: the newest checkpoint)
+        """
+        checkpoint = checkpoint or self.latest_checkpoint()
+        if checkpoint is None:
+            return None
+        tensors = []
+        for digest in checkpoint["layers"]:
+            with open(self._layer_path(digest), "rb") as f:
+                tensors.append(f.read())
+        return Parameters(tensors=tensors, tensor_type=NUMPY_TENSOR_TYPE)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get write counters and the retained rounds."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = self._pending is not None
+        stats["rounds"] = [checkpoint["round"] for checkpoint in self.read_manifest().get("checkpoints", [])]
+        stats["keep"] = self.keep
+        return stats
@@ -27,11 +27,11 @@
 import time
 import requests
 import traceback
-import collections
 import uuid
 import datetime
 from typing import Dict, Any, List, Optional, Tuple, Callable, Union
 import threading # Added for metrics server
+from contextlib import contextmanager
 
 # --- Add project root to path for absolute imports --- 
 # This assumes fl_server.py is in src/fl/server
@@ -42,13 +42,33 @@
 from flwr.common import Parameters, Metrics
 from flwr.server.server import Server
 from flwr.server.client_manager import SimpleClientManager
+from flwr.server.criterion import Criterion
 
 # --- Flask for Metrics Endpoint --- 
-from flask import Flask, jsonify
+from flask import Flask, Response, jsonify
 
 # --- Werkzeug for metrics server ---
 from werkzeug.serving import run_simple
 
+# --- Pooled, cached policy engine client ---
+from src.fl.server.policy_client import PolicyClient, PolicyUnavailableError
+
+# --- Bounded event feed with O(1) cursor lookup ---
+from src.core.common.event_log import EventLog
+
+# --- Incremental per-layer model checkpoints ---
+from src.fl.server.checkpoint_store import CheckpointStore
+
+# --- Compressed client updates ---
+from src.fl.common.compression import decode_update, is_compressed, COMPRESSION_METRIC
+
+# --- Streaming FedAvg and robust aggregation ---
+from src.fl.server.aggregation import StreamingFedAvg
+from src.fl.server.robust_aggregation import ROBUST_AGGREGATORS, create_robust_aggregator
+
+# --- Indexed client registry with utility-weighted sampling ---
+from src.core.clients.client_registry import ClientRegistry
+
 # --- Control gRPC logging ---
 import grpc
 
@@ -75,20 +95,73 @@ def configure_grpc_logging(enable_verbose=False):
         os.environ['GRPC_VERBOSITY'] = 'DEBUG'
 
 # --- Persistent Storage for FL Rounds ---
+_STORE_ROUND_SQL = '''
+    INSERT OR REPLACE INTO fl_rounds 
+    (round_number, timestamp, status, accuracy, loss, training_duration, 
+     model_size_mb, clients, raw_metrics)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+_ROUND_COLUMNS = '''round_number as round, timestamp, status, accuracy, loss, 
+                  training_duration, model_size_mb, clients, raw_metrics'''
+
+
 class FLRoundStorage:
     """Persistent storage for FL rounds using SQLite."""
     
     def __init__(self, db_path: str = "./fl_rounds.db"):
         """Initialize the FL rounds storage."""
         self.db_path = db_path
+        self._connection_pool = {}
+        self._pool_lock = threading.Lock()
+        # Count of rounds >= 1 (the default filter) and latest round number, kept current by store_rounds
+        self._cache_lock = threading.Lock()
+        self._round_count = 0
+        self._latest_round = 0
         self._init_database()
     
+    @contextmanager
+    def _get_connection(self):
+        """Get this thread's pooled database connection."""
+        thread_id = threading.get_ident()
+        
+        with self._pool_lock:
+            if thread_id not in self._connection_pool:
+                conn = sqlite3.connect(
+                    self.db_path,
+                    timeout=30.0,
+                    check_same_thread=False,
+                    cached_statements=64  # Reuse prepared statements across calls
+                )
+                conn.row_factory = sqlite3.Row
+                conn.execute("PRAGMA journal_mode=WAL")  # Readers don't block the round writer
+                conn.execute("PRAGMA synchronous=NORMAL")
+                self._connection_pool[thread_id] = conn
+            
+            conn = self._connection_pool[thread_id]
+        
+        try:
+            yield conn
+        except Exception as e:
+            conn.rollback()
+            raise e
+    
+    def close(self):
+        """Close all pooled connections."""
+        with self._pool_lock:
+            for conn in self._connection_pool.values():
+                try:
+                    conn.close()
+                except Exception as e:
+                    logger.debug(f"Error closing round storage connection: {e}")
+            self._connection_pool.clear()
+    
     def _init_database(self):
         """Initialize the SQLite database."""
         # Ensure directory exists
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
         
-        with sqlite3.connect(self.db_path) as conn:
+        with self._get_connection() as conn:
             conn.execute('''
                 CREATE TABLE IF NOT EXISTS fl_rounds (
                     round_number INTEGER PRIMARY KEY,
@@ -108,81 +181,107 @@ def _init_database(self):
             conn.execute('CREATE INDEX IF NOT EXISTS idx_round_number ON fl_rounds(round_number)')
             conn.execute('CREATE INDEX IF NOT EXISTS idx_timestamp ON fl_rounds(timestamp)')
             conn.commit()
+            
+            count = conn.execute("SELECT COUNT(*) FROM fl_rounds WHERE round_number >= 1").fetchone()[0]
+            latest = conn.execute("SELECT MAX(round_number) FROM fl_rounds").fetchone()[0]
+            with self._cache_lock:
+                self._round_count = count
+                self._latest_round = latest or 0
     
     def store_round(self, round_data: Dict[str, Any]):
         """Store a round's data."""
+        self.store_rounds([round_data])
+    
+    def store_rounds(self, rounds: List[Dict[str, Any]]):
+        """Store several rounds in one transaction."""
+        if not rounds:
+            return
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute('''
-                    INSERT OR REPLACE INTO fl_rounds 
-                    (round_number, timestamp, status, accuracy, loss, training_duration, 
-                     model_size_mb, clients, raw_metrics)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    round_data.get('round', 0),
-                    round_data.get('timestamp', datetime.datetime.now(datetime.timezone.utc).isoformat()),
-                    round_data.get('status', 'complete'),
-                    round_data.get('accuracy', 0.0),
-                    round_data.get('loss', 0.0),
-                    round_data.get('training_duration', 0.0),
-                    round_data.get('model_size_mb', 0.0),
-                    round_data.get('clients', 0),
-                    json.dumps(round_data.get('raw_metrics', {}))
-                ))
+            rows = [(
+                round_data.get('round', 0),
+                round_data.get('timestamp', datetime.datetime.now(datetime.timezone.utc).isoformat()),
+                round_data.get('status', 'complete'),
+                round_data.get('accuracy', 0.0),
+                round_data.get('loss', 0.0),
+                round_data.get('training_duration', 0.0),
+                round_data.get('model_size_mb', 0.0),
+                round_data.get('clients', 0),
+                json.dumps(round_data.get('raw_metrics', {}))
+            ) for round_data in rounds]
+            round_numbers = sorted({row[0] for row in rows})
+            counted = [number for number in round_numbers if number >= 1]
+            
+            with self._get_connection() as conn:
+                existing = 0
+                if counted:
+                    placeholders = ",".join("?" * len(counted))
+                    existing = conn.execute(
+                        f"SELECT COUNT(*) FROM fl_rounds WHERE round_number IN ({placeholders})", counted
+                    ).fetchone()[0]
+                conn.executemany(_STORE_ROUND_SQL, rows)
                 conn.commit()
-                logger.debug(f"Stored round {round_data.get('round', 0)} to persistent storage")
+            
+            with self._cache_lock:
+                self._round_count += len(counted) - existing
+                self._latest_round = max(self._latest_round, round_numbers[-1])
+            logger.debug(f"Stored rounds {round_numbers} to persistent storage")
         except Exception as e:
             logger.error(f"Error storing round data: {e}")
     
+    @staticmethod
+    def _build_filters(start_round: int, end_round: Optional[int],
+                       min_accuracy: Optional[float], max_accuracy: Optional[float]) -> Tuple[str, List[Any]]:
+        """Build the WHERE clause and parameters shared by round queries."""
+        where_clauses = ["round_number >= ?"]
+        params = [start_round]
+        
+        if end_round is not None:
+            where_clauses.append("round_number <= ?")
+            params.append(end_round)
+        
+        if min_accuracy is not None:
+            where_clauses.append("accuracy >= ?")
+            params.append(min_accuracy)
+        
+        if max_accuracy is not None:
+            where_clauses.append("accuracy <= ?")
+            params.append(max_accuracy)
+        
+        return " AND ".join(where_clauses), params
+    
+    @staticmethod
+    def _is_unfiltered(start_round: int, end_round: Optional[int],
+                       min_accuracy: Optional[float], max_accuracy: Optional[float]) -> bool:
+        """Check whether a filter is the default one, whose count is cached."""
+        return start_round == 1 and end_round is None and min_accuracy is None and max_accuracy is None
+    
+    @staticmethod
+    def _row_to_round(row) -> Dict[str, Any]:
+        round_data = dict(row)
+        # Parse raw_metrics back to dict
+        try:
+            round_data['raw_metrics'] = json.loads(round_data.get('raw_metrics', '{}'))
+        except:
+            round_data['raw_metrics'] = {}
+        return round_data
+    
     def get_rounds(self, start_round: int = 1, end_round: Optional[int] = None, 
                    limit: int = 1000, offset: int = 0, 
                    min_accuracy: Optional[float] = None, max_accuracy: Optional[float] = None) -> List[Dict[str, Any]]:
         """Get rounds with filtering and limiting."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                
-                # Build query with filters
-                where_clauses = ["round_number >= ?"]
-                params = [start_round]
-                
-                if end_round is not None:
-                    where_clauses.append("round_number <= ?")
-                    params.append(end_round)
-                
-                if min_accuracy is not None:
-                    where_clauses.append("accuracy >= ?")
-                    params.append(min_accuracy)
-                
-                if max_accuracy is not None:
-                    where_clauses.append("accuracy <= ?")
-                    params.append(max_accuracy)
-                
-                where_clause = " AND ".join(where_clauses)
-                
-                query = f'''
-                    SELECT round_number as round, timestamp, status, accuracy, loss, 
-                           training_duration, model_size_mb, clients, raw_metrics
-                    FROM fl_rounds 
-                    WHERE {where_clause}
-                    ORDER BY round_number ASC
-                    LIMIT ? OFFSET ?
-                '''
-                
-                params.extend([limit, offset])
-                cursor = conn.execute(query, params)
-                
-                rounds = []
-                for row in cursor.fetchall():
-                    round_data = dict(row)
-                    # Parse raw_metrics back to dict
-                    try:
-                        round_data['raw_metrics'] = json.loads(round_data.get('raw_metrics', '{}'))
-                    except:
-                        round_data['raw_metrics'] = {}
-                    rounds.append(round_data)
-                
-                return rounds
+            where_clause, params = self._build_filters(start_round, end_round, min_accuracy, max_accuracy)
+            query = f'''
+                SELECT {_ROUND_COLUMNS}
+                FROM fl_rounds 
+                WHERE {where_clause}
+                ORDER BY round_number ASC
+                LIMIT ? OFFSET ?
+            '''
+            params.extend([limit, offset])
+            
+            with self._get_connection() as conn:
+                return [self._row_to_round(row) for row in conn.execute(query, params).fetchall()]
         except Exception as e:
             logger.error(f"Error getting rounds: {e}")
             return []
@@ -190,42 +289,63 @@ def get_rounds(self, start_round: int = 1, end_round: Optional[int] = None,
     def get_round_count(self, start_round: int = 1, end_round: Optional[int] = None,
                        min_accuracy: Optional[float] = None, max_accuracy: Optional[float] = None) -> int:
         """Get total count of rounds matching criteria."""
+        if self._is_unfiltered(start_round, end_round, min_accuracy, max_accuracy):
+            with self._cache_lock:
+                return self._round_count
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                where_clauses = ["round_number >= ?"]
-                params = [start_round]
-                
-                if end_round is not None:
-                    where_clauses.append("round_number <= ?")
-                    params.append(end_round)
-                
-                if min_accuracy is not None:
-                    where_clauses.append("accuracy >= ?")
-                    params.append(min_accuracy)
-                
-                if max_accuracy is not None:
-                    where_clauses.append("accuracy <= ?")
-                    params.append(max_accuracy)
-                
-                where_clause = " AND ".join(where_clauses)
-                query = f"SELECT COUNT(*) FROM fl_rounds WHERE {where_clause}"
-                
-                cursor = conn.execute(query, params)
-                return cursor.fetchone()[0]
+            where_clause, params = self._build_filters(start_round, end_round, min_accuracy, max_accuracy)
+            with self._get_connection() as conn:
+                return conn.execute(f"SELECT COUNT(*) FROM fl_rounds WHERE {where_clause}", params).fetchone()[0]
         except Exception as e:
             logger.error(f"Error getting round count: {e}")
             return 0
     
     def get_latest_round_number(self) -> int:
         """Get the latest round number."""
+        with self._cache_lock:
+            return self._latest_round
+    
+    def get_rounds_page(self, start_round: int = 1, end_round: Optional[int] = None,
+                        limit: int = 1000, offset: int = 0,
+                        min_accuracy: Optional[float] = None, max_accuracy: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Get a page of rounds together with the matching total and the latest round number.
+        
+        The latest round number, and the total for the default filter, come from
+        memory, so unfiltered pages take a single query. Filtered totals are counted
+        on the same connection, in the same read transaction as the page.
+        
+        Returns:
+            Dictionary with rounds, total and latest
+        """
+        latest = self.get_latest_round_number()
+        cached_total = self._is_unfiltered(start_round, end_round, min_accuracy, max_accuracy)
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute("SELECT MAX(round_number) FROM fl_rounds")
-                result = cursor.fetchone()[0]
-                return result if result is not None else 0
+            where_clause, params = self._build_filters(start_round, end_round, min_accuracy, max_accuracy)
+            query = f'''
+                SELECT {_ROUND_COLUMNS}
+                FROM fl_rounds 
+                WHERE {where_clause}
+                ORDER BY round_number ASC
+                LIMIT ? OFFSET ?
+            '''
+            with self._get_connection() as conn:
+                if cached_total:
+                    rows = conn.execute(query, params + [limit, offset]).fetchall()
+                    with self._cache_lock:
+                        total = self._round_count
+                else:
+                    conn.execute("BEGIN")
+                    try:
+                        rows = conn.execute(query, params + [limit, offset]).fetchall()
+                        total = conn.execute(f"SELECT COUNT(*) FROM fl_rounds WHERE {where_clause}",
+                                             params).fetchone()[0]
+                    finally:
+                        conn.commit()
+            return {"rounds": [self._row_to_round(row) for row in rows], "total": total, "latest": latest}
         except Exception as e:
-            logger.error(f"Error getting latest round: {e}")
-            return 0
+            logger.error(f"Error getting rounds page: {e}")
+            return {"rounds": [], "total": 0, "latest": latest}
 
 # --- Global state for metrics (simpler for this context) ---
 global_metrics = {
@@ -259,19 +379,69 @@ class StopTrainingPolicySignal(Exception):
     """Signal exception to stop training based on policy."""
     pass
 
+class RegistryClientManager(SimpleClientManager):
+    """Client manager that samples connected clients from a ClientRegistry."""
+
+    def __init__(self, registry: ClientRegistry, weighted: bool = False):
+        super().__init__()
+        self.registry = registry
+        self.weighted = weighted
+
+    def register(self, client: fl.server.client_proxy.ClientProxy) -> bool:
+        registered = super().register(client)
+        if registered:
+            self.registry.register(client.cid)
+        return registered
+
+    def unregister(self, client: fl.server.client_proxy.ClientProxy) -> None:
+        super().unregister(client)
+        # Keep the client's history in case it reconnects, but stop sampling it
+        self.registry.set_available(client.cid, False)
+
+    def sample(self, num_clients: int, min_num_clients: Optional[int] = None,
+               criterion: Optional[Criterion] = None) -> List[fl.server.client_proxy.ClientProxy]:
+        """Sample clients from the registry in O(k log n) (criteria fall back to a full scan)."""
+        if criterion is not None:
+            return super().sample(num_clients, min_num_clients, criterion)
+        if min_num_clients is None:
+            min_num_clients = num_clients
+        self.wait_for(min_num_clients)
+        while True:
+            cids = self.registry.sample(num_clients, weighted=self.weighted)
+            # Clients known from an earlier session but not connected now
+            stale = [cid for cid in cids if cid not in self.clients]
+            if not stale:
+                break
+            for cid in stale:
+                self.registry.set_available(cid, False)
+        sampled = [self.clients[cid] for cid in cids]
+        if len(sampled) < num_clients:
+            logger.info(f"Sampling failed: number of available clients ({len(sampled)}) "
+                        f"is less than number of requested clients ({num_clients}).")
+            return []
+        return sampled
+
 # --- Custom Strategy to Track Metrics ---
 class MetricsTrackingStrategy(FedAvg):
     """Custom strategy that tracks detailed metrics and integrates with policy engine."""
     
-    def __init__(self, *args, server_instance=None, **kwargs):
+    def __init__(self, *args, server_instance=None, aggregation_dtype="float64", **kwargs):
         super().__init__(*args, **kwargs)
         self.server_instance = server_instance
+        self.aggregator = StreamingFedAvg(dtype=aggregation_dtype)
+        self.aggregation_method = "fedavg"
+        self.last_aggregation_timing = {}
+        # Global model sent in the current round, needed to decode delta-encoded updates
+        self._round_parameters = None
+        self._round_ndarrays = None
         self.round_start_time = None
         self.aggregation_start_time = None
         self.evaluation_start_time = None
 
     def configure_fit(self, server_round: int, parameters: Parameters, client_manager: fl.server.client_manager.ClientManager) -> List[Tuple[fl.server.client_proxy.ClientProxy, fl.common.FitIns]]:
         """Configure the fit round with policy checks."""
+        self._round_parameters = parameters
+        self._round_ndarrays = None
         if self.server_instance:
             # Check if training was stopped by policy in previous round
             with metrics_lock:
@@ -302,9 +472,30 @@ def configure_fit(self, server_round: int, parameters: Parameters, client_manage
                 "current_timestamp": time.time()
             }
             
-            # Check fl_client_training policy BEFORE allowing any training
+            # Policy check with enhanced context - using client_selection policy type for round configuration
+            policy_context = {
+                "operation": "configure_round",
+                "server_id": self.server_instance.config.get("server_id", "fl_server"),
+                "server_round": int(server_round),
+                "current_round": int(server_round),
+                "total_clients": int(client_manager.num_available()),
+                "available_clients": int(client_manager.num_available()),
+                "min_clients": int(self.min_available_clients),
+                "round_start_time": time.time(),
+                "current_parameters_size": len(parameters.tensors) if parameters and parameters.tensors else 0,
+                "model": self.server_instance.model_name if self.server_instance else "unknown",
+                "dataset": self.server_instance.dataset if self.server_instance else "unknown",
+                "timestamp": time.time()
+            }
+            
+            # Check fl_client_training policy BEFORE allowing any training. The round
+            # configuration check is evaluated concurrently and only used if training
+            # is allowed right away.
+            client_training_policy_result, policy_result = self.server_instance.check_policies([
+                ("fl_client_training", training_policy_context),
+                ("fl_client_selection", policy_context)
+            ])
             while True:
-                client_training_policy_result = self.server_instance.check_policy("fl_client_training", training_policy_context)
                 if client_training_policy_result.get("allowed", True):
                     logger.info(f"Policy allows round {server_round} to proceed")
                     break
@@ -337,6 +528,8 @@ def configure_fit(self, server_round: int, parameters: Parameters, client_manage
                         "current_timestamp": time.time(),
                         "timestamp": time.time()
                     })
+                    client_training_policy_result = self.server_instance.check_policy("fl_client_training", training_policy_context)
+                    policy_result = None  # Stale after waiting
             
             # Resume training if it was paused
             if self.server_instance.training_paused:
@@ -350,24 +543,15 @@ def configure_fit(self, server_round: int, parameters: Parameters, client_manage
                 global_metrics["training_active"] = True
                 global_metrics["connected_clients"] = client_manager.num_available()
             
-            # Policy check with enhanced context - using client_selection policy type for round configuration
-            policy_context = {
-                "operation": "configure_round",
-                "server_id": self.server_instance.config.get("server_id", "fl_server"),
-                "server_round": int(server_round),
-                "current_round": int(server_round),
-                "total_clients": int(client_manager.num_available()),
-                "available_clients": int(client_manager.num_available()),
-                "min_clients": int(self.min_available_clients),
-                "round_start_time": self.round_start_time,
-                "current_parameters_size": len(parameters.tensors) if parameters and parameters.tensors else 0,
-                "model": self.server_instance.model_name if self.server_instance else "unknown",
-                "dataset": self.server_instance.dataset if self.server_instance else "unknown",
-                "timestamp": time.time()
-            }
-            
-            # Check policy before proceeding with round - use a different policy type for round configuration
-            policy_result = self.server_instance.check_policy("fl_client_selection", policy_context)
+            # Re-check round configuration if the round was paused
+            if policy_result is None:
+                policy_context.update({
+                    "total_clients": int(client_manager.num_available()),
+                    "available_clients": int(client_manager.num_available()),
+                    "round_start_time": self.round_start_time,
+                    "timestamp": time.time()
+                })
+                policy_result = self.server_instance.check_policy("fl_client_selection", policy_context)
             
             if not policy_result.get("allowed", True):
                 reason = policy_result.get("reason", "Policy denied training round")
@@ -427,9 +611,14 @@ def aggregate_fit(self, server_round: int, results: List[Tuple[fl.server.client_
                 if isinstance(failure, tuple) and len(failure) >= 2:
                     client_proxy, fit_res = failure
                     logger.warning(f"Failure {i+1}: Client {client_proxy.cid if hasattr(client_proxy, 'cid') else 'unknown'}")
+                    if self.server_instance and hasattr(client_proxy, 'cid'):
+                        self.server_instance.client_registry.record_failure(client_proxy.cid)
                 else:
                     logger.warning(f"Failure {i+1}: {str(failure)}")
         
+        # Decode compressed client updates before anything reads their parameters
+        update_transport = self._decode_client_updates(server_round, results, failures)
+
         # Collect enhanced client metrics
         client_training_durations = []
         client_model_sizes = []
@@ -453,12 +642,16 @@ def aggregate_fit(self, server_round: int, results: List[Tuple[fl.server.client_
                 
                 logger.info(f"Client {client_proxy.cid if hasattr(client_proxy, 'cid') else 'unknown'}: "
                            f"training_duration={training_duration:.2f}s, model={model_type}, dataset={dataset}")
+                
+                # Update the client's latency, participation and sampling score
+                if self.server_instance and hasattr(client_proxy, 'cid'):
+                    self.server_instance.client_registry.record_fit(client_proxy.cid, fit_res.metrics, server_round)
         
         # Note: Policy checks for round decisions are handled in aggregate_evaluate
         # Aggregation itself should generally proceed unless there are severe issues
         
-        # Call the base strategy to get the aggregation results
-        aggregated_parameters, aggregated_metrics = super().aggregate_fit(server_round, results, failures)
+        # Aggregate with the same semantics as FedAvg, folding client updates one at a time
+        aggregated_parameters, aggregated_metrics = self._aggregate_fit_streaming(server_round, results, failures)
         
         # Calculate aggregation duration
         aggregation_duration = time.time() - self.aggregation_start_time
@@ -475,6 +668,13 @@ def aggregate_fit(self, server_round: int, results: List[Tuple[fl.server.client_
             "failed_clients": len(failures),
             "total_clients": len(results) + len(failures),
             "aggregation_duration": aggregation_duration,
+            "aggregation_method": self.aggregation_method,
+            "aggregation_timing": self.last_aggregation_timing,
+            # Bytes of client updates as received, and after decompression
+            "update_bytes_received": update_transport["bytes_received"],
+            "update_bytes_decoded": update_transport["bytes_decoded"],
+            "update_compression_ratio": update_transport["compression_ratio"],
+            "compressed_clients": update_transport["compressed_clients"],
             "round_duration_partial": round_duration,  # Partial because we haven't done evaluation yet
             "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
             "aggregated_metrics": aggregated_metrics,
@@ -507,6 +707,7 @@ def aggregate_fit(self, server_round: int, results: List[Tuple[fl.server.client_
                     "current_round": server_round,
                     "current_parameters": aggregated_parameters,  # Store parameters for checkpoint saving
                     "last_aggregation_duration": aggregation_duration,
+                    "last_update_transport": update_transport,
                     "last_round_partial_duration": round_duration,
                     "aggregation_timestamp": enhanced_metrics["timestamp"],
                     "last_client_training_stats": {
@@ -535,6 +736,97 @@ def aggregate_fit(self, server_round: int, results: List[Tuple[fl.server.client_
             
         return aggregated_parameters, aggregated_metrics
 
+    def _decode_client_updates(self, server_round: int, results, failures) -> Dict[str, Any]:
+        """
+        Replace compressed client updates with their decoded models, in place.
+
+        Results whose update cannot be decoded are moved from `results` to `failures`.
+
+        Returns:
+            Bytes received and decoded for the round's client updates
+        """
+        bytes_received = 0
+        bytes_decoded = 0
+        compressed_clients = 0
+        decoded_results = []
+        for client_proxy, fit_res in results:
+            received = sum(len(tensor) for tensor in fit_res.parameters.tensors)
+            if not is_compressed(fit_res.metrics):
+                bytes_received += received
+                bytes_decoded += received
+                decoded_results.append((client_proxy, fit_res))
+                continue
+
+            if self._round_ndarrays is None and self._round_parameters is not None:
+                self._round_ndarrays = fl.common.parameters_to_ndarrays(self._round_parameters)
+            client_id = client_proxy.cid if hasattr(client_proxy, 'cid') else 'unknown'
+            try:
+                layers = decode_update(fl.common.parameters_to_ndarrays(fit_res.parameters), self._round_ndarrays)
+            except Exception as e:
+                logger.warning(f"Round {server_round}: Dropping undecodable update from client {client_id}: {e}")
+                failures.append((client_proxy, fit_res))
+                if self.server_instance and hasattr(client_proxy, 'cid'):
+                    self.server_instance.client_registry.record_failure(client_proxy.cid)
+                continue
+            decoded_results.append((client_proxy, fit_res))
+            bytes_received += received
+            fit_res.parameters = fl.common.ndarrays_to_parameters(layers)
+            bytes_decoded += sum(len(tensor) for tensor in fit_res.parameters.tensors)
+            compressed_clients += 1
+            logger.debug(f"Round {server_round}: Decoded {fit_res.metrics[COMPRESSION_METRIC]} update from client "
+                         f"{client_id}: {received} bytes")
+        results[:] = decoded_results
+
+        compression_ratio = bytes_decoded / bytes_received if bytes_received else 1.0
+        if compressed_clients:
+            logger.info(f"Round {server_round}: {compressed_clients} compressed updates, "
+                        f"{bytes_received / (1024 * 1024):.2f} MB received for "
+                        f"{bytes_decoded / (1024 * 1024):.2f} MB of parameters ({compression_ratio:.1f}x)")
+        return {
+            "bytes_received": bytes_received,
+            "bytes_decoded": bytes_decoded,
+            "compression_ratio": compression_ratio,
+            "compressed_clients": compressed_clients
+        }
+
+    def _aggregate_fit_streaming(self, server_round: int, results, failures) -> Tuple[Optional[Parameters], Dict[str, Any]]:
+        """
+        FedAvg-compatible aggregation wrapper around the strategy's aggregation operator.
+
+        Records the operator's timing in self.last_aggregation_timing.
+        """
+        self.last_aggregation_timing = {}
+        if not results:
+            return None, {}
+        # Do not aggregate if there are failures and failures are not accepted
+        if not self.accept_failures and failures:
+            return None, {}
+
+        operator_start = time.time()
+        parameters_aggregated = fl.common.ndarrays_to_parameters(self._aggregate_results(results))
+        self.last_aggregation_timing = {
+            "operator": self.aggregation_method,
+            "operator_time": time.time() - operator_start,
+            **self._operator_stats()
+        }
+
+        metrics_aggregated = {}
+        if self.fit_metrics_aggregation_fn:
+            fit_metrics = [(res.num_examples, res.metrics) for _, res in results]
+            metrics_aggregated = self.fit_metrics_aggregation_fn(fit_metrics)
+        return parameters_aggregated, metrics_aggregated
+
+    def _aggregate_results(self, results) -> List[Any]:
+        """Weighted average keeping a single accumulator, releasing each client's update once folded."""
+        self.aggregator.reset()
+        for _, fit_res in results:
+            self.aggregator.add_parameters(fit_res.parameters, fit_res.num_examples, release=True)
+        return self.aggregator.result()
+
+    def _operator_stats(self) -> Dict[str, Any]:
+        """Operator-specific timing breakdown of the last aggregation."""
+        return {}
+
     def aggregate_evaluate(self, server_round: int, results: List[Tuple[fl.server.client_proxy.ClientProxy, fl.common.EvaluateRes]], failures: List[Union[Tuple[fl.server.client_proxy.ClientProxy, fl.common.EvaluateRes], BaseException]]) -> Tuple[Optional[float], Dict[str, Any]]:
         # Record evaluation start time
         self.evaluation_start_time = time.time()
@@ -629,6 +921,7 @@ def aggregate_evaluate(self, server_round: int, results: List[Tuple[fl.server.cl
         
         # Carry over model size from aggregation phase if available
         with metrics_lock:
+            update_transport = global_metrics.get("last_update_transport", {})
             if "model_size_mb" in global_metrics and global_metrics["model_size_mb"] > 0:
                 enhanced_metrics["model_size_mb"] = global_metrics["model_size_mb"]
                 logger.info(f"Round {server_round}: Carried over model size from aggregation: {enhanced_metrics['model_size_mb']:.3f} MB")
@@ -675,6 +968,7 @@ def aggregate_evaluate(self, server_round: int, results: List[Tuple[fl.server.cl
                 "failed_clients": len(failures),
                 "model_size_mb": model_size_mb,  # Use the ensured model size
                 "raw_metrics": {
+                    "update_transport": update_transport,
                     "aggregated_loss": aggregated_loss,
                     "aggregated_metrics": aggregated_metrics,
                     "evaluation_results_count": len(results),
@@ -825,6 +1119,23 @@ def aggregate_evaluate(self, server_round: int, results: List[Tuple[fl.server.cl
             
         return aggregated_loss, aggregated_metrics
 
+class RobustAggregationStrategy(MetricsTrackingStrategy):
+    """MetricsTrackingStrategy aggregating with a Byzantine-robust operator instead of FedAvg."""
+
+    def __init__(self, *args, aggregation_method: str = "median", aggregation_config: Optional[Dict[str, Any]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.robust_aggregator = create_robust_aggregator(aggregation_method, aggregation_config or {})
+        self.aggregation_method = aggregation_method
+
+    def _aggregate_results(self, results) -> List[Any]:
+        """Aggregate coordinate-wise with the configured robust operator."""
+        return self.robust_aggregator.aggregate([(fit_res.parameters, fit_res.num_examples)
+                                                 for _, fit_res in results])
+
+    def _operator_stats(self) -> Dict[str, Any]:
+        return dict(self.robust_aggregator.last_stats)
+
+
 class FLServer:
     """Federated Learning Server implementation."""
     
@@ -850,8 +1161,12 @@ def __init__(self, config: Dict[str, Any]):
         self.metrics_port = config.get("metrics_port", 8081)
         
         # Model parameters persistence
-        self.model_checkpoint_file = config.get("model_checkpoint_file", "./last_model_checkpoint.pkl")
+        self.model_checkpoint_file = config.get("model_checkpoint_file", "./last_model_checkpoint.pkl")  # Legacy pickle, read only
         self.saved_parameters = None
+        self.checkpoint_store = CheckpointStore(
+            config.get("checkpoint_dir", os.path.join(config.get("storage_dir", "./fl_storage"), "checkpoints")),
+            keep=config.get("checkpoint_keep", 5)
+        )
         
         # Initialize global metrics with server configuration
         global_metrics["start_time"] = time.time()
@@ -872,8 +1187,7 @@ def __init__(self, config: Dict[str, Any]):
         global_metrics["max_rounds"] = 0
         
         # Initialize event buffer and lock
-        self.event_buffer = collections.deque(maxlen=1000)  # Store up to 1000 recent events
-        self.buffer_lock = threading.Lock()
+        self.event_buffer = EventLog(capacity=1000, id_key="event_id")  # Store up to 1000 recent events
         
         # Restart control flag
         self._restart_requested = False
@@ -900,6 +1214,26 @@ def __init__(self, config: Dict[str, Any]):
         self.cached_policy_version = 0
         self.last_policy_version_check = 0
         self.policy_version_check_interval = config.get("policy_version_check_interval", 30)  # Check every 30 seconds
+        self._policy_version_lock = threading.Lock()
+        
+        # Pooled policy engine client with a decision cache keyed on context and policy version
+        self.policy_client = PolicyClient(
+            self.policy_engine_url,
+            auth_token=self.policy_auth_token,
+            timeout=self.policy_timeout,
+            max_retries=self.policy_max_retries,
+            retry_delay=self.policy_retry_delay,
+            cache_ttl=self.policy_cache_ttl,
+            cache_size=config.get("policy_cache_size", 1024),
+            max_workers=config.get("policy_check_workers", 8)
+        )
+        
+        # Client registry: Flower samples connected clients from it, and fit results update their scores
+        self.client_selection = config.get("client_selection", "random")  # "random" or "utility"
+        self.client_registry = ClientRegistry(
+            latency_scale=config.get("client_latency_scale", 10.0),
+            participation_penalty=config.get("client_participation_penalty", 0.0)
+        )
         
         # Create results directory if it doesn't exist
         os.makedirs(self.results_dir, exist_ok=True)
@@ -1040,8 +1374,7 @@ def _log_event(self, event_type: str, details: Dict[str, Any]):
             "details": details
         }
         
-        with self.buffer_lock:
-            self.event_buffer.append(event)
+        self.event_buffer.append(event)
         
         logger.debug(f"Logged event: {event['event_id']} - {event_type}")
     
@@ -1142,24 +1475,31 @@ def check_policy_version_and_refresh(self) -> bool:
         if current_time - self.last_policy_version_check < self.policy_version_check_interval:
             return False
         
+        # Concurrent policy checks share a single version check
+        if not self._policy_version_lock.acquire(blocking=False):
+            return False
+        
         try:
             # Get current policy version from policy engine
-            version_url = f"{self.policy_engine_url}/api/v1/policy_version"
-            response = requests.get(version_url, timeout=self.policy_timeout)
+            current_version = self.policy_client.fetch_policy_version()
             
-            if response.status_code == 200:
-                version_data = response.json()
-                current_version = version_data.get("policy_version", 0)
-                
+            if current_version is not None:
                 self.last_policy_version_check = current_time
                 
-                # Check if policy version has changed
-                if current_version > self.cached_policy_version:
+                # Check if policy version has changed (a restarted engine may report a lower one)
+                if current_version != self.cached_policy_version:
                     logger.info(f"Policy version changed from {self.cached_policy_version} to {current_version}, refreshing cache")
+                    old_version = self.cached_policy_version
                     self.cached_policy_version = current_version
                     
-                    # Clear any local policy caches if we had them
-                    self.policy_check_signatures = {}
+                    # Drop cached decisions made under the previous policies
+                    self.policy_client.set_policy_version(current_version)
+                    
+                    # Forget signatures that verify_policy_result would reject as expired anyway
+                    self.policy_check_signatures = {
+                        sig: info for sig, info in list(self.policy_check_signatures.items())
+                        if current_time - info["timestamp"] <= 60
+                    }
                     
                     # Don't reset training stop flag automatically when policy updates
                     # If training was stopped by policy, it should stay stopped unless manually restarted
@@ -1169,7 +1509,7 @@ def check_policy_version_and_refresh(self) -> bool:
                             # Keep the flag set to maintain the stop state
                     
                     self._log_event("POLICY_VERSION_UPDATED", {
-                        "old_version": self.cached_policy_version,
+                        "old_version": old_version,
                         "new_version": current_version,
                         "timestamp": current_time
                     })
@@ -1179,6 +1519,8 @@ def check_policy_version_and_refresh(self) -> bool:
         except Exception as e:
             logger.warning(f"Failed to check policy version: {e}")
             # Don't fail if version check fails, just continue with existing version
+        finally:
+            self._policy_version_lock.release()
             
         return False
 
@@ -1217,130 +1559,38 @@ def check_policy(self, policy_type: str, context: Dict[str, Any]) -> Dict[str, A
             # Record check time
             self.last_policy_check_time = time.time()
             
-            # Call policy engine API
-            headers = {'Content-Type': 'application/json'}
-            if self.policy_auth_token:
-                headers['Authorization'] = f"Bearer {self.policy_auth_token}"
+            # Call policy engine API (decisions for identical contexts are reused
+            # until the TTL expires or the policy version changes)
+            try:
+                result = self.policy_client.check(policy_type, context)
+            except PolicyUnavailableError as e:
+                logger.error(str(e))
                 
-            payload = {
-                'policy_type': policy_type,
-                'context': context
-            }
-            
-            # Setup retry mechanism
-            retries = 0
-            last_error = None
-            
-            while retries <= self.policy_max_retries:
-                if retries > 0:
-                    logger.warning(f"Retrying policy check ({retries}/{self.policy_max_retries})")
-                    time.sleep(self.policy_retry_delay)
+                # In strict mode, fail if policy check fails
+                if self.strict_policy_mode:
+                    raise PolicyEnforcementError(str(e))
                 
-                # Try the v1 API first
-                try:
-                    response = requests.post(
-                        f"{self.policy_engine_url}/api/v1/check",
-                        headers=headers,
-                        json=payload,
-                        timeout=self.policy_timeout
-                    )
-                    response.raise_for_status() # Will raise an HTTPError if the HTTP request returned an unsuccessful status code
-                    
-                    # No need to check response.status_code == 200 if raise_for_status() is used and doesn't raise
-                    result = response.json()
-                    logger.info(f"Policy check result from v1 API: {result}")
-                    
-                    # Add signature to the result for verification
-                    result["signature"] = signature
-                    
-                    # --- Metrics Tracking --- 
-                    if result and result.get('allowed'):
-                         with metrics_lock:
-                              global_metrics["policy_checks_allowed"] += 1
-                    else:
-                         with metrics_lock:
-                              global_metrics["policy_checks_denied"] += 1
-                    # --- End Metrics --- 
-                    
-                    return result
-                except requests.exceptions.HTTPError as http_err:
-                    logger.warning(f"HTTP error using v1 policy API ({http_err.response.status_code}): {http_err}. Trying legacy endpoint.")
-                    last_error = http_err
-                except requests.exceptions.Timeout as timeout_err:
-                    logger.warning(f"Timeout error using v1 policy API: {timeout_err}. Trying legacy endpoint.")
-                    last_error = timeout_err
-                except requests.exceptions.ConnectionError as conn_err:
-                    logger.warning(f"Connection error using v1 policy API: {conn_err}. Trying legacy endpoint.")
-                    last_error = conn_err
-                except requests.exceptions.JSONDecodeError as json_err: # If server returns non-JSON on 200 OK for some reason
-                    logger.warning(f"JSON decode error from v1 policy API: {json_err}. Raw response: {response.text[:200] if response else 'N/A'}. Trying legacy endpoint.")
-                    last_error = json_err
-                except requests.exceptions.RequestException as req_err: # Catch other requests library specific errors
-                    logger.warning(f"General request exception using v1 policy API: {req_err}. Trying legacy endpoint.")
-                    last_error = req_err
-                except Exception as e_v1_unexpected: # Catch any other truly unexpected errors
-                    logger.error(f"Unexpected error using v1 policy API: {e_v1_unexpected}. Trying legacy endpoint.", exc_info=True)
-                    last_error = e_v1_unexpected
-                
-                # Try the legacy endpoint
-                logger.debug("Attempting to use legacy policy API endpoint.")
-                try:
-                    response = requests.post(
-                        f"{self.policy_engine_url}/api/check_policy",
-                        headers=headers,
-                        json=payload,
-                        timeout=self.policy_timeout
-                    )
-                    response.raise_for_status() # Will raise an HTTPError if the HTTP request returned an unsuccessful status code
-                    
-                    # No need to check response.status_code == 200 if raise_for_status() is used and doesn't raise
-                    result = response.json()
-                    logger.info(f"Policy check result from legacy API: {result}")
-                    
-                    # Add signature to the result for verification
-                    result["signature"] = signature
-                    
-                    # --- Metrics Tracking --- 
-                    if result and result.get('allowed'):
-                         with metrics_lock:
-                              global_metrics["policy_checks_allowed"] += 1
-                    else:
-                         with metrics_lock:
-                              global_metrics["policy_checks_denied"] += 1
-                    # --- End Metrics --- 
-                    
-                    return result
-                except requests.exceptions.HTTPError as http_err_legacy:
-                    logger.warning(f"HTTP error using legacy policy API ({http_err_legacy.response.status_code}): {http_err_legacy}. All attempts failed for this retry.")
-                    last_error = http_err_legacy
-                except requests.exceptions.Timeout as timeout_err_legacy:
-                    logger.warning(f"Timeout error using legacy policy API: {timeout_err_legacy}. All attempts failed for this retry.")
-                    last_error = timeout_err_legacy
-                except requests.exceptions.ConnectionError as conn_err_legacy:
-                    logger.warning(f"Connection error using legacy policy API: {conn_err_legacy}. All attempts failed for this retry.")
-                    last_error = conn_err_legacy
-                except requests.exceptions.JSONDecodeError as json_err_legacy: # If server returns non-JSON on 200 OK
-                    logger.warning(f"JSON decode error from legacy policy API: {json_err_legacy}. Raw response: {response.text[:200] if response else 'N/A'}. All attempts failed for this retry.")
-                    last_error = json_err_legacy
-                except requests.exceptions.RequestException as req_err_legacy: # Catch other requests library specific errors
-                    logger.warning(f"General request exception using legacy policy API: {req_err_legacy}. All attempts failed for this retry.")
-                    last_error = req_err_legacy
-                except Exception as e_legacy_unexpected: # Catch any other truly unexpected errors
-                    logger.error(f"Unexpected error using legacy policy API: {e_legacy_unexpected}. All attempts failed for this retry.", exc_info=True)
-                    last_error = e_legacy_unexpected
-                
-                retries += 1
-            
-            # If we get here, all retries failed
-            logger.error(f"Policy check failed after {retries} retries: {last_error}")
+                # Default to allowing if policy engine is unreachable
+                return {"allowed": True, "reason": f"Policy engine unavailable: {e}", "signature": signature}
             
-            # In strict mode, fail if policy check fails
-            if self.strict_policy_mode:
-                raise PolicyEnforcementError(f"Policy check failed after {retries} retries: {last_error}")
+            # Add signature to the result for verification
+            result["signature"] = signature
             
-            # Default to allowing if policy engine is unreachable
-            return {"allowed": True, "reason": f"Policy engine unavailable after {retries} retries: {last_error}", "signature": signature}
+            # --- Metrics Tracking --- 
+            if result and result.get('allowed'):
+                 with metrics_lock:
+                      global_metrics["policy_checks_allowed"] += 1
+            else:
+                 with metrics_lock:
+                      global_metrics["policy_checks_denied"] += 1
+            # --- End Metrics --- 
+            
+            return result
                 
+        except PolicyEnforcementError:
+            with metrics_lock:
+                global_metrics["policy_checks_denied"] += 1 # Count errors as denials for metrics
+            raise
         except Exception as e:
             logger.error(f"Error checking policy: {e}")
             
@@ -1356,6 +1606,25 @@ def check_policy(self, policy_type: str, context: Dict[str, Any]) -> Dict[str, A
             # Default to allowing if policy engine is unreachable
             return {"allowed": True, "reason": f"Error checking policy: {e}", "signature": "error"}
     
+    def check_policies(self, checks: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        Run several policy checks concurrently.
+        
+        Args:
+            checks: List of (policy_type, context) pairs
+            
+        Returns:
+            Policy decisions in the order of the checks, as returned by check_policy
+        """
+        if len(checks) <= 1:
+            return [self.check_policy(policy_type, context) for policy_type, context in checks]
+        
+        self.check_policy_version_and_refresh()
+        futures = [self.policy_client.submit(self.check_policy, policy_type, context)
+                   for policy_type, context in checks]
+        # Raises the first failure, like a sequence of check_policy calls would
+        return [future.result() for future in futures]
+    
     def verify_policy_result(self, result: Dict[str, Any]) -> bool:
         """
         Verify that a policy result is valid and hasn't been tampered with.
@@ -1473,7 +1742,7 @@ def client_filter(self, client_properties: Dict[str, Any]) -> bool:
             True if client should be allowed to join, False otherwise
         """
         try:
-            logger.info(f"Checking client properties for filtering: {client_properties}")
+            logger.debug(f"Checking client properties for filtering: {client_properties}")
             
             # Check policy
             policy_context = {
@@ -1528,6 +1797,8 @@ def evaluate_clients(self, clients_results: Dict[str, Any]) -> Dict[str, Any]:
         try:
             filtered_results = {}
             
+            # Build every client's context first so the checks can run concurrently
+            policy_checks = []
             for client_id, result in clients_results.items():
                 # Extract model parameters and metrics
                 parameters = result.get("parameters", None)
@@ -1547,9 +1818,11 @@ def evaluate_clients(self, clients_results: Dict[str, Any]) -> Dict[str, Any]:
                     "total_rounds": int(self.rounds),
                     "timestamp": time.time()
                 }
-                
-                policy_result = self.check_policy("fl_server_aggregation", policy_context)
-                
+                policy_checks.append(("fl_server_aggregation", policy_context))
+            
+            policy_results = self.check_policies(policy_checks)
+            
+            for (client_id, result), policy_result in zip(clients_results.items(), policy_results):
                 # Verify policy result
                 if not self.verify_policy_result(policy_result):
                     logger.error(f"Policy verification failed for client {client_id}")
@@ -1616,6 +1889,8 @@ def get_metrics():
                     else:
                         response["data_state"] = "initializing"
                 
+            response["policy_client"] = self.policy_client.get_stats()
+            response["checkpoints"] = self.checkpoint_store.get_stats()
             return jsonify(response)
             
         @self.metrics_app.route('/health', methods=['GET'])
@@ -1631,55 +1906,38 @@ def get_events():
             Query parameters:
                 since_event_id: Optional event ID to get events after this ID
                 limit: Maximum number of events to return (default: 1000)
+                wait: Seconds to wait for new events when there are none (default: 0, max: 60)
             """
             try:
                 # Parse query parameters
                 since_event_id = request.args.get('since_event_id')
                 limit = int(request.args.get('limit', 1000))  # No hard maximum limit
+                wait = min(max(float(request.args.get('wait', 0)), 0.0), 60.0)
                 
-                logger.debug(f"Events endpoint called with since_event_id={since_event_id}, limit={limit}")
+                logger.debug(f"Events endpoint called with since_event_id={since_event_id}, limit={limit}, wait={wait}")
                 
-                # Lock the buffer while making a copy
-                with self.buffer_lock:
-                    # Make a snapshot to work with
-                    current_events = list(self.event_buffer)
-                    
-                    if not current_events:
-                        logger.debug("Event buffer is empty")
-                        return jsonify({"events": [], "last_event_id": None})
-                    
-                    last_event_id = current_events[-1]["event_id"] if current_events else None
-                    logger.debug(f"Found {len(current_events)} events in buffer, last_event_id={last_event_id}")
-                    
-                    # Filter events after since_event_id if provided
-                    start_index = 0
-                    if since_event_id:
-                        # Find the index of the event *after* since_event_id
-                        found = False
-                        for i, event in enumerate(current_events):
-                            if event["event_id"] == since_event_id:
-                                start_index = i + 1
-                                found = True
-                                logger.debug(f"Found event at index {i}, returning events starting from index {start_index}")
-                                break
-                                
-                        # If since_event_id not found, return all events
-                        if not found:
-                            logger.debug(f"Event ID {since_event_id} not found, returning all events")
-                            start_index = 0
-                    
-                    # Slice the list based on start_index and limit
-                    results = current_events[start_index : start_index + limit]
-                    logger.debug(f"Returning {len(results)} events")
+                result = self.event_buffer.read_or_wait(since_event_id, limit=limit, timeout=wait)
+                logger.debug(f"Returning {len(result['events'])} events")
                 
                 return jsonify({
-                    "events": results,
-                    "last_event_id": last_event_id
+                    "events": result["events"],
+                    "last_event_id": result["last_event_id"]
                 })
             except Exception as e:
                 logger.error(f"Error in /events endpoint: {str(e)}", exc_info=True)
                 return jsonify({"error": str(e), "events": [], "last_event_id": None}), 500
         
+        @self.metrics_app.route('/events/stream', methods=['GET'])
+        def stream_events():
+            """
+            Stream events as Server-Sent Events.
+            
+            Resumes after the Last-Event-ID header or the since_event_id query parameter.
+            """
+            since_event_id = request.headers.get('Last-Event-ID') or request.args.get('since_event_id')
+            return Response(self.event_buffer.stream(since_event_id), mimetype='text/event-stream',
+                            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+        
         @self.metrics_app.route('/rounds', methods=['GET'])
         def get_rounds():
             """
@@ -1706,8 +1964,8 @@ def get_rounds():
                 if not fl_round_storage:
                     return jsonify({"error": "Round storage not initialized", "rounds": []}), 500
                 
-                # Get rounds from persistent storage
-                rounds = fl_round_storage.get_rounds(
+                # Rounds, matching total and latest round in one storage round-trip
+                page = fl_round_storage.get_rounds_page(
                     start_round=start_round,
                     end_round=end_round,
                     limit=limit,
@@ -1715,17 +1973,9 @@ def get_rounds():
                     min_accuracy=min_accuracy,
                     max_accuracy=max_accuracy
                 )
-                
-                # Get total count for pagination
-                total_count = fl_round_storage.get_round_count(
-                    start_round=start_round,
-                    end_round=end_round,
-                    min_accuracy=min_accuracy,
-                    max_accuracy=max_accuracy
-                )
-                
-                # Get latest round number
-                latest_round = fl_round_storage.get_latest_round_number()
+                rounds = page["rounds"]
+                total_count = page["total"]
+                latest_round = page["latest"]
                 
                 return jsonify({
                     "rounds": rounds,
@@ -1964,7 +2214,9 @@ def _run_metrics_server(self):
             def page_not_found(e):
                 return jsonify({"error": "Endpoint not found", "available_endpoints": ["/", "/health", "/metrics", "/events"]}), 404
                 
-            run_simple(self.metrics_host, self.metrics_port, self.metrics_app, use_reloader=False, use_debugger=False)
+            # Threaded so that long-polling and streaming event consumers don't block other requests
+            run_simple(self.metrics_host, self.metrics_port, self.metrics_app, use_reloader=False, use_debugger=False,
+                       threaded=True)
             logger.info(f"Metrics API server started successfully on {self.metrics_host}:{self.metrics_port}")
         except Exception as e:
             logger.error(f"Metrics API server failed: {e}", exc_info=True)
@@ -2129,13 +2381,23 @@ def start(self) -> bool:
                 if initial_parameters:
                     logger.info("Loaded model parameters from checkpoint for server restart")
                 
-            self.strategy = MetricsTrackingStrategy(
+            strategy_kwargs = dict(
                 server_instance=self,  # Pass server instance to strategy
                 min_fit_clients=self.min_clients,
                 min_available_clients=self.min_available_clients,
                 min_evaluate_clients=self.min_clients,
-                initial_parameters=initial_parameters  # Provide saved parameters if available
+                initial_parameters=initial_parameters,  # Provide saved parameters if available
+                aggregation_dtype=self.config.get("aggregation_dtype", "float64")
             )
+            aggregation_method = self.config.get("aggregation_method", "fedavg")
+            if aggregation_method in ROBUST_AGGREGATORS:
+                logger.info(f"Using robust aggregation: {aggregation_method}")
+                self.strategy = RobustAggregationStrategy(aggregation_method=aggregation_method,
+                                                          aggregation_config=self.config, **strategy_kwargs)
+            else:
+                if aggregation_method != "fedavg":
+                    logger.warning(f"Unknown aggregation method '{aggregation_method}', using fedavg")
+                self.strategy = MetricsTrackingStrategy(**strategy_kwargs)
             # --- End Strategy --- 
 
             # Add immediate confirmation that server is initializing - this will trigger the entrypoint detection
@@ -2197,6 +2459,8 @@ def _start_training_loop(self):
             history = fl.server.start_server(
                 server_address=self.server_address,
                 strategy=self.strategy,
+                client_manager=RegistryClientManager(self.client_registry,
+                                                     weighted=self.client_selection == "utility"),
                 config=server_config
             )
             
@@ -2269,6 +2533,8 @@ def stop(self) -> bool:
             # If metrics server is running in a thread, we might need to signal it
             # but daemon=True should handle this on main thread exit.
             pass
+        # Finish writing any queued checkpoint
+        self.checkpoint_store.close()
         self.is_running = False
         logger.info("FL Server stopped")
         return True
@@ -2494,6 +2760,11 @@ def _restart_training(self):
                 "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat()
             })
             
+            # Resume from the last checkpoint; Flower drops the strategy's initial parameters once used
+            resume_parameters = self._resume_parameters()
+            if resume_parameters is not None and self.strategy is not None:
+                self.strategy.initial_parameters = resume_parameters
+            
             # Restart the training loop - this will continue from current round
             self._start_training_loop()
             
@@ -2561,45 +2832,31 @@ def _monitor_policy_for_training_approval(self):
         return False
 
     def _save_model_checkpoint(self, parameters, round_num: int):
-        """Save model parameters to checkpoint file for restart capability."""
+        """Queue model parameters for writing to the checkpoint store for restart capability."""
         try:
-            import pickle
-            checkpoint_data = {
-                "parameters": parameters,
-                "round": round_num,
-                "timestamp": time.time(),
+            self.checkpoint_store.save(parameters, round_num, {
                 "model_name": self.model_name,
                 "dataset": self.dataset
-            }
-            
-            with open(self.model_checkpoint_file, 'wb') as f:
-                pickle.dump(checkpoint_data, f)
-                
-            logger.info(f"Saved model checkpoint for round {round_num} to {self.model_checkpoint_file}")
+            })
+            logger.info(f"Queued model checkpoint for round {round_num} in {self.checkpoint_store.directory}")
             self.saved_parameters = parameters
             
         except Exception as e:
             logger.warning(f"Failed to save model checkpoint: {e}")
     
     def _load_model_checkpoint(self):
-        """Load model parameters from checkpoint file if available."""
+        """Load model parameters from the newest checkpoint if available."""
         try:
-            import pickle
-            import os
-            
-            if not os.path.exists(self.model_checkpoint_file):
-                logger.info("No model checkpoint file found")
-                return None
+            checkpoint = self.checkpoint_store.latest_checkpoint()
+            if checkpoint is None:
+                return self._load_legacy_model_checkpoint()
                 
-            with open(self.model_checkpoint_file, 'rb') as f:
-                checkpoint_data = pickle.load(f)
-                
-            parameters = checkpoint_data.get("parameters")
-            round_num = checkpoint_data.get("round", 0)
-            model_name = checkpoint_data.get("model_name", "unknown")
-            dataset = checkpoint_data.get("dataset", "unknown")
+            round_num = checkpoint.get("round", 0)
+            model_name = checkpoint.get("model_name", "unknown")
+            dataset = checkpoint.get("dataset", "unknown")
             
             if model_name == self.model_name and dataset == self.dataset:
+                parameters = self.checkpoint_store.load_parameters(checkpoint)
                 logger.info(f"Loaded model checkpoint from round {round_num}")
                 self.saved_parameters = parameters
                 return parameters
@@ -2611,6 +2868,44 @@ def _load_model_checkpoint(self):
             logger.warning(f"Failed to load model checkpoint: {e}")
             return None
 
+    def _load_legacy_model_checkpoint(self):
+        """Load parameters from a pickle checkpoint written by earlier versions, if one exists."""
+        try:
+            import pickle
+            
+            if not os.path.exists(self.model_checkpoint_file):
+                logger.info("No model checkpoint file found")
+                return None
+                
+            with open(self.model_checkpoint_file, 'rb') as f:
+                checkpoint_data = pickle.load(f)
+                
+            if (checkpoint_data.get("model_name") != self.model_name or
+                    checkpoint_data.get("dataset") != self.dataset):
+                logger.warning(f"Legacy checkpoint model mismatch, ignoring {self.model_checkpoint_file}")
+                return None
+            parameters = checkpoint_data.get("parameters")
+            logger.info(f"Loaded legacy model checkpoint from round {checkpoint_data.get('round', 0)}")
+            self.saved_parameters = parameters
+            return parameters
+                
+        except Exception as e:
+            logger.warning(f"Failed to load legacy model checkpoint: {e}")
+            return None
+
+    def _resume_parameters(self):
+        """
+        Get the parameters to resume training from.
+
+        Uses the checkpoint saved by this process when there is one, so resuming
+        does not depend on model size; otherwise loads the newest stored checkpoint.
+        """
+        latest = self.checkpoint_store.latest
+        if latest and latest.get("model_name") == self.model_name and latest.get("dataset") == self.dataset:
+            logger.info(f"Resuming from in-memory checkpoint of round {latest['round']}")
+            return latest["parameters"]
+        return self._load_model_checkpoint()
+
     def pause_training(self, reason: str = "Policy denied"):
         """
         Pause the FL training without disconnecting clients.
@@ -0,0 +1,245 @@
+"""
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Policy engine client for the FL server.
+
+Keeps a pooled keep-alive HTTP session to the policy engine, caches decisions
+per normalized context and policy version, and evaluates batches of checks
+concurrently on a small thread pool.
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Context fields that change on every call without changing the decision
+VOLATILE_CONTEXT_KEYS = frozenset({"timestamp", "current_timestamp", "signature", "round_start_time"})
+
+CHECK_ENDPOINTS = ("/api/v1/check", "/api/check_policy")
+
+
+class PolicyUnavailableError(Exception):
+    """Raised when no policy engine endpoint returned a decision."""
+    pass
+
+
+class PolicyClient:
+    """HTTP client for policy engine decisions with a decision cache."""
+
+    def __init__(self, base_url: str, auth_token: Optional[str] = None, timeout: float = 10,
+                 max_retries: int = 3, retry_delay: float = 2, cache_ttl: float = 10,
+                 cache_size: int = 1024, pool_size: int = 16, max_workers: int = 8):
+        """
+        Initialize the policy client.
+
+        Args:
+            base_url: Base URL of the policy engine
+            auth_token: Optional bearer token sent with every request
+            timeout: Timeout in seconds for each request
+            max_retries: Retries after the first failed attempt
+            retry_delay: Seconds to wait between retries
+            cache_ttl: Seconds a decision is reused for an identical context (0 disables caching)
+            cache_size: Maximum number of cached decisions
+            pool_size: Maximum keep-alive connections to the policy engine
+            max_workers: Threads used to evaluate batched checks
+        """
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.cache_ttl = cache_ttl
+        self.cache_size = max(1, int(cache_size))
+        self.max_workers = max(1, int(max_workers))
+
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+        if auth_token:
+            self.session.headers["Authorization"] = f"Bearer {auth_token}"
+        # Retries are handled here so that both endpoints are tried on each attempt
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(int(pool_size), self.max_workers),
+                              max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.policy_version = 0
+        self._preferred_endpoint = 0
+        self._cache = OrderedDict()  # key -> (result, expires_at)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._stats = {
+            "requests": 0,
+            "cache_hits": 0,
+            "cache_misses": 0,
+            "failures": 0
+        }
+
+    def set_policy_version(self, version: int) -> bool:
+        """
+        Record the policy engine's policy version, dropping cached decisions if it changed.
+
+        Returns:
+            True if the version changed
+        """
+        with self._lock:
+            if version == self.policy_version:
+                return False
+            self.policy_version = version
+            self._cache.clear()
+        return True
+
+    def fetch_policy_version(self) -> Optional[int]:
+        """Get the current policy version from the policy engine, or None if unavailable."""
+        response = self.session.get(f"{self.base_url}/api/v1/policy_version", timeout=self.timeout)
+        if response.status_code != 200:
+            return None
+        return response.json().get("policy_version", 0)
+
+    def cache_key(self, policy_type: str, context: Dict[str, Any]) -> str:
+        """Build the cache key of a check from its normalized context and the policy version."""
+        normalized = {k: v for k, v in context.items() if k not in VOLATILE_CONTEXT_KEYS}
+        data = json.dumps([policy_type, self.policy_version, normalized], sort_keys=True, default=str)
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    def _get_cached(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            result, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return copy.deepcopy(result)
+
+    def _store(self, key: str, result: Dict[str, Any]):
+        with self._lock:
+            self._cache[key] = (copy.deepcopy(result), time.monotonic() + self.cache_ttl)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _post(self, endpoint_index: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self._stats["requests"] += 1
+        response = self.session.post(f"{self.base_url}{CHECK_ENDPOINTS[endpoint_index]}",
+                                     json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def check(self, policy_type: str, context: Dict[str, Any], use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Get a policy decision, reusing a cached decision for an identical context.
+
+        Both the v1 and the legacy endpoint are tried on each attempt, starting with
+        the one that answered last.
+
+        Args:
+            policy_type: Type of policy to check
+            context: Context information for policy evaluation
+            use_cache: Reuse and store decisions in the decision cache
+
+        Returns:
+            Policy decision returned by the policy engine
+
+        Raises:
+            PolicyUnavailableError: If every attempt failed
+        """
+        caching = use_cache and self.cache_ttl > 0
+        key = self.cache_key(policy_type, context) if caching else None
+        if caching:
+            cached = self._get_cached(key)
+            if cached is not None:
+                with self._lock:
+                    self._stats["cache_hits"] += 1
+                return cached
+            with self._lock:
+                self._stats["cache_misses"] += 1
+
+        payload = {"policy_type": policy_type, "context": context}
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt > 0:
+                logger.warning(f"Retrying policy check ({attempt}/{self.max_retries})")
+                time.sleep(self.retry_delay)
+
+            first = self._preferred_endpoint
+            for endpoint_index in (first, 1 - first):
+                try:
+                    result = self._post(endpoint_index, payload)
+                except (requests.exceptions.RequestException, ValueError) as e:
+                    logger.warning(f"Policy check via {CHECK_ENDPOINTS[endpoint_index]} failed: {e}")
+                    last_error = e
+                    continue
+
+                self._preferred_endpoint = endpoint_index
+                logger.info(f"Policy check result from {CHECK_ENDPOINTS[endpoint_index]}: {result}")
+                if caching:
+                    self._store(key, result)
+                return result
+
+        with self._lock:
+            self._stats["failures"] += 1
+        raise PolicyUnavailableError(f"Policy check failed after {self.max_retries} retries: {last_error}")
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        """Run a function on the client's thread pool, e.g. a policy check."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix="policy-check")
+            executor = self._executor
+        return executor.submit(fn, *args, **kwargs)
+
+    def check_many(self, checks: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        Get decisions for several checks concurrently.
+
+        Returns:
+            Decisions in the order of the checks
+
+        Raises:
+            PolicyUnavailableError: If any check failed
+        """
+        futures = [self.submit(self.check, policy_type, context) for policy_type, context in checks]
+        return [future.result() for future in futures]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get request and cache counters."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["cached_decisions"] = len(self._cache)
+        stats["policy_version"] = self.policy_version
+        stats["preferred_endpoint"] = CHECK_ENDPOINTS[self._preferred_endpoint]
+        return stats
+
+    def close(self):
+        """Shut down the thread pool and close pooled connections."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+        self.session.close()
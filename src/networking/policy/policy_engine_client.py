@@ -51,6 +51,7 @@ def __init__(self, policy_engine_url: str = "http://policy-engine:5000",
         self.refresh_thread = None
         self._last_fetch_successful: bool = False
         self._lock = threading.Lock() # Lock for accessing shared state
+        self._policy_version: Optional[tuple] = None  # Version of the cached policies
         
         # Start refresh thread
         self.refresh_thread = threading.Thread(target=self._refresh_policies)
@@ -63,17 +64,45 @@ def _refresh_policies(self) -> None:
         """Periodically refresh policies from the policy engine."""
         while not self.stop_refresh:
             try:
-                old_policies = self.policies.copy()
-                self.policies = self._fetch_policies()
-                
-                # Check if policies have changed
-                if old_policies != self.policies:
-                    self._notify_policy_change()
+                # Skip the fetch while the engine reports the version fetched last time
+                version = self._fetch_policy_version()
+                if version is not None and version == self._policy_version:
+                    with self._lock:
+                        self._last_fetch_successful = True
+                else:
+                    old_policies = self.policies.copy()
+                    self.policies = self._fetch_policies()
+                    if self.check_policy_engine_status():
+                        self._policy_version = version
+                    
+                    # Check if policies have changed
+                    if old_policies != self.policies:
+                        self._notify_policy_change()
             except Exception as e:
                 self.logger.error(f"Error refreshing policies: {e}")
             
             time.sleep(self.refresh_interval)
     
+    def _fetch_policy_version(self) -> Optional[tuple]:
+        """
+        Get the policy engine's policy version, or None if the engine does not report one.
+        
+        Returns:
+            (policy_version, total_policies, last_updated), so that a restarted engine with a
+            different policy set is not mistaken for an unchanged one
+        """
+        try:
+            response = requests.get(f"{self.policy_engine_url}/api/v1/policy_version", timeout=5)
+            if response.status_code != 200:
+                return None
+            data = response.json()
+            if "policy_version" not in data:
+                return None
+            return (data["policy_version"], data.get("total_policies"), data.get("last_updated"))
+        except (requests.exceptions.RequestException, ValueError) as e:
+            self.logger.debug(f"Policy version unavailable: {e}")
+            return None
+    
     def _fetch_policies(self) -> List[Dict[str, Any]]:
         """
         Fetch policies from the remote policy engine.
@@ -22,10 +22,12 @@
 from .policy_switch_core import PolicySwitchCore  
 from .policy_engine_mixin import PolicyEngineMixin
 from .policy_switch_api import PolicySwitchRESTController
+from .flow_classifier import FlowClassifier
 
 __all__ = [
     'PolicySwitch',
     'PolicySwitchCore', 
     'PolicyEngineMixin',
-    'PolicySwitchRESTController'
+    'PolicySwitchRESTController',
+    'FlowClassifier'
 ]
@@ -0,0 +1,439 @@
+"""
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Compiled Flow Policy Classifier
+
+Policies are compiled once per update into rules with pre-parsed networks,
+port ranges and protocol numbers. Rules are indexed by protocol and then by
+destination (prefix buckets per prefix length, exact addresses and
+wildcards), so a lookup only evaluates the rules that can match the packet's
+protocol and destination. Decisions are cached per 5-tuple in an LRU that is
+dropped together with the classifier when policies change.
+
+The decisions are the same as PolicyEngineMixin._condition_matches evaluated
+over all policies in order: the first matching 'allow' or 'deny' rule wins and
+traffic is allowed when no rule matches.
+"""
+
+import heapq
+import ipaddress
+import json
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from itertools import count
+from typing import Any, Dict, List, Optional, Tuple
+
+LOG = logging.getLogger('ryu.app.policy_switch.classifier')
+
+DEFAULT_CACHE_SIZE = 4096
+PROTOCOL_NUMBERS = {'tcp': 6, 'udp': 17, 'icmp': 1}
+
+# Field matcher kinds; a field without a matcher (None) matches anything
+_PRESENT = 'present'   # value must be given, e.g. {'field': 'dst_ip', 'value': 'any'}
+_EQUAL = 'equal'       # exact comparison with the packet value
+_NETWORK = 'network'   # packet address inside a CIDR network
+_RANGE = 'range'       # port within [start, end]
+
+
+class _Never(Exception):
+    """Raised while compiling a condition that can never match."""
+
+
+class _CompiledRule:
+    """A policy rule with its matchers parsed into comparable values."""
+
+    __slots__ = ('order', 'allow', 'policy_id', 'src_ip', 'dst_ip', 'protocol', 'src_port', 'dst_port')
+
+    def __init__(self, order: int, allow: bool, policy_id: Any):
+        self.order = order
+        self.allow = allow
+        self.policy_id = policy_id
+        self.src_ip = None
+        self.dst_ip = None
+        self.protocol = None
+        self.src_port = None
+        self.dst_port = None
+
+    def matches(self, src_ip, src_addr, dst_ip, dst_addr, ip_proto, src_port, dst_port) -> bool:
+        return (_ip_matches(self.src_ip, src_ip, src_addr)
+                and _ip_matches(self.dst_ip, dst_ip, dst_addr)
+                and _value_matches(self.protocol, ip_proto)
+                and _value_matches(self.src_port, src_port)
+                and _value_matches(self.dst_port, dst_port))
+
+
+def _ip_matches(matcher, ip, addr) -> bool:
+    if matcher is None:
+        return True
+    kind, value = matcher
+    if kind == _PRESENT:
+        return bool(ip)
+    if ip is None:
+        return False
+    if kind == _NETWORK:
+        network, text = value
+        if addr is None:
+            # Unparseable packet address: compared as a string like the uncompiled check
+            return ip == text
+        return addr.version == network.version and addr in network
+    return ip == value
+
+
+def _value_matches(matcher, value) -> bool:
+    if matcher is None:
+        return True
+    if value is None:
+        return False
+    kind, expected = matcher
+    if kind == _RANGE:
+        return expected[0] <= value <= expected[1]
+    if kind == _EQUAL:
+        return value == expected
+    return True
+
+
+def _parse_address(ip: Optional[str]):
+    if not ip:
+        return None
+    try:
+        return ipaddress.ip_address(ip)
+    except ValueError:
+        return None
+
+
+def _compile_ip(rule_ip, required: bool):
+    """Compile an address rule (CIDR, exact address or 'any')."""
+    if rule_ip is None:
+        return (_PRESENT, None) if required else None
+    if not isinstance(rule_ip, str):
+        raise _Never(f"unsupported address {rule_ip!r}")
+    if rule_ip.lower() == 'any':
+        return (_PRESENT, None) if required else None
+    if '/' in rule_ip:
+        try:
+            return (_NETWORK, (ipaddress.ip_network(rule_ip, strict=False), rule_ip))
+        except ValueError:
+            pass
+    return (_EQUAL, rule_ip)
+
+
+def _compile_port(rule_port, required: bool):
+    """Compile a port rule (number, 'start-end' range or 'any')."""
+    if rule_port == 'any' or rule_port is None:
+        return (_PRESENT, None) if required else None
+    if isinstance(rule_port, str):
+        if '-' in rule_port:
+            try:
+                start, end = map(int, rule_port.split('-'))
+            except (ValueError, TypeError) as e:
+                raise _Never(f"invalid port range {rule_port!r}: {e}")
+            return (_RANGE, (start, end))
+        if rule_port.isdigit():
+            return (_EQUAL, int(rule_port))
+        raise _Never(f"invalid port {rule_port!r}")
+    return (_EQUAL, rule_port)
+
+
+def _compile_protocol(rule_proto, required: bool):
+    """Compile a protocol rule (name, number string or 'any')."""
+    if rule_proto is None or str(rule_proto).lower() == 'any':
+        return (_PRESENT, None) if required else None
+    number = None
+    if isinstance(rule_proto, str):
+        number = PROTOCOL_NUMBERS.get(rule_proto.lower())
+        if number is None and rule_proto.isdigit():
+            number = int(rule_proto)
+    if number is None:
+        raise _Never(f"unsupported protocol {rule_proto!r}")
+    return (_EQUAL, number)
+
+
+def compile_rule(condition: Dict[str, Any], order: int, policy_id: Any) -> Optional[_CompiledRule]:
+    """
+    Compile one policy rule.
+
+    Args:
+        condition: Rule in field format ({'field', 'value'}) or match format ({'match'})
+        order: Position of the rule across all policies
+        policy_id: Policy the rule belongs to
+
+    Returns:
+        Compiled rule, or None if the rule can never decide a packet
+    """
+    action = condition.get('action', 'allow')
+    if action not in ('allow', 'deny'):
+        # Matching rules with other actions are skipped by the policy check
+        return None
+    rule = _CompiledRule(order, action == 'allow', policy_id)
+    try:
+        if 'field' in condition:
+            field, value = condition['field'], condition.get('value')
+            if field in ('src_ip', 'dst_ip'):
+                setattr(rule, field, _compile_ip(value, required=True))
+            elif field == 'protocol':
+                rule.protocol = _compile_protocol(value, required=True)
+            elif field in ('src_port', 'dst_port'):
+                setattr(rule, field, _compile_port(value, required=True))
+            else:
+                return None
+        elif 'match' in condition:
+            match = condition['match']
+            if 'src_ip' in match or 'ipv4_src' in match:
+                rule.src_ip = _compile_ip(match.get('src_ip', match.get('ipv4_src')), required=False)
+            if 'dst_ip' in match or 'ipv4_dst' in match:
+                rule.dst_ip = _compile_ip(match.get('dst_ip', match.get('ipv4_dst')), required=False)
+            if 'protocol' in match or 'ip_proto' in match:
+                rule.protocol = _compile_protocol(match.get('protocol', match.get('ip_proto')), required=False)
+            if 'src_port' in match:
+                rule.src_port = _compile_port(match['src_port'], required=False)
+            if 'dst_port' in match:
+                rule.dst_port = _compile_port(match['dst_port'], required=False)
+        else:
+            return None
+    except _Never as e:
+        LOG.warning(f"Policy {policy_id} rule {order} can never match: {e}")
+        return None
+    return rule
+
+
+class _DestinationIndex:
+    """Rules of one protocol bucket indexed by destination address."""
+
+    def __init__(self):
+        self.prefixes: Dict[Tuple[int, int, int], List[_CompiledRule]] = {}  # (version, length, network) -> rules
+        self.prefix_lengths: Dict[int, List[int]] = {4: [], 6: []}
+        self.exact: Dict[str, List[_CompiledRule]] = {}
+        self.wildcard: List[_CompiledRule] = []
+
+    def add(self, rule: _CompiledRule):
+        matcher = rule.dst_ip
+        if matcher is None or matcher[0] == _PRESENT:
+            self.wildcard.append(rule)
+        elif matcher[0] == _NETWORK:
+            network, text = matcher[1]
+            key = (network.version, network.prefixlen, int(network.network_address))
+            self.prefixes.setdefault(key, []).append(rule)
+            if network.prefixlen not in self.prefix_lengths[network.version]:
+                self.prefix_lengths[network.version].append(network.prefixlen)
+            # Also reachable by its text for destinations that are not valid addresses
+            self.exact.setdefault(text, []).append(rule)
+        else:
+            self.exact.setdefault(matcher[1], []).append(rule)
+
+    def candidates(self, dst_ip, dst_addr, out: List[List[_CompiledRule]]):
+        """Append the rule lists (each in rule order) that can match a destination."""
+        if self.wildcard:
+            out.append(self.wildcard)
+        if dst_ip is None:
+            return
+        exact = self.exact.get(dst_ip)
+        if exact:
+            out.append(exact)
+        if dst_addr is not None and self.prefixes:
+            version = dst_addr.version
+            bits = 32 if version == 4 else 128
+            value = int(dst_addr)
+            for length in self.prefix_lengths[version]:
+                network = value >> (bits - length) << (bits - length) if length else 0
+                rules = self.prefixes.get((version, length, network))
+                if rules:
+                    out.append(rules)
+
+
+class FlowClassifier:
+    """Indexed first-match classifier over compiled policy rules, with an LRU decision cache."""
+
+    def __init__(self, policies: Dict[str, Any], cache_size: int = DEFAULT_CACHE_SIZE):
+        """
+        Compile policies into the classifier.
+
+        Args:
+            policies: Policy id -> policy, evaluated in order
+            cache_size: Number of 5-tuple decisions cached (0 disables the cache)
+        """
+        self.source = policies
+        self.cache_size = max(0, int(cache_size))
+        self._cache: OrderedDict = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._by_protocol: Dict[int, _DestinationIndex] = {}
+        self._any_protocol = _DestinationIndex()
+        self.stats = {'rules': 0, 'compiled_rules': 0, 'lookups': 0, 'cache_hits': 0, 'rules_evaluated': 0}
+
+        start = time.perf_counter()
+        order = count()
+        for policy_id, policy in policies.items():
+            for condition in policy.get('rules', policy.get('conditions', [])):
+                self.stats['rules'] += 1
+                rule = compile_rule(condition, next(order), policy_id)
+                if rule is None:
+                    continue
+                self.stats['compiled_rules'] += 1
+                if rule.protocol is None or rule.protocol[0] == _PRESENT:
+                    self._any_protocol.add(rule)
+                else:
+                    self._by_protocol.setdefault(rule.protocol[1], _DestinationIndex()).add(rule)
+        self.stats['compile_time'] = time.perf_counter() - start
+        LOG.debug(f"Compiled {self.stats['compiled_rules']}/{self.stats['rules']} policy rules "
+                  f"in {self.stats['compile_time'] * 1000:.1f} ms")
+
+    def _evaluate(self, src_ip, dst_ip, ip_proto, src_port, dst_port) -> bool:
+        dst_addr = _parse_address(dst_ip)
+        lists: List[List[_CompiledRule]] = []
+        if ip_proto is not None:
+            index = self._by_protocol.get(ip_proto)
+            if index is not None:
+                index.candidates(dst_ip, dst_addr, lists)
+        self._any_protocol.candidates(dst_ip, dst_addr, lists)
+        if not lists:
+            return True
+
+        src_addr = _parse_address(src_ip)
+        candidates = lists[0] if len(lists) == 1 else heapq.merge(*lists, key=lambda rule: rule.order)
+        evaluated = 0
+        for rule in candidates:
+            evaluated += 1
+            if rule.matches(src_ip, src_addr, dst_ip, dst_addr, ip_proto, src_port, dst_port):
+                self.stats['rules_evaluated'] += evaluated
+                LOG.debug(f"Policy {rule.policy_id} rule matched: {'allow' if rule.allow else 'deny'}")
+                return rule.allow
+        self.stats['rules_evaluated'] += evaluated
+        return True
+
+    def classify(self, src_ip, dst_ip, ip_proto=None, src_port=None, dst_port=None) -> bool:
+        """
+        Decide whether traffic is allowed.
+
+        Args:
+            src_ip: Source IP address
+            dst_ip: Destination IP address
+            ip_proto: IP protocol number
+            src_port: Transport source port
+            dst_port: Transport destination port
+
+        Returns:
+            False if the first matching rule denies the traffic, True otherwise
+        """
+        self.stats['lookups'] += 1
+        if not self.cache_size:
+            return self._evaluate(src_ip, dst_ip, ip_proto, src_port, dst_port)
+
+        key = (src_ip, dst_ip, ip_proto, src_port, dst_port)
+        with self._cache_lock:
+            decision = self._cache.get(key)
+            if decision is not None:
+                self._cache.move_to_end(key)
+                self.stats['cache_hits'] += 1
+                return decision
+        decision = self._evaluate(src_ip, dst_ip, ip_proto, src_port, dst_port)
+        with self._cache_lock:
+            self._cache[key] = decision
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return decision
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get rule counts, cache hit counts and the compile time."""
+        stats = dict(self.stats)
+        stats['cached_decisions'] = len(self._cache)
+        stats['protocol_buckets'] = len(self._by_protocol)
+        return stats
+
+
+def _generate_policies(num_rules: int, seed: int = 0) -> Dict[str, Any]:
+    """Build policies with num_rules mixed field/match rules over 10.0.0.0/8."""
+    import random
+
+    rng = random.Random(seed)
+    policies = {}
+    per_policy = 50
+    for p in range(max(1, num_rules // per_policy)):
+        rules = []
+        for _ in range(per_policy):
+            net = f"10.{rng.randrange(256)}.{rng.randrange(256)}.0/{rng.choice([16, 24, 24, 28])}"
+            if rng.random() < 0.2:
+                rules.append({'field': rng.choice(['dst_ip', 'src_ip']), 'operator': '==', 'value': net,
+                              'action': rng.choice(['allow', 'deny'])})
+            else:
+                start = rng.randrange(1, 60000)
+                rules.append({'match': {'src_ip': rng.choice(['any', net]),
+                                        'dst_ip': net,
+                                        'protocol': rng.choice(['tcp', 'udp', 'icmp', 'any']),
+                                        'dst_port': rng.choice(['any', str(start), f"{start}-{start + 100}"])},
+                              'action': rng.choice(['allow', 'deny'])})
+        policies[f"policy-{p}"] = {'policy_id': f"policy-{p}", 'rules': rules}
+    return policies
+
+
+def _generate_packets(num_packets: int, num_flows: int, seed: int = 1) -> List[Tuple]:
+    """Build packet 5-tuples drawn from num_flows distinct flows."""
+    import random
+
+    rng = random.Random(seed)
+    flows = []
+    for _ in range(num_flows):
+        proto = rng.choice([6, 17, 1])
+        ports = (rng.randrange(1024, 65535), rng.randrange(1, 60000)) if proto != 1 else (None, None)
+        flows.append((f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}",
+                      f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}",
+                      proto) + ports)
+    return [rng.choice(flows) for _ in range(num_packets)]
+
+
+def benchmark(rule_counts=(1000, 5000), num_packets: int = 2000, num_flows: int = 500) -> Dict[str, Any]:
+    """
+    Compare the uncompiled per-packet policy check with the compiled classifier.
+
+    Args:
+        rule_counts: Numbers of policy rules
+        num_packets: Packet-in events classified per run
+        num_flows: Distinct 5-tuples among the packets
+
+    Returns:
+        Microseconds per packet for the linear check and the classifier with and
+        without its cache, and whether all decisions agree
+    """
+    from src.networking.sdn.apps.policy_engine_mixin import PolicyEngineMixin
+
+    report = {'packets': num_packets, 'flows': num_flows, 'runs': []}
+    packets = _generate_packets(num_packets, num_flows)
+    for num_rules in rule_counts:
+        policies = _generate_policies(num_rules)
+        linear = PolicyEngineMixin()
+        linear.current_policies = policies
+        run = {'rules': num_rules}
+
+        start = time.perf_counter()
+        expected = [linear._check_policy_linear(*packet) for packet in packets]
+        run['linear_us'] = round((time.perf_counter() - start) / num_packets * 1e6, 2)
+
+        for label, cache_size in (('compiled_us', 0), ('compiled_cached_us', DEFAULT_CACHE_SIZE)):
+            classifier = FlowClassifier(policies, cache_size=cache_size)
+            start = time.perf_counter()
+            decisions = [classifier.classify(*packet) for packet in packets]
+            run[label] = round((time.perf_counter() - start) / num_packets * 1e6, 2)
+            run.setdefault('decisions_match', True)
+            run['decisions_match'] &= decisions == expected
+        run['compile_ms'] = round(classifier.stats['compile_time'] * 1000, 2)
+        run['denied'] = expected.count(False)
+        report['runs'].append(run)
+    return report
+
+
+if __name__ == '__main__':
+    counts = tuple(int(arg) for arg in sys.argv[1:]) or (1000, 5000)
+    print(json.dumps(benchmark(counts), indent=2))
@@ -0,0 +1,155 @@
+"""
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Policy Flow Reconciliation
+
+Keeps track of the policy flows installed on each switch and computes the
+FlowMods needed to reach a desired flow set: adds for new flows, strict
+modifies for flows whose actions changed and strict deletes for flows that
+are no longer wanted. A fingerprint of each switch's installed set lets an
+unchanged policy set be recognized without diffing.
+"""
+
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+LOG = logging.getLogger('ryu.app.policy_switch.reconciler')
+
+FlowKey = Tuple[int, int, Tuple[Tuple[str, Any], ...]]
+
+
+class FlowSpec(NamedTuple):
+    """A flow as plain data: identity (table, priority, match) plus what it does."""
+
+    table_id: int
+    priority: int
+    match: Tuple[Tuple[str, Any], ...]  # sorted (field, value) pairs
+    actions: Tuple[Tuple[Any, ...], ...]  # e.g. ('output', 'NORMAL'), ('set_field', 'ip_dscp', 46)
+    idle_timeout: int = 0
+    hard_timeout: int = 0
+
+    @classmethod
+    def build(cls, table_id: int, priority: int, match: Dict[str, Any],
+              actions: Iterable[Tuple[Any, ...]], idle_timeout: int = 0, hard_timeout: int = 0) -> 'FlowSpec':
+        """Create a spec from a match dict and action tuples."""
+        return cls(table_id, priority, tuple(sorted(match.items())), tuple(actions), idle_timeout, hard_timeout)
+
+    @property
+    def key(self) -> FlowKey:
+        """What OpenFlow identifies the flow by in strict modify and delete."""
+        return (self.table_id, self.priority, self.match)
+
+
+class FlowDiff(NamedTuple):
+    """FlowMods needed to move a switch from its installed to its desired flows."""
+
+    adds: List[FlowSpec]
+    modifies: List[FlowSpec]
+    deletes: List[FlowSpec]
+
+    def __bool__(self) -> bool:
+        return bool(self.adds or self.modifies or self.deletes)
+
+    def __len__(self) -> int:
+        return len(self.adds) + len(self.modifies) + len(self.deletes)
+
+
+def desired_state(specs: Iterable[FlowSpec]) -> Tuple[Dict[FlowKey, FlowSpec], str]:
+    """
+    Index desired flows by key and fingerprint the set.
+
+    Later specs with the same key replace earlier ones, as a later FlowMod ADD
+    with the same match and priority would on the switch.
+
+    Returns:
+        (key -> spec, fingerprint of the whole set)
+    """
+    desired: Dict[FlowKey, FlowSpec] = {}
+    for spec in specs:
+        desired[spec.key] = spec
+    digest = hashlib.sha256()
+    for line in sorted(repr(spec) for spec in desired.values()):
+        digest.update(line.encode())
+        digest.update(b'\n')
+    return desired, digest.hexdigest()
+
+
+class FlowReconciler:
+    """Installed policy flows per switch and the diffs against desired flow sets."""
+
+    def __init__(self):
+        self._installed: Dict[Any, Dict[FlowKey, FlowSpec]] = {}
+        self._fingerprints: Dict[Any, str] = {}
+        self._lock = threading.Lock()
+        self.stats = {'reconciles': 0, 'unchanged': 0, 'adds': 0, 'modifies': 0, 'deletes': 0}
+
+    def plan(self, dpid: Any, desired: Dict[FlowKey, FlowSpec], fingerprint: str) -> FlowDiff:
+        """
+        Compute the FlowMods that bring a switch to the desired flows.
+
+        Args:
+            dpid: Switch datapath id
+            desired: Desired flows from desired_state()
+            fingerprint: Fingerprint from desired_state()
+
+        Returns:
+            Flows to add, modify and delete (empty if the switch is up to date)
+        """
+        with self._lock:
+            self.stats['reconciles'] += 1
+            if self._fingerprints.get(dpid) == fingerprint:
+                self.stats['unchanged'] += 1
+                return FlowDiff([], [], [])
+            installed = self._installed.get(dpid, {})
+
+        adds, modifies = [], []
+        for key, spec in desired.items():
+            current = installed.get(key)
+            if current is None:
+                adds.append(spec)
+            elif current != spec:
+                modifies.append(spec)
+        deletes = [spec for key, spec in installed.items() if key not in desired]
+        return FlowDiff(adds, modifies, deletes)
+
+    def commit(self, dpid: Any, desired: Dict[FlowKey, FlowSpec], fingerprint: str, diff: Optional[FlowDiff] = None):
+        """Record that a switch now has the desired flows (after its FlowMods were sent)."""
+        with self._lock:
+            self._installed[dpid] = dict(desired)
+            self._fingerprints[dpid] = fingerprint
+            if diff:
+                self.stats['adds'] += len(diff.adds)
+                self.stats['modifies'] += len(diff.modifies)
+                self.stats['deletes'] += len(diff.deletes)
+
+    def forget(self, dpid: Any):
+        """Drop what is known about a switch, e.g. after it reconnected or its policy table was cleared."""
+        with self._lock:
+            self._installed.pop(dpid, None)
+            self._fingerprints.pop(dpid, None)
+
+    def installed_count(self, dpid: Any) -> int:
+        """Number of policy flows recorded as installed on a switch."""
+        with self._lock:
+            return len(self._installed.get(dpid, {}))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get reconcile counters and the tracked switches."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['switches'] = {str(dpid): len(flows) for dpid, flows in self._installed.items()}
+        return stats
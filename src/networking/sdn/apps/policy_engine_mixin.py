@@ -22,9 +22,13 @@
 import time
 import json
 import logging
+import ipaddress
 import requests
 from typing import Dict, List, Any, Optional, Union
 
+from .flow_classifier import FlowClassifier
+from .flow_reconciler import FlowReconciler, FlowSpec, desired_state
+
 LOG = logging.getLogger('ryu.app.policy_switch.policy')
 
 
@@ -36,6 +40,23 @@ def _check_policy(self, src_ip, dst_ip, ip_proto=None, src_port=None, dst_port=N
         if not self.current_policies:
             return True  # Default allow if no policies
         
+        return self._get_policy_classifier().classify(src_ip, dst_ip, ip_proto, src_port, dst_port)
+    
+    def _get_policy_classifier(self) -> FlowClassifier:
+        """Get the classifier compiled from the current policies, recompiling after a policy update."""
+        classifier = getattr(self, '_policy_classifier', None)
+        if classifier is None or classifier.source is not self.current_policies:
+            classifier = FlowClassifier(self.current_policies)
+            self._policy_classifier = classifier
+            LOG.info(f"Compiled {classifier.stats['compiled_rules']} policy rules "
+                     f"in {classifier.stats['compile_time'] * 1000:.1f} ms")
+        return classifier
+    
+    def _check_policy_linear(self, src_ip, dst_ip, ip_proto=None, src_port=None, dst_port=None):
+        """Check traffic against every policy rule in turn (reference for the compiled classifier)."""
+        if not self.current_policies:
+            return True  # Default allow if no policies
+        
         LOG.debug(f"Checking policies for {src_ip} -> {dst_ip}")
         
         # Check each policy
@@ -118,7 +139,6 @@ def _ip_matches(self, ip, rule_ip):
             
         try:
             # Try CIDR notation first
-            import ipaddress
             if '/' in rule_ip:
                 network = ipaddress.ip_network(rule_ip, strict=False)
                 return ipaddress.ip_address(ip) in network
@@ -181,9 +201,35 @@ def _policy_poll_loop(self):
             # Sleep for the configured interval
             time.sleep(self.policy_poll_interval)
     
+    def _fetch_policy_version(self):
+        """
+        Get the Policy Engine's policy version, or None if it cannot be determined.
+
+        The version is combined with the policy count and last update time so that
+        an engine restarted with a different policy set is not mistaken for unchanged.
+        """
+        try:
+            response = requests.get(f"{self.policy_engine_url}/api/v1/policy_version", timeout=5)
+            if response.status_code != 200:
+                return None
+            data = response.json()
+            if 'policy_version' not in data:
+                return None
+            return (data['policy_version'], data.get('total_policies'), data.get('last_updated'))
+        except (requests.exceptions.RequestException, ValueError) as e:
+            LOG.debug(f"Policy version unavailable: {e}")
+            return None
+
     def _fetch_and_apply_policies(self):
         """Fetch policies from Policy Engine and apply them."""
         try:
+            # Skip the fetch entirely while the engine reports the version already applied
+            version = self._fetch_policy_version()
+            if version is not None and version == getattr(self, '_applied_policy_version', None):
+                LOG.debug(f"Policy version {version[0]} unchanged, skipping policy fetch")
+                self.policy_engine_available = True
+                return
+            
             # Use the correct API endpoint format for the Policy Engine
             response = requests.get(f"{self.policy_engine_url}/api/v1/policies", timeout=10)
             if response.status_code == 200:
@@ -204,9 +250,10 @@ def _fetch_and_apply_policies(self):
                 else:
                     new_policies = {}
                 
-                # Update current policies
+                # Update current policies; unchanged policies keep the compiled classifier and its cache
                 old_count = len(self.current_policies)
-                self.current_policies = new_policies
+                if new_policies != self.current_policies:
+                    self.current_policies = new_policies
                 new_count = len(self.current_policies)
                 
                 if old_count != new_count:
@@ -214,9 +261,10 @@ def _fetch_and_apply_policies(self):
                     for policy_id, policy in new_policies.items():
                         LOG.debug(f"Policy {policy_id}: {policy.get('name', 'Unknown')} - {policy.get('enabled', False)}")
                 
-                # Apply policies to all connected switches
+                # Bring all connected switches to the new policy flows
                 self._apply_policies_to_all_switches()
                 
+                self._applied_policy_version = version
                 self.policy_engine_available = True
                 
         except requests.exceptions.RequestException as e:
@@ -226,33 +274,79 @@ def _fetch_and_apply_policies(self):
         except Exception as e:
             LOG.error(f"Error fetching policies: {e}")
             self.policy_engine_available = False
+
+    def _get_flow_reconciler(self) -> FlowReconciler:
+        """Get the tracker of policy flows installed per switch."""
+        reconciler = getattr(self, '_flow_reconciler', None)
+        if reconciler is None:
+            reconciler = FlowReconciler()
+            self._flow_reconciler = reconciler
+        return reconciler
+
+    def _desired_policy_flows(self):
+        """Get the policy flows for the current policies as (key -> FlowSpec, fingerprint), built once per policy set."""
+        cached = getattr(self, '_desired_flows_cache', None)
+        if cached is None or cached[0] is not self.current_policies:
+            specs = [self._policy_flow_spec(policy) for policy in self.current_policies.values()
+                     if policy.get('enabled', True)]
+            cached = (self.current_policies,) + desired_state(specs)
+            self._desired_flows_cache = cached
+        return cached[1], cached[2]
+
     def _apply_policies_to_all_switches(self):
         """Apply policies to all connected switches."""
         if not self.switches:
             LOG.warning("No switches connected, policies not applied")
             return
         
-        LOG.info(f"Applying {len(self.current_policies)} policies to {len(self.switches)} switches")
-        for dpid in self.switches:
-            self._apply_policies_to_switch(dpid)
+        desired, fingerprint = self._desired_policy_flows()
+        for dpid in list(self.switches):
+            self._apply_policies_to_switch(dpid, desired=desired, fingerprint=fingerprint)
+
+    def _apply_policies_to_switch(self, dpid, resync=False, desired=None, fingerprint=None):
+        """
+        Reconcile a switch's policy flows with the current policies.
 
-    def _apply_policies_to_switch(self, dpid):
-        """Apply policies to a specific switch."""
+        Only the differences to the flows installed earlier are sent: ADD for new
+        flows, MODIFY_STRICT for changed actions and DELETE_STRICT for flows no
+        policy wants any more, followed by a barrier.
+
+        Args:
+            dpid: Switch datapath id
+            resync: Clear the switch's policy table and install all flows (e.g. after it reconnected)
+            desired: Desired flows from _desired_policy_flows() (computed if not given)
+            fingerprint: Fingerprint of the desired flows
+        """
         if dpid not in self.switches:
             LOG.warning(f"Switch {dpid} not found, policies not applied")
             return
         
         datapath = self.switches[dpid]['datapath']
+        reconciler = self._get_flow_reconciler()
+        if desired is None:
+            desired, fingerprint = self._desired_policy_flows()
         
-        # Clear existing policy flows first
-        self._clear_policy_flows(datapath)
+        if resync:
+            self._clear_policy_flows(datapath)
+            reconciler.forget(dpid)
         
-        # Install new policy flows
-        for policy_id, policy in self.current_policies.items():
-            if policy.get('enabled', True):
-                self._install_policy_flows(datapath, policy)
+        diff = reconciler.plan(dpid, desired, fingerprint)
+        if not diff:
+            LOG.debug(f"Policy flows on switch {dpid} are up to date")
+            return
+        
+        ofproto = datapath.ofproto
+        for spec in diff.deletes:
+            self._send_policy_flow_mod(datapath, spec, ofproto.OFPFC_DELETE_STRICT)
+        for spec in diff.modifies:
+            self._send_policy_flow_mod(datapath, spec, ofproto.OFPFC_MODIFY_STRICT)
+        for spec in diff.adds:
+            self._send_policy_flow_mod(datapath, spec, ofproto.OFPFC_ADD)
+        datapath.send_msg(datapath.ofproto_parser.OFPBarrierRequest(datapath))
+        reconciler.commit(dpid, desired, fingerprint, diff)
         
-        LOG.info(f"Applied {len(self.current_policies)} policies to switch {dpid}")
+        LOG.info(f"Reconciled policy flows on switch {dpid}: {len(diff.adds)} added, "
+                 f"{len(diff.modifies)} modified, {len(diff.deletes)} deleted")
 
     def _clear_policy_flows(self, datapath):
         """Clear existing policy flows from the switch."""
@@ -271,15 +365,12 @@ def _clear_policy_flows(self, datapath):
         
         LOG.debug(f"Cleared policy flows from switch {datapath.id}")
 
-    def _install_policy_flows(self, datapath, policy):
-        """Install OpenFlow rules for a policy."""
-        ofproto = datapath.ofproto
-        parser = datapath.ofproto_parser
-        
+    def _policy_flow_spec(self, policy) -> FlowSpec:
+        """Describe the OpenFlow rule for a policy as plain data."""
         policy_id = policy.get('policy_id', policy.get('id', 'unknown'))
         policy_name = policy.get('name', 'Unknown Policy')
         
-        LOG.debug(f"Installing flows for policy: {policy_name} ({policy_id})")
+        LOG.debug(f"Building flow for policy: {policy_name} ({policy_id})")
         
         # Process policy conditions to create match criteria
         conditions = policy.get('conditions', [])
@@ -313,18 +404,11 @@ def _install_policy_flows(self, datapath, policy):
                 # These require runtime measurement, skip for static flow rules
                 continue
         
-        # Create match object
-        if match_fields:
-            # Ensure ethernet type is set for IP matches
-            if any(k.startswith('ipv4_') for k in match_fields):
-                match_fields['eth_type'] = 0x0800  # IPv4
-            if any(k in ['tcp_src', 'tcp_dst'] for k in match_fields):
-                match_fields['ip_proto'] = 6  # TCP
-                
-            match = parser.OFPMatch(**match_fields)
-        else:
-            # Default match all if no specific conditions
-            match = parser.OFPMatch()
+        # Ensure ethernet type is set for IP matches; no fields matches all traffic
+        if any(k.startswith('ipv4_') for k in match_fields):
+            match_fields['eth_type'] = 0x0800  # IPv4
+        if any(k in ['tcp_src', 'tcp_dst'] for k in match_fields):
+            match_fields['ip_proto'] = 6  # TCP
         
         # Process policy actions to create OpenFlow actions
         flow_actions = []
@@ -339,51 +423,82 @@ def _install_policy_flows(self, datapath, policy):
                     flow_actions = []
                     break
                 elif target == 'reroute':
-                    # Reroute to specific port if specified
+                    # Reroute to specific port if specified, default to normal processing
                     new_port = parameters.get('port')
-                    if new_port:
-                        flow_actions.append(parser.OFPActionOutput(new_port))
-                    else:
-                        # Default to normal processing
-                        flow_actions.append(parser.OFPActionOutput(ofproto.OFPP_NORMAL))
+                    flow_actions.append(('output', new_port if new_port else 'NORMAL'))
                 elif target == 'prioritize':
                     # Set DSCP field for QoS prioritization
                     dscp = parameters.get('dscp', 46)  # Default to EF (Expedited Forwarding)
-                    flow_actions.append(parser.OFPActionSetField(ip_dscp=dscp))
-                    flow_actions.append(parser.OFPActionOutput(ofproto.OFPP_NORMAL))
+                    flow_actions.append(('set_field', 'ip_dscp', dscp))
+                    flow_actions.append(('output', 'NORMAL'))
                 elif target == 'mirror':
                     # Mirror traffic to specified port
                     mirror_port = parameters.get('port')
                     if mirror_port:
-                        flow_actions.append(parser.OFPActionOutput(mirror_port))
-                    flow_actions.append(parser.OFPActionOutput(ofproto.OFPP_NORMAL))
+                        flow_actions.append(('output', mirror_port))
+                    flow_actions.append(('output', 'NORMAL'))
             elif action_type == 'qos':
                 # QoS actions
                 if target == 'set_priority':
                     priority_val = parameters.get('priority', 0)
-                    flow_actions.append(parser.OFPActionSetField(vlan_pcp=priority_val))
-                flow_actions.append(parser.OFPActionOutput(ofproto.OFPP_NORMAL))
+                    flow_actions.append(('set_field', 'vlan_pcp', priority_val))
+                flow_actions.append(('output', 'NORMAL'))
         
         # Default action if none specified
         if not flow_actions:
-            flow_actions.append(parser.OFPActionOutput(ofproto.OFPP_NORMAL))
+            flow_actions.append(('output', 'NORMAL'))
+        
+        # No idle timeout: reconciliation removes flows when their policy goes away
+        return FlowSpec.build(table_id=1,  # Policy table
+                              priority=priority + 1000,  # Higher priority for policies
+                              match=match_fields, actions=flow_actions)
+
+    def _send_policy_flow_mod(self, datapath, spec: FlowSpec, command):
+        """Send a FlowMod for a policy flow spec."""
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
+        
+        if command in (ofproto.OFPFC_DELETE, ofproto.OFPFC_DELETE_STRICT):
+            mod = parser.OFPFlowMod(
+                datapath=datapath,
+                table_id=spec.table_id,
+                command=command,
+                priority=spec.priority,
+                match=parser.OFPMatch(**dict(spec.match)),
+                out_port=ofproto.OFPP_ANY,
+                out_group=ofproto.OFPG_ANY
+            )
+            datapath.send_msg(mod)
+            return
+        
+        flow_actions = []
+        for action in spec.actions:
+            if action[0] == 'output':
+                port = action[1]
+                flow_actions.append(parser.OFPActionOutput(ofproto.OFPP_NORMAL if port == 'NORMAL' else port))
+            elif action[0] == 'set_field':
+                flow_actions.append(parser.OFPActionSetField(**{action[1]: action[2]}))
         
         # Create flow mod instruction
         instructions = [parser.OFPInstructionActions(ofproto.OFPIT_APPLY_ACTIONS, flow_actions)]
         
-        # Install the flow
         mod = parser.OFPFlowMod(
             datapath=datapath,
-            table_id=1,  # Policy table
-            priority=priority + 1000,  # Higher priority for policies
-            match=match,
+            table_id=spec.table_id,
+            command=command,
+            priority=spec.priority,
+            match=parser.OFPMatch(**dict(spec.match)),
             instructions=instructions,
-            idle_timeout=300,  # 5 minutes
-            hard_timeout=0,    # No hard timeout
+            idle_timeout=spec.idle_timeout,
+            hard_timeout=spec.hard_timeout,
             flags=ofproto.OFPFF_SEND_FLOW_REM
         )
-        
         datapath.send_msg(mod)
-        LOG.debug(f"Installed flow for policy {policy_name} on switch {datapath.id}")
+
+    def _install_policy_flows(self, datapath, policy):
+        """Install OpenFlow rules for a policy."""
+        spec = self._policy_flow_spec(policy)
+        self._send_policy_flow_mod(datapath, spec, datapath.ofproto.OFPFC_ADD)
+        LOG.debug(f"Installed flow for policy {policy.get('name', 'Unknown Policy')} on switch {datapath.id}")
 
     # ...existing code...
@@ -277,37 +277,7 @@ def get_port_stats(self, req, **kwargs):
             LOG.info(f"Switch data keys: {list(switch_data.keys())}")
             
             # Build port statistics from collected data
-            port_stats = []
-            port_stats_data = switch_data.get('port_stats', {})
-            
-            LOG.info(f"Port stats data: {port_stats_data}")
-            LOG.info(f"Ports data: {switch_data.get('ports', {})}")
-            
-            for port_no, port_info in switch_data.get('ports', {}).items():
-                # Get actual stats if available, otherwise use defaults
-                actual_stats = port_stats_data.get(port_no, {})
-                
-                port_stat = {
-                    'port_no': port_no,
-                    'rx_packets': actual_stats.get('rx_packets', 0),
-                    'tx_packets': actual_stats.get('tx_packets', 0),
-                    'rx_bytes': actual_stats.get('rx_bytes', 0),
-                    'tx_bytes': actual_stats.get('tx_bytes', 0),
-                    'rx_dropped': actual_stats.get('rx_dropped', 0),
-                    'tx_dropped': actual_stats.get('tx_dropped', 0),
-                    'rx_errors': actual_stats.get('rx_errors', 0),
-                    'tx_errors': actual_stats.get('tx_errors', 0),
-                    'rx_frame_err': 0,  # Not available in OpenFlow 1.3
-                    'rx_over_err': 0,   # Not available in OpenFlow 1.3
-                    'rx_crc_err': 0,    # Not available in OpenFlow 1.3
-                    'collisions': 0,    # Not available in OpenFlow 1.3
-                    'duration_sec': int(time.time() - switch_data.get('connected_time', time.time())),
-                    'duration_nsec': 0,
-                    # Add bandwidth information for collector
-                    'rx_bps': actual_stats.get('rx_bps', 0),
-                    'tx_bps': actual_stats.get('tx_bps', 0)
-                }
-                port_stats.append(port_stat)
+            port_stats = self.policy_switch_app.get_port_stats_entries(dpid_int)
               # Return in the format expected by collector
             response_data = {dpid: port_stats}
             safe_response_data = safe_json_serialize(response_data)
@@ -321,6 +291,18 @@ def get_port_stats(self, req, **kwargs):
             return Response(status=500, content_type='application/json', 
                           body=json.dumps({'error': str(e)}))
     
+    @route('policy_switch', '/stats/bulk', methods=['GET'])
+    def get_bulk_stats(self, req, **kwargs):
+        """Get port stats and flow entries of all switches in one response (collector endpoint)."""
+        try:
+            stats = self.policy_switch_app.get_bulk_stats()
+            safe_stats = safe_json_serialize(stats)
+            return Response(content_type='application/json', body=json.dumps(safe_stats, default=str))
+        except Exception as e:
+            LOG.error(f"Error getting bulk stats: {e}")
+            return Response(status=500, content_type='application/json',
+                          body=json.dumps({'error': str(e)}))
+    
     @route('policy_switch', '/stats/flowentry/{dpid}', methods=['GET'])
     def get_flow_entry_stats(self, req, **kwargs):
         """Get flow entry statistics for a specific switch (collector endpoint)."""
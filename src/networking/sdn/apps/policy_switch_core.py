@@ -41,9 +41,22 @@
 from ryu.controller.dpset import DPSet
 from ryu.lib import hub
 
+from .stats_store import FlowStatsStore, PortStatsStore
+
 # Set up logging
 LOG = logging.getLogger('ryu.app.policy_switch')
 
+# Names ofctl_rest uses for reserved output ports
+RESERVED_PORT_NAMES = {
+    ofproto_v1_3.OFPP_IN_PORT: 'IN_PORT',
+    ofproto_v1_3.OFPP_TABLE: 'TABLE',
+    ofproto_v1_3.OFPP_NORMAL: 'NORMAL',
+    ofproto_v1_3.OFPP_FLOOD: 'FLOOD',
+    ofproto_v1_3.OFPP_ALL: 'ALL',
+    ofproto_v1_3.OFPP_CONTROLLER: 'CONTROLLER',
+    ofproto_v1_3.OFPP_LOCAL: 'LOCAL'
+}
+
 
 class PolicySwitchCore(app_manager.RyuApp):
     """
@@ -74,7 +87,8 @@ def __init__(self, *args, **kwargs):
         self.switches = {}  # dpid -> switch info
         self.links = []     # list of link objects
         self.hosts = {}     # mac -> (dpid, port, ip) mapping
-        self.flows = {}     # flow tracking
+        self.flows = FlowStatsStore(serialize_match=self._serialize_match)  # flow tracking
+        self.port_stats = PortStatsStore()  # port counters and bandwidth per switch
           # Policy Engine integration
         policy_engine_host = os.environ.get("POLICY_ENGINE_HOST", "policy-engine")
         policy_engine_port = os.environ.get("POLICY_ENGINE_PORT", "5000")
@@ -134,9 +148,9 @@ def switch_features_handler(self, ev):
         # Install default flows for basic connectivity
         self._install_default_flows(datapath)
         
-        # Apply current policies to this switch
+        # Apply current policies to this switch; its flow tables may have been reset, so resync
         if self.current_policies:
-            self._apply_policies_to_switch(datapath)
+            self._apply_policies_to_switch(dpid, resync=True)
     
     def _install_default_flows(self, datapath):
         """Install default flows for basic connectivity."""
@@ -194,16 +208,12 @@ def add_flow(self, datapath, priority, match, actions,
         datapath.send_msg(mod)
         
         # Store flow information
-        flow_key = f"{datapath.id}_{priority}_{hash(str(match))}"
-        self.flows[flow_key] = {
-            'datapath_id': datapath.id,
-            'priority': priority,
-            'match': self._serialize_match(match),
+        self.flows.record_installed(datapath.id, table_id, priority, match, {
             'actions': self._serialize_actions(actions),
             'idle_timeout': idle_timeout,
             'hard_timeout': hard_timeout,
             'timestamp': time.time()
-        }
+        })
         
         LOG.debug(f"Added flow: priority={priority}, dpid={datapath.id}")
     
@@ -377,6 +387,8 @@ def switch_leave_handler(self, ev):
         LOG.info(f"Switch {dpid} left topology")
         if dpid in self.switches:
             del self.switches[dpid]
+        self.port_stats.remove_switch(dpid)
+        self.flows.remove_switch(dpid)
         self._update_topology()
     
     @set_ev_cls(event.EventLinkAdd)
@@ -512,116 +524,44 @@ def _port_stats_reply_handler(self, ev):
         
         if dpid not in self.switches:
             return
-            
-        # Initialize port stats if needed
-        if 'port_stats' not in self.switches[dpid]:
-            self.switches[dpid]['port_stats'] = {}
-            
-        current_time = time.time()
         
-        # Update port statistics with bandwidth calculation
-        for stat in body:
-            port_no = stat.port_no
-            if port_no < ofproto_v1_3.OFPP_MAX:
-                old_stats = self.switches[dpid]['port_stats'].get(port_no, {})
-                
-                # Calculate bandwidth rates if we have previous data
-                rx_bps = 0
-                tx_bps = 0
-                if old_stats and 'timestamp' in old_stats:
-                    time_diff = current_time - old_stats['timestamp']
-                    if time_diff > 0:
-                        # Calculate bits per second
-                        rx_byte_diff = stat.rx_bytes - old_stats.get('rx_bytes', 0)
-                        tx_byte_diff = stat.tx_bytes - old_stats.get('tx_bytes', 0)
-                        
-                        rx_bps = max(0, (rx_byte_diff * 8) / time_diff)  # bits per second
-                        tx_bps = max(0, (tx_byte_diff * 8) / time_diff)  # bits per second
-                        
-                        # Update cumulative statistics
-                        self.cumulative_stats['total_bytes_transferred'] += rx_byte_diff + tx_byte_diff
-                        self.cumulative_stats['total_packets_transferred'] += (
-                            (stat.rx_packets - old_stats.get('rx_packets', 0)) +
-                            (stat.tx_packets - old_stats.get('tx_packets', 0))
-                        )
-                        
-                        # Track peak bandwidth
-                        current_bandwidth = rx_bps + tx_bps
-                        if current_bandwidth > self.cumulative_stats['peak_bandwidth']:
-                            self.cumulative_stats['peak_bandwidth'] = current_bandwidth
-                        
-                        # Track errors
-                        error_diff = (
-                            (stat.rx_errors - old_stats.get('rx_errors', 0)) +
-                            (stat.tx_errors - old_stats.get('tx_errors', 0))
-                        )
-                        self.cumulative_stats['total_errors'] += error_diff
-                
-                # Store current statistics with calculated bandwidth
-                self.switches[dpid]['port_stats'][port_no] = {
-                    'port_no': port_no,
-                    'rx_packets': stat.rx_packets,
-                    'tx_packets': stat.tx_packets,
-                    'rx_bytes': stat.rx_bytes,
-                    'tx_bytes': stat.tx_bytes,
-                    'rx_dropped': stat.rx_dropped,
-                    'tx_dropped': stat.tx_dropped,
-                    'rx_errors': stat.rx_errors,                    
-                    'tx_errors': stat.tx_errors,
-                    'timestamp': current_time,
-                    'rx_bps': rx_bps,
-                    'tx_bps': tx_bps,
-                    'total_bps': rx_bps + tx_bps
-                }
+        # Counters and per-interval bandwidth are kept in the port stats store
+        deltas = self.port_stats.update(dpid, (stat for stat in body if stat.port_no < ofproto_v1_3.OFPP_MAX))
+        
+        # Update cumulative statistics
+        self.cumulative_stats['total_bytes_transferred'] += deltas['bytes']
+        self.cumulative_stats['total_packets_transferred'] += deltas['packets']
+        self.cumulative_stats['total_errors'] += deltas['errors']
+        
+        # Track peak bandwidth
+        if deltas['peak_bps'] > self.cumulative_stats['peak_bandwidth']:
+            self.cumulative_stats['peak_bandwidth'] = deltas['peak_bps']
 
     @set_ev_cls(ofp_event.EventOFPFlowStatsReply, MAIN_DISPATCHER)
     def _flow_stats_reply_handler(self, ev):
         """Handle flow statistics reply with cumulative tracking."""
-        body = ev.msg.body
-        dpid = ev.msg.datapath.id
+        msg = ev.msg
+        dpid = msg.datapath.id
         
-        # Update flow statistics
-        for stat in body:
-            flow_key = f"{dpid}_{stat.priority}_{hash(str(stat.match))}"
-            
-            if flow_key in self.flows:
-                # Update existing flow with stats
-                old_flow = self.flows[flow_key]
-                old_packet_count = old_flow.get('packet_count', 0)
-                old_byte_count = old_flow.get('byte_count', 0)
-                
-                # Calculate differences for cumulative stats
-                if stat.packet_count > old_packet_count or stat.byte_count > old_byte_count:
-                    self.cumulative_stats['total_packets_transferred'] += max(0, stat.packet_count - old_packet_count)
-                    self.cumulative_stats['total_bytes_transferred'] += max(0, stat.byte_count - old_byte_count)
-                
-                self.flows[flow_key].update({
-                    'packet_count': stat.packet_count,
-                    'byte_count': stat.byte_count,
-                    'duration_sec': stat.duration_sec,
-                    'duration_nsec': stat.duration_nsec,
-                    'last_updated': time.time()
-                })
-            else:
-                # New flow - count it and add to cumulative stats
-                self.cumulative_stats['total_flows_created'] += 1
-                self.cumulative_stats['total_packets_transferred'] += stat.packet_count
-                self.cumulative_stats['total_bytes_transferred'] += stat.byte_count
-                
-                self.flows[flow_key] = {
-                    'datapath_id': dpid,
-                    'table_id': stat.table_id,
-                    'priority': stat.priority,
-                    'idle_timeout': stat.idle_timeout,
-                    'hard_timeout': stat.hard_timeout,
-                    'packet_count': stat.packet_count,
-                    'byte_count': stat.byte_count,
-                    'match': self._serialize_match(stat.match),
-                    'instructions': self._serialize_actions(stat.instructions) if hasattr(stat, 'instructions') else [],
-                    'duration_sec': stat.duration_sec,
-                    'duration_nsec': stat.duration_nsec,
-                    'created_time': time.time()
-                }
+        # Large flow tables arrive in several parts; flows are evicted after the last one
+        complete = not (msg.flags & msg.datapath.ofproto.OFPMPF_REPLY_MORE)
+        changes = self.flows.update(dpid, msg.body, complete=complete, describe=self._describe_flow_stat)
+        
+        # New flows count in full, known flows with their increase since the last reply
+        self.cumulative_stats['total_flows_created'] += changes['new_flows']
+        self.cumulative_stats['total_packets_transferred'] += changes['packets']
+        self.cumulative_stats['total_bytes_transferred'] += changes['bytes']
+        
+        if changes['evicted']:
+            LOG.debug(f"Evicted {changes['evicted']} expired flows of switch {dpid}")
+
+    def _describe_flow_stat(self, stat):
+        """Get the static fields of a flow first seen in a stats reply."""
+        return {
+            'idle_timeout': stat.idle_timeout,
+            'hard_timeout': stat.hard_timeout,
+            'instructions': self._serialize_actions(stat.instructions) if hasattr(stat, 'instructions') else []
+        }
 
     # Utility methods for serialization
     def _serialize_match(self, match):
@@ -795,7 +735,86 @@ def get_hosts(self):
     
     def get_flows(self):
         """Get current flows."""
-        return self.flows
+        return self.flows.to_dict()
+
+    def get_port_stats_entries(self, dpid):
+        """Get the port stats of a switch in the ofctl_rest format, one entry per topology port."""
+        switch_data = self.switches.get(dpid, {})
+        port_stats_data = self.port_stats.get_ports(dpid)
+        duration_sec = int(time.time() - switch_data.get('connected_time', time.time()))
+        entries = []
+        for port_no in switch_data.get('ports', {}):
+            # Get actual stats if available, otherwise use defaults
+            actual_stats = port_stats_data.get(port_no, {})
+            entries.append({
+                'port_no': port_no,
+                'rx_packets': actual_stats.get('rx_packets', 0),
+                'tx_packets': actual_stats.get('tx_packets', 0),
+                'rx_bytes': actual_stats.get('rx_bytes', 0),
+                'tx_bytes': actual_stats.get('tx_bytes', 0),
+                'rx_dropped': actual_stats.get('rx_dropped', 0),
+                'tx_dropped': actual_stats.get('tx_dropped', 0),
+                'rx_errors': actual_stats.get('rx_errors', 0),
+                'tx_errors': actual_stats.get('tx_errors', 0),
+                'rx_frame_err': 0,  # Not available in OpenFlow 1.3
+                'rx_over_err': 0,   # Not available in OpenFlow 1.3
+                'rx_crc_err': 0,    # Not available in OpenFlow 1.3
+                'collisions': 0,    # Not available in OpenFlow 1.3
+                'duration_sec': duration_sec,
+                'duration_nsec': 0,
+                # Add bandwidth information for collector
+                'rx_bps': actual_stats.get('rx_bps', 0),
+                'tx_bps': actual_stats.get('tx_bps', 0)
+            })
+        return entries
+
+    def get_bulk_stats(self):
+        """Get port stats and flow entries of all switches at once, keyed by DPID string."""
+        ports = {}
+        flows = {}
+        for dpid in list(self.switches):
+            dpid_str = dpid_lib.dpid_to_str(dpid)
+            ports[dpid_str] = self.get_port_stats_entries(dpid)
+            flows[dpid_str] = []
+        for flow in self.flows.values():
+            switch_flows = flows.get(dpid_lib.dpid_to_str(flow['datapath_id']))
+            if switch_flows is not None:
+                switch_flows.append(self._flow_entry(flow))
+        return {'timestamp': time.time(), 'ports': ports, 'flows': flows}
+
+    def _flow_entry(self, flow):
+        """Convert a tracked flow to the flat ofctl_rest flow entry format."""
+        actions = []
+        for action in flow.get('instructions') or flow.get('actions') or []:
+            if action.get('type') == 'OUTPUT' and action.get('port') in RESERVED_PORT_NAMES:
+                action = dict(action, port=RESERVED_PORT_NAMES[action['port']])
+            actions.append(action)
+        return {
+            'priority': flow.get('priority', 0),
+            'table_id': flow.get('table_id', 0),
+            'duration_sec': flow.get('duration_sec', 0),
+            'packet_count': flow.get('packet_count', 0),
+            'byte_count': flow.get('byte_count', 0),
+            'idle_timeout': flow.get('idle_timeout', 0),
+            'hard_timeout': flow.get('hard_timeout', 0),
+            'cookie': flow.get('cookie', 0),
+            'match': self._flatten_match(flow.get('match')),
+            'instructions': [{'type': 'APPLY_ACTIONS', 'actions': actions}] if actions else []
+        }
+
+    @staticmethod
+    def _flatten_match(match):
+        """Turn a serialized OFPMatch into a field -> value dict."""
+        if not isinstance(match, dict):
+            return {}
+        if 'OFPMatch' not in match:
+            return match
+        fields = {}
+        for oxm in match['OFPMatch'].get('oxm_fields', []):
+            tlv = oxm.get('OXMTlv', {})
+            if 'field' in tlv:
+                fields[tlv['field']] = tlv.get('value')
+        return fields
     
     def get_policies(self):
         """Get current policies."""
@@ -819,39 +838,24 @@ def get_performance_metrics(self):
         """Get real-time performance metrics with smart aggregation and total statistics."""
         try:
             # Collect port statistics from all switches
-            total_bandwidth = 0
             bandwidth_values = []
             port_counts = {'total': 0, 'up': 0, 'errors': 0}
-            latency_values = []
             
             for dpid, switch_data in self.switches.items():
-                port_stats = switch_data.get('port_stats', {})
                 ports_info = switch_data.get('ports', {})
+                port_counts['total'] += len(ports_info)
                 
-                for port_no, port_info in ports_info.items():
-                    port_counts['total'] += 1
-                    
-                    # Get port statistics
-                    stats = port_stats.get(port_no, {})
-                    rx_bps = stats.get('rx_bps', 0)
-                    tx_bps = stats.get('tx_bps', 0)
-                    
-                    # Only count non-zero bandwidth values for meaningful averages
-                    if rx_bps > 0 or tx_bps > 0:
-                        port_bandwidth = rx_bps + tx_bps
-                        total_bandwidth += port_bandwidth
-                        bandwidth_values.append(port_bandwidth)
-                        port_counts['up'] += 1
-                    
-                    # Count ports with errors
-                    if stats.get('rx_errors', 0) > 0 or stats.get('tx_errors', 0) > 0:
-                        port_counts['errors'] += 1
-                    
-                    # Simulate latency measurements (in a real deployment, this would use ping probes)
-                    if rx_bps > 0 or tx_bps > 0:  # Only for active ports
-                        # Use simple heuristic: higher bandwidth = lower latency (up to a point)
-                        simulated_latency = max(5, min(100, 50 - (port_bandwidth / 1000000)))
-                        latency_values.append(simulated_latency)
+                # Bandwidth of ports with traffic (non-zero values only, for meaningful averages)
+                port_bandwidths, error_ports = self.port_stats.summarize(dpid, ports_info)
+                bandwidth_values.extend(port_bandwidths)
+                port_counts['up'] += len(port_bandwidths)
+                port_counts['errors'] += error_ports
+            
+            total_bandwidth = sum(bandwidth_values)
+            
+            # Simulate latency measurements (in a real deployment, this would use ping probes)
+            # Use simple heuristic: higher bandwidth = lower latency (up to a point)
+            latency_values = [max(5, min(100, 50 - (bandwidth / 1000000))) for bandwidth in bandwidth_values]
             
             # Calculate bandwidth metrics
             bandwidth_metrics = {
@@ -905,7 +909,7 @@ def get_performance_metrics(self):
                 'packet_loss': 0,  # Would need specific monitoring to calculate
                 'flows': {
                     'total': len(self.flows),
-                    'active': len([f for f in self.flows.values() if f.get('packet_count', 0) > 0])
+                    'active': self.flows.active_count()
                 },
                 'ports': port_counts,
                 'health_score': health_score,
@@ -972,25 +976,14 @@ def get_flow_statistics(self):
             total_byte_count = 0
             active_flows = 0
             
-            # Analyze flows by switch
-            for flow_key, flow_data in self.flows.items():
-                dpid = flow_data.get('datapath_id', 'unknown')
-                if dpid not in flow_count_by_switch:
-                    flow_count_by_switch[dpid] = {'count': 0, 'active': 0, 'bytes': 0, 'packets': 0}
-                
-                flow_count_by_switch[dpid]['count'] += 1
-                
-                # Check if flow is active (has packet/byte counts)
-                packet_count = flow_data.get('packet_count', 0)
-                byte_count = flow_data.get('byte_count', 0)
-                
-                if packet_count > 0:
-                    active_flows += 1
-                    flow_count_by_switch[dpid]['active'] += 1
-                    flow_count_by_switch[dpid]['packets'] += packet_count
-                    flow_count_by_switch[dpid]['bytes'] += byte_count
-                    total_packet_count += packet_count
-                    total_byte_count += byte_count
+            # Per-switch totals are kept up to date by the flow stats store
+            for dpid, totals in self.flows.switch_totals.items():
+                if not totals['count']:
+                    continue
+                flow_count_by_switch[dpid] = dict(totals)
+                active_flows += totals['active']
+                total_packet_count += totals['packets']
+                total_byte_count += totals['bytes']
             
             # Calculate efficiency score
             total_flows = len(self.flows)
@@ -0,0 +1,391 @@
+"""
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Port and Flow Statistics Store
+
+Counters are kept in fixed-width arrays (one array per counter, one slot per
+port or flow) instead of a dict per entry. Rates are computed when a stats
+reply arrives, so readers only reduce over the arrays. Flows are identified
+by a structural key (switch, table, priority, match fields) and are evicted
+once a complete flow stats reply no longer contains them.
+"""
+
+import logging
+import time
+from array import array
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+LOG = logging.getLogger('ryu.app.policy_switch.stats')
+
+PORT_COUNTERS = ('rx_packets', 'tx_packets', 'rx_bytes', 'tx_bytes',
+                 'rx_dropped', 'tx_dropped', 'rx_errors', 'tx_errors')
+
+
+def match_key(match) -> Any:
+    """Get a hashable key of an OFPMatch from its fields, without stringifying it."""
+    try:
+        fields = tuple(match.items())
+        hash(fields)
+        return fields
+    except (AttributeError, TypeError):
+        return str(match)
+
+
+class _SwitchPorts:
+    """Counter arrays of one switch, one slot per port."""
+
+    def __init__(self):
+        self.slots: Dict[int, int] = {}  # port_no -> slot
+        self.port_nos = array('Q')
+        self.counters = {name: array('Q') for name in PORT_COUNTERS}
+        self.timestamp = array('d')
+        self.rx_bps = array('d')
+        self.tx_bps = array('d')
+
+    def slot(self, port_no: int) -> int:
+        slot = self.slots.get(port_no)
+        if slot is None:
+            slot = len(self.port_nos)
+            self.slots[port_no] = slot
+            self.port_nos.append(port_no)
+            for values in self.counters.values():
+                values.append(0)
+            self.timestamp.append(0.0)
+            self.rx_bps.append(0.0)
+            self.tx_bps.append(0.0)
+        return slot
+
+
+class PortStatsStore:
+    """Per-switch port counters with the bandwidth of the last stats interval."""
+
+    def __init__(self):
+        self._switches: Dict[Any, _SwitchPorts] = {}
+
+    def update(self, dpid: Any, stats: Iterable[Any], now: Optional[float] = None) -> Dict[str, float]:
+        """
+        Record a port stats reply.
+
+        Args:
+            dpid: Switch datapath id
+            stats: OFPPortStats entries (port_no and the PORT_COUNTERS attributes)
+            now: Reply time (default: current time)
+
+        Returns:
+            Increase since the previous reply in bytes, packets and errors over all
+            ports, and the highest per-port bandwidth of this interval
+        """
+        now = time.time() if now is None else now
+        ports = self._switches.get(dpid)
+        if ports is None:
+            ports = self._switches[dpid] = _SwitchPorts()
+        counters = ports.counters
+        rx_bytes, tx_bytes = counters['rx_bytes'], counters['tx_bytes']
+        rx_packets, tx_packets = counters['rx_packets'], counters['tx_packets']
+        rx_errors, tx_errors = counters['rx_errors'], counters['tx_errors']
+
+        deltas = {'bytes': 0, 'packets': 0, 'errors': 0, 'peak_bps': 0.0}
+        for stat in stats:
+            slot = ports.slot(stat.port_no)
+            previous = ports.timestamp[slot]
+            interval = now - previous
+            if previous and interval > 0:
+                # Counters reset by the switch would give negative deltas; those count as zero
+                rx_delta = max(0, stat.rx_bytes - rx_bytes[slot])
+                tx_delta = max(0, stat.tx_bytes - tx_bytes[slot])
+                ports.rx_bps[slot] = rx_delta * 8 / interval
+                ports.tx_bps[slot] = tx_delta * 8 / interval
+                deltas['bytes'] += rx_delta + tx_delta
+                deltas['packets'] += (max(0, stat.rx_packets - rx_packets[slot])
+                                      + max(0, stat.tx_packets - tx_packets[slot]))
+                deltas['errors'] += (max(0, stat.rx_errors - rx_errors[slot])
+                                     + max(0, stat.tx_errors - tx_errors[slot]))
+                deltas['peak_bps'] = max(deltas['peak_bps'], ports.rx_bps[slot] + ports.tx_bps[slot])
+            for name, values in counters.items():
+                values[slot] = getattr(stat, name)
+            ports.timestamp[slot] = now
+        return deltas
+
+    def remove_switch(self, dpid: Any):
+        """Drop a switch's counters."""
+        self._switches.pop(dpid, None)
+
+    def get_port(self, dpid: Any, port_no: int) -> Dict[str, Any]:
+        """Get one port's counters and rates as a dict (empty if the port has no stats yet)."""
+        ports = self._switches.get(dpid)
+        slot = ports.slots.get(port_no) if ports else None
+        if slot is None:
+            return {}
+        port = {'port_no': port_no}
+        for name, values in ports.counters.items():
+            port[name] = values[slot]
+        rx_bps, tx_bps = ports.rx_bps[slot], ports.tx_bps[slot]
+        port.update({'timestamp': ports.timestamp[slot], 'rx_bps': rx_bps, 'tx_bps': tx_bps,
+                     'total_bps': rx_bps + tx_bps})
+        return port
+
+    def get_ports(self, dpid: Any) -> Dict[int, Dict[str, Any]]:
+        """Get all ports of a switch as port_no -> dict."""
+        ports = self._switches.get(dpid)
+        if ports is None:
+            return {}
+        return {port_no: self.get_port(dpid, port_no) for port_no in ports.slots}
+
+    def summarize(self, dpid: Any, port_nos: Iterable[int]) -> Tuple[List[float], int]:
+        """
+        Reduce the given ports of a switch.
+
+        Args:
+            dpid: Switch datapath id
+            port_nos: Ports to include (e.g. those in the topology)
+
+        Returns:
+            (bandwidth in bps of each port with traffic, number of ports with errors)
+        """
+        ports = self._switches.get(dpid)
+        if ports is None:
+            return [], 0
+        slots = ports.slots
+        rx_bps, tx_bps = ports.rx_bps, ports.tx_bps
+        rx_errors, tx_errors = ports.counters['rx_errors'], ports.counters['tx_errors']
+        bandwidths = []
+        errors = 0
+        for port_no in port_nos:
+            slot = slots.get(port_no)
+            if slot is None:
+                continue
+            bandwidth = rx_bps[slot] + tx_bps[slot]
+            if bandwidth > 0:
+                bandwidths.append(bandwidth)
+            if rx_errors[slot] or tx_errors[slot]:
+                errors += 1
+        return bandwidths, errors
+
+
+class FlowStatsStore(Mapping):
+    """
+    Flow entries with counters in fixed-width arrays.
+
+    Reads like the previous flows dict: flow id -> dict of flow fields, with
+    per-switch totals kept up to date on every update.
+    """
+
+    def __init__(self, serialize_match: Optional[Callable[[Any], Any]] = None):
+        """
+        Initialize the store.
+
+        Args:
+            serialize_match: Converts an OFPMatch to the JSON form kept with each flow
+        """
+        self._serialize_match = serialize_match or (lambda match: match)
+        self._slots: Dict[Tuple, int] = {}   # (dpid, table_id, priority, match key) -> slot
+        self._ids: Dict[str, int] = {}       # flow id -> slot
+        self._by_switch: Dict[Any, set] = {}
+        self._free: List[int] = []
+        self._info: List[Optional[Dict[str, Any]]] = []  # static fields per slot
+        self._keys: List[Optional[Tuple]] = []
+        self.packet_count = array('Q')
+        self.byte_count = array('Q')
+        self.duration_sec = array('Q')
+        self.duration_nsec = array('Q')
+        self.packets_per_second = array('d')
+        self.bytes_per_second = array('d')
+        self.last_updated = array('d')
+        self._last_seen = array('Q')  # update tick
+        self._tick = 0
+        self._completed_tick: Dict[Any, int] = {}  # dpid -> tick of its last complete reply
+        self._next_id = 0
+        # dpid -> {'count', 'active', 'packets', 'bytes'}; packets/bytes count active flows only
+        self.switch_totals: Dict[Any, Dict[str, int]] = {}
+
+    # --- Mapping interface (flow id -> flow dict) ---
+
+    def __getitem__(self, flow_id: str) -> Dict[str, Any]:
+        return self._record(self._ids[flow_id])
+
+    def __iter__(self):
+        return iter(list(self._ids))
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        """Get all flows as a plain dict."""
+        return {flow_id: self._record(slot) for flow_id, slot in self._ids.items()}
+
+    def _record(self, slot: int) -> Dict[str, Any]:
+        record = dict(self._info[slot])
+        record.pop('flow_id', None)
+        record.update({
+            'packet_count': self.packet_count[slot],
+            'byte_count': self.byte_count[slot],
+            'duration_sec': self.duration_sec[slot],
+            'duration_nsec': self.duration_nsec[slot],
+            'packets_per_second': self.packets_per_second[slot],
+            'bytes_per_second': self.bytes_per_second[slot],
+            'last_updated': self.last_updated[slot]
+        })
+        return record
+
+    # --- Updates ---
+
+    def _totals(self, dpid: Any) -> Dict[str, int]:
+        totals = self.switch_totals.get(dpid)
+        if totals is None:
+            totals = self.switch_totals[dpid] = {'count': 0, 'active': 0, 'packets': 0, 'bytes': 0}
+        return totals
+
+    def _allocate(self, key: Tuple, info: Dict[str, Any]) -> int:
+        if self._free:
+            slot = self._free.pop()
+            self._info[slot] = info
+            self._keys[slot] = key
+        else:
+            slot = len(self._info)
+            self._info.append(info)
+            self._keys.append(key)
+            for values in (self.packet_count, self.byte_count, self.duration_sec, self.duration_nsec,
+                           self._last_seen):
+                values.append(0)
+            for values in (self.packets_per_second, self.bytes_per_second, self.last_updated):
+                values.append(0.0)
+        dpid = key[0]
+        flow_id = f"{dpid}_{key[2]}_{self._next_id}"
+        self._next_id += 1
+        info['flow_id'] = flow_id
+        self._slots[key] = slot
+        self._ids[flow_id] = slot
+        self._by_switch.setdefault(dpid, set()).add(slot)
+        self._totals(dpid)['count'] += 1
+        return slot
+
+    def _set_counters(self, slot: int, dpid: Any, packet_count: int, byte_count: int):
+        """Update a slot's counters and the switch totals of active flows."""
+        totals = self._totals(dpid)
+        old_packets, old_bytes = self.packet_count[slot], self.byte_count[slot]
+        if old_packets > 0:
+            totals['active'] -= 1
+            totals['packets'] -= old_packets
+            totals['bytes'] -= old_bytes
+        if packet_count > 0:
+            totals['active'] += 1
+            totals['packets'] += packet_count
+            totals['bytes'] += byte_count
+        self.packet_count[slot] = packet_count
+        self.byte_count[slot] = byte_count
+
+    def _release(self, slot: int):
+        key = self._keys[slot]
+        dpid = key[0]
+        self._set_counters(slot, dpid, 0, 0)
+        self._totals(dpid)['count'] -= 1
+        del self._slots[key]
+        del self._ids[self._info[slot]['flow_id']]
+        self._by_switch[dpid].discard(slot)
+        self._info[slot] = None
+        self._keys[slot] = None
+        self._free.append(slot)
+
+    def record_installed(self, dpid: Any, table_id: int, priority: int, match, info: Dict[str, Any]):
+        """
+        Record a flow sent to a switch, before it shows up in stats replies.
+
+        Args:
+            dpid: Switch datapath id
+            table_id: Flow table
+            priority: Flow priority
+            match: OFPMatch of the flow
+            info: Fields stored with the flow (actions, timeouts, ...)
+        """
+        self._tick += 1
+        key = (dpid, table_id, priority, match_key(match))
+        slot = self._slots.get(key)
+        if slot is None:
+            info = dict(info, datapath_id=dpid, priority=priority, match=self._serialize_match(match))
+            slot = self._allocate(key, info)
+        else:
+            self._info[slot].update(info)
+        self._last_seen[slot] = self._tick
+        self.last_updated[slot] = time.time()
+
+    def update(self, dpid: Any, stats: Iterable[Any], complete: bool = True,
+               describe: Optional[Callable[[Any], Dict[str, Any]]] = None,
+               now: Optional[float] = None) -> Dict[str, int]:
+        """
+        Record (part of) a flow stats reply.
+
+        Args:
+            dpid: Switch datapath id
+            stats: OFPFlowStats entries
+            complete: This is the last part of the reply; flows of the switch not seen
+                since its previous complete reply are then evicted
+            describe: Gives the static fields of a newly seen flow entry
+            now: Reply time (default: current time)
+
+        Returns:
+            New flows and the increase in packets and bytes since the previous reply
+        """
+        now = time.time() if now is None else now
+        self._tick += 1
+        tick = self._tick
+        changes = {'new_flows': 0, 'packets': 0, 'bytes': 0, 'evicted': 0}
+        for stat in stats:
+            key = (dpid, stat.table_id, stat.priority, match_key(stat.match))
+            slot = self._slots.get(key)
+            if slot is None:
+                info = describe(stat) if describe else {}
+                info.update(datapath_id=dpid, table_id=stat.table_id, priority=stat.priority,
+                            created_time=now)
+                info.setdefault('match', self._serialize_match(stat.match))
+                slot = self._allocate(key, info)
+                changes['new_flows'] += 1
+                changes['packets'] += stat.packet_count
+                changes['bytes'] += stat.byte_count
+            else:
+                packet_delta = stat.packet_count - self.packet_count[slot]
+                byte_delta = stat.byte_count - self.byte_count[slot]
+                changes['packets'] += max(0, packet_delta)
+                changes['bytes'] += max(0, byte_delta)
+                interval = now - self.last_updated[slot]
+                if interval > 0:
+                    self.packets_per_second[slot] = max(0, packet_delta) / interval
+                    self.bytes_per_second[slot] = max(0, byte_delta) / interval
+            self._set_counters(slot, dpid, stat.packet_count, stat.byte_count)
+            self.duration_sec[slot] = stat.duration_sec
+            self.duration_nsec[slot] = stat.duration_nsec
+            self.last_updated[slot] = now
+            self._last_seen[slot] = tick
+
+        if complete:
+            previous = self._completed_tick.get(dpid, 0)
+            stale = [slot for slot in self._by_switch.get(dpid, ()) if self._last_seen[slot] <= previous]
+            for slot in stale:
+                self._release(slot)
+            changes['evicted'] = len(stale)
+            self._completed_tick[dpid] = tick
+        return changes
+
+    def remove_switch(self, dpid: Any):
+        """Drop all flows of a switch."""
+        for slot in list(self._by_switch.get(dpid, ())):
+            self._release(slot)
+        self._by_switch.pop(dpid, None)
+        self._completed_tick.pop(dpid, None)
+        self.switch_totals.pop(dpid, None)
+
+    def active_count(self) -> int:
+        """Number of flows that have matched packets."""
+        return sum(totals['active'] for totals in self.switch_totals.values())
@@ -25,6 +25,7 @@
 import threading
 import os
 import json
+import hashlib
 
 from src.core.common.logger import LoggerMixin
 from src.networking.sdn.sdn_controller import ISDNController
@@ -1527,6 +1528,7 @@ def start_policy_polling(self, interval_seconds: int = 30) -> None:
         
         self.polling_interval = interval_seconds
         self.polling_active = True
+        self._applied_policy_fingerprints: Dict[str, str] = {}  # policy id -> fingerprint when applied
         
         self.logger.info(f"FlowManager: Starting policy polling thread with interval {interval_seconds}s")
         
@@ -1540,13 +1542,22 @@ def poll_policies():
                     policies = self.policy_engine.get_policies()
                     
                     if policies:
-                        self.logger.info(f"FlowManager: Received {len(policies)} policies from policy engine")
-                        # Process policies
+                        self.logger.debug(f"FlowManager: Received {len(policies)} policies from policy engine")
+                        # Apply only policies that are new or changed since they were last applied
+                        applied = 0
                         for policy in policies:
                             if policy.get("enabled", True):
-                                # Apply the policy
+                                fingerprint = self._policy_fingerprint(policy)
+                                policy_key = policy.get("id", policy.get("policy_id", fingerprint))
+                                if self._applied_policy_fingerprints.get(policy_key) == fingerprint:
+                                    continue
                                 self.logger.debug(f"FlowManager: Processing policy: {policy.get('name', 'Unnamed')} (type: {policy.get('type')})")
-                                self.apply_network_policy(policy)
+                                # Time-based flows depend on the clock, so those policies are re-evaluated every cycle
+                                if self.apply_network_policy(policy) and policy.get("type") != "time_based":
+                                    self._applied_policy_fingerprints[policy_key] = fingerprint
+                                applied += 1
+                        if applied:
+                            self.logger.info(f"FlowManager: Applied {applied} new or changed policies of {len(policies)}")
                     else:
                         self.logger.debug("FlowManager: No policies received from policy engine, will retry later")
                     
@@ -1563,6 +1574,11 @@ def poll_policies():
         self.polling_thread.daemon = True
         self.polling_thread.start()
     
+    @staticmethod
+    def _policy_fingerprint(policy: Dict[str, Any]) -> str:
+        """Get a digest of a policy's content for change detection."""
+        return hashlib.sha256(json.dumps(policy, sort_keys=True, default=str).encode()).hexdigest()
+    
     def stop_policy_polling(self) -> None:
         """Stop polling for policy updates."""
         self.polling_active = False
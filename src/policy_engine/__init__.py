@@ -17,6 +17,7 @@
 """
 
 from .policy_engine import PolicyEngine
+from .policy_compiler import PolicyCompiler
 from .policy_engine_server import app
 
-__all__ = ["PolicyEngine", "app"] 
\ No newline at end of file
+__all__ = ["PolicyEngine", "PolicyCompiler", "app"] 
\ No newline at end of file
@@ -0,0 +1,343 @@
+"""
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+"""
+Policy Compiler module.
+
+Compiles rule condition strings such as
+"current_hour >= peak_start AND current_hour <= peak_end" into closures once,
+when a policy is loaded, created or updated. Evaluating a compiled condition
+only looks up context values and compares them; parameter substitution,
+operator scanning and literal conversion all happen at compile time.
+
+Compiled conditions produce the same results and explanations as
+PolicyEngine._evaluate_condition, which remains the reference implementation.
+Run this module directly to benchmark both on representative FL contexts.
+"""
+
+import logging
+import operator
+import threading
+from typing import Any, Callable, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Checked in this order, so ">=" wins over ">" (same as the interpreted path)
+OPERATORS = (">=", "<=", "==", "!=", ">", "<")
+NUMERIC_OPERATORS = frozenset({">=", "<=", ">", "<"})
+COMPARATORS = {
+    ">=": operator.ge,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    "<": operator.lt
+}
+
+ConditionResult = Tuple[bool, str]
+
+
+class CompiledCondition:
+    """A rule condition compiled for a fixed set of rule parameters."""
+
+    __slots__ = ("source", "parameters", "_evaluate")
+
+    def __init__(self, source: str, parameters: Dict[str, Any], evaluate: Callable[[Dict[str, Any]], ConditionResult]):
+        self.source = source
+        self.parameters = parameters
+        self._evaluate = evaluate
+
+    def __call__(self, context: Dict[str, Any]) -> ConditionResult:
+        """
+        Evaluate the condition against a context.
+
+        Returns:
+            Tuple of (condition_result, explanation)
+        """
+        try:
+            return self._evaluate(context)
+        except Exception as e:
+            logger.error(f"Error evaluating condition '{self.source}': {e}")
+            return False, f"Condition evaluation error: {str(e)}"
+
+
+class PolicyCompiler:
+    """Compiles and caches the rule conditions of policies."""
+
+    def __init__(self, convert: Callable[[Any], Any], ensure_numeric: Callable[[Any, str], Any]):
+        """
+        Initialize the policy compiler.
+
+        Args:
+            convert: Converts raw values to int, float, bool, None or str
+                (PolicyEngine._convert_to_appropriate_type)
+            ensure_numeric: Converts a value for numeric comparison or raises ValueError
+                (PolicyEngine._ensure_numeric_type)
+        """
+        self._convert = convert
+        self._ensure_numeric = ensure_numeric
+        self._lock = threading.Lock()
+        # policy_id -> {"version", "rules", "conditions": {rule_index: CompiledCondition}}
+        self._policies: Dict[str, Dict[str, Any]] = {}
+        self.stats = {"policies_compiled": 0, "conditions_compiled": 0}
+
+    # --- Compilation ---
+
+    def compile_condition(self, condition: str, parameters: Dict[str, Any]) -> CompiledCondition:
+        """
+        Compile a condition expression with its rule parameters.
+
+        Args:
+            condition: The condition string, e.g. "current_round > max_rounds"
+            parameters: Rule parameters, substituted into the condition
+
+        Returns:
+            Callable evaluating the condition against a context
+        """
+        try:
+            # Parameter placeholders are substituted once, as text (see _evaluate_condition)
+            text = condition
+            for param_key, param_value in parameters.items():
+                if param_key in text:
+                    text = text.replace(param_key, str(param_value))
+
+            if " AND " in text:
+                evaluate = self._compile_junction(text.split(" AND "), parameters, all, "AND")
+            elif " OR " in text:
+                evaluate = self._compile_junction(text.split(" OR "), parameters, any, "OR")
+            else:
+                evaluate = self._compile_simple(text, parameters)
+        except Exception as e:
+            error = e
+
+            def evaluate(context):
+                raise error
+
+        self.stats["conditions_compiled"] += 1
+        return CompiledCondition(condition, parameters, evaluate)
+
+    def _compile_junction(self, parts, parameters: Dict[str, Any], combine, keyword: str):
+        """Compile an AND/OR of simple conditions. Every part is evaluated for the explanation."""
+        compiled_parts = [self._compile_simple(part.strip(), parameters) for part in parts]
+        separator = f" {keyword} "
+        prefix = f"{keyword} condition: "
+
+        def evaluate(context):
+            results = [part(context) for part in compiled_parts]
+            return combine(r[0] for r in results), prefix + separator.join(r[1] for r in results)
+        return evaluate
+
+    def _compile_simple(self, condition: str, parameters: Dict[str, Any]):
+        """Compile a single comparison, or a bare value tested for truthiness."""
+        for op in OPERATORS:
+            if op in condition:
+                left, right = condition.split(op, 1)
+                return self._compile_comparison(condition, left.strip(), op, right.strip(), parameters)
+
+        get_value = self._compile_operand(condition, parameters)
+
+        def evaluate_bool(context):
+            try:
+                bool_val = get_value(context)
+                return bool(bool_val), f"{condition} = {bool_val}"
+            except Exception as e:
+                logger.error(f"Error evaluating simple condition '{condition}': {e}")
+                return False, f"Simple condition error: {str(e)}"
+        return evaluate_bool
+
+    def _compile_comparison(self, condition: str, left: str, op: str, right: str, parameters: Dict[str, Any]):
+        """Compile "left op right" into a closure."""
+        get_left = self._compile_operand(left, parameters)
+        get_right = self._compile_operand(right, parameters)
+        compare = COMPARATORS[op]
+        numeric = op in NUMERIC_OPERATORS
+        ensure_numeric = self._ensure_numeric
+
+        def evaluate(context):
+            try:
+                left_val = get_left(context)
+                right_val = get_right(context)
+                try:
+                    if numeric:
+                        left_val = ensure_numeric(left_val, left)
+                        right_val = ensure_numeric(right_val, right)
+                    result = compare(left_val, right_val)
+                    return result, f"{left}({left_val}) {op} {right}({right_val}) = {result}"
+                except (TypeError, ValueError) as e:
+                    logger.warning(f"Type conversion failed for condition '{condition}': {e}. Left: {left_val} ({type(left_val)}), Right: {right_val} ({type(right_val)})")
+                    if not numeric:
+                        # For type errors, fall back to string comparison for == and !=
+                        str_left = str(left_val)
+                        str_right = str(right_val)
+                        result = compare(str_left, str_right)
+                        return result, f"{left}('{str_left}') {op} {right}('{str_right}') = {result} (string comparison)"
+                    return False, f"Type comparison error: {left}({left_val}, {type(left_val)}) {op} {right}({right_val}, {type(right_val)})"
+            except Exception as e:
+                logger.error(f"Error evaluating simple condition '{condition}': {e}")
+                return False, f"Simple condition error: {str(e)}"
+        return evaluate
+
+    def _compile_operand(self, expr: str, parameters: Dict[str, Any]):
+        """
+        Compile an operand lookup.
+
+        Context values take precedence (they vary per check); otherwise the operand is
+        a rule parameter or a literal, both converted once here.
+        """
+        expr = expr.strip()
+        convert = self._convert
+        if expr in parameters:
+            fallback = convert(parameters[expr])
+        else:
+            fallback = convert(expr)
+
+        def get_value(context):
+            if expr in context:
+                value = context[expr]
+                # Conversion only changes strings
+                return convert(value) if isinstance(value, str) else value
+            return fallback
+        return get_value
+
+    # --- Policy cache ---
+
+    def compile_policy(self, policy: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Compile every rule condition of a policy and cache the result by policy version.
+
+        Args:
+            policy: Policy dictionary with "id" and "rules"
+
+        Returns:
+            The cache entry for the policy
+        """
+        conditions = {}
+        rules = policy.get("rules", [])
+        for rule_index, rule in enumerate(rules if isinstance(rules, list) else []):
+            if not isinstance(rule, dict):
+                continue
+            match = rule.get("match", {})
+            if isinstance(match, dict) and "condition" in match:
+                conditions[rule_index] = self.compile_condition(match["condition"], rule.get("parameters", {}))
+
+        entry = {"version": policy.get("version"), "rules": policy.get("rules"), "conditions": conditions}
+        with self._lock:
+            self._policies[policy.get("id")] = entry
+            self.stats["policies_compiled"] += 1
+        return entry
+
+    def compile_policies(self, policies: Dict[str, Dict[str, Any]]) -> None:
+        """Compile all policies, replacing the cache."""
+        with self._lock:
+            self._policies = {}
+        for policy in policies.values():
+            try:
+                self.compile_policy(policy)
+            except Exception as e:
+                logger.error(f"Error compiling policy {policy.get('id')}: {e}")
+        logger.info(f"Compiled {len(policies)} policies ({self.stats['conditions_compiled']} conditions total)")
+
+    def discard(self, policy_id: str) -> None:
+        """Forget the compiled form of a deleted policy."""
+        with self._lock:
+            self._policies.pop(policy_id, None)
+
+    def get_condition(self, policy: Dict[str, Any], rule_index: int, condition: str,
+                      parameters: Dict[str, Any]) -> CompiledCondition:
+        """
+        Get the compiled condition of a rule, recompiling the policy if it changed.
+
+        A cache entry is valid while the policy keeps the same version and rules list.
+        Parameters are compared by value, as callers may pass a fresh `{}` for rules
+        without parameters.
+        """
+        entry = self._policies.get(policy.get("id"))
+        if entry is None or entry["rules"] is not policy.get("rules") or entry["version"] != policy.get("version"):
+            entry = self.compile_policy(policy)
+        compiled = entry["conditions"].get(rule_index)
+        if compiled is None or compiled.source != condition or (
+                compiled.parameters is not parameters and compiled.parameters != parameters):
+            # The rule was edited in place; compile it on its own
+            compiled = self.compile_condition(condition, parameters)
+            entry["conditions"][rule_index] = compiled
+        return compiled
+
+
+def benchmark(iterations: int = 20000) -> Dict[str, Any]:
+    """
+    Compare compiled and interpreted condition evaluation on representative FL contexts.
+
+    Args:
+        iterations: Number of evaluations of each condition
+
+    Returns:
+        Timings in microseconds per evaluation for both paths
+    """
+    import time
+    from src.policy_engine.policy_engine_server import PolicyEngine
+
+    # Only the stateless conversion helpers are needed, so skip loading policies
+    engine = PolicyEngine.__new__(PolicyEngine)
+    compiler = PolicyCompiler(engine._convert_to_appropriate_type, engine._ensure_numeric_type)
+
+    cases = [
+        ("current_hour >= peak_start AND current_hour <= peak_end", {"peak_start": 9, "peak_end": 17},
+         {"operation": "model_training", "current_hour": 14, "current_round": 12, "server_round": 12}),
+        ("current_round > 30 AND accuracy_improvement <= convergence_threshold", {"convergence_threshold": 0.001},
+         {"operation": "decide_next_round", "current_round": 42, "accuracy": 0.91, "accuracy_improvement": "0.0004"}),
+        ("current_round > 1 AND available_clients < min_clients_threshold", {"min_clients_threshold": 2},
+         {"operation": "decide_next_round", "current_round": 5, "available_clients": 3}),
+        ("model_size_mb >= max_model_size", {"max_model_size": 100},
+         {"operation": "evaluate_client", "client_id": "client-3", "model_size_mb": 42.5}),
+        ("current_round > max_rounds", {"max_rounds": 50},
+         {"operation": "decide_next_round", "current_round": "12"}),
+    ]
+
+    # Time evaluation, not debug log output
+    logging.disable(logging.INFO)
+    results = {"iterations": iterations, "cases": []}
+    total_interpreted = total_compiled = 0.0
+    for condition, parameters, context in cases:
+        compiled = compiler.compile_condition(condition, parameters)
+        expected = engine._evaluate_condition(condition, context, parameters)
+        if compiled(context) != expected:
+            raise AssertionError(f"Compiled result differs for '{condition}': {compiled(context)} != {expected}")
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            engine._evaluate_condition(condition, context, parameters)
+        interpreted = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            compiled(context)
+        compiled_time = time.perf_counter() - start
+
+        total_interpreted += interpreted
+        total_compiled += compiled_time
+        results["cases"].append({
+            "condition": condition,
+            "interpreted_us": round(interpreted / iterations * 1e6, 2),
+            "compiled_us": round(compiled_time / iterations * 1e6, 2),
+            "speedup": round(interpreted / compiled_time, 1) if compiled_time else None
+        })
+
+    logging.disable(logging.NOTSET)
+    results["speedup"] = round(total_interpreted / total_compiled, 1) if total_compiled else None
+    return results
+
+
+if __name__ == "__main__":
+    import json
+    print(json.dumps(benchmark(), indent=2))
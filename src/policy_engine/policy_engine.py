@@ -23,8 +23,6 @@
 import logging
 import uuid
 import datetime
-import collections
-import threading
 from typing import Dict, List, Any, Optional, Union
 import hashlib
 
@@ -33,6 +31,8 @@
 import requests
 from flask import Flask, jsonify, request
 
+from src.core.common.event_log import EventLog
+
 # Set up logging
 logging.basicConfig(level=logging.DEBUG)  # Changed from INFO to DEBUG
 logger = logging.getLogger(__name__)
@@ -51,8 +51,7 @@ class PolicyEngine(IPolicyEngine):
     """
     
     # Class-level event buffer for simplicity (since Flask routes create new instances)
-    _event_buffer = collections.deque(maxlen=1000)  # Store up to 1000 recent events
-    _buffer_lock = threading.Lock()
+    _event_buffer = EventLog(capacity=1000, id_key="event_id")  # Store up to 1000 recent events
     
     def __init__(self, policy_file: str = None):
         """
@@ -88,9 +87,8 @@ def _log_event(self, event_type: str, details: Dict[str, Any]):
         }
         
         logger.debug(f"Adding event to buffer: {event_type} (id: {event['event_id']})")
-        with PolicyEngine._buffer_lock:
-            PolicyEngine._event_buffer.append(event)
-            logger.debug(f"Event buffer size is now {len(PolicyEngine._event_buffer)}")
+        PolicyEngine._event_buffer.append(event)
+        logger.debug(f"Event buffer size is now {len(PolicyEngine._event_buffer)}")
         
         logger.debug(f"Logged event: {event['event_id']} - {event_type}")
     
@@ -503,51 +501,22 @@ def get_events():
     Query parameters:
         since_event_id: Optional event ID to get events after this ID
         limit: Maximum number of events to return (default: 1000)
+        wait: Seconds to wait for new events when there are none (default: 0, max: 60)
     """
     try:
         # Parse query parameters
         since_event_id = request.args.get('since_event_id')
         limit = int(request.args.get('limit', 1000))  # No hard maximum limit
+        wait = min(max(float(request.args.get('wait', 0)), 0.0), 60.0)
         
         logger.debug(f"Events endpoint called - buffer size: {len(PolicyEngine._event_buffer)}")
         
-        # Lock the buffer while making a copy
-        with PolicyEngine._buffer_lock:
-            # Make a snapshot to work with
-            current_events = list(PolicyEngine._event_buffer)
-            logger.debug(f"Copied {len(current_events)} events from buffer")
-            
-            last_event_id = current_events[-1]["event_id"] if current_events else None
-            
-            if not current_events:
-                logger.debug("Event buffer is empty")
-                return jsonify({"events": [], "last_event_id": None})
-            
-            # Filter events after since_event_id if provided
-            start_index = 0
-            if since_event_id:
-                logger.debug(f"Filtering events after ID: {since_event_id}")
-                # Find the index of the event *after* since_event_id
-                found = False
-                for i, event in enumerate(current_events):
-                    if event["event_id"] == since_event_id:
-                        start_index = i + 1
-                        found = True
-                        logger.debug(f"Found event at index {i}, returning events starting from index {start_index}")
-                        break
-                        
-                # If since_event_id not found, return all events
-                if not found:
-                    logger.debug(f"Event ID not found: {since_event_id}, returning all events")
-                    start_index = 0
-            
-            # Slice the list based on start_index and limit
-            results = current_events[start_index : start_index + limit]
-            logger.debug(f"Returning {len(results)} events")
+        result = PolicyEngine._event_buffer.read_or_wait(since_event_id, limit=limit, timeout=wait)
+        logger.debug(f"Returning {len(result['events'])} events")
         
         return jsonify({
-            "events": results,
-            "last_event_id": last_event_id
+            "events": result["events"],
+            "last_event_id": result["last_event_id"]
         })
     except Exception as e:
         logger.error(f"Error in /events endpoint: {str(e)}", exc_info=True)
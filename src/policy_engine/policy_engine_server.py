@@ -27,13 +27,12 @@
 import logging
 import json
 import uuid
-import threading
 import time
 import datetime
 import random
 from typing import Dict, Any, List, Optional, Union, Tuple
 from functools import lru_cache
-from flask import Flask, request, jsonify, g
+from flask import Flask, Response, request, jsonify, g
 from flask_cors import CORS
 
 # --- Use absolute imports --- 
@@ -42,6 +41,8 @@
 # from .policy_functions import PolicyFunctionManager, PolicyFunction, PolicyFunctionError
 from src.policy_engine.policies import PolicyManager, Policy, PolicyEvaluationError
 from src.policy_engine.policy_functions import PolicyFunctionManager, PolicyFunction, PolicyFunctionError
+from src.policy_engine.policy_compiler import PolicyCompiler
+from src.core.common.event_log import EventLog
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -53,8 +54,7 @@
 
 # Event buffer for logging policy events - OPTIMIZED FOR MEMORY
 MAX_EVENT_BUFFER_SIZE = 500  # Reduced from 1000
-EVENT_BUFFER = []
-EVENT_BUFFER_LOCK = threading.Lock()
+EVENT_BUFFER = EventLog(capacity=MAX_EVENT_BUFFER_SIZE, id_key="id")
 
 def log_event(event_type: str, details: Dict[str, Any], source_component: str = "POLICY_ENGINE"):
     """
@@ -77,14 +77,8 @@ def log_event(event_type: str, details: Dict[str, Any], source_component: str =
         "details": details if isinstance(details, dict) and len(str(details)) < 1000 else {"summary": str(details)[:500]}  # Limit detail size
     }
     
-    # Add to event buffer with automatic cleanup
-    with EVENT_BUFFER_LOCK:
-        EVENT_BUFFER.append(event)
-        # Trim buffer more aggressively to save memory
-        if len(EVENT_BUFFER) > MAX_EVENT_BUFFER_SIZE:
-            # Remove oldest 20% of events
-            remove_count = max(1, MAX_EVENT_BUFFER_SIZE // 5)
-            EVENT_BUFFER[:remove_count] = []
+    # Add to the bounded event buffer; the oldest event is evicted when it is full
+    EVENT_BUFFER.append(event)
             
     # Log the event (reduced verbosity)
     logger.debug(f"Event logged: {event_type}")
@@ -121,56 +115,38 @@ def get_events():
     Query parameters:
         since_event_id: Optional event ID to get events after this ID
         limit: Maximum number of events to return (default: 1000)
+        wait: Seconds to wait for new events when there are none (default: 0, max: 60)
     """
     try:
         # Parse query parameters
         since_event_id = request.args.get('since_event_id')
         limit = int(request.args.get('limit', 1000))  # No hard maximum limit
+        wait = min(max(float(request.args.get('wait', 0)), 0.0), 60.0)
         
         logger.debug(f"Events endpoint called - buffer size: {len(EVENT_BUFFER)}")
         
-        # Lock the buffer while making a copy
-        with EVENT_BUFFER_LOCK:
-            # Make a snapshot to work with
-            current_events = EVENT_BUFFER.copy()
-            logger.debug(f"Copied {len(current_events)} events from buffer")
-            
-            last_event_id = current_events[-1]["id"] if current_events else None
-            
-            if not current_events:
-                logger.debug("Event buffer is empty")
-                return jsonify({"events": [], "last_event_id": None})
-            
-            # Filter events after since_event_id if provided
-            start_index = 0
-            if since_event_id:
-                logger.debug(f"Filtering events after ID: {since_event_id}")
-                # Find the index of the event *after* since_event_id
-                found = False
-                for i, event in enumerate(current_events):
-                    if event["id"] == since_event_id:
-                        start_index = i + 1
-                        found = True
-                        logger.debug(f"Found event at index {i}, returning events starting from index {start_index}")
-                        break
-                        
-                # If since_event_id not found, return all events
-                if not found:
-                    logger.debug(f"Event ID not found: {since_event_id}, returning all events")
-                    start_index = 0
-            
-            # Slice the list based on start_index and limit
-            results = current_events[start_index : start_index + limit]
-            logger.debug(f"Returning {len(results)} events")
+        result = EVENT_BUFFER.read_or_wait(since_event_id, limit=limit, timeout=wait)
+        logger.debug(f"Returning {len(result['events'])} events")
         
         return jsonify({
-            "events": results,
-            "last_event_id": last_event_id
+            "events": result["events"],
+            "last_event_id": result["last_event_id"]
         })
     except Exception as e:
         logger.error(f"Error in /events endpoint: {str(e)}", exc_info=True)
         return jsonify({"error": str(e)}), 500
 
+@app.route('/events/stream', methods=['GET'])
+def stream_events():
+    """
+    Stream events as Server-Sent Events.
+    
+    Resumes after the Last-Event-ID header or the since_event_id query parameter.
+    """
+    since_event_id = request.headers.get('Last-Event-ID') or request.args.get('since_event_id')
+    return Response(EVENT_BUFFER.stream(since_event_id), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 class PolicyEngine:
     """Policy engine for evaluating and enforcing policies."""
     
@@ -201,8 +177,12 @@ def __init__(self):
         self._last_cleanup_time = time.time()
         self._cleanup_interval = 3600  # Cleanup every hour
         
+        # Rule conditions are compiled once per policy version instead of parsed per check
+        self.policy_compiler = PolicyCompiler(self._convert_to_appropriate_type, self._ensure_numeric_type)
+        
         # Load policies from file if it exists
         self._load_policies()
+        self.policy_compiler.compile_policies(self.policies)
         
         logger.info("Policy engine initialized with memory optimizations")
         
@@ -430,6 +410,7 @@ def create_policy(self, policy_type: str, policy_data: Dict[str, Any]) -> str:
         
         # Store the policy
         self.policies[policy_id] = policy_data
+        self.policy_compiler.compile_policy(policy_data)
         
         # Save to file
         try:
@@ -449,6 +430,7 @@ def create_policy(self, policy_type: str, policy_data: Dict[str, Any]) -> str:
             # Remove from memory if save failed
             if policy_id in self.policies:
                 del self.policies[policy_id]
+            self.policy_compiler.discard(policy_id)
             logger.error(f"Failed to save policy {policy_id}: {e}")
             raise ValueError(f"Failed to save policy: {e}")
     
@@ -509,6 +491,8 @@ def update_policy(self, policy_id: str, policy_data: Dict[str, Any]) -> bool:
         # Remove any existing 'data' field to avoid confusion
         if "data" in policy:
             del policy["data"]
+        
+        self.policy_compiler.compile_policy(policy)
 
         # Add policy update to history
         self.policy_history.append({
@@ -573,6 +557,7 @@ def delete_policy(self, policy_id: str) -> bool:
         
         # Remove policy
         del self.policies[policy_id]
+        self.policy_compiler.discard(policy_id)
         
         # Save policies to file
         self._save_policies()
@@ -991,8 +976,9 @@ def check_policy(self, policy_type: str, context: Dict[str, Any]) -> Dict[str, A
                     
                     for key, value in match_conditions.items():
                         if key == "condition":
-                            # Handle complex condition expressions
-                            condition_matched, condition_reason = self._evaluate_condition(value, context, rule_parameters)
+                            # Handle complex condition expressions (compiled when the policy was loaded)
+                            compiled_condition = self.policy_compiler.get_condition(policy, rule_index, value, rule_parameters)
+                            condition_matched, condition_reason = compiled_condition(context)
                             if not condition_matched:
                                 match = False
                             match_details.append({
@@ -0,0 +1,100 @@
+from collections import Counter
+
+from flwr.server.client_proxy import ClientProxy
+
+from src.core.clients.client_registry import ClientRegistry
+from src.fl.server.fl_server import RegistryClientManager
+
+
+class _Proxy(ClientProxy):
+    """Client proxy stub; the client manager never calls the client."""
+
+    def get_properties(self, ins, timeout, group_id):
+        raise NotImplementedError
+
+    def get_parameters(self, ins, timeout, group_id):
+        raise NotImplementedError
+
+    def fit(self, ins, timeout, group_id):
+        raise NotImplementedError
+
+    def evaluate(self, ins, timeout, group_id):
+        raise NotImplementedError
+
+    def reconnect(self, ins, timeout, group_id):
+        raise NotImplementedError
+
+
+def _manager(num_clients, weighted=False):
+    manager = RegistryClientManager(ClientRegistry(seed=0), weighted=weighted)
+    for i in range(num_clients):
+        manager.register(_Proxy(f"client-{i}"))
+    return manager
+
+
+def test_client_manager_registry_register_adds_client():
+    """Test that registering a client proxy makes it available in the registry."""
+    manager = _manager(3)
+    assert manager.num_available() == 3
+    assert len(manager.registry) == 3
+    assert manager.registry.get_score("client-0") > 0
+    assert not manager.register(_Proxy("client-0"))
+
+
+def test_client_manager_registry_unregister_stops_sampling():
+    """Test that an unregistered client keeps its history but is no longer sampled."""
+    manager = _manager(3)
+    manager.unregister(manager.clients["client-1"])
+    assert "client-1" in manager.registry
+    assert manager.registry.get_score("client-1") == 0
+    for _ in range(20):
+        assert "client-1" not in [proxy.cid for proxy in manager.sample(2)]
+
+
+def test_client_manager_registry_reconnect_is_sampled_again():
+    """Test that a client registering again after disconnecting becomes available."""
+    manager = _manager(2)
+    manager.unregister(manager.clients["client-0"])
+    manager.register(_Proxy("client-0"))
+    assert sorted(proxy.cid for proxy in manager.sample(2)) == ["client-0", "client-1"]
+
+
+def test_client_manager_registry_skips_stale_clients():
+    """Test that registry clients without a connection are not returned and are marked unavailable."""
+    manager = _manager(2)
+    manager.registry.register("stale")
+    for _ in range(20):
+        assert sorted(proxy.cid for proxy in manager.sample(2)) == ["client-0", "client-1"]
+    assert manager.registry.get_score("stale") == 0
+
+
+def test_client_manager_registry_too_few_clients():
+    """Test that sampling more clients than are connected returns nothing."""
+    manager = _manager(2)
+    assert manager.sample(3, min_num_clients=1) == []
+
+
+def test_client_manager_registry_weighted_favours_fast_clients():
+    """Test that utility-weighted sampling picks fast clients more often than slow ones."""
+    manager = _manager(10, weighted=True)
+    for i in range(10):
+        duration = 1.0 if i < 5 else 100.0
+        manager.registry.record_fit(f"client-{i}", {"training_duration": duration})
+
+    counts = Counter(proxy.cid for _ in range(500) for proxy in manager.sample(2))
+    fast = sum(counts[f"client-{i}"] for i in range(5))
+    slow = sum(counts[f"client-{i}"] for i in range(5, 10))
+    assert fast > 3 * slow
+
+
+def test_client_manager_registry_uniform_ignores_utility():
+    """Test that uniform sampling picks fast and slow clients about equally often."""
+    manager = _manager(10)
+    for i in range(10):
+        duration = 1.0 if i < 5 else 100.0
+        manager.registry.record_fit(f"client-{i}", {"training_duration": duration})
+
+    counts = Counter(proxy.cid for _ in range(500) for proxy in manager.sample(2))
+    fast = sum(counts[f"client-{i}"] for i in range(5))
+    slow = sum(counts[f"client-{i}"] for i in range(5, 10))
+    assert 0.7 < fast / slow < 1.4
@@ -0,0 +1,31 @@
+import numpy as np
+
+from src.fl.common.compression import UpdateCompressor, decode_update
+
+
+def test_compression_dense_fallback_round_trips_layer():
+    """Test that a layer sent dense by a top-k compressor decodes to its values."""
+    compressor = UpdateCompressor(topk_ratio=0.95)
+    layer = np.arange(1, 11, dtype=np.float32)
+    zeros = np.zeros_like(layer)
+    decoded = decode_update(compressor.encode([layer], [zeros]), [zeros])
+    np.testing.assert_array_equal(decoded[0], layer)
+
+
+def test_compression_dense_fallback_round_trips_scalar():
+    """Test that a scalar layer, always sent dense, decodes to its value."""
+    compressor = UpdateCompressor(topk_ratio=0.01)
+    layer = np.asarray([3.0], dtype=np.float32)
+    zeros = np.zeros_like(layer)
+    decoded = decode_update(compressor.encode([layer], [zeros]), [zeros])
+    np.testing.assert_array_equal(decoded[0], layer)
+
+
+def test_compression_dense_fallback_leaves_zero_residual():
+    """Test that error feedback carries nothing over from a layer sent exactly."""
+    compressor = UpdateCompressor(topk_ratio=0.95)
+    layer = np.arange(1, 11, dtype=np.float32)
+    zeros = np.zeros_like(layer)
+    compressor.encode([layer], [zeros])
+    decoded = decode_update(compressor.encode([layer], [zeros]), [zeros])
+    np.testing.assert_array_equal(decoded[0], layer)
@@ -0,0 +1,28 @@
+import numpy as np
+
+from src.fl.common.compression import UpdateCompressor, decode_update
+
+
+def test_compression_topk_rounds_enables_delta():
+    """Test that a top-k config without compression_delta still encodes deltas."""
+    compressor = UpdateCompressor.from_config({"compression_topk_ratio": 0.1})
+    assert compressor.delta
+    assert compressor.scheme == "f32+top0.1+delta"
+
+
+def test_compression_topk_rounds_stay_bounded_without_delta_config():
+    """Test that top-k with delta off in the config keeps a constant model constant over rounds."""
+    compressor = UpdateCompressor.from_config({"compression_topk_ratio": 0.1})
+    global_model = [np.full((10, 10), 2.0, dtype=np.float32)]
+    for _ in range(5):
+        trained = [layer.copy() for layer in global_model]
+        global_model = decode_update(compressor.encode(trained, global_model), global_model)
+        np.testing.assert_array_equal(global_model[0], np.full((10, 10), 2.0, dtype=np.float32))
+
+
+def test_compression_topk_rounds_send_dense_without_global_model():
+    """Test that top-k sends every value when no global model is available for the delta."""
+    compressor = UpdateCompressor(topk_ratio=0.1)
+    layer = np.arange(100, dtype=np.float32).reshape(10, 10)
+    for _ in range(3):
+        np.testing.assert_array_equal(decode_update(compressor.encode([layer]))[0], layer)
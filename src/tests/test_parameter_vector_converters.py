@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from flwr.common import ndarrays_to_parameters, parameters_to_ndarrays
+
+from src.core.common.parameter_vector import ParameterVector
+
+
+def _layers():
+    return [np.arange(12, dtype=np.float32).reshape(3, 4),
+            np.asarray([0.5, -1.5], dtype=np.float64),
+            np.asarray(7, dtype=np.int64)]
+
+
+def test_parameter_vector_converters_parameters_round_trip():
+    """Test that Flower Parameters survive packing and serializing with layer dtypes intact."""
+    layers = _layers()
+    vector = ParameterVector.from_parameters(ndarrays_to_parameters(layers))
+    assert vector.dtype == np.float64
+    restored = parameters_to_ndarrays(vector.to_parameters())
+    for original, array in zip(layers, restored):
+        assert array.dtype == original.dtype
+        np.testing.assert_array_equal(array, original)
+
+
+def test_parameter_vector_converters_state_dict_round_trip():
+    """Test that a torch state dict survives packing and unpacking."""
+    torch = pytest.importorskip("torch")
+    state_dict = {"weight": torch.arange(6, dtype=torch.float32).reshape(2, 3),
+                  "bias": torch.tensor([1.0, -1.0])}
+    vector = ParameterVector.from_state_dict(state_dict)
+    assert vector.names == ["weight", "bias"]
+    restored = vector.to_state_dict()
+    for name, tensor in state_dict.items():
+        assert torch.equal(restored[name], tensor)
+
+
+def test_parameter_vector_converters_weighted_sum():
+    """Test that weighted_sum matches the per-layer weighted average."""
+    rng = np.random.default_rng(0)
+    clients = [[rng.standard_normal((3, 4)), rng.standard_normal(5)] for _ in range(3)]
+    weights = [0.5, 0.3, 0.2]
+    vectors = [ParameterVector.from_ndarrays(layers, np.float64) for layers in clients]
+    result = ParameterVector.weighted_sum(vectors, weights)
+    for index, layer in enumerate(result.to_ndarrays()):
+        expected = sum(weight * layers[index] for weight, layers in zip(weights, clients))
+        np.testing.assert_allclose(layer, expected)
+
+
+def test_parameter_vector_converters_weighted_sum_rejects_layout_mismatch():
+    """Test that weighted_sum refuses vectors with different layer shapes."""
+    first = ParameterVector.from_ndarrays([np.zeros(3)])
+    second = ParameterVector.from_ndarrays([np.zeros(4)])
+    with pytest.raises(ValueError):
+        ParameterVector.weighted_sum([first, second], [0.5, 0.5])
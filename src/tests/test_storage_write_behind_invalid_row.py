@@ -0,0 +1,30 @@
+import pytest
+
+pytest.importorskip("apscheduler")  # required by the src.collector package
+
+from src.collector.storage import MetricsStorage
+
+
+@pytest.fixture
+def storage(tmp_path):
+    MetricsStorage._instance = None
+    storage = MetricsStorage(output_dir=str(tmp_path), write_behind=True,
+                             flush_interval_ms=1000, inline_cleanup=False)
+    yield storage
+    storage.close()
+    MetricsStorage._instance = None
+
+
+def test_storage_write_behind_invalid_row_keeps_valid_rows(storage):
+    """Test that one event violating NOT NULL in a batch only loses that event."""
+    for i in range(10):
+        storage.store_metric("network", {"latency": i})
+    storage.store_event({"event_type": "TEST", "message": "no source component"})
+    storage.store_event({"event_type": "TEST", "source_component": "test"})
+    assert storage.flush()
+
+    assert storage.count_metrics() == 10
+    assert storage.count_events() == 1
+    stats = storage.get_write_stats()
+    assert stats["rows_failed"] == 1
+    assert stats["rows_written"] == 11